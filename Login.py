@@ -1,23 +1,39 @@
+import importlib
 import customtkinter
-from tkinter import messagebox
-from db_connection import get_connection
-from dashboard import Dashboard
-import os
-from PIL import Image
+from db_connection import flush_audit_log
+from query_executor import FrameTasks, run_query
+from credentials import authenticate, get_sessions, LoginThrottled
+from migrations import migrate_on_startup
+from assets import load_image
+from patient_picker import clear_patient_cache
 
-class LoginPage(customtkinter.CTk):
-    def __init__(self):
-        super().__init__()
-        self.title("Queen Elizabeth Hospital Management System - Login")
-        self.geometry("1000x700")
-        self.resizable(False, False)
-        
-        # Set hospital color theme
-        customtkinter.set_appearance_mode("light")
-        customtkinter.set_default_color_theme("blue")
-        
-        # Configure main window background
-        self.configure(fg_color="#f0f8ff")  # Light blue background
+LOGIN_TITLE = "Queen Elizabeth Hospital Management System - Login"
+LOGIN_GEOMETRY = "1000x700"
+SESSION_GEOMETRY = "1400x900"
+
+# role -> (module, frame class); a module is imported when its role first logs in
+ROLE_FRAMES = {
+    "Admin": ("admin", "AdminFrame"),
+    "Doctor": ("doctor", "DoctorFrame"),
+    "Nurse": ("nurse", "NurseFrame"),
+    "Receptionist": ("receptionist", "ReceptionistFrame"),
+}
+
+
+def role_frame_class(role):
+    """Frame class of role's workspace, or None for a role without one"""
+    if role not in ROLE_FRAMES:
+        return None
+    module, name = ROLE_FRAMES[role]
+    return getattr(importlib.import_module(module), name)
+
+
+class LoginPage(customtkinter.CTkFrame):
+    def __init__(self, master, on_login=None):
+        # Light blue background
+        super().__init__(master, fg_color="#f0f8ff", corner_radius=0)
+        self.on_login = on_login
+        self.busy = False       # set while start-up migrations run
         
         # Create main container
         main_container = customtkinter.CTkFrame(self, fg_color="transparent")
@@ -36,16 +52,13 @@ class LoginPage(customtkinter.CTk):
         logo_frame = customtkinter.CTkFrame(title_frame, fg_color="transparent")
         logo_frame.pack(pady=15)
         
-        # Try to load logo, fallback to text
-        img_path = os.path.join(os.path.dirname(__file__), "hospital_logo.png")
-        if os.path.exists(img_path):
-            try:
-                pil_img = Image.open(img_path)
-                hospital_logo = customtkinter.CTkImage(light_image=pil_img, size=(60, 60))
-                logo_label = customtkinter.CTkLabel(logo_frame, image=hospital_logo, text="")
-                logo_label.pack(side="left", padx=(0, 15))
-            except:
-                pass
+        # Try to load logo (pre-resized, from the asset cache), fallback to text
+        hospital_logo = load_image(
+            "hospital_logo.png", (60, 60), customtkinter.ScalingTracker.get_widget_scaling(self)
+        )
+        if hospital_logo is not None:
+            logo_label = customtkinter.CTkLabel(logo_frame, image=hospital_logo, text="")
+            logo_label.pack(side="left", padx=(0, 15))
         
         # Hospital name and subtitle
         text_frame = customtkinter.CTkFrame(logo_frame, fg_color="transparent")
@@ -165,7 +178,7 @@ class LoginPage(customtkinter.CTk):
         self.toggle_btn.pack(anchor="w")
         
         # Login button
-        login_btn = customtkinter.CTkButton(
+        self.login_btn = customtkinter.CTkButton(
             login_frame, 
             text="🔐 LOGIN TO SYSTEM", 
             command=self.check_login,
@@ -176,7 +189,7 @@ class LoginPage(customtkinter.CTk):
             hover_color="#2d4a6b",
             corner_radius=20
         )
-        login_btn.pack(pady=25)
+        self.login_btn.pack(pady=25)
         
         # Status message
         self.status_label = customtkinter.CTkLabel(
@@ -266,7 +279,6 @@ class LoginPage(customtkinter.CTk):
         footer_text.pack(expand=True)
         
         # Bind Enter key to login
-        self.bind('<Return>', lambda event: self.check_login())
         self.username_entry.bind('<Return>', lambda event: self.password_entry.focus())
         self.password_entry.bind('<Return>', lambda event: self.check_login())
 
@@ -280,6 +292,8 @@ class LoginPage(customtkinter.CTk):
             self.toggle_btn.configure(text="👁️ Show Password")
 
     def check_login(self):
+        if self.busy:
+            return
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
         
@@ -295,83 +309,112 @@ class LoginPage(customtkinter.CTk):
         self.update()
         
         try:
-            self.conn = get_connection()
-            self.cursor = self.conn.cursor()
-            
-            # More secure query (consider using hashed passwords in production)
-            self.cursor.execute("SELECT role FROM users WHERE username=%s AND password=%s", (username, password))
-            result = self.cursor.fetchone()
-            self.conn.close()
-            
-            if result:
-                role = result[0]
-                self.status_label.configure(text="✅ Login successful! Loading dashboard...", text_color="#28a745")
-                self.update()
-                self.withdraw()
-                # Pass self.restart_login as on_logout to each frame
-                if role == "Admin":
-                    from admin import AdminFrame
-                    app = customtkinter.CTk()
-                    frame = AdminFrame(app, username)
-                    frame.on_logout = self.restart_login
-                    frame.pack(fill="both", expand=True)
-                    app.protocol("WM_DELETE_WINDOW", self.restart_login)
-                    app.mainloop()
-                elif role == "Doctor":
-                    from doctor import DoctorFrame
-                    app = customtkinter.CTk()
-                    frame = DoctorFrame(app, username)
-                    frame.on_logout = self.restart_login
-                    frame.pack(fill="both", expand=True)
-                    app.protocol("WM_DELETE_WINDOW", self.restart_login)
-                    app.mainloop()
-                elif role == "Receptionist":
-                    from receptionist import ReceptionistFrame
-                    app = customtkinter.CTk()
-                    frame = ReceptionistFrame(app, username)
-                    frame.on_logout = self.restart_login
-                    frame.pack(fill="both", expand=True)
-                    app.protocol("WM_DELETE_WINDOW", self.restart_login)
-                    app.mainloop()
-                elif role == "Nurse":
-                    from nurse import NurseFrame
-                    app = customtkinter.CTk()
-                    frame = NurseFrame(app, username)
-                    frame.on_logout = self.restart_login  # This makes logout return to login page
-                    frame.pack(fill="both", expand=True)
-                    app.protocol("WM_DELETE_WINDOW", self.restart_login)
-                    app.mainloop()
-                else:
-                    # Default dashboard
-                    from dashboard import Dashboard
-                    app = Dashboard(username, role)
-                    app.on_logout = self.restart_login
-                    app.mainloop()
-            else:
-                self.status_label.configure(text="❌ Invalid username or password. Please try again.", text_color="#dc3545")
-                
+            session = run_query(lambda cursor: authenticate(cursor, username, password))
+        except LoginThrottled as err:
+            self.status_label.configure(
+                text=f"⏳ Too many failed attempts. Try again in {max(1, round(err.seconds))} seconds.", text_color="#dc3545"
+            )
+            return
         except Exception as err:
             self.status_label.configure(text=f"🚫 Database connection error. Contact IT support.", text_color="#dc3545")
             print(f"Database Error: {err}")  # Log for debugging
+            return
 
-    def restart_login(self):
-        """Called when user logs out"""
+        if session is None:
+            self.status_label.configure(text="❌ Invalid username or password. Please try again.", text_color="#dc3545")
+        elif role_frame_class(session.role) is None:
+            get_sessions().end(username)
+            self.status_label.configure(text=f"⚠️ No workspace for the {session.role} role. Contact IT support.", text_color="#dc3545")
+        else:
+            self.status_label.configure(text="✅ Login successful! Loading dashboard...", text_color="#28a745")
+            self.update()
+            if self.on_login:
+                self.on_login(username, session.role)
+
+    def set_busy(self, message=None):
+        """Hold logins back, showing message, until called again without one"""
+        self.busy = message is not None
+        self.login_btn.configure(state="disabled" if self.busy else "normal")
+        self.status_label.configure(text=message or "", text_color="#0066cc")
+
+    def reset(self):
+        """Empty the form for the next user"""
         self.username_entry.delete(0, 'end')
         self.password_entry.delete(0, 'end')
         self.status_label.configure(text="")
         self.show_password = False
         self.password_entry.configure(show="*")
         self.toggle_btn.configure(text="👁️ Show Password")
-        self.deiconify()  # Show login window again
-        self.username_entry.focus()  # Focus on username field
 
-    def logout(self):
-        self.conn.close()
-        self.cursor.close()
-        # Do NOT use self.conn or self.cursor after this!
+
+def close_session(frame):
+    """Tear a role frame down: drop its queued queries, destroy its cached
+    views, dialogs and widgets (and the images they hold), forget the user's
+    session and the patients it looked up and write out its audit entries"""
+    frame.tasks.cancel_all()
+    frame.views.invalidate()
+    frame.destroy()
+    get_sessions().end()
+    clear_patient_cache()
+    flush_audit_log()
+
+
+class HospitalApp(customtkinter.CTk):
+    """The application window. The login page and the role frame of whoever
+    is logged in take turns inside this one root, so logging in and out all
+    day on a shared terminal reuses a single Tk interpreter and mainloop."""
+
+    def __init__(self):
+        super().__init__()
+        self.login = LoginPage(self, on_login=self.start_session)
+        self.session = None     # role frame of the logged-in user
+        self.tasks = FrameTasks(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.show_login()
+
+    def show_login(self):
+        self.title(LOGIN_TITLE)
+        self.geometry(LOGIN_GEOMETRY)
+        self.resizable(False, False)
+        self.login.reset()
+        self.login.pack(fill="both", expand=True)
+        self.login.username_entry.focus()
+
+    def upgrade_schema(self):
+        """Apply pending schema migrations in the background (rebuilding an index
+        or the rollups can take minutes on a large database); logins wait for it"""
+        self.login.set_busy("🔄 Updating the database, please wait...")
+        ready = lambda _: self.login.set_busy(None)
+        self.tasks.run(lambda cursor: migrate_on_startup(), ready, ready, cancellable=False)
+
+    def start_session(self, username, role):
+        self.login.pack_forget()
+        self.title(f"Queen Elizabeth Hospital Management System - {role}: {username}")
+        self.geometry(SESSION_GEOMETRY)
+        self.resizable(True, True)
+        frame = role_frame_class(role)(self, username)
+        frame.on_logout = self.end_session
+        frame.pack(fill="both", expand=True)
+        self.session = frame
+
+    def end_session(self):
+        """Called when the user logs out"""
+        frame, self.session = self.session, None
+        if frame is not None:
+            close_session(frame)
+        self.show_login()
+
+    def on_close(self):
+        # Closing the window logs the user out; closed at the login page it quits
+        if self.session is not None:
+            self.end_session()
+            return
+        flush_audit_log()
+        self.destroy()
 
 if __name__ == "__main__":
     customtkinter.set_appearance_mode("light")
     customtkinter.set_default_color_theme("blue")
-    login = LoginPage()
-    login.mainloop()
\ No newline at end of file
+    app = HospitalApp()
+    app.upgrade_schema()
+    app.mainloop()
\ No newline at end of file
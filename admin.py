@@ -2,22 +2,38 @@ import os
 import customtkinter
 from tkinter import messagebox, ttk, filedialog
 import tkinter as tk
-from datetime import datetime, date
-from db_connection import get_connection
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.units import inch
-import calendar
+from datetime import datetime
+from db_connection import flush_audit_log, get_backend
+from credentials import hash_password
+from query_executor import FrameTasks, show_loading, take_placeholder
+from view_cache import ViewCache
+from virtual_table import VirtualTable, query_pages
+from log_pages import LogPager, PAGE_SIZES, DEFAULT_PAGE_SIZE
+import date_ranges
+from dashboard_stats import get_dashboard_stats, invalidate_stats
+from pending_queue import get_pending_queue
+from patient_search import search_patients, fetch_ranked
+from query_stats import get_query_stats
+from backup import BackupJob, BackupCancelled
+from rollups import record_log_deleted, department_stats
+from reports import (
+    FULL_YEAR, MONTHS, ReportCancelled, ReportRequest, get_report_queue, report_filename
+)
+
+BACKUP_POLL_MS = 200
+REPORT_POLL_MS = 200
 
 class AdminFrame(customtkinter.CTkFrame):
     def __init__(self, master, username):
         super().__init__(master)
         self.username = username
-        self.conn = get_connection()
-        self.cursor = self.conn.cursor()
+        self.tasks = FrameTasks(self)
         self.on_logout = None
+        self.backup_job = None
+        self.backup_status = None
+        self.report_status = None
+        self.report_progress = None
+        self.reports_saved = []
 
         # Layout: Sidebar and Main Content
         self.grid_rowconfigure(0, weight=1)
@@ -57,6 +73,7 @@ class AdminFrame(customtkinter.CTkFrame):
             ("Staff Management", self.show_staff_management),
             ("System Reports", self.show_system_reports),
             ("System Logs", self.show_logs),
+            ("Query Performance", self.show_query_performance),
             ("Database Backup", self.show_backup_options)
         ]
         
@@ -85,17 +102,25 @@ class AdminFrame(customtkinter.CTkFrame):
         # Main content area
         self.content = customtkinter.CTkFrame(self, fg_color="white")
         self.content.grid(row=0, column=1, sticky="nsew", padx=10, pady=10)
+        self.views = ViewCache(self.content)
         self.show_dashboard()
+        if get_report_queue().busy():
+            # Reports queued before a logout are still rendering
+            self._poll_reports()
 
     def clear_content(self):
-        for widget in self.content.winfo_children():
-            widget.destroy()
+        self.tasks.cancel_all()
+        self.views.clear()
 
     def show_dashboard(self):
-        self.clear_content()
+        self.tasks.cancel_all()
+        self.views.show("dashboard", self._build_dashboard)
+
+    def _build_dashboard(self, parent):
+        """Lay out the dashboard; returns the refresh that reloads its counts"""
         
         # Enhanced Dashboard with Statistics
-        title_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        title_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
         title_frame.pack(fill="x", padx=20, pady=20)
         
         customtkinter.CTkLabel(
@@ -111,51 +136,30 @@ class AdminFrame(customtkinter.CTkFrame):
             text_color="#666"
         ).pack(anchor="w", pady=(5, 0))
 
-        # Quick Stats Cards
-        try:
-            # Get statistics
-            self.cursor.execute("SELECT COUNT(*) FROM patients")
-            total_patients = self.cursor.fetchone()[0]
-            
-            # Pending patients (those without recent treatment)
-            self.cursor.execute("""
-                SELECT COUNT(DISTINCT p.patient_id) 
-                FROM patients p 
-                LEFT JOIN treatments t ON p.patient_id = t.patient_id AND DATE(t.date) = CURDATE()
-                WHERE t.patient_id IS NULL
-            """)
-            pending_patients = self.cursor.fetchone()[0]
-            
-            self.cursor.execute("SELECT COUNT(*) FROM doctors")
-            total_doctors = self.cursor.fetchone()[0]
-            
-            self.cursor.execute("SELECT COUNT(*) FROM users")
-            total_users = self.cursor.fetchone()[0]
-            
-        except Exception:
-            total_patients = pending_patients = total_doctors = total_users = 0
-
         # Stats display
-        stats_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        stats_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
         stats_frame.pack(fill="x", padx=20, pady=20)
         
         stats_data = [
-            ("Total Patients", total_patients, "#3498db"),
-            ("Pending Patients", pending_patients, "#e74c3c"),
-            ("Doctors", total_doctors, "#27ae60"),
-            ("System Users", total_users, "#9b59b6")
+            ("Total Patients", "#3498db"),
+            ("Pending Patients", "#e74c3c"),
+            ("Doctors", "#27ae60"),
+            ("System Users", "#9b59b6")
         ]
         
-        for i, (title, value, color) in enumerate(stats_data):
+        value_labels = []
+        for i, (title, color) in enumerate(stats_data):
             card = customtkinter.CTkFrame(stats_frame, fg_color=color, width=150, height=100)
             card.grid(row=0, column=i, padx=10, pady=10, sticky="ew")
             
-            customtkinter.CTkLabel(
+            value_label = customtkinter.CTkLabel(
                 card,
-                text=str(value),
+                text="...",
                 font=("Arial", 24, "bold"),
                 text_color="white"
-            ).pack(pady=(20, 5))
+            )
+            value_label.pack(pady=(20, 5))
+            value_labels.append(value_label)
             
             customtkinter.CTkLabel(
                 card,
@@ -164,8 +168,20 @@ class AdminFrame(customtkinter.CTkFrame):
                 text_color="white"
             ).pack()
 
+        # Quick Stats Cards - shared cached counters, filled in when ready
+        def show_stats(stats):
+            values = [stats["total_patients"], stats["pending_patients"], stats["total_doctors"], stats["total_users"]]
+            for label, value in zip(value_labels, values):
+                label.configure(text=str(value))
+
+        def refresh():
+            get_dashboard_stats().load(
+                self.tasks, show_stats,
+                lambda err: [label.configure(text="0") for label in value_labels]
+            )
+
         # Quick actions
-        actions_frame = customtkinter.CTkFrame(self.content)
+        actions_frame = customtkinter.CTkFrame(parent)
         actions_frame.pack(fill="x", padx=20, pady=20)
         
         customtkinter.CTkLabel(
@@ -178,7 +194,7 @@ class AdminFrame(customtkinter.CTkFrame):
             ("View Pending Patients", self.show_pending_patients),
             ("Generate Monthly Report", self.generate_monthly_report),
             ("View System Logs", self.show_logs),
-            ("Backup Database", self.create_backup)
+            ("Backup Database", lambda: self.show_backup_options(start=True))
         ]
         
         buttons_frame = customtkinter.CTkFrame(actions_frame, fg_color="transparent")
@@ -194,110 +210,91 @@ class AdminFrame(customtkinter.CTkFrame):
             )
             btn.grid(row=i//2, column=i%2, padx=10, pady=5)
 
+        refresh()
+        return refresh
+
     # NEW FEATURE: Pending Patients Management
     def show_pending_patients(self):
         """Show patients who need treatment attention"""
-        self.clear_content()
+        self.tasks.cancel_all()
+        self.views.show("pending", self._build_pending_patients)
+
+    def _build_pending_patients(self, parent):
+        """Lay out the pending patients page; returns the refresh that reloads the list"""
         
         customtkinter.CTkLabel(
-            self.content, 
+            parent, 
             text="Pending Patients - Require Medical Attention", 
             font=("Arial", 20, "bold")
         ).pack(pady=20)
 
-        try:
-            # Get patients who haven't been treated today or recently
-            self.cursor.execute("""
-                SELECT p.patient_id, p.name, p.gender, p.blood_type, p.date_registered,
-                       COALESCE(MAX(t.date), 'Never treated') as last_treatment
-                FROM patients p
-                LEFT JOIN treatments t ON p.patient_id = t.patient_id
-                WHERE p.patient_id NOT IN (
-                    SELECT DISTINCT patient_id FROM treatments 
-                    WHERE DATE(date) = CURDATE()
-                )
-                GROUP BY p.patient_id, p.name, p.gender, p.blood_type, p.date_registered
-                ORDER BY last_treatment DESC, p.date_registered ASC
-            """)
-            pending = self.cursor.fetchall()
-
-            if not pending:
-                customtkinter.CTkLabel(
-                    self.content,
-                    text="✅ No pending patients - All patients have been treated today!",
-                    font=("Arial", 16),
-                    text_color="green"
-                ).pack(pady=50)
-                return
+        body = customtkinter.CTkFrame(parent, fg_color="transparent")
+        body.pack(fill="both", expand=True)
 
-            # Statistics
-            stats_frame = customtkinter.CTkFrame(self.content)
-            stats_frame.pack(fill="x", padx=20, pady=10)
-            
-            customtkinter.CTkLabel(
-                stats_frame,
-                text=f"⚠️ {len(pending)} patients require medical attention",
-                font=("Arial", 16, "bold"),
-                text_color="#e74c3c"
-            ).pack(pady=15)
-
-            # Scrollable list
-            list_frame = customtkinter.CTkFrame(self.content)
-            list_frame.pack(fill="both", expand=True, padx=20, pady=10)
-            
-            # Create scrollable frame
-            scroll_frame = customtkinter.CTkScrollableFrame(list_frame, height=400)
-            scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        def refresh():
+            for widget in body.winfo_children():
+                widget.destroy()
+            loading = show_loading(body, "Loading pending patients...")
 
-            # Header
-            header_frame = customtkinter.CTkFrame(scroll_frame, fg_color="#34495e")
-            header_frame.pack(fill="x", pady=(0, 5))
-            
-            headers = ["Patient ID", "Name", "Gender", "Blood Type", "Last Treatment", "Days Pending"]
-            for i, header in enumerate(headers):
+            def load(cursor):
+                # Get patients who haven't been treated today
+                return get_pending_queue().awaiting_treatment(cursor)
+
+            def render(pending):
+                if not take_placeholder(loading):
+                    return
+                if not pending:
+                    customtkinter.CTkLabel(
+                        body,
+                        text="✅ No pending patients - All patients have been treated today!",
+                        font=("Arial", 16),
+                        text_color="green"
+                    ).pack(pady=50)
+                    return
+
+                # Statistics
+                stats_frame = customtkinter.CTkFrame(body)
+                stats_frame.pack(fill="x", padx=20, pady=10)
+        
                 customtkinter.CTkLabel(
-                    header_frame, 
-                    text=header, 
-                    font=("Arial", 12, "bold"), 
-                    text_color="white",
-                    width=120
-                ).grid(row=0, column=i, padx=5, pady=10)
-
-            # Patient rows
-            for patient in pending:
-                patient_frame = customtkinter.CTkFrame(scroll_frame, fg_color="#ecf0f1")
-                patient_frame.pack(fill="x", pady=2)
-                
-                # Calculate days pending
-                if patient[5] == 'Never treated':
-                    days_pending = "Never"
-                    priority_color = "#e74c3c"  # Red for never treated
-                else:
-                    try:
-                        last_date = datetime.strptime(str(patient[5]).split()[0], "%Y-%m-%d").date()
-                        days_pending = str((datetime.now().date() - last_date).days)
-                        priority_color = "#f39c12" if int(days_pending) > 7 else "#27ae60"
-                    except:
-                        days_pending = "Unknown"
-                        priority_color = "#95a5a6"
-
-                data = [patient[0], patient[1], patient[2], patient[3], 
-                       str(patient[5]).split()[0] if patient[5] != 'Never treated' else 'Never', 
-                       days_pending]
-                
-                for i, value in enumerate(data):
-                    label = customtkinter.CTkLabel(
-                        patient_frame, 
-                        text=str(value), 
-                        width=120,
-                        font=("Arial", 11)
-                    )
-                    if i == 5:  # Days pending column
-                        label.configure(text_color=priority_color, font=("Arial", 11, "bold"))
-                    label.grid(row=0, column=i, padx=5, pady=8)
-
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Error loading pending patients: {e}")
+                    stats_frame,
+                    text=f"⚠️ {len(pending)} patients require medical attention",
+                    font=("Arial", 16, "bold"),
+                    text_color="#e74c3c"
+                ).pack(pady=15)
+
+                def format_pending(patient):
+                    # Days pending, marked by priority: never treated, over a week, recent
+                    if patient[5] is None:
+                        days_pending = "🔴 Never"
+                    else:
+                        try:
+                            last_date = datetime.strptime(str(patient[5]).split()[0], "%Y-%m-%d").date()
+                            days = (datetime.now().date() - last_date).days
+                            days_pending = f"{'🟠' if days > 7 else '🟢'} {days}"
+                        except ValueError:
+                            days_pending = "Unknown"
+                    return [patient[0], patient[1], patient[2], patient[3],
+                            str(patient[5]).split()[0] if patient[5] is not None else 'Never',
+                            days_pending]
+
+                VirtualTable(
+                    body,
+                    columns=[("Patient ID", 90), ("Name", 180), ("Gender", 80), ("Blood Type", 90),
+                             ("Last Treatment", 120), ("Days Pending", 120)],
+                    rows=pending,
+                    format_row=format_pending,
+                    height=400
+                ).pack(fill="both", expand=True, padx=20, pady=10)
+
+            def on_error(e):
+                take_placeholder(loading)
+                messagebox.showerror("Database Error", f"Error loading pending patients: {e}")
+
+            self.tasks.run(load, render, on_error)
+
+        refresh()
+        return refresh
 
     # FIXED: System Logs with Proper Scrolling and Ordering
     def show_logs(self):
@@ -312,7 +309,14 @@ class AdminFrame(customtkinter.CTkFrame):
         dept_combo.pack(side="left", padx=5)
         date_entry = customtkinter.CTkEntry(filter_frame, placeholder_text="YYYY-MM-DD (optional)")
         date_entry.pack(side="left", padx=5)
-        filter_btn = customtkinter.CTkButton(filter_frame, text="Filter", command=lambda: self.show_logs_filtered(dept_combo.get(), date_entry.get()))
+        customtkinter.CTkLabel(filter_frame, text="Per page:").pack(side="left", padx=(15, 5))
+        size_combo = customtkinter.CTkComboBox(filter_frame, values=[str(size) for size in PAGE_SIZES], width=80)
+        size_combo.set(str(DEFAULT_PAGE_SIZE))
+        size_combo.pack(side="left", padx=5)
+        filter_btn = customtkinter.CTkButton(
+            filter_frame, text="Filter",
+            command=lambda: self.show_logs_filtered(dept_combo.get(), date_entry.get(), size_combo.get())
+        )
         filter_btn.pack(side="left", padx=5)
 
         # FIXED: Create main scrollable frame for logs
@@ -321,102 +325,188 @@ class AdminFrame(customtkinter.CTkFrame):
         
         self.show_logs_filtered("All", "")
 
-    def show_logs_filtered(self, department, date_str):
+    def show_logs_filtered(self, department, date_str, page_size=DEFAULT_PAGE_SIZE):
         # Clear the main logs frame
         for widget in self.logs_main_frame.winfo_children():
             widget.destroy()
-            
+
         try:
-            query = "SELECT log_id, user, department, action, log_date, timestamp FROM logs"
-            params = []
-            filters = []
-            if department != "All":
-                filters.append("department=%s")
-                params.append(department)
-            if date_str:
-                filters.append("log_date=%s")
-                params.append(date_str)
-            if filters:
-                query += " WHERE " + " AND ".join(filters)
-            
-            # FIXED: Proper ordering by timestamp (newest first)
-            query += " ORDER BY timestamp DESC, log_id DESC"
-            
-            self.cursor.execute(query, tuple(params))
-            logs = self.cursor.fetchall()
-            
+            page_size = int(page_size)
+        except ValueError:
+            page_size = DEFAULT_PAGE_SIZE
+        pager = LogPager(department, date_str, max(1, page_size))
+        try:
+            pager.filters()
+        except ValueError:
+            messagebox.showerror("Invalid Date", "Enter the date as YYYY-MM-DD.")
+            return
+        self.log_pager = pager
+
+        self.logs_count_label = customtkinter.CTkLabel(self.logs_main_frame, text="Counting entries...", text_color="#7f8c8d")
+        self.logs_count_label.pack(anchor="w", padx=10, pady=(5, 0))
+        self.logs_table_frame = customtkinter.CTkFrame(self.logs_main_frame, fg_color="transparent")
+        self.logs_table_frame.pack(fill="both", expand=True)
+
+        nav_frame = customtkinter.CTkFrame(self.logs_main_frame, fg_color="transparent")
+        nav_frame.pack(fill="x", padx=10, pady=(0, 10))
+        self.logs_prev_btn = customtkinter.CTkButton(nav_frame, text="◀ Previous", width=100, command=lambda: self.show_log_page("previous"))
+        self.logs_prev_btn.pack(side="left")
+        self.logs_next_btn = customtkinter.CTkButton(nav_frame, text="Next ▶", width=100, command=lambda: self.show_log_page("next"))
+        self.logs_next_btn.pack(side="right")
+        self.logs_page_label = customtkinter.CTkLabel(nav_frame, text="")
+        self.logs_page_label.pack(side="left", expand=True)
+
+        def counted(estimate):
+            if pager is self.log_pager and self.logs_count_label.winfo_exists():
+                self.logs_count_label.configure(text=f"About {estimate:,} matching entries")
+
+        self.tasks.run(pager.count_query(), counted, lambda err: print(f"Error estimating log count: {err}"))
+        self.show_log_page("first")
+
+    def show_log_page(self, direction):
+        pager = self.log_pager
+        for widget in self.logs_table_frame.winfo_children():
+            widget.destroy()
+        loading = show_loading(self.logs_table_frame, "Loading logs...")
+        self.logs_prev_btn.configure(state="disabled")
+        self.logs_next_btn.configure(state="disabled")
+
+        def format_log(log):
+            timestamp_str = str(log[5])
+            try:
+                time_part = timestamp_str.split()[1][:8] if len(timestamp_str.split()) > 1 else "00:00:00"
+            except:
+                time_part = "00:00:00"
+            action = str(log[3])
+            return [log[0], log[1], log[2], action[:50] + "..." if len(action) > 50 else action,
+                    str(log[4]), time_part]
+
+        def render(rows):
+            if pager is not self.log_pager or not take_placeholder(loading):
+                return
+            logs = pager.accept(direction, rows)
+            if direction in ("next", "previous") and not logs:
+                # The neighbouring page vanished (deleted entries); stay on this one
+                self.show_log_page("current")
+                return
+            self.logs_prev_btn.configure(state="normal" if pager.has_previous else "disabled")
+            self.logs_next_btn.configure(state="normal" if pager.has_next else "disabled")
             if not logs:
-                customtkinter.CTkLabel(self.logs_main_frame, text="No logs found.").pack(pady=50)
+                self.logs_page_label.configure(text="")
+                customtkinter.CTkLabel(self.logs_table_frame, text="No logs found.").pack(pady=50)
                 return
+            self.logs_page_label.configure(text=f"Page {pager.page_number}")
+            if pager.page_number == 1 and not pager.has_next:
+                self.logs_count_label.configure(text=f"{len(logs)} matching entries")
 
-            # FIXED: Create properly scrollable frame
-            scroll_frame = customtkinter.CTkScrollableFrame(self.logs_main_frame, height=500)
-            scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
+            VirtualTable(
+                self.logs_table_frame,
+                columns=[("ID", 60), ("User", 120), ("Department", 120), ("Action", 300), ("Date", 100), ("Time", 120)],
+                rows=logs,
+                format_row=format_log,
+                action=("Delete", lambda log: self.delete_log(log[0]), "#e74c3c"),
+                height=500
+            ).pack(fill="both", expand=True, padx=10, pady=10)
 
-            # Table header
-            header_frame = customtkinter.CTkFrame(scroll_frame, fg_color="#2c3e50")
-            header_frame.pack(fill="x", pady=(0, 5))
-            
-            headers = ["ID", "User", "Department", "Action", "Date", "Time", "Actions"]
-            widths = [60, 120, 120, 300, 100, 120, 80]
-            
-            for i, (header, width) in enumerate(zip(headers, widths)):
-                customtkinter.CTkLabel(
-                    header_frame, 
-                    text=header, 
-                    width=width, 
-                    font=("Arial", 12, "bold"),
-                    text_color="white"
-                ).grid(row=0, column=i, padx=2, pady=8, sticky="w")
-
-            # Log entries
-            for log in logs:
-                log_frame = customtkinter.CTkFrame(scroll_frame, fg_color="#ecf0f1")
-                log_frame.pack(fill="x", pady=2)
-                
-                # Format timestamp
-                timestamp_str = str(log[5])
-                try:
-                    time_part = timestamp_str.split()[1][:8] if len(timestamp_str.split()) > 1 else "00:00:00"
-                except:
-                    time_part = "00:00:00"
-                
-                data = [log[0], log[1], log[2], log[3][:50] + "..." if len(str(log[3])) > 50 else log[3], 
-                       str(log[4]), time_part]
-                
-                for i, (value, width) in enumerate(zip(data, widths[:-1])):
-                    customtkinter.CTkLabel(
-                        log_frame, 
-                        text=str(value), 
-                        width=width,
-                        font=("Arial", 10),
-                        anchor="w"
-                    ).grid(row=0, column=i, padx=2, pady=5, sticky="w")
-                
-                # Delete button
-                del_btn = customtkinter.CTkButton(
-                    log_frame, 
-                    text="Delete", 
-                    width=70,
-                    height=25,
-                    font=("Arial", 10),
-                    fg_color="#e74c3c",
-                    command=lambda log_id=log[0]: self.delete_log(log_id)
-                )
-                del_btn.grid(row=0, column=6, padx=2, pady=2)
-
-        except Exception as err:
+        def on_error(err):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error: {err}")
 
+        self.tasks.run(pager.page_query(direction), render, on_error)
+
     def delete_log(self, log_id):
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this log?"):
-            try:
-                self.cursor.execute("DELETE FROM logs WHERE log_id=%s", (log_id,))
-                self.conn.commit()
+            def deleted(_):
                 messagebox.showinfo("Deleted", "Log entry deleted.")
-                self.show_logs_filtered("All", "")  # Refresh the display
-            except Exception as err:
-                messagebox.showerror("Database Error", f"Error: {err}")
+                if self.logs_table_frame.winfo_exists():
+                    self.show_log_page("current")  # Refresh the page the entry was on
+
+            def delete(cursor):
+                record_log_deleted(cursor, log_id)
+                cursor.execute("DELETE FROM logs WHERE log_id=%s", (log_id,))
+
+            self.tasks.run(
+                delete,
+                deleted,
+                lambda err: messagebox.showerror("Database Error", f"Error: {err}"),
+                cancellable=False
+            )
+
+    def show_query_performance(self):
+        """Per-statement latency recorded by the instrumented cursors of this process"""
+        self.clear_content()
+        stats = get_query_stats()
+        customtkinter.CTkLabel(self.content, text="Query Performance", font=("Arial", 18, "bold")).pack(pady=10)
+        customtkinter.CTkLabel(
+            self.content,
+            text=f"Statements slower than {stats.slow_ms} ms are written to {stats.slow_log_path} "
+                 "(parameters redacted).",
+            font=("Arial", 11),
+            text_color="#666"
+        ).pack()
+
+        button_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        button_frame.pack(fill="x", padx=10, pady=10)
+        buttons = [
+            ("Refresh", self.show_query_performance, None),
+            ("Reset", lambda: (stats.reset(), self.show_query_performance()), "#e67e22"),
+            ("Export JSON", lambda: self.export_query_stats("json"), "#27ae60"),
+            ("Export Prometheus", lambda: self.export_query_stats("prom"), "#27ae60"),
+        ]
+        for text, command, color in buttons:
+            options = {"fg_color": color} if color else {}
+            customtkinter.CTkButton(button_frame, text=text, command=command, width=140, **options).pack(side="left", padx=5)
+
+        queries = stats.snapshot()
+        if not queries:
+            customtkinter.CTkLabel(self.content, text="No statements recorded yet.", font=("Arial", 14)).pack(pady=40)
+            return
+        customtkinter.CTkLabel(
+            self.content,
+            text=f"{len(queries)} distinct statements, slowest total time first",
+            font=("Arial", 12, "bold")
+        ).pack(anchor="w", padx=15)
+        VirtualTable(
+            self.content,
+            columns=[("Called from", 200), ("Statement", 330), ("Calls", 60), ("p50 ms", 70),
+                     ("p95 ms", 70), ("p99 ms", 70), ("Max ms", 70), ("Rows", 60)],
+            rows=queries,
+            format_row=lambda q: [q["callers"][0] if q["callers"] else "", q["fingerprint"][:60], q["count"],
+                                  q["p50_ms"], q["p95_ms"], q["p99_ms"], q["max_ms"], q["rows_per_call"]],
+            action=("Details", self.show_query_details, "#3498db"),
+            height=450
+        ).pack(fill="both", expand=True, padx=10, pady=10)
+
+    def show_query_details(self, query):
+        lines = [
+            query["fingerprint"],
+            "",
+            f"Calls: {query['count']}   Total: {query['total_ms']:.1f} ms   Mean: {query['mean_ms']:.2f} ms",
+            f"p50: {query['p50_ms']} ms   p95: {query['p95_ms']} ms   p99: {query['p99_ms']} ms   "
+            f"Max: {query['max_ms']} ms",
+            f"Rows per call: {query['rows_per_call']}",
+            "",
+            "Called from: " + ", ".join(query["callers"]),
+        ]
+        messagebox.showinfo("Statement Details", "\n".join(lines))
+
+    def export_query_stats(self, kind):
+        extension = ".json" if kind == "json" else ".prom"
+        filename = filedialog.asksaveasfilename(
+            defaultextension=extension,
+            filetypes=[("JSON files", "*.json")] if kind == "json" else [("Prometheus text", "*.prom *.txt")],
+            initialfile=f"query_stats_{datetime.now().strftime('%Y%m%d_%H%M')}{extension}",
+            title="Export Query Statistics"
+        )
+        if not filename:
+            return
+        stats = get_query_stats()
+        try:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(stats.to_json() if kind == "json" else stats.to_prometheus())
+            messagebox.showinfo("Export Complete", f"Query statistics saved to:\n{filename}")
+        except OSError as e:
+            messagebox.showerror("Export Failed", f"Could not write {filename}: {e}")
 
     # NEW: Monthly Report Generation with PDF Download
     def show_system_reports(self):
@@ -438,10 +528,8 @@ class AdminFrame(customtkinter.CTkFrame):
         
         customtkinter.CTkLabel(month_frame, text="Select Month:", font=("Arial", 12)).pack(side="left", padx=10)
         
-        months = ["January", "February", "March", "April", "May", "June",
-                 "July", "August", "September", "October", "November", "December"]
-        month_combo = customtkinter.CTkComboBox(month_frame, values=months, width=120)
-        month_combo.set(months[datetime.now().month - 1])
+        month_combo = customtkinter.CTkComboBox(month_frame, values=MONTHS + [FULL_YEAR], width=120)
+        month_combo.set(MONTHS[datetime.now().month - 1])
         month_combo.pack(side="left", padx=5)
         
         customtkinter.CTkLabel(month_frame, text="Year:", font=("Arial", 12)).pack(side="left", padx=10)
@@ -449,14 +537,40 @@ class AdminFrame(customtkinter.CTkFrame):
         year_combo.set(str(datetime.now().year))
         year_combo.pack(side="left", padx=5)
         
+        report_buttons = customtkinter.CTkFrame(monthly_frame, fg_color="transparent")
+        report_buttons.pack(pady=15)
         customtkinter.CTkButton(
-            monthly_frame, 
+            report_buttons,
             text="Generate Monthly Report (PDF)",
             command=lambda: self.generate_monthly_report(month_combo.get(), year_combo.get()),
             height=40,
             font=("Arial", 12, "bold"),
             fg_color="#27ae60"
-        ).pack(pady=15)
+        ).pack(side="left", padx=10)
+        customtkinter.CTkButton(
+            report_buttons,
+            text="Every Month of the Year",
+            command=lambda: self.generate_year_of_reports(year_combo.get()),
+            height=40
+        ).pack(side="left", padx=10)
+
+        # Reports render in the background; their progress shows here
+        self.report_progress = customtkinter.CTkProgressBar(monthly_frame, width=400)
+        self.report_progress.set(0)
+        self.report_progress.pack(pady=5)
+        self.report_status = customtkinter.CTkLabel(monthly_frame, text="", font=("Arial", 12))
+        self.report_status.pack(pady=5)
+        cancel_buttons = customtkinter.CTkFrame(monthly_frame, fg_color="transparent")
+        cancel_buttons.pack(pady=(0, 10))
+        customtkinter.CTkButton(
+            cancel_buttons, text="Cancel Report", fg_color="#aa3333",
+            command=self.cancel_report, height=30
+        ).pack(side="left", padx=10)
+        customtkinter.CTkButton(
+            cancel_buttons, text="Cancel All", fg_color="#aa3333",
+            command=lambda: self.cancel_report(everything=True), height=30
+        ).pack(side="left", padx=10)
+        self._show_report_queue()
         
         # Department statistics
         dept_frame = customtkinter.CTkFrame(reports_frame)
@@ -469,172 +583,95 @@ class AdminFrame(customtkinter.CTkFrame):
         ).pack(pady=10)
 
     def generate_monthly_report(self, month_name=None, year=None):
-        """Generate detailed monthly report in PDF format"""
-        try:
-            if not month_name:
-                month_name = calendar.month_name[datetime.now().month]
-            if not year:
-                year = str(datetime.now().year)
-                
-            month_num = list(calendar.month_name).index(month_name)
-            
-            # Ask user where to save the file
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".pdf",
-                filetypes=[("PDF files", "*.pdf")],
-                title="Save Monthly Report",
-                initialname=f"Hospital_Report_{month_name}_{year}.pdf"
-            )
-            
-            if not filename:
-                return
-                
-            # Create PDF document
-            doc = SimpleDocTemplate(filename, pagesize=A4)
-            styles = getSampleStyleSheet()
-            story = []
-            
-            # Title
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                spaceAfter=30,
-                alignment=1  # Center alignment
-            )
-            
-            story.append(Paragraph(f"Queen Elizabeth Central Hospital", title_style))
-            story.append(Paragraph(f"Monthly Report - {month_name} {year}", styles['Heading2']))
-            story.append(Spacer(1, 20))
-            
-            # Get data for the selected month
-            start_date = f"{year}-{month_num:02d}-01"
-            if month_num == 12:
-                end_date = f"{int(year)+1}-01-01"
+        """Queue the monthly (or annual) report PDF; it renders in a worker
+        process while the admin keeps working"""
+        if not month_name:
+            month_name = MONTHS[datetime.now().month - 1]
+        if not year:
+            year = str(datetime.now().year)
+
+        # Ask user where to save the file
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF files", "*.pdf")],
+            title="Save Monthly Report",
+            initialfile=report_filename(month_name, year)
+        )
+        if not filename:
+            return
+        self.queue_reports([ReportRequest(month_name, year, filename)])
+
+    def generate_year_of_reports(self, year):
+        """Queue one report per month of year, saved into a chosen folder"""
+        directory = filedialog.askdirectory(title=f"Save the {year} monthly reports in")
+        if not directory:
+            return
+        self.queue_reports([ReportRequest(month, year, os.path.join(directory, report_filename(month, year)))
+                            for month in MONTHS])
+
+    def queue_reports(self, requests):
+        reports = get_report_queue()
+        polling = reports.busy()
+        for request in requests:
+            reports.submit(request)
+        self._show_report_queue()
+        if not polling:
+            self._poll_reports()
+
+    def cancel_report(self, everything=False):
+        reports = get_report_queue()
+        if everything:
+            reports.cancel_all()
+        else:
+            reports.cancel()
+
+    def _show_report_queue(self, latest=None):
+        """Refresh the report queue panel of the System Reports page, if shown"""
+        if self.report_status is None or not self.report_status.winfo_exists():
+            return
+        reports = get_report_queue()
+        current, pending = reports.current(), reports.pending()
+        if latest is not None and not latest.done:
+            self.report_progress.set(latest.fraction)
+            text = f"{latest.request.title}: {latest.stage}..."
+        elif current is not None:
+            text = f"{current.title}: rendering..."
+        else:
+            self.report_progress.set(0)
+            text = "No reports in progress."
+        if pending:
+            text += f"  ({len(pending)} more queued: {', '.join(request.title for request in pending[:3])}"
+            text += ", ...)" if len(pending) > 3 else ")"
+        self.report_status.configure(text=text)
+
+    def _poll_reports(self):
+        """Relay report progress to the System Reports page and notify when a
+        report is saved or fails, whichever page is showing"""
+        if not self.winfo_exists():
+            return  # logged out; the queue keeps rendering
+        reports = get_report_queue()
+        latest = None
+        while not reports.updates.empty():
+            update = reports.updates.get()
+            if update.done:
+                if update.error is None:
+                    self.reports_saved.append(update.request.filename)
+                elif not isinstance(update.error, ReportCancelled):
+                    messagebox.showerror("Error", f"Failed to generate the {update.request.title}: "
+                                                  f"{update.error}")
             else:
-                end_date = f"{year}-{month_num+1:02d}-01"
-                
-            # Patient statistics
-            story.append(Paragraph("Patient Statistics", styles['Heading3']))
-            
-            # New patients registered
-            self.cursor.execute(
-                "SELECT COUNT(*) FROM patients WHERE date_registered >= %s AND date_registered < %s",
-                (start_date, end_date)
-            )
-            new_patients = self.cursor.fetchone()[0]
-            
-            # Total treatments
-            self.cursor.execute(
-                "SELECT COUNT(*) FROM treatments WHERE date >= %s AND date < %s",
-                (start_date, end_date)
-            )
-            total_treatments = self.cursor.fetchone()[0]
-            
-            # Treatments by department
-            self.cursor.execute("""
-                SELECT d.specialization, COUNT(t.treatment_id)
-                FROM treatments t
-                JOIN doctors d ON t.doctor_id = d.id
-                WHERE t.date >= %s AND t.date < %s
-                GROUP BY d.specialization
-                ORDER BY COUNT(t.treatment_id) DESC
-            """, (start_date, end_date))
-            dept_treatments = self.cursor.fetchall()
-            
-            # Patient statistics table
-            patient_data = [
-                ['Metric', 'Value'],
-                ['New Patients Registered', str(new_patients)],
-                ['Total Treatments Given', str(total_treatments)],
-                ['Average Treatments per Day', str(round(total_treatments/30, 1))]
-            ]
-            
-            patient_table = Table(patient_data, colWidths=[3*inch, 2*inch])
-            patient_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(patient_table)
-            story.append(Spacer(1, 20))
-            
-            # Department performance
-            if dept_treatments:
-                story.append(Paragraph("Department Performance", styles['Heading3']))
-                
-                dept_data = [['Department', 'Treatments']]
-                for dept, count in dept_treatments:
-                    dept_data.append([dept or 'General', str(count)])
-                
-                dept_table = Table(dept_data, colWidths=[3*inch, 2*inch])
-                dept_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 12),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                
-                story.append(dept_table)
-                story.append(Spacer(1, 20))
-            
-            # System usage statistics
-            story.append(Paragraph("System Usage", styles['Heading3']))
-            
-            self.cursor.execute("""
-                SELECT department, COUNT(*) as activity_count
-                FROM logs 
-                WHERE log_date >= %s AND log_date < %s
-                GROUP BY department
-                ORDER BY activity_count DESC
-            """, (start_date, end_date))
-            usage_stats = self.cursor.fetchall()
-            
-            if usage_stats:
-                usage_data = [['Department', 'System Activities']]
-                for dept, count in usage_stats:
-                    usage_data.append([dept, str(count)])
-                
-                usage_table = Table(usage_data, colWidths=[3*inch, 2*inch])
-                usage_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 12),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                ]))
-                
-                story.append(usage_table)
-            
-            # Footer
-            story.append(Spacer(1, 30))
-            story.append(Paragraph(f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-            story.append(Paragraph("Queen Elizabeth Central Hospital - Blantyre, Malawi", styles['Normal']))
-            
-            # Build PDF
-            doc.build(story)
-            
+                latest = update
+        self._show_report_queue(latest)
+        if reports.busy():
+            self.after(REPORT_POLL_MS, self._poll_reports)
+        elif self.reports_saved:
+            saved, self.reports_saved = self.reports_saved, []
+            files = "\n".join(saved) if len(saved) <= 3 else f"{len(saved)} reports in {os.path.dirname(saved[0])}"
             messagebox.showinfo(
-                "Report Generated", 
-                f"Monthly report saved successfully!\n\nFile: {filename}\n\nThe report contains:\n"
+                "Report Generated",
+                f"Report saved successfully!\n\nFile: {files}\n\nThe report contains:\n"
                 f"• Patient statistics\n• Department performance\n• System usage data"
             )
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate report: {str(e)}\n\nMake sure you have reportlab installed:\npip install reportlab")
 
     def show_department_stats(self):
         self.clear_content()
@@ -644,25 +681,16 @@ class AdminFrame(customtkinter.CTkFrame):
         stats_frame = customtkinter.CTkScrollableFrame(self.content, width=700, height=400)
         stats_frame.pack(fill="both", expand=True, padx=20, pady=10)
         
-        try:
-            # Get patient count by gender
-            self.cursor.execute("SELECT gender, COUNT(*) FROM patients GROUP BY gender")
-            patient_gender_data = self.cursor.fetchall()
-            
-            # Get patient count by blood type
-            self.cursor.execute("SELECT blood_type, COUNT(*) FROM patients GROUP BY blood_type")
-            patient_blood_data = self.cursor.fetchall()
-            
-            # Get treatment count by doctor
-            self.cursor.execute("""
-                SELECT d.firstname, d.lastname, COUNT(t.treatment_id) as treatment_count
-                FROM doctors d
-                LEFT JOIN treatments t ON d.id = t.doctor_id
-                GROUP BY d.id, d.firstname, d.lastname
-                ORDER BY treatment_count DESC
-            """)
-            doctor_treatment_data = self.cursor.fetchall()
-            
+        loading = show_loading(stats_frame, "Loading statistics...")
+
+        def load(cursor):
+            # Gender, blood type and per-doctor counts, summed from the daily_stats rollups
+            return department_stats(cursor)
+
+        def render(data):
+            if not take_placeholder(loading):
+                return
+            patient_gender_data, patient_blood_data, doctor_treatment_data = data
             # Display patient gender statistics
             gender_frame = customtkinter.CTkFrame(stats_frame)
             gender_frame.pack(fill="x", padx=10, pady=10)
@@ -676,7 +704,7 @@ class AdminFrame(customtkinter.CTkFrame):
                 for gender, count in patient_gender_data:
                     customtkinter.CTkLabel(
                         gender_frame,
-                        text=f"{gender.capitalize()}: {count}",
+                        text=f"{(gender or 'Unknown').capitalize()}: {count}",
                         font=("Arial", 12)
                     ).pack(pady=2)
             else:
@@ -699,7 +727,7 @@ class AdminFrame(customtkinter.CTkFrame):
                 for blood_type, count in patient_blood_data:
                     customtkinter.CTkLabel(
                         blood_frame,
-                        text=f"Blood Type {blood_type}: {count}",
+                        text=f"Blood Type {blood_type or 'Unknown'}: {count}",
                         font=("Arial", 12)
                     ).pack(pady=2)
             else:
@@ -732,11 +760,14 @@ class AdminFrame(customtkinter.CTkFrame):
                     text="No doctor treatment data available",
                     font=("Arial", 12)
                 ).pack(pady=2)
-                
-        except Exception as e:
+
+        def on_error(e):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error loading department statistics: {e}")
 
-    def show_backup_options(self):
+        self.tasks.run(load, render, on_error)
+
+    def show_backup_options(self, start=False):
         self.clear_content()
         customtkinter.CTkLabel(self.content, text="Database Backup & Maintenance", font=("Arial", 20, "bold")).pack(pady=20)
         backup_frame = customtkinter.CTkFrame(self.content)
@@ -744,76 +775,99 @@ class AdminFrame(customtkinter.CTkFrame):
         customtkinter.CTkLabel(backup_frame, text="Database Backup", font=("Arial", 16, "bold")).pack(pady=15)
         customtkinter.CTkLabel(
             backup_frame,
-            text="Create a backup of all hospital data including patients, treatments, and user records.",
+            text="Create a backup of all hospital data including patients, treatments, and user records.\n"
+                 "An incremental backup only copies the records added or changed since the last backup.",
             font=("Arial", 12)
         ).pack(pady=5)
+        last_label = customtkinter.CTkLabel(backup_frame, text="", font=("Arial", 12), text_color="gray")
+        last_label.pack(pady=5)
+        self.backup_progress = customtkinter.CTkProgressBar(backup_frame, width=400)
+        self.backup_progress.set(0)
+        self.backup_progress.pack(pady=10)
+        self.backup_status = customtkinter.CTkLabel(backup_frame, text="", font=("Arial", 12))
+        self.backup_status.pack(pady=5)
+        buttons = customtkinter.CTkFrame(backup_frame, fg_color="transparent")
+        buttons.pack(pady=15)
         customtkinter.CTkButton(
-            backup_frame, text="Create Backup",
+            buttons, text="Full Backup",
             command=self.create_backup, height=40
-        ).pack(pady=15)
+        ).pack(side="left", padx=10)
+        customtkinter.CTkButton(
+            buttons, text="Incremental Backup",
+            command=lambda: self.create_backup("incremental"), height=40
+        ).pack(side="left", padx=10)
+        customtkinter.CTkButton(
+            buttons, text="Cancel", fg_color="#aa3333",
+            command=self.cancel_backup, height=40
+        ).pack(side="left", padx=10)
 
-    def create_backup(self):
-        try:
-            # Import required modules
-            import subprocess
-            import os
-            from os.path import expanduser
-            
-            # Create backup directory
-            user_home = expanduser("~")
-            backup_dir = os.path.join(user_home, "hospital_backups")
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # Generate timestamp for backup file
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(backup_dir, f"hospital_db_backup_{timestamp}.sql")
-            
-            # Get database connection details
-            db_config = {
-                'host': 'localhost',
-                'user': 'root',
-                'password': '',
-                'database': 'hospital-management'
-            }
-            
-            # Create backup using mysqldump command
-            dump_command = [
-                'mysqldump',
-                f'--host={db_config["host"]}',
-                f'--user={db_config["user"]}',
-                f'--password={db_config["password"]}',
-                db_config["database"]
-            ]
-            
-            # Execute the mysqldump command and save to file
-            with open(backup_file, 'w') as output_file:
-                process = subprocess.run(
-                    dump_command,
-                    stdout=output_file,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                
-            # Check if the backup was successful
-            if process.returncode == 0:
-                messagebox.showinfo("Backup Successful", f"Database backup created:\n{backup_file}")
+        def load_last(cursor):
+            cursor.execute("SELECT kind, taken_at FROM backup_watermarks ORDER BY id DESC LIMIT 1")
+            return cursor.fetchone()
+
+        def show_last(row):
+            if row is None:
+                last_label.configure(text="No backups yet - start with a full backup.")
             else:
-                # If mysqldump failed, try a simple file copy as fallback
-                # This assumes the database file is accessible directly
-                try:
-                    # Try to locate the database file (this is a simplified approach)
-                    # In a real application, you would need to know the exact path
-                    db_file_path = "db/hospital-management.sql"  # Adjust path as needed
-                    if os.path.exists(db_file_path):
-                        import shutil
-                        shutil.copyfile(db_file_path, backup_file)
-                        messagebox.showinfo("Backup Successful", f"Database backup created (using file copy):\n{backup_file}")
-                    else:
-                        raise Exception("Database file not found for backup")
-                except Exception as copy_error:
-                    messagebox.showerror("Backup Error", f"Error creating backup:\n{process.stderr}\n\nFallback error: {copy_error}")
-        except Exception as e:
+                last_label.configure(text=f"Last backup: {row[0]}, taken {row[1]:%Y-%m-%d %H:%M}")
+
+        self.tasks.run(load_last, show_last, lambda e: last_label.configure(text=""))
+
+        if self.backup_job is not None and self.backup_job.running():
+            # A backup started earlier is still going: show its progress again
+            self.backup_status.configure(text="Backup in progress...")
+            self._poll_backup()
+        elif start:
+            self.create_backup()
+
+    def create_backup(self, kind="full"):
+        """Stream a consistent, compressed snapshot (of every table, or of the
+        changes since the last backup) in the background"""
+        if self.backup_job is not None and self.backup_job.running():
+            messagebox.showinfo("Backup", "A backup is already running.")
+            return
+        try:
+            self.backup_job = BackupJob(kind).start()
+        except OSError as e:
             messagebox.showerror("Backup Error", f"Error creating backup: {e}")
+            return
+        self.backup_progress.set(0)
+        self.backup_status.configure(text=f"Starting {kind} backup of {get_backend().describe()}...")
+        self._poll_backup()
+
+    def cancel_backup(self):
+        if self.backup_job is not None and self.backup_job.running():
+            self.backup_job.cancel()
+            self.backup_status.configure(text="Cancelling...")
+
+    def _poll_backup(self):
+        job = self.backup_job
+        if job is None or not self.backup_status.winfo_exists():
+            return  # page left; the job keeps running and is picked up again on return
+        latest = None
+        while not job.updates.empty():
+            latest = job.updates.get()
+        if latest is not None:
+            if latest.error is not None:
+                self.backup_job = None
+                self.backup_progress.set(0)
+                if isinstance(latest.error, BackupCancelled):
+                    self.backup_status.configure(text="Backup cancelled.")
+                else:
+                    self.backup_status.configure(text="Backup failed.")
+                    messagebox.showerror("Backup Error", f"Error creating backup: {latest.error}")
+                return
+            self.backup_progress.set(latest.fraction)
+            if latest.done:
+                self.backup_job = None
+                self.backup_status.configure(text=f"{latest.rows:,} rows backed up and verified.")
+                messagebox.showinfo("Backup Successful", f"Database backup created:\n{latest.path}")
+                return
+            self.backup_status.configure(
+                text=f"Table {latest.tables_done + 1} of {latest.tables_total}: {latest.table} "
+                     f"- {latest.rows:,} rows"
+            )
+        self.after(BACKUP_POLL_MS, self._poll_backup)
 
     # Keep all your existing methods (show_user_management, show_staff_management, etc.)
     def show_user_management(self):
@@ -850,25 +904,41 @@ class AdminFrame(customtkinter.CTkFrame):
         if not username or not password or not role:
             messagebox.showerror("Error", "All fields are required!")
             return
-        try:
-            self.cursor.execute("SELECT username FROM users WHERE username = %s", (username,))
-            if self.cursor.fetchone():
-                messagebox.showerror("Error", "Username already exists!")
-                return
-            self.cursor.execute(
+
+        def save(cursor):
+            cursor.execute("SELECT username FROM users WHERE username = %s", (username,))
+            if cursor.fetchone():
+                return False
+            cursor.execute(
                 "INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
-                (username, password, role)
+                (username, hash_password(password), role)
             )
-            self.conn.commit()
+            return True
+
+        def saved(added):
+            if not added:
+                messagebox.showerror("Error", "Username already exists!")
+                return
+            invalidate_stats("users")
             messagebox.showinfo("Success", "User added successfully!")
             self.show_user_management()
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Error adding user: {e}")
+
+        self.tasks.run(
+            save, saved,
+            lambda e: messagebox.showerror("Database Error", f"Error adding user: {e}"),
+            cancellable=False
+        )
 
     def show_users_list(self, parent_frame):
-        try:
-            self.cursor.execute("SELECT id, username, role, timestamp FROM users ORDER BY id")
-            users = self.cursor.fetchall()
+        loading = show_loading(parent_frame, "Loading users...")
+
+        def load(cursor):
+            cursor.execute("SELECT id, username, role, timestamp FROM users ORDER BY id")
+            return cursor.fetchall()
+
+        def render(users):
+            if not take_placeholder(loading):
+                return
             if users:
                 scrollable_frame = customtkinter.CTkScrollableFrame(parent_frame, height=300)
                 scrollable_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -891,18 +961,26 @@ class AdminFrame(customtkinter.CTkFrame):
                         ).grid(row=0, column=4, padx=5, pady=5)
                     else:
                         customtkinter.CTkLabel(user_frame, text="Protected", width=120).grid(row=0, column=4, padx=5, pady=5)
-        except Exception as e:
+
+        def on_error(e):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error loading users: {e}")
 
+        self.tasks.run(load, render, on_error)
+
     def delete_user(self, user_id):
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this user?"):
-            try:
-                self.cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
-                self.conn.commit()
+            def deleted(_):
+                invalidate_stats("users")
                 messagebox.showinfo("Success", "User deleted successfully!")
                 self.show_user_management()
-            except Exception as e:
-                messagebox.showerror("Database Error", f"Error deleting user: {e}")
+
+            self.tasks.run(
+                lambda cursor: cursor.execute("DELETE FROM users WHERE id = %s", (user_id,)),
+                deleted,
+                lambda e: messagebox.showerror("Database Error", f"Error deleting user: {e}"),
+                cancellable=False
+            )
 
     def show_staff_management(self):
         self.clear_content()
@@ -940,21 +1018,34 @@ class AdminFrame(customtkinter.CTkFrame):
         if not all(values.values()):
             messagebox.showerror("Error", "All fields are required!")
             return
-        try:
-            self.cursor.execute(
+
+        def save(cursor):
+            cursor.execute(
                 "INSERT INTO doctors (firstname, lastname, national_id, qualification, specialization) VALUES (%s, %s, %s, %s, %s)",
                 (values["First Name"], values["Last Name"], values["National ID"], values["Qualification"], values["Specialization"])
             )
-            self.conn.commit()
+
+        def saved(_):
+            invalidate_stats("doctors")
             messagebox.showinfo("Success", "Doctor registered successfully!")
             self.show_staff_management()
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Error registering doctor: {e}")
+
+        self.tasks.run(
+            save, saved,
+            lambda e: messagebox.showerror("Database Error", f"Error registering doctor: {e}"),
+            cancellable=False
+        )
 
     def show_doctors_list(self, parent_frame):
-        try:
-            self.cursor.execute("SELECT * FROM doctors ORDER BY id")
-            doctors = self.cursor.fetchall()
+        loading = show_loading(parent_frame, "Loading doctors...")
+
+        def load(cursor):
+            cursor.execute("SELECT * FROM doctors ORDER BY id")
+            return cursor.fetchall()
+
+        def render(doctors):
+            if not take_placeholder(loading):
+                return
             if doctors:
                 scrollable_frame = customtkinter.CTkScrollableFrame(parent_frame, height=300)
                 scrollable_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -974,18 +1065,26 @@ class AdminFrame(customtkinter.CTkFrame):
                         doctor_frame, text="Delete", width=60, height=25, fg_color="#ff4444",
                         command=lambda did=doctor[0]: self.delete_doctor(did)
                     ).grid(row=0, column=6, padx=2, pady=5)
-        except Exception as e:
+
+        def on_error(e):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error loading doctors: {e}")
 
+        self.tasks.run(load, render, on_error)
+
     def delete_doctor(self, doctor_id):
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this doctor?\nThis will also affect treatment records."):
-            try:
-                self.cursor.execute("DELETE FROM doctors WHERE id = %s", (doctor_id,))
-                self.conn.commit()
+            def deleted(_):
+                invalidate_stats("doctors")
                 messagebox.showinfo("Success", "Doctor deleted successfully!")
                 self.show_staff_management()
-            except Exception as e:
-                messagebox.showerror("Database Error", f"Error deleting doctor: {e}")
+
+            self.tasks.run(
+                lambda cursor: cursor.execute("DELETE FROM doctors WHERE id = %s", (doctor_id,)),
+                deleted,
+                lambda e: messagebox.showerror("Database Error", f"Error deleting doctor: {e}"),
+                cancellable=False
+            )
 
     def show_patient_records(self):
         self.clear_content()
@@ -1014,47 +1113,55 @@ class AdminFrame(customtkinter.CTkFrame):
     def show_all_patients(self):
         for widget in self.patients_results_frame.winfo_children():
             widget.destroy()
-        try:
-            self.cursor.execute("SELECT * FROM patients ORDER BY patient_id DESC LIMIT 50")
-            patients = self.cursor.fetchall()
+        loading = show_loading(self.patients_results_frame, "Loading patients...")
+
+        def load(cursor):
+            cursor.execute("SELECT COUNT(*) FROM patients")
+            return cursor.fetchone()[0]
+
+        def render(total):
+            if not take_placeholder(loading):
+                return
             customtkinter.CTkLabel(
                 self.patients_results_frame,
-                text=f"Recent Patients (Showing {len(patients)} records)",
+                text=f"All Patients ({total} records)",
                 font=("Arial", 16, "bold")
             ).pack(pady=10)
-            if patients:
-                scrollable_frame = customtkinter.CTkScrollableFrame(self.patients_results_frame, height=400)
-                scrollable_frame.pack(fill="both", expand=True, padx=10, pady=10)
-                header_frame = customtkinter.CTkFrame(scrollable_frame, fg_color="#e0e0e0")
-                header_frame.pack(fill="x", pady=(0, 5))
-                headers = ["Patient ID", "Name", "Gender", "Blood Type", "Date Registered", "Actions"]
-                for i, header in enumerate(headers):
-                    customtkinter.CTkLabel(header_frame, text=header, font=("Arial", 12, "bold"), width=120).grid(row=0, column=i, padx=5, pady=5)
-                for patient in patients:
-                    patient_frame = customtkinter.CTkFrame(scrollable_frame)
-                    patient_frame.pack(fill="x", pady=2)
-                    data = [patient[0], patient[1], patient[3], patient[4], str(patient[5]).split()[0]]
-                    for i, value in enumerate(data):
-                        customtkinter.CTkLabel(patient_frame, text=str(value), width=120).grid(row=0, column=i, padx=5, pady=5)
-                    customtkinter.CTkButton(
-                        patient_frame, text="View Treatments", width=100,
-                        command=lambda pid=patient[0]: self.view_patient_treatments(pid)
-                    ).grid(row=0, column=5, padx=5, pady=5)
-        except Exception as e:
+            if total:
+                VirtualTable(
+                    self.patients_results_frame,
+                    columns=[("Patient ID", 90), ("Name", 180), ("Gender", 80), ("Blood Type", 90), ("Date Registered", 120)],
+                    fetch_page=query_pages(self.tasks, "SELECT * FROM patients ORDER BY patient_id DESC", on_error=on_error),
+                    total=total,
+                    format_row=lambda p: [p[0], p[1], p[3], p[4], str(p[5]).split()[0]],
+                    action=("Treatments", lambda p: self.view_patient_treatments(p[0]), "#3498db")
+                ).pack(fill="both", expand=True, padx=10, pady=10)
+
+        def on_error(e):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error loading patients: {e}")
 
+        self.tasks.run(load, render, on_error)
+
     def search_patients(self, search_term):
         if not search_term:
             self.show_all_patients()
             return
         for widget in self.patients_results_frame.winfo_children():
             widget.destroy()
-        try:
+        loading = show_loading(self.patients_results_frame, "Searching...")
+
+        def load(cursor):
             if search_term.isdigit():
-                self.cursor.execute("SELECT * FROM patients WHERE patient_id = %s", (search_term,))
-            else:
-                self.cursor.execute("SELECT * FROM patients WHERE name LIKE %s", (f"%{search_term}%",))
-            patients = self.cursor.fetchall()
+                cursor.execute("SELECT * FROM patients WHERE patient_id = %s", (search_term,))
+                return cursor.fetchall()
+            # Ranked trigram search instead of a LIKE '%term%' table scan
+            matches = search_patients(cursor, search_term)
+            return fetch_ranked(cursor, "*", [match[0] for match in matches])
+
+        def render(patients):
+            if not take_placeholder(loading):
+                return
             customtkinter.CTkLabel(
                 self.patients_results_frame,
                 text=f"Search Results ({len(patients)} found)",
@@ -1078,12 +1185,16 @@ class AdminFrame(customtkinter.CTkFrame):
                     text="No patients found matching your search.",
                     font=("Arial", 14)
                 ).pack(pady=20)
-        except Exception as e:
+
+        def on_error(e):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error searching patients: {e}")
 
+        self.tasks.run(load, render, on_error)
+
     def view_patient_treatments(self, patient_id):
-        try:
-            self.cursor.execute("""
+        def load(cursor):
+            cursor.execute("""
                 SELECT t.treatment_id, t.symptoms, t.treatment, t.blood_pressure, 
                        t.temperature, t.weight, t.date, d.firstname, d.lastname
                 FROM treatments t
@@ -1091,7 +1202,9 @@ class AdminFrame(customtkinter.CTkFrame):
                 WHERE t.patient_id = %s
                 ORDER BY t.date DESC
             """, (patient_id,))
-            treatments = self.cursor.fetchall()
+            return cursor.fetchall()
+
+        def render(treatments):
             treatment_window = customtkinter.CTkToplevel(self)
             treatment_window.title(f"Treatment History - Patient ID: {patient_id}")
             treatment_window.geometry("800x600")
@@ -1127,8 +1240,11 @@ class AdminFrame(customtkinter.CTkFrame):
                     text="No treatment records found for this patient.",
                     font=("Arial", 14)
                 ).pack(pady=50)
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Error loading treatments: {e}")
+
+        self.tasks.run(
+            load, render,
+            lambda e: messagebox.showerror("Database Error", f"Error loading treatments: {e}")
+        )
 
     def show_treatment_records(self):
         self.clear_content()
@@ -1155,19 +1271,28 @@ class AdminFrame(customtkinter.CTkFrame):
     def filter_treatments_by_date(self, date_str):
         for widget in self.treatments_results_frame.winfo_children():
             widget.destroy()
-        try:
+        date_str = date_str.strip()
+        if date_str:
+            try:
+                day_filter, day_params = date_ranges.on_day("t.date", date_str)
+            except ValueError:
+                messagebox.showerror("Invalid Date", "Enter the date as YYYY-MM-DD.")
+                return
+        loading = show_loading(self.treatments_results_frame, "Loading treatments...")
+
+        def load(cursor):
             if date_str:
-                self.cursor.execute("""
+                cursor.execute(f"""
                     SELECT t.treatment_id, p.name, t.symptoms, t.treatment, 
                            t.date, d.firstname, d.lastname
                     FROM treatments t
                     JOIN patients p ON t.patient_id = p.patient_id
                     LEFT JOIN doctors d ON t.doctor_id = d.id
-                    WHERE DATE(t.date) = %s
+                    WHERE {day_filter}
                     ORDER BY t.date DESC
-                """, (date_str,))
+                """, day_params)
             else:
-                self.cursor.execute("""
+                cursor.execute("""
                     SELECT t.treatment_id, p.name, t.symptoms, t.treatment, 
                            t.date, d.firstname, d.lastname
                     FROM treatments t
@@ -1176,7 +1301,11 @@ class AdminFrame(customtkinter.CTkFrame):
                     ORDER BY t.date DESC
                     LIMIT 100
                 """)
-            treatments = self.cursor.fetchall()
+            return cursor.fetchall()
+
+        def render(treatments):
+            if not take_placeholder(loading):
+                return
             customtkinter.CTkLabel(
                 self.treatments_results_frame,
                 text=f"Treatment Records ({len(treatments)} found)",
@@ -1214,11 +1343,18 @@ class AdminFrame(customtkinter.CTkFrame):
                     text="No treatment records found.",
                     font=("Arial", 14)
                 ).pack(pady=20)
-        except Exception as e:
+
+        def on_error(e):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error loading treatments: {e}")
 
+        self.tasks.run(load, render, on_error)
+
     def logout(self):
-        self.conn.close()
-        self.master.destroy()
+        self.tasks.cancel_all()
+        flush_audit_log()
+        # The application window tears this frame down and shows the login page
         if self.on_logout:
-            self.on_logout()
\ No newline at end of file
+            self.on_logout()
+        else:
+            self.master.destroy()
\ No newline at end of file
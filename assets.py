@@ -0,0 +1,53 @@
+import hashlib
+import os
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get(
+    "HOSPITAL_ASSET_CACHE", os.path.join(os.path.expanduser("~"), ".hospital-management", "asset_cache")
+)
+
+
+def source_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def cached_image_path(path, size):
+    """PNG of the image at path resized to size (width, height) pixels.
+
+    Resized copies live in CACHE_DIR, named by the source's hash and the
+    size, so the full-size artwork is decoded and scaled once per machine
+    rather than on every start; an edited source gets a new entry."""
+    width, height = size
+    name, _ = os.path.splitext(os.path.basename(path))
+    cached = os.path.join(CACHE_DIR, f"{name}-{source_digest(path)}-{width}x{height}.png")
+    if not os.path.exists(cached):
+        from PIL import Image
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with Image.open(path) as source:
+            resized = source.convert("RGBA").resize((width, height), Image.LANCZOS)
+        partial = f"{cached}.{os.getpid()}.partial"
+        resized.save(partial, "PNG")
+        os.replace(partial, cached)
+    return cached
+
+
+def load_image(filename, size, scale=1.0):
+    """CTkImage of an image in the application directory, shown at size and
+    read from a copy pre-resized to size * scale (the window's DPI scaling);
+    None when the file is missing or unreadable"""
+    path = os.path.join(ASSET_DIR, filename)
+    if not os.path.exists(path):
+        return None
+    try:
+        import customtkinter
+        from PIL import Image
+        pixels = (round(size[0] * scale), round(size[1] * scale))
+        image = Image.open(cached_image_path(path, pixels))
+        return customtkinter.CTkImage(light_image=image, size=size)
+    except (OSError, ValueError) as err:
+        print(f"Could not load image {filename}: {err}")
+        return None
@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class AuditLogWriter:
+    """Queues audit entries and writes them to the logs table in batches from a background thread.
+
+    Every queued entry is also appended to a local spool file, which is rewritten
+    after each successful flush, so entries that never reached the database
+    (crash, DB outage) are replayed the next time the writer starts. At most
+    max_queue entries are held in memory; while the queue is full (the database
+    is down), log() only appends to the spool and the writer reads the spilled
+    entries back as the queue drains, so the caller never waits.
+    """
+
+    INSERT_SQL = (
+        "INSERT INTO logs (user, department, action, log_date, timestamp) "
+        "VALUES (%s, %s, %s, %s, %s)"
+    )
+
+    def __init__(self, connection_factory, spool_path, batch_size=50, flush_interval=2.0,
+                 max_queue=1000, retry_delay=5.0, after_insert=None):
+        self.connection_factory = connection_factory
+        self.after_insert = after_insert    # after_insert(cursor, batch), in the batch's transaction
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.retry_delay = retry_delay
+
+        self._pending = deque()     # the first entries of the spool
+        self._spilled = 0           # entries after them, in the spool only
+        self._cond = threading.Condition()
+        self._flush_requested = False
+        self._stopping = False
+        self._thread = None
+        self._last_error = None
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._load(self._read_spool())
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+
+    def log(self, user, department, action):
+        now = datetime.now()
+        entry = [user, department, action, now.strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d %H:%M:%S")]
+        with self._cond:
+            self._append_spool(entry)
+            if self._spilled or len(self._pending) >= self.max_queue:
+                # Queue full, so the writer is already draining (or retrying):
+                # keep the entry in the spool only
+                self._spilled += 1
+                return
+            self._pending.append(entry)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout=5.0):
+        """Ask the writer to drain the queue now; returns True once everything is in the database"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self._thread is None:
+                return not self._pending and not self._spilled
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._spilled:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout=5.0):
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return flushed
+
+    def pending_count(self):
+        with self._cond:
+            return len(self._pending) + self._spilled
+
+    def last_error(self):
+        return self._last_error
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while (not self._stopping and not self._flush_requested
+                       and len(self._pending) < self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopping and not self._pending:
+                    return
+                batch = [tuple(entry) for entry in list(self._pending)[:self.batch_size]]
+
+            if not batch:
+                with self._cond:
+                    self._flush_requested = False
+                continue
+
+            if self._write(batch):
+                with self._cond:
+                    for _ in batch:
+                        self._pending.popleft()
+                    if self._spilled:
+                        # The batch was the start of the spool; read the spilled entries back in
+                        remaining = self._read_spool()[len(batch):]
+                        self._load(remaining)
+                    else:
+                        remaining = self._pending
+                    self._rewrite_spool(remaining)
+                    if not self._pending:
+                        self._flush_requested = False
+                    self._cond.notify_all()
+            else:
+                with self._cond:
+                    if self._stopping:
+                        # Entries stay in the spool and are replayed on next start
+                        return
+                    self._flush_requested = False
+                    self._cond.wait(self.retry_delay)
+
+    def _load(self, entries):
+        """Hold the first max_queue of entries (the whole spool, in order) in memory"""
+        self._pending = deque(entries[:self.max_queue])
+        self._spilled = len(entries) - len(self._pending)
+
+    def _write(self, batch):
+        conn = None
+        try:
+            conn = self.connection_factory()
+            cursor = conn.cursor()
+            # mysql.connector turns executemany on an INSERT into one multi-row INSERT
+            cursor.executemany(self.INSERT_SQL, batch)
+            if self.after_insert is not None:
+                try:
+                    self.after_insert(cursor, batch)
+                except Exception as err:
+                    # Never hold the audit trail back for derived data
+                    print(f"Audit log after_insert failed: {err}")
+            conn.commit()
+            cursor.close()
+            self._last_error = None
+            return True
+        except Exception as err:
+            self._last_error = err
+            print(f"Audit log flush failed, will retry: {err}")
+            return False
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def _read_spool(self):
+        entries = []
+        try:
+            with open(self.spool_path, "r", encoding="utf-8") as spool:
+                for line in spool:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        # Torn last line from a crash mid-write
+                        continue
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _append_spool(self, entry):
+        try:
+            os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+            with open(self.spool_path, "a", encoding="utf-8") as spool:
+                spool.write(json.dumps(entry) + "\n")
+                spool.flush()
+                os.fsync(spool.fileno())
+        except OSError as err:
+            print(f"Audit spool write failed: {err}")
+
+    def _rewrite_spool(self, entries):
+        tmp_path = self.spool_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as spool:
+                for entry in entries:
+                    spool.write(json.dumps(entry) + "\n")
+                spool.flush()
+                os.fsync(spool.fileno())
+            os.replace(tmp_path, self.spool_path)
+        except OSError as err:
+            print(f"Audit spool rewrite failed: {err}")
@@ -0,0 +1,369 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from db_connection import get_backend
+
+BACKUP_DIR = os.path.join(os.path.expanduser("~"), "hospital_backups")
+MANIFEST_NAME = "MANIFEST.json"
+FETCH_ROWS = 2000               # rows pulled from the server per round trip
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+PROGRESS_EVERY = 10000          # rows between progress reports within a table
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# Columns holding the time each row was written (patients: also last changed,
+# via ON UPDATE CURRENT_TIMESTAMP; treatments: edits reset date). Incremental
+# backups take the rows at or after the previous watermark and copy every other
+# table - the small ones rows get deleted from, users and doctors - whole.
+# A log entry deleted by an admin stays in a restore until the next full backup.
+CHANGE_COLUMNS = {
+    "patients": "date_registered",
+    "treatments": "date",
+    "patient_notes": "date",
+    "logs": "timestamp",
+}
+DERIVED_TABLES = {"patient_name_trigrams"}     # rebuilt by the restore from the patients replayed
+LOCAL_TABLES = {"backup_watermarks"}           # this server's backup history; never copied
+
+
+class BackupError(Exception):
+    pass
+
+
+class BackupCancelled(BackupError):
+    pass
+
+
+def default_compression():
+    """zstd when the optional zstandard package is installed, gzip otherwise"""
+    try:
+        import zstandard  # noqa: F401
+        return "zstd"
+    except ImportError:
+        return "gzip"
+
+
+def _extension(compression):
+    return {"gzip": ".gz", "zstd": ".zst"}[compression]
+
+
+class _HashingWriter(io.RawIOBase):
+    """Binary file wrapper that checksums and counts the bytes written through it"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._raw.write(data)
+
+    def flush(self):
+        self._raw.flush()
+
+
+def _compressed_writer(fileobj, compression):
+    if compression == "zstd":
+        import zstandard
+        stream = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(fileobj, closefd=False)
+    else:
+        stream = gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+    return io.TextIOWrapper(stream, encoding="utf-8", newline="\n")
+
+
+def open_table_file(path, compression):
+    """Decompressed text lines of one table file of a backup"""
+    if compression == "zstd":
+        import zstandard
+        return zstandard.open(path, "rt", encoding="utf-8")
+    return gzip.open(path, "rt", encoding="utf-8")
+
+
+def _json_value(value):
+    # DATETIME/DATE/DECIMAL/TIME in the text form both MySQL and SQLite accept back
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (Decimal, timedelta)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", "replace")
+    raise TypeError(f"Cannot back up a {type(value).__name__} value")
+
+
+_ENCODER = json.JSONEncoder(default=_json_value, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_row(row):
+    return _ENCODER.encode(row)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(backup_path):
+    with open(os.path.join(backup_path, MANIFEST_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_backup(backup_path):
+    """Check every table file against the manifest: checksum, readable
+    compression and row count. Raises BackupError on the first mismatch."""
+    manifest = read_manifest(backup_path)
+    for entry in manifest["tables"]:
+        path = os.path.join(backup_path, entry["file"])
+        if not os.path.exists(path):
+            raise BackupError(f"{entry['file']} is missing")
+        if file_sha256(path) != entry["sha256"]:
+            raise BackupError(f"{entry['file']} does not match its checksum")
+        try:
+            with open_table_file(path, manifest["compression"]) as f:
+                lines = sum(1 for _ in f) - 1  # first line is the table header
+        except (OSError, EOFError, ValueError) as err:
+            raise BackupError(f"{entry['file']} is unreadable: {err}")
+        if lines != entry["rows"]:
+            raise BackupError(f"{entry['file']} holds {lines} rows, manifest says {entry['rows']}")
+    return manifest
+
+
+class BackupProgress:
+    """Snapshot of a running backup, posted to BackupJob.updates"""
+
+    __slots__ = ("table", "tables_done", "tables_total", "rows", "rows_estimate", "done", "path", "error")
+
+    def __init__(self, table=None, tables_done=0, tables_total=0, rows=0, rows_estimate=0,
+                 done=False, path=None, error=None):
+        self.table = table
+        self.tables_done = tables_done
+        self.tables_total = tables_total
+        self.rows = rows
+        self.rows_estimate = rows_estimate
+        self.done = done
+        self.path = path
+        self.error = error
+
+    @property
+    def fraction(self):
+        if self.done:
+            return 1.0
+        if self.rows_estimate:
+            return min(0.99, self.rows / self.rows_estimate)
+        return self.tables_done / self.tables_total if self.tables_total else 0.0
+
+
+def last_watermark(backend=None):
+    """(path, taken_at) of the newest backup recorded in backup_watermarks, or None"""
+    conn = (backend or get_backend()).connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT path, taken_at FROM backup_watermarks ORDER BY id DESC LIMIT 1")
+        row = cursor.fetchone()
+        cursor.close()
+        return row
+    finally:
+        conn.close()
+
+
+def record_watermark(backend, kind, path, taken_at, rows):
+    conn = backend.connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO backup_watermarks (kind, path, taken_at, rows_written) VALUES (%s, %s, %s, %s)",
+            (kind, path, taken_at, rows)
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def finish_backup(partial, destination, manifest):
+    """Write MANIFEST.json, verify the files against it and move the backup into place"""
+    with open(os.path.join(partial, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    verify_backup(partial)
+    os.replace(partial, destination)
+
+
+def dump_database(destination, kind="full", compression=None, on_progress=None, cancelled=None, backend=None):
+    """Stream the tables to destination/<table>.jsonl.gz (or .zst) from one
+    consistent snapshot, then write and verify MANIFEST.json.
+
+    Each table file starts with a header line (columns, DDL and mode) followed
+    by one JSON array per row. kind="incremental" takes only the rows of the
+    CHANGE_COLUMNS tables written since the previous backup's watermark (less
+    WATERMARK_OVERLAP, for transactions that committed late) and the other
+    tables in full. The backup is written to destination + ".partial" and only
+    renamed into place, and its watermark recorded, once every file has been
+    verified, so a failed or cancelled run never leaves something that looks
+    like a usable backup.
+    """
+    backend = backend or get_backend()
+    compression = compression or default_compression()
+    if os.path.exists(destination):
+        raise BackupError(f"{destination} already exists")
+    previous = since = None
+    if kind == "incremental":
+        previous = last_watermark(backend)
+        if previous is None or not os.path.isdir(previous[0]):
+            raise BackupError("No earlier backup to build on - take a full backup first")
+        since = previous[1] - WATERMARK_OVERLAP
+    partial = destination + ".partial"
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+    report = on_progress or (lambda progress: None)
+
+    try:
+        conn = backend.connect()
+        try:
+            cursor = conn.cursor()
+            try:
+                backend.begin_snapshot(cursor)
+                cursor.execute("SELECT NOW()")
+                taken_at = cursor.fetchone()[0]
+                plan = []
+                for table in backend.list_tables(cursor):
+                    if table in LOCAL_TABLES or (since and table in DERIVED_TABLES):
+                        continue
+                    if since and table in CHANGE_COLUMNS:
+                        query = (f"SELECT * FROM {table} WHERE {CHANGE_COLUMNS[table]} >= %s", (since,))
+                        mode, estimate = "changes", 0
+                    else:
+                        query = (f"SELECT * FROM {table}", None)
+                        mode, estimate = "full", backend.estimate_rows(cursor, table)
+                    plan.append((table, backend.table_ddl(cursor, table), mode, query, estimate))
+                # Incremental runs are small and their size unknown: report by table
+                estimate = sum(entry[4] for entry in plan) if since is None else 0
+                entries = []
+                total_rows = 0
+                for done, (table, ddl, mode, query, _) in enumerate(plan):
+                    def table_progress(rows, table=table, done=done):
+                        if cancelled is not None and cancelled():
+                            raise BackupCancelled("Backup cancelled")
+                        report(BackupProgress(table, done, len(plan), total_rows + rows, estimate))
+
+                    cursor.execute(*query)
+                    entry = dump_table(cursor, partial, table, ddl, mode, compression, table_progress)
+                    entries.append(entry)
+                    total_rows += entry["rows"]
+            finally:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass  # a cancelled dump leaves unread rows; the connection is closed below
+            conn.rollback()
+        finally:
+            conn.close()
+
+        manifest = {
+            "format": 1,
+            "kind": kind,
+            "created": datetime.now().isoformat(sep=" ", timespec="seconds"),
+            "taken_at": taken_at.isoformat(sep=" "),
+            "since": since.isoformat(sep=" ") if since else None,
+            "previous": os.path.basename(previous[0]) if previous else None,
+            "backend": backend.name,
+            "source": backend.describe(),
+            "compression": compression,
+            "tables": entries,
+        }
+        finish_backup(partial, destination, manifest)
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    record_watermark(backend, kind, destination, taken_at, total_rows)
+    report(BackupProgress(None, len(plan), len(plan), total_rows, estimate, done=True, path=destination))
+    return manifest
+
+
+def dump_table(cursor, directory, table, ddl, mode, compression, table_progress):
+    """Write the rows of the query just run on cursor to directory/<table> file;
+    returns the table's manifest entry"""
+    name = f"{table}.jsonl{_extension(compression)}"
+    path = os.path.join(directory, name)
+    columns = [column[0] for column in cursor.description]
+    rows = 0
+    with open(path, "wb") as raw:
+        hashing = _HashingWriter(raw)
+        with _compressed_writer(hashing, compression) as out:
+            out.write(json.dumps({"table": table, "columns": columns, "ddl": ddl, "mode": mode}) + "\n")
+            next_report = PROGRESS_EVERY
+            while True:
+                batch = cursor.fetchmany(FETCH_ROWS)
+                if not batch:
+                    break
+                out.write("\n".join(encode_row(list(row)) for row in batch))
+                out.write("\n")
+                rows += len(batch)
+                if rows >= next_report:
+                    table_progress(rows)
+                    next_report = rows + PROGRESS_EVERY
+        raw.flush()
+        os.fsync(raw.fileno())
+    table_progress(rows)
+    return {"table": table, "file": name, "mode": mode, "rows": rows, "bytes": hashing.size,
+            "sha256": hashing.sha256.hexdigest()}
+
+
+class BackupJob:
+    """Runs dump_database() on its own thread so the admin window stays responsive.
+
+    Progress reports and the final result are posted to the updates queue,
+    which the Tk side polls with after(); cancel() stops the dump at the next
+    batch of rows and removes the partial files.
+    """
+
+    def __init__(self, kind="full", backup_dir=BACKUP_DIR, compression=None):
+        self.kind = kind
+        self.backup_dir = backup_dir
+        self.compression = compression
+        self.updates = queue.SimpleQueue()
+        self._cancel = threading.Event()
+        self._thread = None
+        self.path = None
+
+    def start(self):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = "_incr" if self.kind == "incremental" else ""
+        self.path = os.path.join(self.backup_dir, f"hospital_db_backup_{timestamp}{suffix}")
+        self._thread = threading.Thread(target=self._run, name="database-backup", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        started = time.perf_counter()
+        try:
+            dump_database(self.path, self.kind, self.compression, self.updates.put, self._cancel.is_set)
+        except Exception as err:
+            self.updates.put(BackupProgress(done=True, error=err))
+        else:
+            print(f"{self.kind.capitalize()} backup written to {self.path} in {time.perf_counter() - started:.1f} s")
@@ -0,0 +1,153 @@
+"""Generate the report PDFs for a range of months without the admin window.
+
+    python batch_reports.py --from 2026-01 --to 2026-12 [--out reports] [--jobs 4]
+                            [--annual] [--no-specializations]
+
+For every month in the range (both ends included) this writes the hospital
+report of the System Reports page and, unless --no-specializations is given,
+one report per doctor specialization; --annual adds the annual report of
+each year in the range. Works on the configured database (HOSPITAL_DB_BACKEND
+/ HOSPITAL_DB_PATH).
+
+The figures of each period are fetched once, from the daily rollups, and
+shared by all of that period's reports; the PDFs are then laid out by jobs
+worker processes. The time taken by every fetch and every report is printed.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from datetime import date
+from db_connection import get_backend
+from report_layout import build_period_report, build_specialization_report
+from reports import FULL_YEAR, MONTHS, report_filename, report_period
+from rollups import doctor_treatments, period_report
+
+DEFAULT_JOBS = min(4, os.cpu_count() or 1)
+
+
+def _month(value):
+    try:
+        year, month = value.split("-")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+
+
+def plan_periods(first, last, annual=False):
+    """(month_name, year) of every month from first to last, then the years when annual"""
+    periods = []
+    month = first
+    while month <= last:
+        periods.append((MONTHS[month.month - 1], month.year))
+        month = date(month.year + 1, 1, 1) if month.month == 12 else date(month.year, month.month + 1, 1)
+    if annual:
+        periods.extend((FULL_YEAR, year) for year in range(first.year, last.year + 1))
+    return periods
+
+
+def fetch_figures(periods, report=print):
+    """{(month_name, year): (days, period_report(), doctor_treatments())}, one fetch per period"""
+    backend = get_backend()
+    figures = {}
+    conn = backend.connect()
+    try:
+        cursor = conn.cursor(buffered=True)
+        for month_name, year in periods:
+            started = time.perf_counter()
+            start, end = report_period(month_name, year)
+            data = period_report(cursor, start, end)
+            doctors = doctor_treatments(cursor, start, end)
+            conn.commit()   # keep any rollups the catch-up refreshed
+            figures[(month_name, year)] = ((end - start).days, data, doctors)
+            report(f"  fetched {_period_title(month_name, year):32} {time.perf_counter() - started:8.3f} s")
+        cursor.close()
+    finally:
+        conn.close()
+    return figures
+
+
+def plan_reports(figures, directory, specializations=True):
+    """One job per PDF: the hospital report of every period and, when asked,
+    the report of every specialization with doctors"""
+    jobs = []
+    for (month_name, year), (days, data, doctors) in figures.items():
+        title = _period_title(month_name, year)
+        jobs.append((title, os.path.join(directory, report_filename(month_name, year)),
+                     build_period_report, (month_name, year) + tuple(data), days))
+        if specializations:
+            _, total_treatments, dept_treatments, _ = data
+            for specialization in sorted({doctor[2] for doctor in doctors}):
+                jobs.append((
+                    f"{specialization}, {title}",
+                    os.path.join(directory, report_filename(month_name, year, specialization)),
+                    build_specialization_report,
+                    (specialization, month_name, year, total_treatments, dept_treatments, doctors), days
+                ))
+    return jobs
+
+
+def _build_one(job):
+    title, filename, build, args, days = job
+    started = time.perf_counter()
+    try:
+        build(filename, *args, days=days)
+    except Exception as err:
+        return title, filename, time.perf_counter() - started, f"{type(err).__name__}: {err}"
+    return title, filename, time.perf_counter() - started, None
+
+
+def generate(first, last, directory, jobs=DEFAULT_JOBS, annual=False, specializations=True, report=print):
+    """Write every report for the months first..last into directory; returns
+    (reports written, reports failed, seconds)"""
+    started = time.perf_counter()
+    os.makedirs(directory, exist_ok=True)
+    periods = plan_periods(first, last, annual)
+    report(f"Fetching the figures of {len(periods)} periods from {get_backend().describe()}")
+    work = plan_reports(fetch_figures(periods, report), directory, specializations)
+    report(f"Building {len(work)} reports with {jobs} workers")
+    written = failed = 0
+    with multiprocessing.get_context().Pool(jobs) as pool:
+        for title, filename, seconds, error in pool.imap_unordered(_build_one, work):
+            if error is None:
+                written += 1
+                report(f"  {title:40} {seconds:8.3f} s  {os.path.basename(filename)}")
+            else:
+                failed += 1
+                report(f"  {title:40} {seconds:8.3f} s  FAILED: {error}")
+    seconds = time.perf_counter() - started
+    report(f"{written} reports written to {directory} in {seconds:.1f} s"
+           + (f", {failed} failed" if failed else ""))
+    return written, failed, seconds
+
+
+def _period_title(month_name, year):
+    return f"Annual report {year}" if month_name == FULL_YEAR else f"{month_name} {year}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--from", dest="first", type=_month, required=True, help="first month, YYYY-MM")
+    parser.add_argument("--to", dest="last", type=_month, help="last month, YYYY-MM (default: --from)")
+    parser.add_argument("--out", default="reports", help="directory the PDFs are written to")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS)
+    parser.add_argument("--annual", action="store_true", help="also the annual report of each year")
+    parser.add_argument("--no-specializations", dest="specializations", action="store_false",
+                        help="only the hospital report of each period")
+    args = parser.parse_args()
+    last = args.last or args.first
+    if last < args.first:
+        parser.error("--to is before --from")
+
+    try:
+        _, failed, _ = generate(args.first, last, args.out, args.jobs, args.annual, args.specializations)
+    except OSError as err:
+        print(f"Report generation failed: {err}")
+        sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Time the main.py console's start-up, lookups and saves on a large patient store.
+
+    python benchmarks/console_store_bench.py [--patients 100000] [--journal 5000] [--runs 5]
+
+A scratch data directory gets a snapshot of --patients patients and a
+journal of --journal changes after it (new patients, renames, treatments),
+then this is timed:
+
+    append    saving one change to the journal, synced to disk (median)
+    start     HospitalSystem() loading the snapshot and replaying the
+              journal (median of --runs starts)
+    index     building the name index, on the first search by name
+    by id     get_patient_by_id, against the linear scan it replaced
+    by name   a lookup in the name index, against a scan comparing names
+    compact   folding the journal into a new snapshot
+
+The data directory is removed afterwards.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import HospitalSystem, Patient, PatientStore
+
+FIRST_NAMES = ["Chikondi", "Mphatso", "Thoko", "Kondwani", "Tiwonge", "Chisomo", "Limbani", "Madalitso"]
+LOOKUPS = 1000
+
+
+def build_store(directory, patients, journal, rng):
+    """Snapshot of patients patients, then journal changes; returns (patient ids, append seconds)"""
+    store = PatientStore(directory, compact_after=journal + 1)
+    records = {}
+    for i in range(patients):
+        pid = f"P{i:06d}"
+        records[pid] = Patient(pid, f"{rng.choice(FIRST_NAMES)} {i}", rng.randint(0, 95), rng.choice("MF"))
+    store.compact(records)
+
+    ids = list(records)
+    appends = []
+    for i in range(journal):
+        kind = i % 3
+        if kind == 0:
+            pid = f"N{i:06d}"
+            entry = {"op": "add", "patient": [pid, f"{rng.choice(FIRST_NAMES)} new {i}", 30, "F", []]}
+            ids.append(pid)
+        elif kind == 1:
+            entry = {"op": "update", "id": rng.choice(ids), "changes": {"age": rng.randint(0, 95)}}
+        else:
+            entry = {"op": "treatment", "id": rng.choice(ids), "treatment": "Paracetamol 500mg"}
+        started = time.perf_counter()
+        store.append(entry)
+        appends.append(time.perf_counter() - started)
+    store.close()
+    return ids, appends
+
+
+def time_lookups(func, keys):
+    started = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - started) / len(keys)
+
+
+def _us(seconds):
+    return f"{seconds * 1e6:10.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, default=100000)
+    parser.add_argument("--journal", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    directory = tempfile.mkdtemp(prefix="hospital_console_")
+    try:
+        ids, appends = build_store(directory, args.patients, args.journal, rng)
+        size = os.path.getsize(os.path.join(directory, "snapshot.json")) / 2**20
+        print(f"{args.patients:,} patients in the snapshot ({size:.1f} MB), {args.journal:,} journal entries")
+        print(f"append   median {_us(statistics.median(appends))}")
+
+        starts = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            system = HospitalSystem(directory)
+            starts.append(time.perf_counter() - started)
+            system.close()
+        print(f"start    median {statistics.median(starts) * 1000:8.1f} ms   ({len(system.patients):,} patients)")
+        started = time.perf_counter()
+        indexed = len(system.names)
+        print(f"index    {(time.perf_counter() - started) * 1000:8.1f} ms   ({indexed:,} names)")
+
+        sample = [rng.choice(ids) for _ in range(LOOKUPS)]
+        names = [system.patients[pid].name for pid in sample]
+        patient_list = list(system.patients.values())
+
+        def scan_id(pid):
+            for patient in patient_list:
+                if patient.patient_id == pid:
+                    return patient
+
+        def scan_name(name):
+            return [patient for patient in patient_list if patient.name.lower() == name.lower()]
+
+        scans = sample[:LOOKUPS // 100]
+        print(f"by id    index {_us(time_lookups(system.get_patient_by_id, sample))}   "
+              f"scan {_us(time_lookups(scan_id, scans))}")
+        print(f"by name  index {_us(time_lookups(lambda name: system.names.get(name.lower()), names))}   "
+              f"scan {_us(time_lookups(scan_name, names[:LOOKUPS // 100]))}")
+
+        started = time.perf_counter()
+        system.store.compact(system.patients)
+        compact = time.perf_counter() - started
+        started = time.perf_counter()
+        HospitalSystem(directory).close()
+        print(f"compact  {compact * 1000:8.1f} ms; start after it {(time.perf_counter() - started) * 1000:8.1f} ms")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Check that the date_ranges filters are answered with index range scans.
+
+Creates a scratch database next to the configured one, seeds it with a year
+of patients/treatments/notes/logs, applies the schema migrations' indexes and
+EXPLAINs the "today"/day/month queries the role screens run. Exits non-zero
+if any of them falls back to a full scan. The scratch database is dropped
+afterwards unless --keep is given.
+
+    python benchmarks/explain_date_ranges.py [--rows 20000] [--keep]
+"""
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mysql.connector
+import date_ranges
+from db_connection import DB_CONFIG
+from migrations import MIGRATIONS
+
+SCRATCH_SUFFIX = "_explain_check"
+
+BASE_TABLES = [
+    """CREATE TABLE patients (
+        patient_id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        date_of_birth DATETIME NOT NULL,
+        gender VARCHAR(10) NOT NULL,
+        blood_type VARCHAR(3) NOT NULL,
+        date_registered TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB""",
+    """CREATE TABLE treatments (
+        treatment_id INT AUTO_INCREMENT PRIMARY KEY,
+        patient_id INT NOT NULL,
+        doctor_id INT NOT NULL,
+        symptoms TEXT,
+        treatment TEXT,
+        blood_pressure INT,
+        temperature INT,
+        weight INT,
+        date TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+        KEY patient_id (patient_id),
+        KEY doctor_id (doctor_id)
+    ) ENGINE=InnoDB""",
+]
+
+
+def build_checks():
+    today = datetime.now().date()
+    checks = []
+
+    sql, params = date_ranges.today("date")
+    checks.append(("treatments today", f"SELECT COUNT(*) FROM treatments WHERE {sql}", params, "idx_treatments_date"))
+
+    sql, params = date_ranges.on_day("t.date", today)
+    checks.append(("treatments on a day", f"SELECT t.treatment_id FROM treatments t WHERE {sql} ORDER BY t.date DESC", params, "idx_treatments_date"))
+
+    sql, params = date_ranges.on_day("date_registered", today)
+    checks.append(("registrations today", f"SELECT COUNT(*) FROM patients WHERE {sql}", params, "idx_patients_date_registered"))
+
+    sql, params = date_ranges.since_days("date_registered", 7, today)
+    checks.append(("registrations this week", f"SELECT COUNT(*) FROM patients WHERE {sql}", params, "idx_patients_date_registered"))
+
+    sql, params = date_ranges.today("date")
+    checks.append(("emergency notes today", f"SELECT COUNT(*) FROM patient_notes WHERE emergency = TRUE AND {sql}", params, "idx_patient_notes_emergency_date"))
+
+    sql, params = date_ranges.in_month("log_date", today.year, today.month)
+    checks.append(("logs this month", f"SELECT department, COUNT(*) FROM logs WHERE {sql} GROUP BY department", params, "idx_logs_date_timestamp"))
+    return checks
+
+
+def seed(cursor, rows):
+    now = datetime.now()
+    random.seed(42)
+
+    def moment():
+        return now - timedelta(days=random.randint(0, 364), seconds=random.randint(0, 86399))
+
+    cursor.executemany(
+        "INSERT INTO patients (name, date_of_birth, gender, blood_type, date_registered) VALUES (%s, %s, %s, %s, %s)",
+        [(f"patient {i}", "1990-01-01", random.choice(["male", "female"]), "O", moment()) for i in range(rows // 4)]
+    )
+    cursor.executemany(
+        "INSERT INTO treatments (patient_id, doctor_id, symptoms, treatment, blood_pressure, temperature, weight, date) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+        [(random.randint(1, rows // 4), 1, "cough", "rest", 120, 36, 70, moment()) for _ in range(rows)]
+    )
+    cursor.executemany(
+        "INSERT INTO patient_notes (patient_id, notes, author, date, emergency) VALUES (%s, %s, %s, %s, %s)",
+        [(random.randint(1, rows // 4), "note", "nurse", moment(), random.random() < 0.05) for _ in range(rows // 2)]
+    )
+    entries = []
+    for _ in range(rows):
+        when = moment()
+        entries.append(("admin", random.choice(["Admin", "Doctor", "Nurse", "Receptionist"]), "viewed", when.date(), when))
+    cursor.executemany(
+        "INSERT INTO logs (user, department, action, log_date, timestamp) VALUES (%s, %s, %s, %s, %s)", entries
+    )
+
+
+def main():
+    rows = int(sys.argv[sys.argv.index("--rows") + 1]) if "--rows" in sys.argv else 20000
+    scratch = DB_CONFIG["database"] + SCRATCH_SUFFIX
+    config = {key: value for key, value in DB_CONFIG.items() if key != "database"}
+
+    conn = mysql.connector.connect(**config)
+    cursor = conn.cursor(buffered=True)
+    cursor.execute(f"DROP DATABASE IF EXISTS `{scratch}`")
+    cursor.execute(f"CREATE DATABASE `{scratch}`")
+    cursor.execute(f"USE `{scratch}`")
+    failures = 0
+    try:
+        for ddl in BASE_TABLES:
+            cursor.execute(ddl)
+        for _, _, steps in MIGRATIONS:
+            for step in steps:
+                step.apply(cursor)
+        print(f"Seeding {rows} treatments/logs into {scratch}...")
+        seed(cursor, rows)
+        conn.commit()
+        for table in ("patients", "treatments", "patient_notes", "logs"):
+            cursor.execute(f"ANALYZE TABLE {table}")
+            cursor.fetchall()
+
+        for name, query, params, expected_key in build_checks():
+            cursor.execute("EXPLAIN " + query, params)
+            columns = [column[0] for column in cursor.description]
+            plan = dict(zip(columns, cursor.fetchone()))
+            cursor.fetchall()
+            ok = plan["type"] in ("range", "ref") and plan["key"] == expected_key
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name:26} type={plan['type']:6} key={plan['key']} rows={plan['rows']}")
+    finally:
+        if "--keep" not in sys.argv:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{scratch}`")
+        cursor.close()
+        conn.close()
+
+    print("All date filters use index range scans." if not failures else f"{failures} check(s) failed.")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Time logins at the configured password-hash cost and check them against a latency target.
+
+    python benchmarks/login_bench.py [--logins 50] [--target-ms 250]
+
+First the cost of one scrypt hash is timed at a few work factors around the
+one in credentials.py (SCRYPT_N), to show what raising or lowering it would
+cost. Then a scratch SQLite database is filled by seed_data.py (its accounts
+start with plaintext passwords, like an unmigrated install) and the login
+path the login page runs, credentials.authenticate on a pooled connection,
+is timed as medians and 95th percentiles for:
+
+    upgrade    first login of an account still in plaintext (checked, then hashed)
+    hashed     a login against a stored hash: the everyday case
+    wrong      a wrong password for an existing account
+    unknown    a username that does not exist
+    throttled  an attempt refused because of earlier failures
+
+Exits with status 1 when the 95th percentile of the hashed logins is over
+--target-ms.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import seed_data
+import credentials
+from credentials import LoginThrottled, authenticate, get_login_throttle, hash_password
+from db_connection import set_backend
+from query_executor import run_query
+
+PASSWORD = "1234"   # every account seed_data.py creates
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def summary(samples):
+    values = sorted(samples)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    return statistics.median(values), p95
+
+
+def print_row(label, samples):
+    median, p95 = summary(samples)
+    print(f"{label:12} median {median * 1000:8.1f} ms   p95 {p95 * 1000:8.1f} ms   n={len(samples)}")
+
+
+def login(username, password):
+    try:
+        return run_query(lambda cursor: authenticate(cursor, username, password))
+    except LoginThrottled:
+        return None
+
+
+def bench_hash_costs(runs):
+    print(f"scrypt r={credentials.SCRYPT_R} p={credentials.SCRYPT_P}, one hash:")
+    for shift in (-2, -1, 0, 1, 2):
+        n = credentials.SCRYPT_N * 2 ** shift if shift >= 0 else credentials.SCRYPT_N // 2 ** -shift
+        samples = [timed(lambda: hash_password(PASSWORD, n=n)) for _ in range(runs)]
+        median, _ = summary(samples)
+        memory = 128 * n * credentials.SCRYPT_R / 2**20
+        marker = "   <- SCRYPT_N" if shift == 0 else ""
+        print(f"  n=2**{n.bit_length() - 1:<3} {memory:6.0f} MiB   median {median * 1000:8.1f} ms{marker}")
+
+
+def accounts():
+    def load(cursor):
+        cursor.execute("SELECT username FROM users ORDER BY id")
+        return [row[0] for row in cursor.fetchall()]
+    return run_query(load)
+
+
+def bench_logins(logins):
+    users = accounts()
+    throttle = get_login_throttle()
+    results = {}
+    results["upgrade"] = [timed(lambda: login(user, PASSWORD)) for user in users[:logins]]
+    results["hashed"] = [timed(lambda: login(users[i % len(users)], PASSWORD)) for i in range(logins)]
+    results["wrong"] = []
+    for i in range(logins):
+        user = users[i % len(users)]
+        results["wrong"].append(timed(lambda: login(user, "wrong")))
+        throttle.succeeded(user)    # keep the next sample from being throttled
+    results["unknown"] = [timed(lambda: login(f"nobody{i}", PASSWORD)) for i in range(logins)]
+    for _ in range(throttle.free_attempts + 1):
+        login("admin", "wrong")
+    results["throttled"] = [timed(lambda: login("admin", PASSWORD)) for _ in range(logins)]
+    throttle.succeeded("admin")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    seed_data.add_arguments(parser)
+    parser.add_argument("--logins", type=int, default=50, help="timed logins per case")
+    parser.add_argument("--hash-runs", type=int, default=5, help="hashes timed per work factor")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.set_defaults(patients=500, doctors=60)
+    args = parser.parse_args()
+
+    bench_hash_costs(args.hash_runs)
+
+    path = os.path.join(tempfile.gettempdir(), f"hospital_login_{args.patients}.db")
+    try:
+        seed_data.load_sqlite(path, seed_data.config_from_args(args), verbose=False)
+        results = bench_logins(args.logins)
+    finally:
+        set_backend(None)
+        for leftover in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    print("authenticate() on a pooled connection:")
+    for label, samples in results.items():
+        print_row(label, samples)
+    _, p95 = summary(results["hashed"])
+    verdict = "within" if p95 * 1000 <= args.target_ms else "OVER"
+    print(f"Hashed login p95 {p95 * 1000:.1f} ms is {verdict} the {args.target_ms:.0f} ms target")
+    sys.exit(0 if verdict == "within" else 1)
+
+
+if __name__ == "__main__":
+    main()
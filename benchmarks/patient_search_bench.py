@@ -0,0 +1,190 @@
+"""Time the trigram patient search against a LIKE '%term%' scan.
+
+Generates synthetic patient names into a scratch SQLite database, loads
+the in-process TrigramIndex from it with MemorySearch.refresh (the load the
+app does) and reports the load time and index size, then times exact,
+substring and misspelt queries against a linear substring scan (what
+LIKE '%term%' does without an index). With --database it also times the real LIKE query against
+search_database() on the configured database, whose patient_name_trigrams
+table must be up to date (python migrations.py).
+
+    python benchmarks/patient_search_bench.py [--rows 1000000] [--queries 200] [--database]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_backend import SQLiteBackend
+from db_connection import get_connection, set_backend
+from migrations import migrate
+from patient_search import MemorySearch, normalize
+
+FIRST_NAMES = [
+    "Chikondi", "Mphatso", "Thoko", "Kondwani", "Chisomo", "Tawonga", "Limbani", "Dalitso",
+    "Yamikani", "Madalitso", "Tiyamike", "Kumbukani", "Precious", "Grace", "James", "Mary",
+    "John", "Esther", "Blessings", "Innocent", "Patricia", "Joseph", "Agnes", "Peter",
+]
+LAST_NAMES = [
+    "Banda", "Phiri", "Mwale", "Chirwa", "Nyirenda", "Kamanga", "Gondwe", "Mbewe", "Tembo",
+    "Zulu", "Kumwenda", "Msiska", "Chinyanja", "Mkandawire", "Chavula", "Kaunda", "Lungu",
+    "Ngwira", "Mhango", "Moyo", "Jere", "Nkhoma", "Kachale", "Chimwaza",
+]
+
+
+def make_names(count, seed=42):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        # A suffix keeps the distinct-name count realistic for large runs
+        suffix = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(3))
+        names.append(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}{suffix}")
+    return names
+
+
+def misspell(word, rng):
+    position = rng.randrange(1, len(word) - 1)
+    return word[:position] + rng.choice("aeiou") + word[position + 1:]
+
+
+def make_queries(names, count, seed=7):
+    rng = random.Random(seed)
+    queries = {"exact": [], "substring": [], "typo": []}
+    for _ in range(count):
+        name = rng.choice(names)
+        queries["exact"].append(name)
+        start = rng.randrange(0, len(name) - 5)
+        queries["substring"].append(name[start:start + 5])
+        queries["typo"].append(misspell(name.split()[1], rng))
+    return queries
+
+
+def timed(func, terms):
+    samples = []
+    for term in terms:
+        started = time.perf_counter()
+        func(term)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def scan(lowered, term):
+    return [name for name in lowered if term in name][:50]
+
+
+def report(label, median, p95):
+    print(f"  {label:28} median {median:9.2f} ms   p95 {p95:9.2f} ms")
+
+
+def load_names(path, names):
+    """Fresh SQLite database at path with the app's schema and one patient per
+    name, made the backend; returns an open connection to it"""
+    for leftover in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    set_backend(SQLiteBackend(path))
+    migrate()   # the schema and indexes first, while the tables are empty
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            "INSERT INTO patients (name, date_of_birth, gender) VALUES (%s, %s, %s)",
+            [(name, "1990-01-01 00:00:00", "F") for name in names]
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+    return conn
+
+
+def run_memory(rows, query_count):
+    print(f"Generating {rows:,} names...")
+    names = make_names(rows)
+
+    path = os.path.join(tempfile.gettempdir(), f"hospital_search_{rows}.db")
+    try:
+        conn = load_names(path, names)
+        cursor = conn.cursor(buffered=True)
+        try:
+            tracemalloc.start()
+            started = time.perf_counter()
+            memory = MemorySearch()
+            memory.refresh(cursor)
+            build = time.perf_counter() - started
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+        finally:
+            cursor.close()
+            conn.close()
+    finally:
+        set_backend(None)
+        for leftover in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    index = memory.index
+    print(f"Loaded TrigramIndex from the database in {build:.1f} s, {size / 1024 / 1024:.0f} MiB "
+          f"(rows fetched included)")
+
+    lowered = [normalize(name) for name in names]
+    queries = make_queries(names, query_count)
+    # The linear scan is slow; a few queries are enough to show it
+    scan_terms = {kind: terms[:max(5, query_count // 20)] for kind, terms in queries.items()}
+
+    for kind, terms in queries.items():
+        print(f"{kind} queries:")
+        report("trigram index", *timed(index.search, terms))
+        report("substring scan (LIKE '%x%')",
+               *timed(lambda term: scan(lowered, normalize(term)), scan_terms[kind]))
+
+
+def run_database(query_count):
+    from patient_search import search_database
+
+    conn = get_connection()
+    cursor = conn.cursor(buffered=True)
+    try:
+        cursor.execute("SELECT name FROM patients")
+        names = [row[0] for row in cursor.fetchall() if len(row[0]) > 6]
+        if not names:
+            print("No patients in the configured database.")
+            return
+        print(f"Database: {len(names):,} patients")
+        queries = make_queries(names, query_count)
+
+        def like(term):
+            cursor.execute(
+                "SELECT patient_id, name FROM patients WHERE name LIKE %s ORDER BY name LIMIT 50",
+                (f"%{term}%",)
+            )
+            cursor.fetchall()
+
+        for kind, terms in queries.items():
+            print(f"{kind} queries:")
+            report("patient_name_trigrams", *timed(lambda term: search_database(cursor, term), terms))
+            report("LIKE '%term%'", *timed(like, terms))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--database", action="store_true", help="also time the configured MySQL database")
+    args = parser.parse_args()
+
+    run_memory(args.rows, args.queries)
+    if args.database:
+        run_database(args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+"""Time every query the four role frames run, at several data scales.
+
+For each scale the seeded generator (seed_data.py) fills a scratch
+database, then each query in QUERIES is run `--repeat` times after one
+warm-up run. Median/p95/min times and row counts are written as JSON to
+benchmarks/results/<commit>-<backend>.json, so runs on different commits
+can be compared:
+
+    python benchmarks/scale_bench.py --scales 10000,100000,1000000
+    python benchmarks/scale_bench.py --backend sqlite --scales 10000 --compare benchmarks/results/abc1234-sqlite.json
+
+--backend sqlite needs no database server: the same SQL runs on a
+temporary SQLite file through db_backend.SQLiteBackend.
+
+With --compare, queries more than --threshold times slower than in the
+earlier file are listed and the exit status is 1.
+
+The queries mirror the SQL in admin.py, doctor.py, nurse.py and
+receptionist.py; where a screen goes through a shared helper
+(DashboardStats, PendingQueue, LogPager, patient search) the helper itself
+is timed. Keep QUERIES in step when a screen's SQL changes.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import date_ranges
+import db_connection
+import seed_data
+from db_connection import DB_CONFIG, get_connection, set_backend
+from dashboard_stats import DashboardStats, recent_patients
+from log_pages import LogPager
+from patient_search import search_database, search_query
+from pending_queue import PendingQueue
+from rollups import department_stats, period_report, rebuild
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SCALES = (10000, 100000, 1000000)
+BENCH_DATABASE_SUFFIX = "_bench"
+PAGE_SIZE = 100
+
+
+def _run(sql, params=()):
+    def query(cursor, ctx):
+        cursor.execute(sql, params(ctx) if callable(params) else params)
+        return cursor.fetchall()
+    return query
+
+
+def _dated(build, sql, params=()):
+    """Query whose WHERE clause comes from a date_ranges helper: build(ctx) -> (filter, params)"""
+    def query(cursor, ctx):
+        condition, condition_params = build(ctx)
+        cursor.execute(sql.format(filter=condition), tuple(condition_params) + tuple(params))
+        return cursor.fetchall()
+    return query
+
+
+def _rebuild_month(cursor, ctx):
+    # What the catch-up job costs per month of history
+    start, end = date_ranges.in_month("date", *ctx["month"])[1]
+    rebuild(cursor, start, end)
+    return []
+
+
+def _dashboard(cursor, ctx):
+    return [DashboardStats().fetch(cursor, ctx["doctor_id"])]
+
+
+def _pending_full(cursor, ctx):
+    return PendingQueue().awaiting_treatment(cursor)
+
+
+def _pending_incremental(cursor, ctx):
+    queue = ctx.setdefault("pending_queue", PendingQueue())
+    return queue.awaiting_treatment(cursor)
+
+
+def _vitals_queue(cursor, ctx):
+    return PendingQueue().awaiting_vitals(cursor)
+
+
+def _log_page(department="All", day=""):
+    def query(cursor, ctx):
+        return LogPager(department, ctx["today"].isoformat() if day else "").page_query("first")(cursor)
+    return query
+
+
+def _log_count(department="All"):
+    def query(cursor, ctx):
+        return [LogPager(department, "").count_query()(cursor)]
+    return query
+
+
+def _search(term_key):
+    def query(cursor, ctx):
+        return search_database(cursor, ctx[term_key])
+    return query
+
+
+def _picker(cursor, ctx):
+    return search_query(ctx["prefix"])(cursor)
+
+
+_TREATMENT_LIST = """
+    SELECT t.treatment_id, p.name, t.symptoms, t.treatment, t.date, d.firstname, d.lastname
+    FROM treatments t
+    JOIN patients p ON t.patient_id = p.patient_id
+    LEFT JOIN doctors d ON t.doctor_id = d.id
+"""
+
+# (name, query(cursor, ctx)) - name is "<role>.<screen>"; ctx holds sample ids and dates
+QUERIES = [
+    ("shared.dashboard_stats", _dashboard),
+    ("shared.pending_treatment_full", _pending_full),
+    ("shared.pending_treatment_incremental", _pending_incremental),
+    ("shared.pending_vitals_full", _vitals_queue),
+    ("shared.search_name", _search("term")),
+    ("shared.search_typo", _search("typo")),
+    ("shared.patient_picker", _picker),
+
+    ("admin.patients_count", _run("SELECT COUNT(*) FROM patients")),
+    ("admin.patients_first_page", _run("SELECT * FROM patients LIMIT %s OFFSET %s", (PAGE_SIZE, 0))),
+    ("admin.patients_middle_page", _run("SELECT * FROM patients LIMIT %s OFFSET %s",
+                                        lambda ctx: (PAGE_SIZE, ctx["patients"] // 2))),
+    ("admin.patient_by_id", _run("SELECT * FROM patients WHERE patient_id = %s", lambda ctx: (ctx["patient_id"],))),
+    ("admin.patient_treatments", _run("""
+        SELECT t.treatment_id, t.symptoms, t.treatment, t.blood_pressure,
+               t.temperature, t.weight, t.date, d.firstname, d.lastname
+        FROM treatments t
+        LEFT JOIN doctors d ON t.doctor_id = d.id
+        WHERE t.patient_id = %s
+        ORDER BY t.date DESC
+    """, lambda ctx: (ctx["patient_id"],))),
+    ("admin.treatments_latest", _run(_TREATMENT_LIST + " ORDER BY t.date DESC LIMIT 100")),
+    ("admin.treatments_on_day", _dated(lambda ctx: date_ranges.on_day("t.date", ctx["today"]),
+                                       _TREATMENT_LIST + " WHERE {filter} ORDER BY t.date DESC")),
+    ("admin.department_stats", lambda cursor, ctx: list(department_stats(cursor))),
+    ("admin.report_month", lambda cursor, ctx: list(period_report(cursor, *date_ranges.in_month("date", *ctx["month"])[1]))),
+    ("admin.report_year", lambda cursor, ctx: list(period_report(
+        cursor, date(ctx["today"].year, 1, 1), date(ctx["today"].year + 1, 1, 1)))),
+    ("admin.rollup_rebuild_month", _rebuild_month),
+    ("admin.logs_first_page", _log_page()),
+    ("admin.logs_department_page", _log_page("Nurse")),
+    ("admin.logs_day_page", _log_page(day=True)),
+    ("admin.logs_count", _log_count()),
+    ("admin.logs_department_count", _log_count("Nurse")),
+    ("admin.users", _run("SELECT id, username, role, timestamp FROM users ORDER BY id")),
+    ("admin.doctors", _run("SELECT * FROM doctors ORDER BY id")),
+
+    ("doctor.lookup", _run("SELECT id, specialization FROM doctors WHERE firstname=%s", ("doctor1",))),
+    ("doctor.newest_patient", _run("SELECT patient_id, name FROM patients ORDER BY date_registered DESC LIMIT 1")),
+    ("doctor.patient_details", _run("SELECT name, date_of_birth, gender, blood_type FROM patients WHERE patient_id=%s",
+                                    lambda ctx: (ctx["patient_id"],))),
+    ("doctor.latest_vitals", _run("""
+        SELECT treatment_id, blood_pressure, temperature, weight, date, symptoms, treatment
+        FROM treatments WHERE patient_id=%s ORDER BY date DESC LIMIT 1
+    """, lambda ctx: (ctx["patient_id"],))),
+    ("doctor.medical_history", _run("""
+        SELECT date, blood_pressure, temperature, weight, symptoms, treatment, heart_rate
+        FROM treatments WHERE patient_id=%s ORDER BY date DESC LIMIT %s
+    """, lambda ctx: (ctx["patient_id"], PAGE_SIZE))),
+    ("doctor.todays_patients", _dated(lambda ctx: date_ranges.today("t.date"), """
+        SELECT DISTINCT t.patient_id, p.name, COUNT(t.treatment_id) as visits
+        FROM treatments t
+        JOIN patients p ON t.patient_id = p.patient_id
+        WHERE t.doctor_id = %s AND {filter}
+        GROUP BY t.patient_id, p.name
+        ORDER BY MAX(t.date) DESC
+    """, (1,))),
+    ("doctor.emergencies", _run("""
+        SELECT n.patient_id, p.name, n.notes, n.date, n.author
+        FROM patient_notes n
+        JOIN patients p ON n.patient_id = p.patient_id
+        WHERE n.emergency=1
+        ORDER BY n.date DESC
+    """)),
+    ("doctor.emergencies_today", _dated(lambda ctx: date_ranges.today("n.date"), """
+        SELECT n.patient_id, p.name, n.notes, n.date, n.author
+        FROM patient_notes n
+        JOIN patients p ON n.patient_id = p.patient_id
+        WHERE n.emergency=1 AND {filter}
+        ORDER BY n.date DESC
+    """)),
+    ("doctor.statistics_patients", _run("SELECT COUNT(DISTINCT patient_id) FROM treatments WHERE doctor_id=%s", (1,))),
+    ("doctor.statistics_treatments", _run("SELECT COUNT(*) FROM treatments WHERE doctor_id=%s", (1,))),
+
+    ("nurse.first_patient", _run("SELECT patient_id, name FROM patients ORDER BY name LIMIT 1")),
+    ("nurse.latest_treatment", _run("SELECT treatment_id FROM treatments WHERE patient_id = %s ORDER BY date DESC LIMIT 1",
+                                    lambda ctx: (ctx["patient_id"],))),
+    ("nurse.vitals_history", _run("""
+        SELECT blood_pressure, temperature, weight, notes, date
+        FROM treatments
+        WHERE patient_id = %s AND (blood_pressure IS NOT NULL OR temperature IS NOT NULL OR weight IS NOT NULL)
+        ORDER BY date DESC LIMIT %s
+    """, lambda ctx: (ctx["patient_id"], PAGE_SIZE + 1))),
+    ("nurse.emergency_list", _run("""
+        SELECT pn.notes, pn.date, p.name, p.patient_id, pn.author
+        FROM patient_notes pn
+        JOIN patients p ON pn.patient_id = p.patient_id
+        WHERE pn.emergency = TRUE
+        ORDER BY pn.date DESC
+        LIMIT 20
+    """)),
+
+    ("receptionist.recent_patients", lambda cursor, ctx: recent_patients(cursor)),
+    ("receptionist.patients_first_page", _run("""
+        SELECT patient_id, name, date_of_birth, gender, phone, date_registered
+        FROM patients ORDER BY date_registered DESC LIMIT %s
+    """, (PAGE_SIZE,))),
+    ("receptionist.registered_today", _dated(lambda ctx: date_ranges.on_day("date_registered", ctx["today"]),
+                                             "SELECT COUNT(*) FROM patients WHERE {filter}")),
+    ("receptionist.registered_this_week", _dated(lambda ctx: date_ranges.since_days("date_registered", 7, ctx["today"]),
+                                                 "SELECT COUNT(*) FROM patients WHERE {filter}")),
+]
+
+
+def time_queries(cursor, ctx, repeat):
+    results = {}
+    for name, query in QUERIES:
+        ctx.pop("pending_queue", None)
+        samples = []
+        try:
+            query(cursor, ctx)      # warm-up, and the full load for the incremental queue
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = query(cursor, ctx)
+                samples.append((time.perf_counter() - started) * 1000)
+        except Exception as err:
+            results[name] = {"error": str(err).splitlines()[0]}
+            print(f"  {name:40} error: {results[name]['error']}")
+            continue
+        samples.sort()
+        results[name] = {
+            "median_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 3),
+            "min_ms": round(samples[0], 3),
+            "rows": len(rows) if isinstance(rows, (list, tuple)) else 1,
+        }
+        print(f"  {name:40} median {results[name]['median_ms']:10.2f} ms  rows {results[name]['rows']}")
+    return results
+
+
+def make_context(cursor, patients):
+    # A patient with treatments, so the per-patient history queries return rows
+    cursor.execute("SELECT patient_id FROM treatments ORDER BY treatment_id LIMIT 1 OFFSET %s", (patients // 2,))
+    row = cursor.fetchone()
+    today = date.today()
+    return {
+        "patients": patients,
+        "patient_id": row[0] if row else 1,
+        "doctor_id": 1,
+        "today": today,
+        "month": (today.year, today.month),
+        "term": "banda",
+        "typo": "nyirnda",
+        "prefix": "chi",
+    }
+
+
+def bench_mysql(config, repeat):
+    return _bench(lambda: seed_data.load_mysql(DB_CONFIG["database"] + BENCH_DATABASE_SUFFIX, config),
+                  config, repeat)
+
+
+def bench_sqlite(config, repeat):
+    path = os.path.join(tempfile.gettempdir(), f"hospital_bench_{config.patients}.db")
+    try:
+        return _bench(lambda: seed_data.load_sqlite(path, config), config, repeat)
+    finally:
+        set_backend(None)
+        for leftover in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def _bench(load, config, repeat):
+    started = time.perf_counter()
+    counts = load()     # also points get_connection() at the freshly loaded database
+    load_seconds = time.perf_counter() - started
+    conn = get_connection()
+    cursor = conn.cursor(buffered=True)
+    try:
+        return load_seconds, counts, time_queries(cursor, make_context(cursor, config.patients), repeat)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(RESULTS_DIR), check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(old_path, new, threshold):
+    """Print queries slower than threshold x the earlier run; returns how many there were"""
+    with open(old_path) as f:
+        old = json.load(f)
+    regressions = 0
+    for scale, result in new["scales"].items():
+        before = old.get("scales", {}).get(scale, {}).get("queries", {})
+        for name, timing in result["queries"].items():
+            previous = before.get(name, {})
+            if "median_ms" not in timing or "median_ms" not in previous:
+                continue
+            ratio = timing["median_ms"] / max(previous["median_ms"], 0.001)
+            if ratio > threshold:
+                regressions += 1
+                print(f"REGRESSION {scale:>8} {name:40} {previous['median_ms']:.2f} -> {timing['median_ms']:.2f} ms "
+                      f"({ratio:.1f}x)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    seed_data.add_arguments(parser)
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default="mysql")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)), help="patient counts, comma separated")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="results file (default results/<commit>-<backend>.json)")
+    parser.add_argument("--compare", metavar="RESULTS", help="earlier results file to check against")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+    # Time the statements themselves, without the per-statement instrumentation
+    db_connection.INSTRUMENT_QUERIES = False
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    bench = bench_mysql if args.backend == "mysql" else bench_sqlite
+    for patients in (int(scale) for scale in args.scales.split(",")):
+        config = seed_data.config_from_args(args, patients)
+        print(f"Scale {patients:,} patients ({args.backend})")
+        load_seconds, counts, queries = bench(config, args.repeat)
+        report["scales"][str(patients)] = {
+            "config": config.as_dict(),
+            "load_seconds": round(load_seconds, 1),
+            "rows": counts,
+            "queries": queries,
+        }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}-{args.backend}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Results written to {output}")
+
+    if args.compare and compare(args.compare, report, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Reproducible synthetic hospital data for benchmarks and load testing.
+
+Generates patients, doctors, users, treatments (with vitals), patient notes
+(a share of them emergencies) and audit logs spread over the last few
+months, from a fixed seed so two runs produce the same rows (dated relative
+to the current day, so "today" screens have data). Loads them
+into a MySQL/MariaDB database (created next to the configured one, schema
+from the base tables plus the migrations) or into a SQLite file stand-in.
+
+    python benchmarks/seed_data.py --patients 100000 --mysql hospital_bench
+    python benchmarks/seed_data.py --patients 10000 --sqlite /tmp/hospital.db
+
+Existing data in the target is dropped first.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_backend import MySQLBackend, SQLiteBackend
+import db_connection
+from db_connection import DB_CONFIG, get_connection, set_backend
+from migrations import migrate
+from patient_search import backfill_trigrams
+from rollups import catch_up
+
+BATCH_SIZE = 5000
+
+FIRST_NAMES = [
+    "Chikondi", "Mphatso", "Thoko", "Kondwani", "Chisomo", "Tawonga", "Limbani", "Dalitso",
+    "Yamikani", "Madalitso", "Tiyamike", "Kumbukani", "Precious", "Grace", "James", "Mary",
+    "John", "Esther", "Blessings", "Innocent", "Patricia", "Joseph", "Agnes", "Peter",
+    "Chimwemwe", "Takondwa", "Wongani", "Lusungu", "Alinafe", "Tadala", "Mwayi", "Fatsani",
+]
+LAST_NAMES = [
+    "Banda", "Phiri", "Mwale", "Chirwa", "Nyirenda", "Kamanga", "Gondwe", "Mbewe", "Tembo",
+    "Zulu", "Kumwenda", "Msiska", "Chinyanja", "Mkandawire", "Chavula", "Kaunda", "Lungu",
+    "Ngwira", "Mhango", "Moyo", "Jere", "Nkhoma", "Kachale", "Chimwaza", "Kazembe",
+    "Kanzengo", "Mvula", "Saka", "Chilima", "Munthali", "Kalua", "Mtambo",
+]
+SPECIALIZATIONS = ["Surgeon", "Optician", "Psychian", "Neurologuist", "Medicine", "Hematologist"]
+BLOOD_TYPES = ["O", "AB", "O+", "B", "B+"]
+SYMPTOMS = ["fever", "cough", "headache", "abdominal pain", "fatigue", "rash", "dizziness", "chest pain"]
+TREATMENTS = ["paracetamol", "rest and fluids", "antibiotics", "antimalarials", "referred", "observation"]
+DEPARTMENTS = ["Admin", "Doctor", "Nurse", "Receptionist"]
+ACTIONS = ["Logged in", "Viewed patient list", "Registered patient", "Recorded vitals",
+           "Added treatment", "Viewed reports", "Logged out"]
+
+# Column order of the rows generate() yields for each table
+COLUMNS = {
+    "doctors": ("id", "firstname", "lastname", "national_id", "qualification", "specialization", "date_registered"),
+    "users": ("id", "username", "password", "timestamp", "role"),
+    "patients": ("patient_id", "name", "date_of_birth", "gender", "blood_type", "phone", "address", "date_registered"),
+    "treatments": ("patient_id", "doctor_id", "symptoms", "treatment", "blood_pressure", "temperature",
+                   "weight", "heart_rate", "notes", "date"),
+    "patient_notes": ("patient_id", "notes", "author", "date", "emergency"),
+    "logs": ("user", "department", "action", "log_date", "timestamp"),
+}
+
+# Tables the app expects before the migrations run (they add logs, patient_notes and the indexes);
+# the SQLite equivalents are db_backend.SQLITE_BASE_TABLES
+MYSQL_BASE_TABLES = [
+    """CREATE TABLE doctors (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        firstname VARCHAR(255) NOT NULL,
+        lastname VARCHAR(255) NOT NULL,
+        national_id VARCHAR(255) NOT NULL,
+        qualification VARCHAR(255) NOT NULL,
+        specialization ENUM('Surgeon','Optician','Psychian','Neurologuist','Medicine','Hematologist') DEFAULT NULL,
+        date_registered TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(50) NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        role VARCHAR(50) NOT NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE patients (
+        patient_id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        date_of_birth DATETIME NOT NULL,
+        gender VARCHAR(10) NOT NULL,
+        blood_type VARCHAR(3) DEFAULT NULL,
+        phone VARCHAR(20) DEFAULT NULL,
+        address VARCHAR(255) DEFAULT NULL,
+        date_registered TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE treatments (
+        treatment_id INT AUTO_INCREMENT PRIMARY KEY,
+        patient_id INT NOT NULL,
+        doctor_id INT DEFAULT NULL,
+        symptoms TEXT,
+        treatment TEXT,
+        blood_pressure VARCHAR(20) DEFAULT NULL,
+        temperature DECIMAL(4,1) DEFAULT NULL,
+        weight DECIMAL(5,1) DEFAULT NULL,
+        heart_rate INT DEFAULT NULL,
+        notes TEXT,
+        date TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP,
+        KEY patient_id (patient_id),
+        KEY doctor_id (doctor_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4""",
+]
+
+class Config:
+    """What to generate; every count is derived from these and the seed"""
+
+    def __init__(self, patients=10000, treatments_per_patient=3.0, notes_per_patient=0.5,
+                 emergency_rate=0.05, months=12, logs_per_day=500, doctors=40, seed=42):
+        self.patients = patients
+        self.treatments_per_patient = treatments_per_patient
+        self.notes_per_patient = notes_per_patient
+        self.emergency_rate = emergency_rate
+        self.months = months
+        self.logs_per_day = logs_per_day
+        self.doctors = doctors
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def generate(config, now=None):
+    """Yield (table, rows) batches in load order; patient and doctor ids start at 1"""
+    rng = random.Random(config.seed)
+    now = (now or datetime.now()).replace(microsecond=0)
+    span = timedelta(days=30 * config.months)
+    start = now - span
+
+    def moment_between(low, high):
+        return low + timedelta(seconds=rng.randint(0, max(0, int((high - low).total_seconds()))))
+
+    doctors = []
+    for doctor_id in range(1, config.doctors + 1):
+        doctors.append((doctor_id, f"doctor{doctor_id}", rng.choice(LAST_NAMES), f"NID{doctor_id:06d}",
+                        "MBBS", rng.choice(SPECIALIZATIONS), start))
+    yield "doctors", doctors
+
+    users = [(1, "admin", "1234", start, "Admin"), (2, "reception", "1234", start, "Receptionist"),
+             (3, "nurse", "1234", start, "Nurse")]
+    for doctor_id in range(1, config.doctors + 1):
+        users.append((len(users) + 1, f"doctor{doctor_id}", "1234", start, "Doctor"))
+    yield "users", users
+
+    # Registrations grow over the period, with a few landing today
+    registered = sorted(moment_between(start, now) for _ in range(config.patients))
+    batch = []
+    for patient_id, when in enumerate(registered, start=1):
+        birth = datetime(rng.randint(1940, 2023), rng.randint(1, 12), rng.randint(1, 28))
+        batch.append((patient_id, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", birth,
+                      rng.choice(("male", "female")), rng.choice(BLOOD_TYPES),
+                      f"09{rng.randint(10000000, 99999999)}", f"Area {rng.randint(1, 60)}, Lilongwe", when))
+        if len(batch) >= BATCH_SIZE:
+            yield "patients", batch
+            batch = []
+    if batch:
+        yield "patients", batch
+
+    batch = []
+    for patient_id, when in enumerate(registered, start=1):
+        # Poisson-ish visit counts around the configured mean
+        visits = int(rng.expovariate(1 / config.treatments_per_patient) + 0.5) if config.treatments_per_patient else 0
+        for _ in range(visits):
+            date = moment_between(when, now)
+            if rng.random() < 0.3:
+                # Nurse vitals without a doctor yet
+                batch.append((patient_id, None, None, None, f"{rng.randint(100, 150)}/{rng.randint(60, 95)}",
+                              round(rng.uniform(35.5, 40.0), 1), round(rng.uniform(3, 120), 1),
+                              rng.randint(55, 120), None, date))
+            else:
+                batch.append((patient_id, rng.randint(1, config.doctors), rng.choice(SYMPTOMS),
+                              rng.choice(TREATMENTS), f"{rng.randint(100, 150)}/{rng.randint(60, 95)}",
+                              round(rng.uniform(35.5, 40.0), 1), round(rng.uniform(3, 120), 1),
+                              rng.randint(55, 120), None, date))
+            if len(batch) >= BATCH_SIZE:
+                yield "treatments", batch
+                batch = []
+    if batch:
+        yield "treatments", batch
+
+    batch = []
+    for _ in range(int(config.patients * config.notes_per_patient)):
+        patient_id = rng.randint(1, config.patients)
+        batch.append((patient_id, rng.choice(SYMPTOMS) + " reported", "nurse",
+                      moment_between(registered[patient_id - 1], now), rng.random() < config.emergency_rate))
+        if len(batch) >= BATCH_SIZE:
+            yield "patient_notes", batch
+            batch = []
+    if batch:
+        yield "patient_notes", batch
+
+    batch = []
+    for _ in range(config.logs_per_day * span.days):
+        when = moment_between(start, now)
+        department = rng.choice(DEPARTMENTS)
+        batch.append((department.lower(), department, rng.choice(ACTIONS), when.date(), when))
+        if len(batch) >= BATCH_SIZE:
+            yield "logs", batch
+            batch = []
+    if batch:
+        yield "logs", batch
+
+
+def insert_sql(table):
+    columns = COLUMNS[table]
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+
+def load_mysql(database, config, verbose=True):
+    """(Re)create database next to the configured one, fill it and make it the
+    backend get_connection() uses; returns rows per table"""
+    import mysql.connector
+
+    server = {key: value for key, value in DB_CONFIG.items() if key != "database"}
+    conn = mysql.connector.connect(**server)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+        cursor.execute(f"CREATE DATABASE `{database}`")
+    finally:
+        cursor.close()
+        conn.close()
+
+    set_backend(MySQLBackend(dict(DB_CONFIG, database=database)))
+    conn = get_connection()
+    cursor = conn.cursor(buffered=True)
+    try:
+        for ddl in MYSQL_BASE_TABLES:
+            cursor.execute(ddl)
+        conn.commit()
+        migrate()
+        return _fill(conn, cursor, config, verbose)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def load_sqlite(path, config, verbose=True):
+    """(Re)create the SQLite file at path, fill it and make it the backend
+    get_connection() uses; returns rows per table"""
+    for leftover in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    set_backend(SQLiteBackend(path))
+    migrate()   # the base tables, then every migration, recorded in schema_version
+    conn = get_connection()
+    cursor = conn.cursor(buffered=True)
+    try:
+        cursor.execute("DELETE FROM users")     # the generated accounts replace the default admin
+        return _fill(conn, cursor, config, verbose)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _fill(conn, cursor, config, verbose):
+    # The schema is migrate()'s, so the app finds every migration applied;
+    # the trigrams and rollups of the generated rows are built here instead
+    counts = dict.fromkeys(COLUMNS, 0)
+    started = time.perf_counter()
+    for table, rows in generate(config):
+        cursor.executemany(insert_sql(table), rows)
+        counts[table] += len(rows)
+    backfill_trigrams(cursor)
+    catch_up(cursor, full=True)
+    conn.commit()
+    for table in COLUMNS:
+        cursor.execute(f"ANALYZE TABLE {table}")
+        cursor.fetchall()
+    if verbose:
+        summary = ", ".join(f"{count:,} {table}" for table, count in counts.items())
+        print(f"Loaded {summary} in {time.perf_counter() - started:.1f} s")
+    return counts
+
+
+def add_arguments(parser):
+    parser.add_argument("--patients", type=int, default=10000)
+    parser.add_argument("--treatments-per-patient", type=float, default=3.0)
+    parser.add_argument("--notes-per-patient", type=float, default=0.5)
+    parser.add_argument("--emergency-rate", type=float, default=0.05)
+    parser.add_argument("--months", type=int, default=12, help="history covered by registrations and logs")
+    parser.add_argument("--logs-per-day", type=int, default=500)
+    parser.add_argument("--doctors", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def config_from_args(args, patients=None):
+    return Config(patients=patients or args.patients, treatments_per_patient=args.treatments_per_patient,
+                  notes_per_patient=args.notes_per_patient, emergency_rate=args.emergency_rate,
+                  months=args.months, logs_per_day=args.logs_per_day, doctors=args.doctors, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--mysql", metavar="DATABASE", help="database to (re)create on the configured server")
+    target.add_argument("--sqlite", metavar="PATH", help="SQLite file to (re)create")
+    args = parser.parse_args()
+    db_connection.INSTRUMENT_QUERIES = False
+
+    config = config_from_args(args)
+    if args.mysql:
+        load_mysql(args.mysql, config)
+    else:
+        load_sqlite(args.sqlite, config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Log in and out of the application window many times and check that memory stays flat.
+
+    python benchmarks/session_soak.py [--cycles 1000] [--patients 500] [--max-growth-mb 8]
+
+A scratch SQLite database is filled by seed_data.py, then one HospitalApp
+(Login.py) is driven through `--cycles` logins, rotating through the admin,
+receptionist, nurse and doctor accounts. Each cycle types the credentials
+into the login page, logs in, waits for the role frame's first page to be
+drawn and logs out again (HospitalApp.end_session, what every frame's
+Logout button ends in). After the first `--warmup` cycles, which load the
+role modules and fill the process-wide caches, this is sampled:
+
+    rss       resident memory of the process
+    tcl       commands registered in the Tcl interpreter
+    widgets   widgets under the root window
+    objects   objects tracked by Python's garbage collector
+    in use    pooled database connections checked out
+
+Exits with status 1 when resident memory grew by more than --max-growth-mb
+after the warm-up, or when any of the counts ended above where they started.
+Needs a display (or Xvfb).
+"""
+import argparse
+import gc
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import seed_data
+from db_connection import pool_stats, set_backend
+from Login import HospitalApp
+
+ACCOUNTS = (("admin", "1234"), ("reception", "1234"), ("nurse", "1234"), ("doctor1", "1234"))
+SETTLE_TIMEOUT = 30
+
+
+def rss_bytes():
+    """Current resident set size; the peak where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def count_widgets(widget):
+    return sum(1 + count_widgets(child) for child in widget.winfo_children())
+
+
+def sample(app):
+    gc.collect()
+    return {
+        "rss": rss_bytes(),
+        "tcl": len(app.tk.splitlist(app.tk.call("info", "commands"))),
+        "widgets": count_widgets(app),
+        "objects": len(gc.get_objects()),
+        "in use": pool_stats()["in_use"],
+    }
+
+
+def settle(app, frame):
+    """Run the Tk loop until frame's background queries are drawn"""
+    deadline = time.perf_counter() + SETTLE_TIMEOUT
+    app.update()
+    while frame.tasks.busy() and time.perf_counter() < deadline:
+        time.sleep(0.002)
+        app.update()
+    app.update_idletasks()
+
+
+def cycle(app, username, password):
+    app.login.username_entry.insert(0, username)
+    app.login.password_entry.insert(0, password)
+    app.login.check_login()
+    frame = app.session
+    if frame is None:
+        raise RuntimeError(f"login as {username} failed: {app.login.status_label.cget('text')}")
+    settle(app, frame)
+    app.end_session()
+    app.update()
+
+
+def print_sample(label, values):
+    print(f"{label:>8} {values['rss'] / 2**20:10.1f} {values['tcl']:8} {values['widgets']:8} "
+          f"{values['objects']:10} {values['in use']:7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    seed_data.add_arguments(parser)
+    parser.add_argument("--cycles", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--every", type=int, default=100, help="cycles between samples")
+    parser.add_argument("--max-growth-mb", type=float, default=8.0)
+    parser.set_defaults(patients=500)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"hospital_soak_{args.patients}.db")
+    seed_data.load_sqlite(path, seed_data.config_from_args(args))
+    try:
+        app = HospitalApp()
+    except Exception as err:
+        print(f"Cannot open a Tk window ({err}); run with a display or under xvfb-run.")
+        sys.exit(1)
+
+    try:
+        app.update()
+        for i in range(args.warmup):
+            cycle(app, *ACCOUNTS[i % len(ACCOUNTS)])
+        print(f"{'cycle':>8} {'rss (MB)':>10} {'tcl':>8} {'widgets':>8} {'objects':>10} {'in use':>7}")
+        baseline = sample(app)
+        print_sample("warm", baseline)
+        started = time.perf_counter()
+        for i in range(1, args.cycles + 1):
+            cycle(app, *ACCOUNTS[i % len(ACCOUNTS)])
+            if i % args.every == 0 or i == args.cycles:
+                last = sample(app)
+                print_sample(str(i), last)
+        seconds = time.perf_counter() - started
+    finally:
+        app.destroy()
+        set_backend(None)
+        for leftover in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    growth = (last["rss"] - baseline["rss"]) / 2**20
+    print(f"{args.cycles} login/logout cycles in {seconds:.1f} s "
+          f"({seconds / args.cycles * 1000:.1f} ms each); resident memory grew {growth:+.1f} MB")
+    failures = []
+    if growth > args.max_growth_mb:
+        failures.append(f"resident memory grew {growth:.1f} MB (limit {args.max_growth_mb} MB)")
+    for key in ("tcl", "widgets", "in use"):
+        if last[key] > baseline[key]:
+            failures.append(f"{key} went from {baseline[key]} to {last[key]}")
+    # Allow for caches that hold a bounded number of entries
+    if last["objects"] > baseline["objects"] * 1.05:
+        failures.append(f"objects went from {baseline['objects']} to {last['objects']}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
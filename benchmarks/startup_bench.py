@@ -0,0 +1,83 @@
+"""Time from launching the application to the first paint of the login window.
+
+    python benchmarks/startup_bench.py [--runs 10]
+
+Each run starts a fresh interpreter that imports Login.py, builds the login
+window and paints it, the way `python Login.py` does before the schema check.
+Reported as medians over the runs, from the moment the process is launched:
+
+    imported  Login.py and everything it imports are loaded
+    built     HospitalApp() has created the window and the login page
+    painted   the window has been drawn (time to first paint)
+
+and the heavy modules (reportlab, the role frames) already loaded at
+that point, which should be none. Without a display only the import time is
+measured.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("reportlab", "admin", "doctor", "nurse", "receptionist", "dashboard", "reports")
+
+CHILD = f"""
+import json, sys, time
+import Login
+timings = {{"imported": time.time()}}
+try:
+    app = Login.HospitalApp()
+except Exception as err:
+    timings["error"] = str(err)
+else:
+    timings["built"] = time.time()
+    app.update()
+    timings["painted"] = time.time()
+    app.destroy()
+timings["heavy"] = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(json.dumps(timings))
+"""
+
+
+def run_once():
+    """Seconds from launch to each stage of one start, and the heavy modules loaded"""
+    launched = time.time()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    timings = json.loads(output.strip().splitlines()[-1])
+    stages = {stage: timings[stage] - launched for stage in ("imported", "built", "painted") if stage in timings}
+    return stages, timings["heavy"], timings.get("error")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    samples = {}
+    heavy = set()
+    error = None
+    run_once()  # warm the OS file cache and the asset cache
+    for _ in range(args.runs):
+        stages, loaded, error = run_once()
+        heavy.update(loaded)
+        for stage, seconds in stages.items():
+            samples.setdefault(stage, []).append(seconds)
+
+    for stage in ("imported", "built", "painted"):
+        if stage in samples:
+            values = sorted(samples[stage])
+            print(f"{stage:10} median {statistics.median(values) * 1000:8.1f} ms   "
+                  f"min {values[0] * 1000:8.1f} ms   max {values[-1] * 1000:8.1f} ms")
+    if error:
+        print(f"No window could be opened ({error}); only the imports were timed.")
+    print(f"Heavy modules loaded before the first paint: {', '.join(sorted(heavy)) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Time switching between two sidebar pages of each role frame, with and without the view cache.
+
+    python benchmarks/view_switch_bench.py [--switches 20] [--patients 2000]
+
+A scratch SQLite database is filled by seed_data.py, then each role frame
+is opened in a real Tk window and flipped between its dashboard and a second
+page `--switches` times: once with every page rebuilt on each visit (the
+view cache disabled) and once with the view cache. Two times are reported
+per page, as medians:
+
+    tk       time on the Tk thread to show the page, layout included
+             (what ViewCache records: "build" or "reuse")
+    settled  until the page's background queries have returned and been drawn
+
+Needs a display (or Xvfb).
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import customtkinter
+import seed_data
+from db_connection import get_connection, set_backend
+from admin import AdminFrame
+from doctor import DoctorFrame
+from nurse import NurseFrame
+from receptionist import ReceptionistFrame
+
+SETTLE_TIMEOUT = 30
+
+
+def _doctor_name():
+    conn = get_connection()
+    cursor = conn.cursor(buffered=True)
+    try:
+        cursor.execute("SELECT firstname FROM doctors ORDER BY id LIMIT 1")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# (role, frame class, username, two pages as (method, ViewCache name or None when not cached))
+def _roles():
+    return [
+        ("admin", AdminFrame, "admin", (("show_dashboard", "dashboard"), ("show_pending_patients", "pending"))),
+        ("doctor", DoctorFrame, _doctor_name(), (("show_welcome", "dashboard"), ("show_pending_patients", "pending"))),
+        ("nurse", NurseFrame, "nurse", (("show_welcome", "dashboard"), ("show_pending_patients", "pending"))),
+        ("receptionist", ReceptionistFrame, "reception", (("show_dashboard", "dashboard"), ("show_view_patients", None))),
+    ]
+
+
+def settle(root, frame):
+    """Run the Tk loop until frame's background queries are drawn"""
+    deadline = time.perf_counter() + SETTLE_TIMEOUT
+    root.update()
+    while frame.tasks.busy() and time.perf_counter() < deadline:
+        time.sleep(0.002)
+        root.update()
+    root.update_idletasks()
+
+
+def switch(root, frame, pages, switches):
+    """{page: [settled seconds, ...]} for switches visits alternating between pages"""
+    settled = {page: [] for page, _ in pages}
+    for i in range(switches):
+        page, _ = pages[i % 2]
+        started = time.perf_counter()
+        getattr(frame, page)()
+        settle(root, frame)
+        settled[page].append(time.perf_counter() - started)
+    return settled
+
+
+def bench_role(root, frame_class, username, pages, switches, cached):
+    frame = frame_class(root, username)
+    frame.pack(fill="both", expand=True)
+    settle(root, frame)
+    if not cached:
+        frame.views.invalidate()
+        frame.views.max_views = 0
+    frame.views.timings.clear()
+    try:
+        settled = switch(root, frame, pages, switches)
+        return settled, dict(frame.views.timings)
+    finally:
+        frame.tasks.cancel_all()
+        frame.destroy()
+        root.update()
+
+
+def _median_ms(samples):
+    return f"{statistics.median(samples) * 1000:8.1f}" if samples else "       -"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    seed_data.add_arguments(parser)
+    parser.add_argument("--switches", type=int, default=20)
+    parser.set_defaults(patients=2000)
+    args = parser.parse_args()
+
+    try:
+        root = customtkinter.CTk()
+    except Exception as err:
+        print(f"Cannot open a Tk window ({err}); run with a display or under xvfb-run.")
+        sys.exit(1)
+    root.geometry("1400x900")
+
+    path = os.path.join(tempfile.gettempdir(), f"hospital_views_{args.patients}.db")
+    try:
+        seed_data.load_sqlite(path, seed_data.config_from_args(args))
+        print(f"{'page':40} {'rebuild tk':>11} {'settled':>8} {'reuse tk':>11} {'settled':>8}  (ms, median)")
+        for role, frame_class, username, pages in _roles():
+            rebuilt, rebuilt_tk = bench_role(root, frame_class, username, pages, args.switches, cached=False)
+            reused, reused_tk = bench_role(root, frame_class, username, pages, args.switches, cached=True)
+            for page, view in pages:
+                # Pages the view cache does not keep have no tk timings
+                rebuild_tk = rebuilt_tk.get((view, "build"), [])
+                reuse_tk = reused_tk.get((view, "reuse"), [])
+                print(f"{role + '.' + page:40} {_median_ms(rebuild_tk):>11} {_median_ms(rebuilt[page]):>8} "
+                      f"{_median_ms(reuse_tk):>11} {_median_ms(reused[page]):>8}")
+    finally:
+        set_backend(None)
+        root.destroy()
+        for leftover in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+# scrypt cost: 2**14 x 8 x 128 bytes = 16 MiB and ~60 ms per check on a ward PC
+# (benchmarks/login_bench.py); raising it re-hashes each account at its next login
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+HASH_BYTES = 32
+HASH_SCHEME = "scrypt"
+
+SESSION_TTL = 15 * 60           # seconds a session stays cached without being used
+THROTTLE_FREE_ATTEMPTS = 3      # failed logins per username before attempts are slowed down
+THROTTLE_BASE_DELAY = 2.0       # seconds after the first throttled failure, doubling each time
+THROTTLE_MAX_DELAY = 300.0
+THROTTLE_WINDOW = 15 * 60       # failures older than this are forgotten
+THROTTLE_MAX_TRACKED = 1000     # usernames remembered at most
+
+
+class LoginThrottled(Exception):
+    """Too many failed logins for a username; seconds is how long until the next attempt"""
+
+    def __init__(self, seconds):
+        super().__init__(f"Too many failed attempts; try again in {max(1, round(seconds))} s")
+        self.seconds = seconds
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p, length):
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          dklen=length, maxmem=256 * n * r)
+
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """Salted scrypt hash of password, as stored in users.password:
+    scrypt$<n>$<r>$<p>$<salt>$<hash> with base64 salt and hash"""
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p, HASH_BYTES)
+    return f"{HASH_SCHEME}${n}${r}${p}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored):
+    return stored.startswith(HASH_SCHEME + "$")
+
+
+def verify_password(password, stored):
+    """(matches, needs_rehash) for password against a stored value. Values
+    that are not scrypt hashes are plaintext left from before hashing; they
+    still match, and need_rehash, like hashes made at an older cost."""
+    if not is_hashed(stored):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8")), True
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        salt, digest = base64.b64decode(salt), base64.b64decode(digest)
+    except ValueError:
+        return False, False
+    matches = hmac.compare_digest(_scrypt(password, salt, n, r, p, len(digest)), digest)
+    return matches, (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+_dummy_hash = None
+
+
+def _verify_unknown_user(password):
+    # As slow as checking a real account, so the time taken does not tell
+    # which usernames exist
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password("")
+    verify_password(password, _dummy_hash)
+
+
+class LoginThrottle:
+    """Failed logins per username, kept in this process. The first few
+    failures cost nothing; after that every attempt has to wait, twice as long
+    after each further failure. A successful login clears the count."""
+
+    def __init__(self, free_attempts=THROTTLE_FREE_ATTEMPTS, base_delay=THROTTLE_BASE_DELAY,
+                 max_delay=THROTTLE_MAX_DELAY, window=THROTTLE_WINDOW):
+        self.free_attempts = free_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.window = window
+        self._failures = {}     # username -> (failures, time of the last one)
+        self._lock = threading.Lock()
+
+    def wait_time(self, username):
+        """Seconds until username may try again; 0 when it may now"""
+        with self._lock:
+            entry = self._failures.get(username.lower())
+        if entry is None:
+            return 0.0
+        failures, last = entry
+        elapsed = time.monotonic() - last
+        if failures <= self.free_attempts or elapsed > self.window:
+            return 0.0
+        delay = min(self.base_delay * 2 ** (failures - self.free_attempts - 1), self.max_delay)
+        return max(0.0, delay - elapsed)
+
+    def failed(self, username):
+        now = time.monotonic()
+        with self._lock:
+            failures, last = self._failures.get(username.lower(), (0, now))
+            if now - last > self.window:
+                failures = 0
+            self._failures[username.lower()] = (failures + 1, now)
+            if len(self._failures) > THROTTLE_MAX_TRACKED:
+                self._failures = {
+                    name: entry for name, entry in self._failures.items() if now - entry[1] <= self.window
+                }
+
+    def succeeded(self, username):
+        with self._lock:
+            self._failures.pop(username.lower(), None)
+
+
+class Session:
+    """Who is logged in: the users row and, for a doctor, the doctors row (id, specialization)"""
+
+    def __init__(self, user_id, username, role, doctor=None):
+        self.user_id = user_id
+        self.username = username
+        self.role = role
+        self.doctor = doctor
+        self.last_used = time.monotonic()
+
+
+class SessionCache:
+    """Sessions started in this process, so the role frame reads the identity
+    established at login instead of querying it again. A session not used for
+    ttl seconds is dropped, as is every session on logout."""
+
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def start(self, session):
+        with self._lock:
+            self._sessions[session.username] = session
+        return session
+
+    def get(self, username):
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(username)
+            if session is None:
+                return None
+            if now - session.last_used > self.ttl:
+                del self._sessions[username]
+                return None
+            session.last_used = now
+            return session
+
+    def end(self, username=None):
+        """Forget username's session (every session when not given)"""
+        with self._lock:
+            if username is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(username, None)
+
+
+_throttle = None
+_sessions = None
+_singleton_lock = threading.Lock()
+
+
+def get_login_throttle():
+    global _throttle
+    if _throttle is None:
+        with _singleton_lock:
+            if _throttle is None:
+                _throttle = LoginThrottle()
+    return _throttle
+
+
+def get_sessions():
+    global _sessions
+    if _sessions is None:
+        with _singleton_lock:
+            if _sessions is None:
+                _sessions = SessionCache()
+    return _sessions
+
+
+def authenticate(cursor, username, password):
+    """Session of the user, or None for a wrong username or password; raises
+    LoginThrottled while the username has to wait. A password still stored in
+    plaintext (or at an old cost) is re-hashed on the spot - commit afterwards."""
+    throttle = get_login_throttle()
+    wait = throttle.wait_time(username)
+    if wait > 0:
+        raise LoginThrottled(wait)
+
+    cursor.execute("SELECT id, password, role FROM users WHERE username = %s", (username,))
+    row = cursor.fetchone()
+    if row is None:
+        _verify_unknown_user(password)
+        throttle.failed(username)
+        return None
+    user_id, stored, role = row
+    matches, needs_rehash = verify_password(password, stored)
+    if not matches:
+        throttle.failed(username)
+        return None
+    throttle.succeeded(username)
+    if needs_rehash:
+        cursor.execute("UPDATE users SET password = %s WHERE id = %s", (hash_password(password), user_id))
+
+    doctor = None
+    if role == "Doctor":
+        cursor.execute("SELECT id, specialization FROM doctors WHERE firstname = %s", (username,))
+        doctor = cursor.fetchone()
+    return get_sessions().start(Session(user_id, username, role, doctor))
+
+
+def hash_plaintext_passwords(cursor):
+    """Replace every password still stored in plaintext by its hash; returns how many"""
+    cursor.execute("SELECT id, password FROM users")
+    plaintext = [(user_id, stored) for user_id, stored in cursor.fetchall() if not is_hashed(stored)]
+    for user_id, stored in plaintext:
+        cursor.execute("UPDATE users SET password = %s WHERE id = %s", (hash_password(stored), user_id))
+    return len(plaintext)
@@ -1,8 +1,4 @@
 import customtkinter
-from doctor import DoctorFrame
-from nurse import NurseFrame
-from receptionist import ReceptionistFrame
-from admin import AdminFrame
 
 class Dashboard(customtkinter.CTk):
     def __init__(self, username, role):
@@ -14,12 +10,16 @@ class Dashboard(customtkinter.CTk):
 
         # Clear window and load the correct module
         if role == "Doctor":
+            from doctor import DoctorFrame
             self.module_frame = DoctorFrame(self, username)
         elif role == "Nurse":
+            from nurse import NurseFrame
             self.module_frame = NurseFrame(self, username)
         elif role == "Receptionist":
+            from receptionist import ReceptionistFrame
             self.module_frame = ReceptionistFrame(self, username)
         elif role == "Admin":
+            from admin import AdminFrame
             self.module_frame = AdminFrame(self, username)
         else:
             self.module_frame = customtkinter.CTkLabel(self, text="Unknown role")
@@ -0,0 +1,143 @@
+import threading
+import time
+import date_ranges
+
+STATS_TTL = 30          # seconds a counter may be served from the cache
+RECENT_PATIENTS = 15    # rows in the receptionist dashboard's recent registrations table
+
+COUNTERS = (
+    "total_patients", "registered_today", "pending_patients", "pending_vitals",
+    "treatments_today", "emergencies_today", "total_doctors", "total_users",
+    "doctor_patients_today",
+)
+
+# Counters each kind of write can change; invalidate() drops just these
+AFFECTED_BY = {
+    "patients": ("total_patients", "registered_today", "pending_patients", "pending_vitals"),
+    "treatments": ("pending_patients", "pending_vitals", "treatments_today", "doctor_patients_today"),
+    "patient_notes": ("emergencies_today",),
+    "doctors": ("total_doctors",),
+    "users": ("total_users",),
+}
+
+
+def _stats_query():
+    treated_today, _ = date_ranges.today("t.date")
+    dated_today, _ = date_ranges.today("date")
+    registered_today, _ = date_ranges.today("date_registered")
+    vitals = "(t.blood_pressure IS NOT NULL OR t.temperature IS NOT NULL OR t.weight IS NOT NULL)"
+    return f"""
+        SELECT
+            (SELECT COUNT(*) FROM patients) AS total_patients,
+            (SELECT COUNT(*) FROM patients WHERE {registered_today}) AS registered_today,
+            (SELECT COUNT(*) FROM patients p WHERE NOT EXISTS (
+                SELECT 1 FROM treatments t WHERE t.patient_id = p.patient_id AND {treated_today}
+            )) AS pending_patients,
+            (SELECT COUNT(*) FROM patients p WHERE NOT EXISTS (
+                SELECT 1 FROM treatments t WHERE t.patient_id = p.patient_id AND {treated_today} AND {vitals}
+            )) AS pending_vitals,
+            (SELECT COUNT(*) FROM treatments WHERE {dated_today}) AS treatments_today,
+            (SELECT COUNT(*) FROM patient_notes WHERE emergency = TRUE AND {dated_today}) AS emergencies_today,
+            (SELECT COUNT(*) FROM doctors) AS total_doctors,
+            (SELECT COUNT(*) FROM users) AS total_users,
+            (SELECT COUNT(DISTINCT patient_id) FROM treatments WHERE doctor_id = %s AND {dated_today})
+                AS doctor_patients_today
+    """
+
+
+class DashboardStats:
+    """Home-screen counters for every role, fetched in one query and shared across frames.
+
+    All counters come back from a single round trip and are cached for `ttl`
+    seconds. Writes made by this process call invalidate(table) so the
+    affected counters are refetched on the next read instead of going stale
+    until the TTL runs out. doctor_patients_today is cached per doctor.
+    """
+
+    def __init__(self, ttl=STATS_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = {}       # counter -> (value, fetched_at); keyed (counter, doctor_id) for per-doctor ones
+        self._generation = 0    # bumped by invalidate() so an in-flight fetch can't re-cache old numbers
+        self._query = _stats_query()
+
+    def cached(self, doctor_id=None):
+        """All counters if every one is fresh, else None; never touches the database"""
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for name in COUNTERS:
+                key = (name, doctor_id) if name == "doctor_patients_today" else name
+                entry = self._values.get(key)
+                if entry is None or now - entry[1] > self.ttl:
+                    return None
+                result[name] = entry[0]
+        return result
+
+    def fetch(self, cursor, doctor_id=None):
+        """Cached counters, or all of them refreshed in one query; runs on a worker thread"""
+        result = self.cached(doctor_id)
+        if result is not None:
+            return result
+        with self._lock:
+            generation = self._generation
+        cursor.execute(self._query, (doctor_id or 0,))
+        names = [column[0] for column in cursor.description]
+        result = {name: int(value or 0) for name, value in zip(names, cursor.fetchone())}
+        now = time.monotonic()
+        with self._lock:
+            if generation != self._generation:
+                return result
+            for name, value in result.items():
+                key = (name, doctor_id) if name == "doctor_patients_today" else name
+                self._values[key] = (value, now)
+        return result
+
+    def load(self, tasks, on_done, on_error=None, doctor_id=None, cancellable=True):
+        """Hand the counters to on_done; straight from the cache when fresh, else via tasks"""
+        result = self.cached(doctor_id)
+        if result is not None:
+            on_done(result)
+            return
+        tasks.run(lambda cursor: self.fetch(cursor, doctor_id), on_done, on_error, cancellable=cancellable)
+
+    def invalidate(self, table=None):
+        """Forget the counters a write to table affects (all counters when table is None)"""
+        with self._lock:
+            self._generation += 1
+            if table is None:
+                self._values.clear()
+                return
+            affected = AFFECTED_BY.get(table, ())
+            for key in list(self._values):
+                name = key[0] if isinstance(key, tuple) else key
+                if name in affected:
+                    del self._values[key]
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_dashboard_stats():
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = DashboardStats()
+    return _stats
+
+
+def invalidate_stats(table=None):
+    get_dashboard_stats().invalidate(table)
+
+
+def recent_patients(cursor, limit=RECENT_PATIENTS):
+    """The last limit patients registered, newest first, for the receptionist dashboard"""
+    cursor.execute("""
+        SELECT patient_id, name, date_of_birth, gender, phone, address, date_registered
+        FROM patients
+        ORDER BY date_registered DESC
+        LIMIT %s
+    """, (limit,))
+    return cursor.fetchall()
@@ -0,0 +1,50 @@
+from datetime import date, datetime, timedelta
+
+# Day/week/month filters as half-open ranges: column >= start AND column < end.
+# Unlike DATE(column) = ..., these let MySQL range-scan an index on the column.
+# Each helper returns (sql, params) ready to splice into a WHERE or ON clause.
+
+TODAY_SQL = "{column} >= CURDATE() AND {column} < CURDATE() + INTERVAL 1 DAY"
+
+
+def between(column, start, end):
+    """column in [start, end)"""
+    return f"{column} >= %s AND {column} < %s", (start, end)
+
+
+def today(column):
+    """Rows dated today by the database server's clock (no parameters)"""
+    return TODAY_SQL.format(column=column), ()
+
+
+def on_day(column, day):
+    """Rows falling on day (a date, datetime or 'YYYY-MM-DD' string)"""
+    start = _as_date(day)
+    return between(column, start, start + timedelta(days=1))
+
+
+def in_week(column, day=None):
+    """Rows in the Monday-to-Sunday week containing day (default today)"""
+    start = _as_date(day or date.today())
+    start -= timedelta(days=start.weekday())
+    return between(column, start, start + timedelta(days=7))
+
+
+def in_month(column, year, month):
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return between(column, start, end)
+
+
+def since_days(column, days, day=None):
+    """Rows from the start of the day `days` days before day (default today) onwards"""
+    start = _as_date(day or date.today()) - timedelta(days=days)
+    return f"{column} >= %s", (start,)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
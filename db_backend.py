@@ -0,0 +1,409 @@
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+SQLITE_BUSY_TIMEOUT = 10        # seconds a writer waits for another writer's lock
+SQLITE_BULK_BUSY_TIMEOUT = 600  # the same for parallel restore workers
+
+
+# Non-unique secondary index lines of SHOW CREATE TABLE; group 1 is the first column
+_MYSQL_KEY = re.compile(r"(?:KEY|INDEX|FULLTEXT KEY|SPATIAL KEY) `[^`]+` \(`([^`]+)`")
+
+
+class MySQLBackend:
+    """The hospital's MySQL/MariaDB server; SQL runs as written"""
+
+    name = "mysql"
+    row_estimates = True        # information_schema / EXPLAIN give cheap row counts
+
+    def __init__(self, config):
+        self.config = dict(config)
+
+    def connect(self):
+        import mysql.connector
+        return mysql.connector.connect(**self.config)
+
+    def describe(self):
+        return f"MySQL {self.config.get('database')} on {self.config.get('host')}"
+
+    def exists(self):
+        """Whether the database is there to connect to; the server reports a missing one on connect"""
+        return True
+
+    def table_exists(self, cursor, table):
+        cursor.execute("SHOW TABLES LIKE %s", (table,))
+        return cursor.fetchone() is not None
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute(
+            "SELECT COUNT(*) FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+            (table, name)
+        )
+        return cursor.fetchone()[0] > 0
+
+    def create_schema(self, conn):
+        """The MySQL base tables come from db/hospital-management.sql"""
+
+    def list_tables(self, cursor):
+        cursor.execute("SHOW FULL TABLES WHERE Table_type = 'BASE TABLE'")
+        return [row[0] for row in cursor.fetchall()]
+
+    def table_ddl(self, cursor, table):
+        """Statements that recreate table (SHOW CREATE TABLE includes the indexes)"""
+        cursor.execute(f"SHOW CREATE TABLE `{table}`")
+        return [cursor.fetchone()[1]]
+
+    def estimate_rows(self, cursor, table):
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,)
+        )
+        row = cursor.fetchone()
+        return int(row[0] or 0) if row else 0
+
+    def begin_snapshot(self, cursor):
+        """Start a read-only transaction that sees one point in time (InnoDB MVCC)"""
+        cursor.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+
+    def foreign_keys(self, cursor, enabled):
+        cursor.execute(f"SET FOREIGN_KEY_CHECKS = {1 if enabled else 0}")
+
+    def lock_writes(self, cursor):
+        """Hold off every writer while parallel dump workers open their snapshots"""
+        cursor.execute("FLUSH TABLES WITH READ LOCK")
+
+    def unlock_writes(self, cursor):
+        cursor.execute("UNLOCK TABLES")
+
+    def bulk_load_session(self, cursor):
+        """Session settings for a restore worker: no per-row FK or unique checks"""
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        cursor.execute("SET UNIQUE_CHECKS = 0")
+
+    def split_indexes(self, table, ddl):
+        """(statements creating the bare table, statements adding its secondary
+        indexes afterwards). Indexes a foreign key relies on stay in the table."""
+        lines = ddl[0].split("\n")
+        fk_columns = set(re.findall(r"FOREIGN KEY \(`([^`]+)`", ddl[0]))
+        keep, indexes = [], []
+        for line in lines:
+            definition = line.strip().rstrip(",")
+            match = _MYSQL_KEY.match(definition)
+            if match and match.group(1) not in fk_columns:
+                indexes.append(definition)
+            else:
+                keep.append(line)
+        if not indexes:
+            return ddl, []
+        # The last definition before ") ENGINE=..." must lose its comma
+        closing = max(i for i, line in enumerate(keep) if line.startswith(")"))
+        keep[closing - 1] = keep[closing - 1].rstrip(",")
+        alter = f"ALTER TABLE `{table}` " + ", ".join(f"ADD {index}" for index in indexes)
+        return ["\n".join(keep)] + ddl[1:], [alter]
+
+
+# Base tables for a standalone SQLite database; logs, patient_notes and the
+# indexes are added by the migrations, as on MySQL
+SQLITE_BASE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS doctors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        firstname VARCHAR(255) NOT NULL,
+        lastname VARCHAR(255) NOT NULL,
+        national_id VARCHAR(255) NOT NULL,
+        qualification VARCHAR(255) NOT NULL,
+        specialization VARCHAR(50) DEFAULT NULL,
+        date_registered TIMESTAMP NOT NULL DEFAULT (DATETIME('now', 'localtime'))
+    )""",
+    """CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username VARCHAR(50) NOT NULL,
+        password VARCHAR(255) NOT NULL,
+        timestamp TIMESTAMP NOT NULL DEFAULT (DATETIME('now', 'localtime')),
+        role VARCHAR(50) NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS patients (
+        patient_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name VARCHAR(100) NOT NULL,
+        date_of_birth DATETIME NOT NULL,
+        gender VARCHAR(10) NOT NULL,
+        blood_type VARCHAR(3) DEFAULT NULL,
+        phone VARCHAR(20) DEFAULT NULL,
+        address VARCHAR(255) DEFAULT NULL,
+        date_registered TIMESTAMP NOT NULL DEFAULT (DATETIME('now', 'localtime'))
+    )""",
+    # MySQL's ON UPDATE CURRENT_TIMESTAMP, which the incremental refreshes rely on
+    """CREATE TRIGGER IF NOT EXISTS patients_touch AFTER UPDATE ON patients
+       WHEN NEW.date_registered = OLD.date_registered
+       BEGIN
+           UPDATE patients SET date_registered = DATETIME('now', 'localtime')
+           WHERE patient_id = NEW.patient_id;
+       END""",
+    """CREATE TABLE IF NOT EXISTS treatments (
+        treatment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        patient_id INTEGER NOT NULL,
+        doctor_id INTEGER DEFAULT NULL,
+        symptoms TEXT,
+        treatment TEXT,
+        blood_pressure VARCHAR(20) DEFAULT NULL,
+        temperature DECIMAL(4,1) DEFAULT NULL,
+        weight DECIMAL(5,1) DEFAULT NULL,
+        heart_rate INTEGER DEFAULT NULL,
+        notes TEXT,
+        date TIMESTAMP DEFAULT (DATETIME('now', 'localtime'))
+    )""",
+    "CREATE INDEX IF NOT EXISTS patient_id ON treatments (patient_id)",
+    "CREATE INDEX IF NOT EXISTS doctor_id ON treatments (doctor_id)",
+    """INSERT INTO users (username, password, role)
+       SELECT 'admin', '1234', 'Admin' WHERE NOT EXISTS (SELECT 1 FROM users)""",
+]
+
+_LOCAL_NOW = "DATETIME('now', 'localtime')"
+
+# (pattern, replacement) applied in order by translate_sqlite()
+_SQLITE_RULES = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"CURDATE\(\)\s*\+\s*INTERVAL\s+(\d+)\s+DAY", re.I), r"DATE('now', 'localtime', '+\1 day')"),
+    (re.compile(r"CURDATE\(\)", re.I), "DATE('now', 'localtime')"),
+    (re.compile(r"NOW\(\)", re.I), _LOCAL_NOW),
+    (re.compile(r"\s+ON UPDATE CURRENT_TIMESTAMP(\(\))?", re.I), ""),
+    (re.compile(r"DEFAULT CURRENT_TIMESTAMP(\(\))?", re.I), f"DEFAULT ({_LOCAL_NOW})"),
+    (re.compile(r"\bCURRENT_TIMESTAMP(\(\))?", re.I), _LOCAL_NOW),
+    (re.compile(r"LAST_INSERT_ID\(\)", re.I), "last_insert_rowid()"),
+    (re.compile(r"^\s*SHOW TABLES LIKE\s+('[^']*'|\?)", re.I),
+     r"SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE \1"),
+    (re.compile(r"^\s*ANALYZE TABLE\s+", re.I), "ANALYZE "),
+    (re.compile(r"\bINSERT IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bINT(EGER)?\s+AUTO_INCREMENT\s+PRIMARY KEY", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\s*\bENGINE\s*=\s*\w+", re.I), ""),
+    (re.compile(r"\s*\bDEFAULT CHARSET\s*=\s*\w+", re.I), ""),
+    (re.compile(r"\s*\bCHARACTER SET\s+\w+", re.I), ""),
+    (re.compile(r"\s*\bCOLLATE\s*=?\s*utf8\w*", re.I), ""),
+]
+
+
+@lru_cache(maxsize=1024)
+def translate_sqlite(sql):
+    """The app's MySQL SQL in SQLite's dialect: ? placeholders, local-time CURDATE()/NOW(),
+    last_insert_rowid(), SHOW TABLES, INSERT IGNORE and the MySQL-only DDL options"""
+    for pattern, replacement in _SQLITE_RULES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def _sqlite_param(value):
+    # Stored as MySQL prints them, so text comparisons order like the dates they are
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _mysql_value(value):
+    # DATETIME/DATE text back to the datetime/date objects mysql.connector returns
+    if isinstance(value, str) and len(value) in (10, 19) and value[4:5] == "-" and value[7:8] == "-":
+        try:
+            if len(value) == 10:
+                return date.fromisoformat(value)
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    return value
+
+
+class SQLiteCursor:
+    """sqlite3 cursor with mysql.connector's calling conventions"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    def execute(self, operation, params=None):
+        self._raw.execute(translate_sqlite(operation), tuple(_sqlite_param(value) for value in params or ()))
+
+    def executemany(self, operation, seq_params):
+        self._raw.executemany(
+            translate_sqlite(operation),
+            (tuple(_sqlite_param(value) for value in params) for params in seq_params)
+        )
+
+    def fetchone(self):
+        row = self._raw.fetchone()
+        return None if row is None else tuple(_mysql_value(value) for value in row)
+
+    def fetchmany(self, size=1):
+        return [tuple(_mysql_value(value) for value in row) for row in self._raw.fetchmany(size)]
+
+    def fetchall(self):
+        return [tuple(_mysql_value(value) for value in row) for row in self._raw.fetchall()]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        self._raw.close()
+
+
+class SQLiteConnection:
+    """sqlite3 connection with the parts of mysql.connector's interface the app uses"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._open = True
+
+    def cursor(self, buffered=None, **kwargs):
+        # sqlite3 cursors hold their rows locally already; buffered is a no-op
+        return SQLiteCursor(self._raw.cursor())
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def is_connected(self):
+        return self._open
+
+    def ping(self, reconnect=False, **kwargs):
+        self._raw.execute("SELECT 1")
+
+    def close(self):
+        self._open = False
+        self._raw.close()
+
+
+class SQLiteBackend:
+    """A single-file database for standalone clinics and benchmark/test runs.
+
+    WAL journaling lets the worker threads read while one of them writes;
+    writers queue on the file lock for up to SQLITE_BUSY_TIMEOUT seconds.
+    """
+
+    name = "sqlite"
+    row_estimates = False       # no optimizer statistics to read; count instead
+
+    def __init__(self, path):
+        self.path = path
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def connect(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        raw = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        raw.execute("PRAGMA foreign_keys=ON")
+        raw.create_function("DATABASE", 0, lambda: "main")
+        raw.create_function("GET_LOCK", 2, self._get_lock)
+        raw.create_function("RELEASE_LOCK", 1, self._release_lock)
+        return SQLiteConnection(raw)
+
+    def describe(self):
+        return f"SQLite {os.path.abspath(self.path)}"
+
+    def exists(self):
+        """Whether the database file is there; connecting would create it"""
+        return os.path.exists(self.path)
+
+    def table_exists(self, cursor, table):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        return cursor.fetchone() is not None
+
+    def index_exists(self, cursor, table, name):
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+            (table, name)
+        )
+        return cursor.fetchone()[0] > 0
+
+    def create_schema(self, conn):
+        """Create the base tables (and a first admin account) in an empty database"""
+        cursor = conn.cursor()
+        try:
+            for ddl in SQLITE_BASE_TABLES:
+                cursor.execute(ddl)
+            conn.commit()
+        finally:
+            cursor.close()
+
+    def list_tables(self, cursor):
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def table_ddl(self, cursor, table):
+        """CREATE TABLE followed by the table's indexes and triggers"""
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = %s AND sql IS NOT NULL "
+            "ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END, name",
+            (table,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    def estimate_rows(self, cursor, table):
+        cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+        return cursor.fetchone()[0]
+
+    def begin_snapshot(self, cursor):
+        """Start a read transaction; under WAL it keeps seeing the database as of its first read,
+        which is made here"""
+        cursor.execute("BEGIN")
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master")
+        cursor.fetchone()
+
+    def foreign_keys(self, cursor, enabled):
+        # Only takes effect outside a transaction
+        cursor.execute(f"PRAGMA foreign_keys = {'ON' if enabled else 'OFF'}")
+
+    def lock_writes(self, cursor):
+        """Take the write lock so parallel dump workers all open their snapshots at the same point"""
+        cursor.execute("BEGIN IMMEDIATE")
+
+    def unlock_writes(self, cursor):
+        cursor.execute("ROLLBACK")
+
+    def bulk_load_session(self, cursor):
+        """Restore workers take turns at the single write lock; let them wait for it"""
+        cursor.execute("PRAGMA foreign_keys = OFF")
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BULK_BUSY_TIMEOUT * 1000}")
+
+    def split_indexes(self, table, ddl):
+        """(CREATE TABLE, the indexes and triggers to add once the rows are in)"""
+        create = [statement for statement in ddl if statement.lstrip().upper().startswith("CREATE TABLE")]
+        return create, [statement for statement in ddl if statement not in create]
+
+    # GET_LOCK/RELEASE_LOCK stand-ins so migrate() runs unchanged; within one
+    # process these are enough, and SQLite serialises writers across processes
+    def _get_lock(self, name, timeout):
+        with self._locks_guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        return 1 if lock.acquire(timeout=max(0, timeout)) else 0
+
+    def _release_lock(self, name):
+        lock = self._locks.get(name)
+        if lock is None or not lock.locked():
+            return 0
+        lock.release()
+        return 1
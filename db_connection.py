@@ -1,19 +1,304 @@
-import mysql.connector
+import atexit
+import os
+import threading
+import time
+from audit_writer import AuditLogWriter
+from db_backend import MySQLBackend, SQLiteBackend
+from query_stats import InstrumentedCursor, get_query_stats
+from rollups import record_log_activity
+
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "database": "hospital-management"
+}
+
+# "mysql" (the hospital server above) or "sqlite" for a clinic running standalone
+DB_BACKEND = os.environ.get("HOSPITAL_DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get(
+    "HOSPITAL_DB_PATH", os.path.join(os.path.expanduser("~"), ".hospital-management", "hospital.db")
+)
+
+# Connection pool settings - tune POOL_SIZE with the numbers from pool_stats()
+POOL_SIZE = 10
+POOL_CHECKOUT_TIMEOUT = 10      # seconds to wait for a free connection
+POOL_MAX_IDLE = 300             # close connections idle longer than this
+POOL_MAX_LIFETIME = 3600        # recycle connections older than this
+POOL_HEALTH_CHECK_AFTER = 30    # ping connections idle longer than this on checkout
+
+# Per-statement timing (query_stats); the admin "Query Performance" page shows it
+INSTRUMENT_QUERIES = True
+
+# Audit log writer settings
+AUDIT_SPOOL_PATH = os.path.join(os.path.expanduser("~"), ".hospital-management", "audit_spool.jsonl")
+AUDIT_BATCH_SIZE = 50
+AUDIT_FLUSH_INTERVAL = 2.0      # seconds between flushes when the batch is not full
+AUDIT_MAX_QUEUE = 1000
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class PooledConnection:
+    """Borrowed connection; close() hands it back to the pool instead of disconnecting"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        raw = self._raw.cursor(*args, **kwargs)
+        if INSTRUMENT_QUERIES:
+            return InstrumentedCursor(raw, get_query_stats())
+        return raw
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._pool.release(self._raw)
+
+    def __del__(self):
+        # Safety net for frames torn down without logout(): don't leak the slot
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, factory, size=POOL_SIZE, checkout_timeout=POOL_CHECKOUT_TIMEOUT,
+                 max_idle=POOL_MAX_IDLE, max_lifetime=POOL_MAX_LIFETIME,
+                 health_check_after=POOL_HEALTH_CHECK_AFTER):
+        self.factory = factory
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+
+        self._lock = threading.Condition()
+        self._idle = []          # [(raw, created_at, last_used)], most recently used last
+        self._created = {}       # id(raw) -> created_at for every open connection
+        self._connecting = 0     # slots reserved by callers still opening a connection
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "closed": 0,
+            "failed_health_checks": 0
+        }
+
+    def acquire(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        waited_since = None
+        with self._lock:
+            while True:
+                self._evict_idle()
+                if self._idle:
+                    raw, created_at, last_used = self._idle.pop()
+                    if self._is_healthy(raw, last_used):
+                        break
+                    self._stats["failed_health_checks"] += 1
+                    self._discard(raw)
+                    continue
+                if len(self._created) + self._connecting < self.size:
+                    # Reserve the slot, then connect outside the lock
+                    raw = None
+                    self._connecting += 1
+                    break
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._stats["wait_time"] += time.monotonic() - waited_since
+                    raise PoolExhausted(
+                        f"No database connection free after {self.checkout_timeout}s "
+                        f"(pool size {self.size})"
+                    )
+                self._lock.wait(remaining)
+
+            if waited_since is not None:
+                self._stats["wait_time"] += time.monotonic() - waited_since
+            self._stats["checkouts"] += 1
+
+        if raw is None:
+            raw = self._open()
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        try:
+            # Never hand the next borrower a half-finished transaction
+            raw.rollback()
+            reusable = raw.is_connected()
+        except Exception:
+            reusable = False
+
+        with self._lock:
+            created_at = self._created.get(id(raw))
+            if (not reusable or created_at is None
+                    or time.monotonic() - created_at > self.max_lifetime):
+                self._discard(raw)
+            else:
+                self._idle.append((raw, created_at, time.monotonic()))
+            self._lock.notify()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["open"] = len(self._created) + self._connecting
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = stats["open"] - len(self._idle)
+            stats["avg_wait"] = stats["wait_time"] / stats["waits"] if stats["waits"] else 0.0
+            return stats
+
+    def close_all(self):
+        with self._lock:
+            while self._idle:
+                raw, _, _ = self._idle.pop()
+                self._discard(raw)
+
+    def _open(self):
+        try:
+            raw = self.factory()
+        except Exception:
+            with self._lock:
+                self._connecting -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            self._connecting -= 1
+            self._created[id(raw)] = time.monotonic()
+            self._stats["created"] += 1
+        return raw
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        keep = []
+        for raw, created_at, last_used in self._idle:
+            if now - last_used > self.max_idle or now - created_at > self.max_lifetime:
+                self._discard(raw)
+            else:
+                keep.append((raw, created_at, last_used))
+        self._idle = keep
+
+    def _is_healthy(self, raw, last_used):
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, raw):
+        self._created.pop(id(raw), None)
+        self._stats["closed"] += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if DB_BACKEND == "sqlite":
+                    _backend = SQLiteBackend(SQLITE_PATH)
+                else:
+                    _backend = MySQLBackend(DB_CONFIG)
+    return _backend
+
+
+def set_backend(backend):
+    """Switch every later get_connection() to backend (benchmarks, tools); idle
+    connections to the old one are closed"""
+    global _backend, _pool
+    with _backend_lock:
+        _backend = backend
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = None
+
+
+def _connect():
+    return get_backend().connect()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_connect)
+    return _pool
+
 
 def get_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="",
-        database="hospital-management"
-    )
+    return get_pool().acquire()
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+_audit_writer = None
+_audit_lock = threading.Lock()
+
+
+def get_audit_writer():
+    global _audit_writer
+    if _audit_writer is None:
+        with _audit_lock:
+            if _audit_writer is None:
+                writer = AuditLogWriter(
+                    get_connection,
+                    AUDIT_SPOOL_PATH,
+                    batch_size=AUDIT_BATCH_SIZE,
+                    flush_interval=AUDIT_FLUSH_INTERVAL,
+                    max_queue=AUDIT_MAX_QUEUE,
+                    after_insert=record_log_activity
+                )
+                writer.start()
+                atexit.register(writer.close)
+                _audit_writer = writer
+    return _audit_writer
+
 
 def log_action(user, department, action):
-    conn = get_connection()
-    cursor = conn.cursor(buffered=True)
-    cursor.execute(
-        "INSERT INTO logs (user, department, action) VALUES (%s, %s, %s)",
-        (user, department, action)
-    )
-    conn.commit()
-    conn.close()
\ No newline at end of file
+    # Queued and written in batches by the background writer - no DB round trip here
+    get_audit_writer().log(user, department, action)
+
+
+def flush_audit_log(timeout=5.0):
+    """Push queued audit entries to the database (called on logout / window close)"""
+    if _audit_writer is None:
+        return True
+    return _audit_writer.flush(timeout)
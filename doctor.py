@@ -1,14 +1,23 @@
 import customtkinter
 from tkinter import messagebox, ttk
-from db_connection import get_connection, log_action
+from db_connection import log_action, flush_audit_log
+from credentials import get_sessions
+from query_executor import FrameTasks, show_loading, take_placeholder
+from view_cache import ViewCache
+from virtual_table import VirtualTable, query_pages, PAGE_SIZE
+import date_ranges
+from dashboard_stats import get_dashboard_stats, invalidate_stats
+from pending_queue import get_pending_queue
+from patient_picker import PatientPicker
+from patient_search import find_patients
+from rollups import record_treatment, record_treatment_moved
 import datetime
 
 class DoctorFrame(customtkinter.CTkFrame):
     def __init__(self, master, username):
         super().__init__(master)
         self.username = username
-        self.conn = get_connection()
-        self.cursor = self.conn.cursor(buffered=True)
+        self.tasks = FrameTasks(self)
         self.on_logout = None
         
         # Professional color scheme
@@ -39,6 +48,7 @@ class DoctorFrame(customtkinter.CTkFrame):
         # Create main content area
         self.content = customtkinter.CTkScrollableFrame(self, fg_color=self.colors['light_gray'])
         self.content.grid(row=1, column=1, sticky="nsew", padx=10, pady=10)
+        self.views = ViewCache(self.content)
         
         # Create footer
         self.create_footer()
@@ -183,24 +193,35 @@ class DoctorFrame(customtkinter.CTkFrame):
 
     def clear_content(self):
         """Clear main content area"""
-        for widget in self.content.winfo_children():
-            widget.destroy()
+        self.tasks.cancel_all()
+        self.views.clear()
 
     def check_and_register_doctor(self):
         """Check if doctor exists in database"""
-        try:
-            self.cursor.execute("SELECT id, specialization FROM doctors WHERE firstname=%s", (self.username,))
-            doctor_row = self.cursor.fetchone()
+        def load(cursor):
+            cursor.execute("SELECT id, specialization FROM doctors WHERE firstname=%s", (self.username,))
+            return cursor.fetchone()
+
+        def checked(doctor_row):
             if not doctor_row:
                 self.show_register_doctor()
             else:
                 self.doctor_id = doctor_row[0]
                 self.doctor_specialization = doctor_row[1]
                 self.show_welcome()
-        except Exception as e:
+
+        # The doctor's profile was looked up at login
+        session = get_sessions().get(self.username)
+        if session is not None and session.doctor:
+            checked(session.doctor)
+            return
+
+        def on_error(e):
             messagebox.showerror("Database Error", f"Error checking doctor: {str(e)}")
             self.show_register_doctor()
 
+        self.tasks.run(load, checked, on_error)
+
     def show_register_doctor(self):
         """Enhanced doctor registration"""
         self.clear_content()
@@ -294,29 +315,33 @@ class DoctorFrame(customtkinter.CTkFrame):
                 messagebox.showerror("Error", "All fields are required.")
                 return
             
-            try:
-                self.cursor.execute(
+            def save(cursor):
+                cursor.execute(
                     """INSERT INTO doctors (firstname, lastname, national_id, qualification, specialization) 
                        VALUES (%s, %s, %s, %s, %s)""",
                     (fname, lname, natid, qual, spec)
                 )
-                self.conn.commit()
-                
+                return cursor.lastrowid
+
+            def saved(doctor_id):
+                invalidate_stats("doctors")
                 messagebox.showinfo("Success", f"Welcome Dr. {fname}! Your profile has been registered successfully.")
                 
                 self.username = fname
                 log_action(self.username, "Doctor", "Registered new doctor profile")
                 
-                # After registering a doctor
-                self.cursor.execute("SELECT id FROM doctors WHERE firstname=%s AND lastname=%s", (fname, lname))
-                row = self.cursor.fetchone()
-                if row:
-                    self.doctor_id = row[0]
+                if doctor_id:
+                    self.doctor_id = doctor_id
                 
                 self.check_and_register_doctor()
-                
-            except Exception as err:
-                messagebox.showerror("Database Error", f"Registration failed: {str(err)}")
+
+            register_btn.configure(state="disabled")
+            self.tasks.run(
+                save, saved,
+                lambda err: (register_btn.configure(state="normal"),
+                             messagebox.showerror("Database Error", f"Registration failed: {str(err)}")),
+                cancellable=False
+            )
         
         # Register button
         register_btn = customtkinter.CTkButton(
@@ -333,10 +358,14 @@ class DoctorFrame(customtkinter.CTkFrame):
 
     def show_welcome(self):
         """Enhanced dashboard with medical statistics"""
-        self.clear_content()
+        self.tasks.cancel_all()
+        self.views.show("dashboard", self._build_welcome)
+
+    def _build_welcome(self, parent):
+        """Lay out the dashboard; returns the refresh that reloads its counts"""
         
         # Welcome header
-        welcome_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        welcome_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
         welcome_frame.pack(fill="x", padx=20, pady=20)
         
         customtkinter.CTkLabel(
@@ -355,55 +384,30 @@ class DoctorFrame(customtkinter.CTkFrame):
             ).pack(anchor="w", pady=(5, 0))
         
         # Statistics cards
-        stats_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        stats_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
         stats_frame.pack(fill="x", padx=20, pady=20)
         
-        try:
-            # Get statistics
-            self.cursor.execute("SELECT COUNT(*) FROM patients")
-            total_patients = self.cursor.fetchone()[0]
-            
-            # Get pending patients count
-            self.cursor.execute("""
-                SELECT COUNT(DISTINCT p.patient_id) 
-                FROM patients p 
-                LEFT JOIN treatments t ON p.patient_id = t.patient_id AND DATE(t.date) = CURDATE()
-                WHERE t.patient_id IS NULL
-            """)
-            pending_patients = self.cursor.fetchone()[0]
-            
-            self.cursor.execute(
-                "SELECT COUNT(DISTINCT patient_id) FROM treatments WHERE doctor_id=%s AND DATE(date) = CURDATE()",
-                (getattr(self, 'doctor_id', 0),)
-            )
-            today_patients = self.cursor.fetchone()[0]
-            
-            self.cursor.execute(
-                "SELECT COUNT(*) FROM patient_notes WHERE emergency = TRUE AND DATE(date) = CURDATE()"
-            )
-            emergencies = self.cursor.fetchone()[0]
-            
-        except:
-            total_patients = pending_patients = today_patients = emergencies = 0
-        
-        # Create stat cards
+        # Create stat cards - counts arrive from a background query
         stats = [
-            ("Total Patients", total_patients, self.colors['info']),
-            ("Pending Patients", pending_patients, self.colors['warning']),
-            ("Today's Treated", today_patients, self.colors['success']),
-            ("Emergency Cases", emergencies, self.colors['danger'])
+            ("Total Patients", self.colors['info']),
+            ("Pending Patients", self.colors['warning']),
+            ("Today's Treated", self.colors['success']),
+            ("Emergency Cases", self.colors['danger'])
         ]
         
-        for i, (title, value, color) in enumerate(stats):
+        value_labels = []
+        for i, (title, color) in enumerate(stats):
             card = customtkinter.CTkFrame(stats_frame, fg_color=color, width=180, height=120)
             card.grid(row=0, column=i, padx=10, pady=10, sticky="ew")
             
-            customtkinter.CTkLabel(
+            value_label = customtkinter.CTkLabel(
                 card,
-                text=str(value),
+                text="...",
                 font=("Arial", 28, "bold"),
                 text_color="white"
-            ).pack(pady=(20, 5))
+            )
+            value_label.pack(pady=(20, 5))
+            value_labels.append(value_label)
             
             customtkinter.CTkLabel(
                 card,
@@ -411,9 +415,22 @@ class DoctorFrame(customtkinter.CTkFrame):
                 font=("Arial", 12),
                 text_color="white"
             ).pack()
+
+        def show_stats(stats):
+            values = [stats["total_patients"], stats["pending_patients"],
+                      stats["doctor_patients_today"], stats["emergencies_today"]]
+            for label, value in zip(value_labels, values):
+                label.configure(text=str(value))
+
+        def refresh():
+            get_dashboard_stats().load(
+                self.tasks, show_stats,
+                lambda e: [label.configure(text="0") for label in value_labels],
+                doctor_id=getattr(self, 'doctor_id', 0)
+            )
         
         # Quick actions
-        actions_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
+        actions_frame = customtkinter.CTkFrame(parent, fg_color=self.colors['white'])
         actions_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
         customtkinter.CTkLabel(
@@ -447,12 +464,19 @@ class DoctorFrame(customtkinter.CTkFrame):
             )
             btn.grid(row=i//2, column=i%2, padx=20, pady=15, sticky="ew")
 
+        refresh()
+        return refresh
+
     # NEW FEATURE: Show Pending Patients for Doctor
     def show_pending_patients(self):
         """Show patients who need medical attention from this doctor"""
-        self.clear_content()
+        self.tasks.cancel_all()
+        self.views.show("pending", self._build_pending_patients)
+
+    def _build_pending_patients(self, parent):
+        """Lay out the pending patients page; returns the refresh that reloads the list"""
         
-        title_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        title_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
         title_frame.pack(fill="x", padx=20, pady=20)
         
         customtkinter.CTkLabel(
@@ -462,135 +486,139 @@ class DoctorFrame(customtkinter.CTkFrame):
             text_color=self.colors['warning']
         ).pack(anchor="w")
         
-        try:
-            # Get patients who haven't been treated today
-            self.cursor.execute("""
-                SELECT p.patient_id, p.name, p.gender, p.blood_type, p.date_registered,
-                       COALESCE(MAX(t.date), 'Never treated') as last_treatment,
-                       COALESCE(pn.notes, 'No notes') as recent_notes
-                FROM patients p
-                LEFT JOIN treatments t ON p.patient_id = t.patient_id
-                LEFT JOIN patient_notes pn ON p.patient_id = pn.patient_id AND DATE(pn.date) = CURDATE()
-                WHERE p.patient_id NOT IN (
-                    SELECT DISTINCT patient_id FROM treatments 
-                    WHERE DATE(date) = CURDATE()
-                )
-                GROUP BY p.patient_id, p.name, p.gender, p.blood_type, p.date_registered, pn.notes
-                ORDER BY last_treatment DESC, p.date_registered ASC
-            """)
-            pending = self.cursor.fetchall()
+        body = customtkinter.CTkFrame(parent, fg_color="transparent")
+        body.pack(fill="both", expand=True)
 
-            if not pending:
-                customtkinter.CTkLabel(
-                    self.content,
-                    text="Excellent! No patients are pending medical attention today.",
-                    font=("Arial", 16),
-                    text_color=self.colors['success']
-                ).pack(pady=50)
-                return
+        def refresh():
+            for widget in body.winfo_children():
+                widget.destroy()
+            loading = show_loading(body, "Loading pending patients...")
 
-            # Statistics
-            stats_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['warning'])
-            stats_frame.pack(fill="x", padx=20, pady=10)
+            def load(cursor):
+                # Get patients who haven't been treated today
+                return get_pending_queue().awaiting_treatment(cursor)
+
+            def render(pending):
+                if not take_placeholder(loading):
+                    return
+                if not pending:
+                    customtkinter.CTkLabel(
+                        body,
+                        text="Excellent! No patients are pending medical attention today.",
+                        font=("Arial", 16),
+                        text_color=self.colors['success']
+                    ).pack(pady=50)
+                    return
+
+                # Statistics
+                stats_frame = customtkinter.CTkFrame(body, fg_color=self.colors['warning'])
+                stats_frame.pack(fill="x", padx=20, pady=10)
             
-            customtkinter.CTkLabel(
-                stats_frame,
-                text=f"PRIORITY ALERT: {len(pending)} patients require your medical attention",
-                font=("Arial", 16, "bold"),
-                text_color="white"
-            ).pack(pady=15)
+                customtkinter.CTkLabel(
+                    stats_frame,
+                    text=f"PRIORITY ALERT: {len(pending)} patients require your medical attention",
+                    font=("Arial", 16, "bold"),
+                    text_color="white"
+                ).pack(pady=15)
 
-            # Scrollable patient list
-            list_frame = customtkinter.CTkFrame(self.content)
-            list_frame.pack(fill="both", expand=True, padx=20, pady=10)
+                # Scrollable patient list
+                list_frame = customtkinter.CTkFrame(body)
+                list_frame.pack(fill="both", expand=True, padx=20, pady=10)
             
-            scroll_frame = customtkinter.CTkScrollableFrame(list_frame, height=400)
-            scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
+                scroll_frame = customtkinter.CTkScrollableFrame(list_frame, height=400)
+                scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
-            # Header
-            header_frame = customtkinter.CTkFrame(scroll_frame, fg_color=self.colors['text_dark'])
-            header_frame.pack(fill="x", pady=(0, 5))
+                # Header
+                header_frame = customtkinter.CTkFrame(scroll_frame, fg_color=self.colors['text_dark'])
+                header_frame.pack(fill="x", pady=(0, 5))
             
-            headers = ["Patient ID", "Name", "Gender", "Blood Type", "Last Treatment", "Priority", "Action"]
-            widths = [80, 150, 80, 100, 120, 100, 120]
+                headers = ["Patient ID", "Name", "Gender", "Blood Type", "Last Treatment", "Priority", "Action"]
+                widths = [80, 150, 80, 100, 120, 100, 120]
             
-            for i, (header, width) in enumerate(zip(headers, widths)):
-                customtkinter.CTkLabel(
-                    header_frame, 
-                    text=header, 
-                    font=("Arial", 12, "bold"), 
-                    text_color="white",
-                    width=width
-                ).grid(row=0, column=i, padx=5, pady=10)
+                for i, (header, width) in enumerate(zip(headers, widths)):
+                    customtkinter.CTkLabel(
+                        header_frame, 
+                        text=header, 
+                        font=("Arial", 12, "bold"), 
+                        text_color="white",
+                        width=width
+                    ).grid(row=0, column=i, padx=5, pady=10)
 
-            # Patient rows
-            for patient in pending:
-                patient_frame = customtkinter.CTkFrame(scroll_frame, fg_color="#ecf0f1")
-                patient_frame.pack(fill="x", pady=2)
+                # Patient rows
+                for patient in pending:
+                    patient_frame = customtkinter.CTkFrame(scroll_frame, fg_color="#ecf0f1")
+                    patient_frame.pack(fill="x", pady=2)
                 
-                # Calculate priority based on last treatment
-                if patient[5] == 'Never treated':
-                    priority = "URGENT"
-                    priority_color = self.colors['danger']
-                else:
-                    try:
-                        last_date = datetime.datetime.strptime(str(patient[5]).split()[0], "%Y-%m-%d").date()
-                        days_ago = (datetime.datetime.now().date() - last_date).days
-                        if days_ago > 7:
-                            priority = "HIGH"
-                            priority_color = self.colors['warning']
-                        elif days_ago > 3:
-                            priority = "MEDIUM"
-                            priority_color = self.colors['info']
-                        else:
-                            priority = "NORMAL"
-                            priority_color = self.colors['success']
-                    except:
-                        priority = "UNKNOWN"
-                        priority_color = "#95a5a6"
-
-                data = [
-                    patient[0], 
-                    patient[1][:15] + "..." if len(patient[1]) > 15 else patient[1], 
-                    patient[2], 
-                    patient[3], 
-                    str(patient[5]).split()[0] if patient[5] != 'Never treated' else 'Never',
-                    priority
-                ]
+                    # Calculate priority based on last treatment
+                    if patient[5] is None:
+                        priority = "URGENT"
+                        priority_color = self.colors['danger']
+                    else:
+                        try:
+                            last_date = datetime.datetime.strptime(str(patient[5]).split()[0], "%Y-%m-%d").date()
+                            days_ago = (datetime.datetime.now().date() - last_date).days
+                            if days_ago > 7:
+                                priority = "HIGH"
+                                priority_color = self.colors['warning']
+                            elif days_ago > 3:
+                                priority = "MEDIUM"
+                                priority_color = self.colors['info']
+                            else:
+                                priority = "NORMAL"
+                                priority_color = self.colors['success']
+                        except:
+                            priority = "UNKNOWN"
+                            priority_color = "#95a5a6"
+
+                    data = [
+                        patient[0], 
+                        patient[1][:15] + "..." if len(patient[1]) > 15 else patient[1], 
+                        patient[2], 
+                        patient[3], 
+                        str(patient[5]).split()[0] if patient[5] is not None else 'Never',
+                        priority
+                    ]
                 
-                for i, (value, width) in enumerate(zip(data, widths[:-1])):
-                    label = customtkinter.CTkLabel(
-                        patient_frame, 
-                        text=str(value), 
-                        width=width,
-                        font=("Arial", 11)
-                    )
-                    if i == 5:  # Priority column
-                        label.configure(text_color=priority_color, font=("Arial", 11, "bold"))
-                    label.grid(row=0, column=i, padx=5, pady=8)
+                    for i, (value, width) in enumerate(zip(data, widths[:-1])):
+                        label = customtkinter.CTkLabel(
+                            patient_frame, 
+                            text=str(value), 
+                            width=width,
+                            font=("Arial", 11)
+                        )
+                        if i == 5:  # Priority column
+                            label.configure(text_color=priority_color, font=("Arial", 11, "bold"))
+                        label.grid(row=0, column=i, padx=5, pady=8)
                 
-                # Action button
-                treat_btn = customtkinter.CTkButton(
-                    patient_frame,
-                    text="Treat Now",
-                    width=100,
-                    height=30,
-                    font=("Arial", 10, "bold"),
-                    fg_color=self.colors['success'],
-                    command=lambda pid=patient[0]: self.quick_treat_patient(pid)
-                )
-                treat_btn.grid(row=0, column=6, padx=5, pady=5)
+                    # Action button
+                    treat_btn = customtkinter.CTkButton(
+                        patient_frame,
+                        text="Treat Now",
+                        width=100,
+                        height=30,
+                        font=("Arial", 10, "bold"),
+                        fg_color=self.colors['success'],
+                        command=lambda pid=patient[0]: self.quick_treat_patient(pid)
+                    )
+                    treat_btn.grid(row=0, column=6, padx=5, pady=5)
+
+            def on_error(e):
+                take_placeholder(loading)
+                messagebox.showerror("Database Error", f"Error loading pending patients: {e}")
+
+            self.tasks.run(load, render, on_error)
 
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Error loading pending patients: {e}")
+        refresh()
+        return refresh
 
     def quick_treat_patient(self, patient_id):
         """Quick treatment interface for pending patients"""
-        try:
+        def load(cursor):
             # Get patient info
-            self.cursor.execute("SELECT name FROM patients WHERE patient_id = %s", (patient_id,))
-            patient_name = self.cursor.fetchone()[0]
-            
+            cursor.execute("SELECT name FROM patients WHERE patient_id = %s", (patient_id,))
+            return cursor.fetchone()[0]
+
+        def render(patient_name):
             # Create treatment window
             treatment_window = customtkinter.CTkToplevel(self)
             treatment_window.title(f"Quick Treatment - {patient_name}")
@@ -643,24 +671,29 @@ class DoctorFrame(customtkinter.CTkFrame):
                     messagebox.showerror("Error", "Please enter symptoms or treatment.")
                     return
                 
-                try:
+                def save(cursor):
                     # Insert new treatment record
-                    self.cursor.execute(
+                    cursor.execute(
                         """INSERT INTO treatments (patient_id, doctor_id, symptoms, treatment, date)
                            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)""",
                         (patient_id, self.doctor_id, symptoms, treatment)
                     )
-                    self.conn.commit()
-                    
+                    record_treatment(cursor, self.doctor_id)
+
+                def saved(_):
+                    invalidate_stats("treatments")
                     messagebox.showinfo("Success", f"Treatment saved successfully for {patient_name}!")
                     
                     log_action(self.username, "Doctor", f"Treated patient ID: {patient_id}")
                     
                     treatment_window.destroy()
                     self.show_pending_patients()  # Refresh the list
-                    
-                except Exception as err:
-                    messagebox.showerror("Database Error", f"Error saving treatment: {str(err)}")
+
+                self.tasks.run(
+                    save, saved,
+                    lambda err: messagebox.showerror("Database Error", f"Error saving treatment: {str(err)}"),
+                    cancellable=False
+                )
             
             # Save button
             save_btn = customtkinter.CTkButton(
@@ -673,9 +706,8 @@ class DoctorFrame(customtkinter.CTkFrame):
                 fg_color=self.colors['success']
             )
             save_btn.pack(pady=20)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error opening treatment window: {str(e)}")
+
+        self.tasks.run(load, render, lambda e: messagebox.showerror("Error", f"Error opening treatment window: {str(e)}"))
 
     # Keep all your existing methods but update them for better integration
     def show_patients(self):
@@ -693,12 +725,16 @@ class DoctorFrame(customtkinter.CTkFrame):
             text_color=self.colors['text_dark']
         ).pack(anchor="w")
         
-        try:
-            self.cursor.execute(
-                "SELECT patient_id, name, date_of_birth, gender, blood_type FROM patients ORDER BY date_registered DESC"
-            )
-            patients = self.cursor.fetchall()
-            
+        loading = show_loading(self.content, "Loading patients...")
+
+        def load(cursor):
+            # Only the newest patient, to preselect; the picker queries the rest on demand
+            cursor.execute("SELECT patient_id, name FROM patients ORDER BY date_registered DESC LIMIT 1")
+            return cursor.fetchall()
+
+        def render(patients):
+            if not take_placeholder(loading):
+                return
             if not patients:
                 customtkinter.CTkLabel(
                     self.content,
@@ -719,15 +755,13 @@ class DoctorFrame(customtkinter.CTkFrame):
                 text_color=self.colors['text_dark']
             ).pack(anchor="w", padx=20, pady=(20, 5))
             
-            patient_combo = customtkinter.CTkComboBox(
+            patient_picker = PatientPicker(
                 selection_frame,
-                values=[f"{p[0]} - {p[1]}" for p in patients],
-                width=500,
-                height=35,
-                font=("Arial", 12),
-                command=lambda _: show_patient_details()
+                self.tasks,
+                on_select=lambda pid, name: show_patient_details(),
+                width=500
             )
-            patient_combo.pack(anchor="w", padx=20, pady=(0, 20))
+            patient_picker.pack(anchor="w", padx=20, pady=(0, 20))
             
             # Patient details area
             details_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['light_gray'])
@@ -738,213 +772,233 @@ class DoctorFrame(customtkinter.CTkFrame):
                 for widget in details_frame.winfo_children():
                     widget.destroy()
                 
-                selection = patient_combo.get()
+                selection = patient_picker.selected()
                 if not selection:
                     return
                 
-                pid = selection.split(" - ")[0]
-                
-                # Get patient info
-                self.cursor.execute(
-                    "SELECT name, date_of_birth, gender, blood_type FROM patients WHERE patient_id=%s",
-                    (pid,)
-                )
-                patient_info = self.cursor.fetchone()
-                
-                if not patient_info:
-                    return
-                
-                # Patient info header
-                info_header = customtkinter.CTkFrame(details_frame, fg_color=self.colors['primary'])
-                info_header.pack(fill="x", padx=20, pady=20)
+                pid = selection[0]
                 
-                customtkinter.CTkLabel(
-                    info_header,
-                    text=f"{patient_info[0]} (ID: {pid})",
-                    font=("Arial", 18, "bold"),
-                    text_color="white"
-                ).pack(pady=15)
-                
-                patient_details = f"DOB: {patient_info[1]} | Gender: {patient_info[2]} | Blood Type: {patient_info[3]}"
-                customtkinter.CTkLabel(
-                    info_header,
-                    text=patient_details,
-                    font=("Arial", 12),
-                    text_color="white"
-                ).pack(pady=(0, 15))
-                
-                # Latest vitals
-                self.cursor.execute(
-                    """SELECT treatment_id, blood_pressure, temperature, weight, date, symptoms, treatment
-                       FROM treatments WHERE patient_id=%s ORDER BY date DESC LIMIT 1""",
-                    (pid,)
-                )
-                latest_vitals = self.cursor.fetchone()
+                loading = show_loading(details_frame, "Loading patient details...")
+
+                def load_details(cursor):
+                    # Get patient info
+                    cursor.execute(
+                        "SELECT name, date_of_birth, gender, blood_type FROM patients WHERE patient_id=%s",
+                        (pid,)
+                    )
+                    patient_info = cursor.fetchone()
+                    # Latest vitals
+                    cursor.execute(
+                        """SELECT treatment_id, blood_pressure, temperature, weight, date, symptoms, treatment
+                           FROM treatments WHERE patient_id=%s ORDER BY date DESC LIMIT 1""",
+                        (pid,)
+                    )
+                    return patient_info, cursor.fetchone()
+
+                def render_details(data):
+                    if not take_placeholder(loading):
+                        return
+                    patient_info, latest_vitals = data
+                    if not patient_info:
+                        return
+
+                    # Patient info header
+                    info_header = customtkinter.CTkFrame(details_frame, fg_color=self.colors['primary'])
+                    info_header.pack(fill="x", padx=20, pady=20)
                 
-                vitals_frame = customtkinter.CTkFrame(details_frame, fg_color=self.colors['white'])
-                vitals_frame.pack(fill="x", padx=20, pady=10)
+                    customtkinter.CTkLabel(
+                        info_header,
+                        text=f"{patient_info[0]} (ID: {pid})",
+                        font=("Arial", 18, "bold"),
+                        text_color="white"
+                    ).pack(pady=15)
                 
-                if latest_vitals and any(latest_vitals[1:4]):
+                    patient_details = f"DOB: {patient_info[1]} | Gender: {patient_info[2]} | Blood Type: {patient_info[3]}"
                     customtkinter.CTkLabel(
-                        vitals_frame,
-                        text="Latest Vital Signs",
-                        font=("Arial", 16, "bold"),
-                        text_color=self.colors['text_dark']
-                    ).pack(pady=(15, 10))
+                        info_header,
+                        text=patient_details,
+                        font=("Arial", 12),
+                        text_color="white"
+                    ).pack(pady=(0, 15))
+
+                    vitals_frame = customtkinter.CTkFrame(details_frame, fg_color=self.colors['white'])
+                    vitals_frame.pack(fill="x", padx=20, pady=10)
+                
+                    if latest_vitals and any(latest_vitals[1:4]):
+                        customtkinter.CTkLabel(
+                            vitals_frame,
+                            text="Latest Vital Signs",
+                            font=("Arial", 16, "bold"),
+                            text_color=self.colors['text_dark']
+                        ).pack(pady=(15, 10))
                     
-                    # Vitals display
-                    vitals_grid = customtkinter.CTkFrame(vitals_frame, fg_color="transparent")
-                    vitals_grid.pack(fill="x", padx=20, pady=10)
+                        # Vitals display
+                        vitals_grid = customtkinter.CTkFrame(vitals_frame, fg_color="transparent")
+                        vitals_grid.pack(fill="x", padx=20, pady=10)
                     
-                    vital_data = [
-                        ("Blood Pressure", latest_vitals[1] or "Not recorded"),
-                        ("Temperature", f"{latest_vitals[2]}°C" if latest_vitals[2] else "Not recorded"),
-                        ("Weight", f"{latest_vitals[3]} kg" if latest_vitals[3] else "Not recorded"),
-                    ]
+                        vital_data = [
+                            ("Blood Pressure", latest_vitals[1] or "Not recorded"),
+                            ("Temperature", f"{latest_vitals[2]}°C" if latest_vitals[2] else "Not recorded"),
+                            ("Weight", f"{latest_vitals[3]} kg" if latest_vitals[3] else "Not recorded"),
+                        ]
                     
-                    for i, (label, value) in enumerate(vital_data):
-                        row = i // 2
-                        col = i % 2
+                        for i, (label, value) in enumerate(vital_data):
+                            row = i // 2
+                            col = i % 2
                         
-                        vital_card = customtkinter.CTkFrame(vitals_grid, fg_color=self.colors['light_blue'])
-                        vital_card.grid(row=row, column=col, padx=10, pady=5, sticky="ew")
+                            vital_card = customtkinter.CTkFrame(vitals_grid, fg_color=self.colors['light_blue'])
+                            vital_card.grid(row=row, column=col, padx=10, pady=5, sticky="ew")
                         
-                        customtkinter.CTkLabel(
-                            vital_card,
-                            text=label,
-                            font=("Arial", 11, "bold")
-                        ).pack(pady=(8, 0))
+                            customtkinter.CTkLabel(
+                                vital_card,
+                                text=label,
+                                font=("Arial", 11, "bold")
+                            ).pack(pady=(8, 0))
                         
-                        customtkinter.CTkLabel(
-                            vital_card,
-                            text=str(value),
-                            font=("Arial", 12)
-                        ).pack(pady=(0, 8))
+                            customtkinter.CTkLabel(
+                                vital_card,
+                                text=str(value),
+                                font=("Arial", 12)
+                            ).pack(pady=(0, 8))
                     
-                    vitals_grid.grid_columnconfigure(0, weight=1)
-                    vitals_grid.grid_columnconfigure(1, weight=1)
+                        vitals_grid.grid_columnconfigure(0, weight=1)
+                        vitals_grid.grid_columnconfigure(1, weight=1)
                     
-                    # Show existing diagnosis/treatment
-                    if latest_vitals[5] or latest_vitals[6]:
-                        customtkinter.CTkLabel(
-                            vitals_frame,
-                            text=f"Current Symptoms: {latest_vitals[5] or 'Not recorded'}",
-                            font=("Arial", 12),
-                            text_color=self.colors['text_dark']
-                        ).pack(anchor="w", padx=20, pady=(10, 5))
+                        # Show existing diagnosis/treatment
+                        if latest_vitals[5] or latest_vitals[6]:
+                            customtkinter.CTkLabel(
+                                vitals_frame,
+                                text=f"Current Symptoms: {latest_vitals[5] or 'Not recorded'}",
+                                font=("Arial", 12),
+                                text_color=self.colors['text_dark']
+                            ).pack(anchor="w", padx=20, pady=(10, 5))
                         
-                        customtkinter.CTkLabel(
-                            vitals_frame,
-                            text=f"Current Treatment: {latest_vitals[6] or 'Not prescribed'}",
-                            font=("Arial", 12),
-                            text_color=self.colors['text_dark']
-                        ).pack(anchor="w", padx=20, pady=(0, 15))
+                            customtkinter.CTkLabel(
+                                vitals_frame,
+                                text=f"Current Treatment: {latest_vitals[6] or 'Not prescribed'}",
+                                font=("Arial", 12),
+                                text_color=self.colors['text_dark']
+                            ).pack(anchor="w", padx=20, pady=(0, 15))
                     
-                    # Medical treatment form
-                    treatment_frame = customtkinter.CTkFrame(details_frame, fg_color=self.colors['white'])
-                    treatment_frame.pack(fill="x", padx=20, pady=10)
+                        # Medical treatment form
+                        treatment_frame = customtkinter.CTkFrame(details_frame, fg_color=self.colors['white'])
+                        treatment_frame.pack(fill="x", padx=20, pady=10)
                     
-                    customtkinter.CTkLabel(
-                        treatment_frame,
-                        text="Update Medical Assessment",
-                        font=("Arial", 16, "bold"),
-                        text_color=self.colors['text_dark']
-                    ).pack(pady=(15, 10))
+                        customtkinter.CTkLabel(
+                            treatment_frame,
+                            text="Update Medical Assessment",
+                            font=("Arial", 16, "bold"),
+                            text_color=self.colors['text_dark']
+                        ).pack(pady=(15, 10))
                     
-                    # Symptoms input
-                    customtkinter.CTkLabel(
-                        treatment_frame,
-                        text="Symptoms & Diagnosis:",
-                        font=("Arial", 12, "bold")
-                    ).pack(anchor="w", padx=20, pady=(10, 5))
+                        # Symptoms input
+                        customtkinter.CTkLabel(
+                            treatment_frame,
+                            text="Symptoms & Diagnosis:",
+                            font=("Arial", 12, "bold")
+                        ).pack(anchor="w", padx=20, pady=(10, 5))
                     
-                    symptoms_text = customtkinter.CTkTextbox(
-                        treatment_frame,
-                        height=80,
-                        width=500,
-                        font=("Arial", 11)
-                    )
-                    symptoms_text.pack(anchor="w", padx=20, pady=(0, 10))
+                        symptoms_text = customtkinter.CTkTextbox(
+                            treatment_frame,
+                            height=80,
+                            width=500,
+                            font=("Arial", 11)
+                        )
+                        symptoms_text.pack(anchor="w", padx=20, pady=(0, 10))
                     
-                    # Treatment input
-                    customtkinter.CTkLabel(
-                        treatment_frame,
-                        text="Treatment & Prescription:",
-                        font=("Arial", 12, "bold")
-                    ).pack(anchor="w", padx=20, pady=(10, 5))
+                        # Treatment input
+                        customtkinter.CTkLabel(
+                            treatment_frame,
+                            text="Treatment & Prescription:",
+                            font=("Arial", 12, "bold")
+                        ).pack(anchor="w", padx=20, pady=(10, 5))
                     
-                    treatment_text = customtkinter.CTkTextbox(
-                        treatment_frame,
-                        height=80,
-                        width=500,
-                        font=("Arial", 11)
-                    )
-                    treatment_text.pack(anchor="w", padx=20, pady=(0, 20))
+                        treatment_text = customtkinter.CTkTextbox(
+                            treatment_frame,
+                            height=80,
+                            width=500,
+                            font=("Arial", 11)
+                        )
+                        treatment_text.pack(anchor="w", padx=20, pady=(0, 20))
                     
-                    def save_medical_assessment():
-                        """Save symptoms and treatment"""
-                        symptoms = symptoms_text.get("1.0", "end-1c").strip()
-                        treatment = treatment_text.get("1.0", "end-1c").strip()
+                        def save_medical_assessment():
+                            """Save symptoms and treatment"""
+                            symptoms = symptoms_text.get("1.0", "end-1c").strip()
+                            treatment = treatment_text.get("1.0", "end-1c").strip()
                         
-                        if not symptoms and not treatment:
-                            messagebox.showerror("Error", "Please enter symptoms or treatment.")
-                            return
+                            if not symptoms and not treatment:
+                                messagebox.showerror("Error", "Please enter symptoms or treatment.")
+                                return
                         
-                        try:
-                            # Update the latest treatment record
-                            self.cursor.execute(
-                                """UPDATE treatments SET doctor_id=%s, symptoms=%s, treatment=%s, date=CURRENT_TIMESTAMP
-                                   WHERE treatment_id=%s""",
-                                (self.doctor_id, symptoms, treatment, latest_vitals[0])
-                            )
-                            self.conn.commit()
-                            
-                            messagebox.showinfo("Success", "Medical assessment saved successfully!")
-                            
-                            # Clear form
-                            symptoms_text.delete("1.0", "end")
-                            treatment_text.delete("1.0", "end")
+                            def save(cursor):
+                                # Update the latest treatment record (now dated today)
+                                record_treatment_moved(cursor, latest_vitals[0], self.doctor_id)
+                                cursor.execute(
+                                    """UPDATE treatments SET doctor_id=%s, symptoms=%s, treatment=%s, date=CURRENT_TIMESTAMP
+                                       WHERE treatment_id=%s""",
+                                    (self.doctor_id, symptoms, treatment, latest_vitals[0])
+                                )
+
+                            def saved(_):
+                                invalidate_stats("treatments")
+                                messagebox.showinfo("Success", "Medical assessment saved successfully!")
                             
-                            log_action(self.username, "Doctor", f"Updated medical assessment for patient ID: {pid}")
+                                # Clear form
+                                symptoms_text.delete("1.0", "end")
+                                treatment_text.delete("1.0", "end")
                             
-                            # Refresh display
-                            show_patient_details()
+                                log_action(self.username, "Doctor", f"Updated medical assessment for patient ID: {pid}")
                             
-                        except Exception as err:
-                            messagebox.showerror("Database Error", f"Error saving assessment: {str(err)}")
+                                # Refresh display
+                                show_patient_details()
+
+                            self.tasks.run(
+                                save, saved,
+                                lambda err: messagebox.showerror("Database Error", f"Error saving assessment: {str(err)}"),
+                                cancellable=False
+                            )
                     
-                    # Save button
-                    save_btn = customtkinter.CTkButton(
-                        treatment_frame,
-                        text="Save Medical Assessment",
-                        command=save_medical_assessment,
-                        height=45,
-                        width=250,
-                        font=("Arial", 14, "bold"),
-                        fg_color=self.colors['success'],
-                        hover_color="#219a52"
-                    )
-                    save_btn.pack(pady=(0, 20))
+                        # Save button
+                        save_btn = customtkinter.CTkButton(
+                            treatment_frame,
+                            text="Save Medical Assessment",
+                            command=save_medical_assessment,
+                            height=45,
+                            width=250,
+                            font=("Arial", 14, "bold"),
+                            fg_color=self.colors['success'],
+                            hover_color="#219a52"
+                        )
+                        save_btn.pack(pady=(0, 20))
                     
-                else:
-                    customtkinter.CTkLabel(
-                        vitals_frame,
-                        text="No vitals recorded yet. Please ask a nurse to record vitals first.",
-                        font=("Arial", 14),
-                        text_color=self.colors['warning']
-                    ).pack(pady=30)
+                    else:
+                        customtkinter.CTkLabel(
+                            vitals_frame,
+                            text="No vitals recorded yet. Please ask a nurse to record vitals first.",
+                            font=("Arial", 14),
+                            text_color=self.colors['warning']
+                        ).pack(pady=30)
                 
-                # Patient history
-                self.show_patient_medical_history(pid, details_frame)
+                    # Patient history
+                    self.show_patient_medical_history(pid, details_frame)
+
+                def details_error(err):
+                    take_placeholder(loading)
+                    messagebox.showerror("Database Error", f"Error loading patient: {str(err)}")
+
+                self.tasks.run(load_details, render_details, details_error)
             
             # Show first patient by default
             if patients:
-                patient_combo.set(f"{patients[0][0]} - {patients[0][1]}")
+                patient_picker.set(patients[0][0], patients[0][1])
                 show_patient_details()
-                
-        except Exception as err:
+
+        def on_error(err):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error loading patients: {str(err)}")
 
+        self.tasks.run(load, render, on_error)
+
     def show_patient_medical_history(self, patient_id, parent_frame):
         """Display comprehensive patient medical history"""
         history_frame = customtkinter.CTkFrame(parent_frame, fg_color=self.colors['white'])
@@ -957,69 +1011,44 @@ class DoctorFrame(customtkinter.CTkFrame):
             text_color=self.colors['text_dark']
         ).pack(pady=(15, 10))
         
-        try:
-            # Get all treatment records
-            self.cursor.execute(
-                """SELECT date, blood_pressure, temperature, weight, symptoms, treatment, heart_rate
-                   FROM treatments WHERE patient_id=%s ORDER BY date DESC""",
-                (patient_id,)
-            )
-            records = self.cursor.fetchall()
-            
+        loading = show_loading(history_frame, "Loading medical history...")
+
+        query = """SELECT date, blood_pressure, temperature, weight, symptoms, treatment, heart_rate
+                   FROM treatments WHERE patient_id=%s ORDER BY date DESC"""
+
+        def load(cursor):
+            # First page of treatment records; the table pages in the rest on scroll
+            cursor.execute(query + " LIMIT %s", (patient_id, PAGE_SIZE))
+            return cursor.fetchall()
+
+        def format_record(record):
+            def clip(text):
+                text = str(text) if text else "-"
+                return text[:40] + "..." if len(text) > 40 else text
+            return [
+                record[0].strftime('%Y-%m-%d %H:%M'),
+                record[1] or "-",
+                f"{record[2]}°C" if record[2] else "-",
+                f"{record[3]}kg" if record[3] else "-",
+                clip(record[4]),
+                clip(record[5])
+            ]
+
+        def render(records):
+            if not take_placeholder(loading):
+                return
             if records:
-                # Create scrollable history
-                history_scroll = customtkinter.CTkScrollableFrame(history_frame, height=300)
-                history_scroll.pack(fill="both", expand=True, padx=20, pady=(0, 20))
-                
-                for i, record in enumerate(records):
-                    record_frame = customtkinter.CTkFrame(history_scroll, fg_color=self.colors['light_blue'])
-                    record_frame.pack(fill="x", pady=5)
-                    
-                    # Record header
-                    customtkinter.CTkLabel(
-                        record_frame,
-                        text=f"Visit #{i+1} - {record[0].strftime('%Y-%m-%d %H:%M')}",
-                        font=("Arial", 12, "bold"),
-                        text_color=self.colors['text_dark']
-                    ).pack(anchor="w", padx=15, pady=(10, 5))
-                    
-                    # Vitals
-                    vitals_text = "Vitals: "
-                    vitals_parts = []
-                    if record[1]: vitals_parts.append(f"BP: {record[1]}")
-                    if record[2]: vitals_parts.append(f"Temp: {record[2]}°C")
-                    if record[3]: vitals_parts.append(f"Weight: {record[3]}kg")
-                    
-                    if vitals_parts:
-                        vitals_text += " | ".join(vitals_parts)
-                    else:
-                        vitals_text += "Not recorded"
-                    
-                    customtkinter.CTkLabel(
-                        record_frame,
-                        text=vitals_text,
-                        font=("Arial", 11),
-                        text_color=self.colors['text_dark']
-                    ).pack(anchor="w", padx=15, pady=2)
-                    
-                    # Medical info
-                    if record[4]:
-                        customtkinter.CTkLabel(
-                            record_frame,
-                            text=f"Symptoms: {record[4]}",
-                            font=("Arial", 11),
-                            text_color=self.colors['text_dark'],
-                            wraplength=400
-                        ).pack(anchor="w", padx=15, pady=2)
-                    
-                    if record[5]:
-                        customtkinter.CTkLabel(
-                            record_frame,
-                            text=f"Treatment: {record[5]}",
-                            font=("Arial", 11),
-                            text_color=self.colors['text_dark'],
-                            wraplength=400
-                        ).pack(anchor="w", padx=15, pady=(2, 10))
+                VirtualTable(
+                    history_frame,
+                    columns=[("Visit", 120), ("BP", 70), ("Temp", 60), ("Weight", 60), ("Symptoms", 220), ("Treatment", 220)],
+                    rows=records,
+                    fetch_page=query_pages(self.tasks, query, (patient_id,)),
+                    format_row=format_record,
+                    height=300,
+                    header_color=self.colors['primary'],
+                    row_colors=(self.colors['light_blue'], self.colors['white']),
+                    font=("Arial", 11)
+                ).pack(fill="both", expand=True, padx=20, pady=(0, 20))
             else:
                 customtkinter.CTkLabel(
                     history_frame,
@@ -1027,8 +1056,10 @@ class DoctorFrame(customtkinter.CTkFrame):
                     font=("Arial", 12),
                     text_color="#777"
                 ).pack(pady=20)
-                    
-        except Exception as e:
+
+        def on_error(e):
+            if not take_placeholder(loading):
+                return
             customtkinter.CTkLabel(
                 history_frame,
                 text=f"Error loading medical history: {str(e)}",
@@ -1036,6 +1067,8 @@ class DoctorFrame(customtkinter.CTkFrame):
                 text_color=self.colors['danger']
             ).pack(pady=20)
 
+        self.tasks.run(load, render, on_error)
+
     def show_todays_patients(self):
         """Enhanced today's patients view"""
         self.clear_content()
@@ -1052,20 +1085,26 @@ class DoctorFrame(customtkinter.CTkFrame):
         
         today = datetime.date.today()
         
-        try:
+        loading = show_loading(self.content, "Loading today's patients...")
+
+        def load(cursor):
             # Get today's patients treated by this doctor
-            self.cursor.execute(
-                """SELECT DISTINCT t.patient_id, p.name, COUNT(t.treatment_id) as visits
+            treated_today, _ = date_ranges.today("t.date")
+            cursor.execute(
+                f"""SELECT DISTINCT t.patient_id, p.name, COUNT(t.treatment_id) as visits
                    FROM treatments t
                    JOIN patients p ON t.patient_id = p.patient_id
-                   WHERE t.doctor_id = %s AND DATE(t.date) = CURDATE()
+                   WHERE t.doctor_id = %s AND {treated_today}
                    GROUP BY t.patient_id, p.name
                    ORDER BY MAX(t.date) DESC
                 """,
                 (self.doctor_id,)
             )
-            patients = self.cursor.fetchall()
-            
+            return cursor.fetchall()
+
+        def render(patients):
+            if not take_placeholder(loading):
+                return
             # Statistics
             stats_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
             stats_frame.pack(fill="x", padx=20, pady=20)
@@ -1118,10 +1157,13 @@ class DoctorFrame(customtkinter.CTkFrame):
                     font=("Arial", 12),
                     text_color="white"
                 ).pack(anchor="w", padx=20, pady=(0, 15))
-                
-        except Exception as err:
+
+        def on_error(err):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error loading today's patients: {str(err)}")
 
+        self.tasks.run(load, render, on_error)
+
     def show_emergency_cases(self):
         """Enhanced emergency cases display"""
         self.clear_content()
@@ -1136,17 +1178,22 @@ class DoctorFrame(customtkinter.CTkFrame):
             text_color=self.colors['danger']
         ).pack(anchor="w")
         
-        try:
+        loading = show_loading(self.content, "Loading emergency cases...")
+
+        def load(cursor):
             # Get all emergency notes
-            self.cursor.execute(
+            cursor.execute(
                 """SELECT n.patient_id, p.name, n.notes, n.date, n.author
                    FROM patient_notes n
                    JOIN patients p ON n.patient_id = p.patient_id
                    WHERE n.emergency=1
                    ORDER BY n.date DESC"""
             )
-            emergencies = self.cursor.fetchall()
-            
+            return cursor.fetchall()
+
+        def render(emergencies):
+            if not take_placeholder(loading):
+                return
             # Statistics
             stats_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
             stats_frame.pack(fill="x", padx=20, pady=20)
@@ -1215,10 +1262,13 @@ class DoctorFrame(customtkinter.CTkFrame):
                     text_color="white",
                     wraplength=500
                 ).pack(anchor="w", padx=20, pady=(5, 15))
-                
-        except Exception as err:
+
+        def on_error(err):
+            take_placeholder(loading)
             messagebox.showerror("Database Error", f"Error loading emergency cases: {str(err)}")
 
+        self.tasks.run(load, render, on_error)
+
     def show_statistics(self):
         """Medical statistics dashboard"""
         self.clear_content()
@@ -1236,29 +1286,37 @@ class DoctorFrame(customtkinter.CTkFrame):
         stats_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
         stats_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
-        try:
+        loading = show_loading(stats_frame, "Loading statistics...")
+
+        def load(cursor):
             # Personal statistics
             doctor_id = getattr(self, 'doctor_id', 0)
             
-            self.cursor.execute(
+            cursor.execute(
                 "SELECT COUNT(DISTINCT patient_id) FROM treatments WHERE doctor_id=%s",
                 (doctor_id,)
             )
-            total_patients_treated = self.cursor.fetchone()[0]
+            total_patients_treated = cursor.fetchone()[0]
             
-            self.cursor.execute(
+            cursor.execute(
                 "SELECT COUNT(*) FROM treatments WHERE doctor_id=%s",
                 (doctor_id,)
             )
-            total_treatments = self.cursor.fetchone()[0]
+            total_treatments = cursor.fetchone()[0]
             
             # Hospital statistics
-            self.cursor.execute("SELECT COUNT(*) FROM patients")
-            total_hospital_patients = self.cursor.fetchone()[0]
-            
-            self.cursor.execute("SELECT COUNT(*) FROM doctors")
-            total_doctors = self.cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM patients")
+            total_hospital_patients = cursor.fetchone()[0]
             
+            cursor.execute("SELECT COUNT(*) FROM doctors")
+            total_doctors = cursor.fetchone()[0]
+            return total_patients_treated, total_treatments, total_hospital_patients, total_doctors
+
+        def render(data):
+            if not take_placeholder(loading):
+                return
+            total_patients_treated, total_treatments, total_hospital_patients, total_doctors = data
+
             # Display statistics
             personal_frame = customtkinter.CTkFrame(stats_frame, fg_color=self.colors['light_blue'])
             personal_frame.pack(fill="x", padx=20, pady=20)
@@ -1308,8 +1366,10 @@ class DoctorFrame(customtkinter.CTkFrame):
                     font=("Arial", 12),
                     text_color="white"
                 ).pack(anchor="w", padx=20, pady=(5, 15))
-                
-        except Exception as e:
+
+        def on_error(e):
+            if not take_placeholder(loading):
+                return
             customtkinter.CTkLabel(
                 stats_frame,
                 text=f"Error loading statistics: {str(e)}",
@@ -1317,6 +1377,8 @@ class DoctorFrame(customtkinter.CTkFrame):
                 text_color=self.colors['danger']
             ).pack(pady=50)
 
+        self.tasks.run(load, render, on_error)
+
     def show_search_patient(self):
         """Patient search functionality"""
         self.clear_content()
@@ -1352,7 +1414,7 @@ class DoctorFrame(customtkinter.CTkFrame):
         results_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['light_gray'])
         results_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
-        def search_patients():
+        def run_search():
             """Search for patients"""
             for widget in results_frame.winfo_children():
                 widget.destroy()
@@ -1367,17 +1429,15 @@ class DoctorFrame(customtkinter.CTkFrame):
                 ).pack(pady=20)
                 return
             
-            try:
-                # Search by name or ID
-                self.cursor.execute(
-                    """SELECT patient_id, name, date_of_birth, gender 
-                       FROM patients 
-                       WHERE name LIKE %s OR patient_id LIKE %s
-                       ORDER BY name""",
-                    (f"%{query}%", f"%{query}%")
-                )
-                results = self.cursor.fetchall()
-                
+            loading = show_loading(results_frame, "Searching...")
+
+            def load(cursor):
+                # Search by exact ID, then by name through the ranked trigram search
+                return find_patients(cursor, query, "patient_id, name, date_of_birth, gender")
+
+            def render(results):
+                if not take_placeholder(loading):
+                    return
                 if results:
                     customtkinter.CTkLabel(
                         results_frame,
@@ -1414,20 +1474,24 @@ class DoctorFrame(customtkinter.CTkFrame):
                         font=("Arial", 14),
                         text_color=self.colors['danger']
                     ).pack(pady=50)
-                    
-            except Exception as e:
+
+            def on_error(e):
+                if not take_placeholder(loading):
+                    return
                 customtkinter.CTkLabel(
                     results_frame,
                     text=f"Error searching patients: {str(e)}",
                     font=("Arial", 14),
                     text_color=self.colors['danger']
                 ).pack(pady=20)
-        
+
+            self.tasks.run(load, render, on_error)
+
         # Search button
         search_btn = customtkinter.CTkButton(
             search_frame,
             text="Search Patients",
-            command=search_patients,
+            command=run_search,
             height=35,
             width=150,
             font=("Arial", 12, "bold"),
@@ -1436,7 +1500,7 @@ class DoctorFrame(customtkinter.CTkFrame):
         search_btn.pack(anchor="w", padx=20, pady=(0, 20))
         
         # Bind Enter key to search
-        search_entry.bind("<Return>", lambda e: search_patients())
+        search_entry.bind("<Return>", lambda e: run_search())
 
     def show_doctor_profile(self):
         """Display doctor profile and settings"""
@@ -1452,15 +1516,20 @@ class DoctorFrame(customtkinter.CTkFrame):
             text_color=self.colors['text_dark']
         ).pack(anchor="w")
         
-        try:
+        loading = show_loading(self.content, "Loading profile...")
+
+        def load(cursor):
             # Get doctor info
-            self.cursor.execute(
+            cursor.execute(
                 """SELECT firstname, lastname, national_id, qualification, specialization
                    FROM doctors WHERE firstname=%s""",
                 (self.username,)
             )
-            doctor_info = self.cursor.fetchone()
-            
+            return cursor.fetchone()
+
+        def render(doctor_info):
+            if not take_placeholder(loading):
+                return
             if doctor_info:
                 profile_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
                 profile_frame.pack(fill="both", expand=True, padx=20, pady=20)
@@ -1516,8 +1585,10 @@ class DoctorFrame(customtkinter.CTkFrame):
                     font=("Arial", 14),
                     text_color=self.colors['danger']
                 ).pack(pady=50)
-                
-        except Exception as e:
+
+        def on_error(e):
+            if not take_placeholder(loading):
+                return
             customtkinter.CTkLabel(
                 self.content,
                 text=f"Error loading profile: {str(e)}",
@@ -1525,18 +1596,22 @@ class DoctorFrame(customtkinter.CTkFrame):
                 text_color=self.colors['danger']
             ).pack(pady=50)
 
+        self.tasks.run(load, render, on_error)
+
     def check_emergencies(self):
         """Enhanced emergency alert system"""
-        try:
-            self.cursor.execute(
-                """SELECT n.patient_id, p.name, n.notes, n.date, n.author
+        def load(cursor):
+            noted_today, _ = date_ranges.today("n.date")
+            cursor.execute(
+                f"""SELECT n.patient_id, p.name, n.notes, n.date, n.author
                    FROM patient_notes n
                    JOIN patients p ON n.patient_id = p.patient_id
-                   WHERE n.emergency=1 AND DATE(n.date) = CURDATE()
+                   WHERE n.emergency=1 AND {noted_today}
                    ORDER BY n.date DESC"""
             )
-            today_emergencies = self.cursor.fetchall()
-            
+            return cursor.fetchall()
+
+        def render(today_emergencies):
             if today_emergencies:
                 msg = "EMERGENCY ALERT - TODAY'S CASES!\n\n"
                 for patient_id, name, notes, date, author in today_emergencies:
@@ -1552,9 +1627,8 @@ class DoctorFrame(customtkinter.CTkFrame):
                 self.show_emergency_cases()
             else:
                 messagebox.showinfo("No Emergencies", "No emergency cases reported today.")
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Error checking emergencies: {str(e)}")
+
+        self.tasks.run(load, render, lambda e: messagebox.showerror("Error", f"Error checking emergencies: {str(e)}"))
 
     def logout(self):
         result = messagebox.askyesno(
@@ -1564,10 +1638,13 @@ class DoctorFrame(customtkinter.CTkFrame):
         if result:
             try:
                 log_action(self.username, "Doctor", "Logged out from medical system")
-                self.conn.close()
+                self.tasks.cancel_all()
+                flush_audit_log()
             except:
                 pass
             messagebox.showinfo("Goodbye", f"Thank you for your service, Dr. {self.username}!")
-            self.master.destroy()
+            # The application window tears this frame down and shows the login page
             if self.on_logout:
-                self.on_logout()
\ No newline at end of file
+                self.on_logout()
+            else:
+                self.master.destroy()
\ No newline at end of file
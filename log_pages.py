@@ -0,0 +1,127 @@
+from datetime import datetime
+from db_connection import get_backend
+
+PAGE_SIZES = (25, 50, 100, 200)
+DEFAULT_PAGE_SIZE = 50
+
+LOG_COLUMNS = "log_id, user, department, action, log_date, timestamp"
+
+
+class LogPager:
+    """Keyset (seek) pagination over the logs table, newest first.
+
+    Pages are addressed by the (timestamp, log_id) of their first and last
+    rows instead of an OFFSET, so every page costs one index range read no
+    matter how deep into the history the user has gone. The query methods
+    return work(cursor) functions for FrameTasks; accept() must be called
+    with the result on the Tk thread to move the pager.
+    """
+
+    def __init__(self, department="All", date_str="", page_size=DEFAULT_PAGE_SIZE):
+        self.department = department
+        self.date_str = date_str.strip()
+        self.page_size = page_size
+        self.page_number = 0
+        self.first_key = None
+        self.last_key = None
+        self.has_next = False
+        self.has_previous = False
+
+    def filters(self):
+        """WHERE conditions and params for the department/date filters"""
+        conditions = []
+        params = []
+        if self.department and self.department != "All":
+            conditions.append("department = %s")
+            params.append(self.department)
+        if self.date_str:
+            datetime.strptime(self.date_str, "%Y-%m-%d")  # ValueError for a bad filter
+            conditions.append("log_date = %s")
+            params.append(self.date_str)
+        return conditions, params
+
+    def page_query(self, direction="first"):
+        """work(cursor) fetching one page (plus one look-ahead row) in the given direction"""
+        conditions, params = self.filters()
+        order = "DESC"
+        if direction == "next" and self.last_key:
+            # timestamp <= x first keeps the predicate a plain range on the index
+            conditions.append("timestamp <= %s AND (timestamp < %s OR log_id < %s)")
+            params += [self.last_key[0], self.last_key[0], self.last_key[1]]
+        elif direction == "previous" and self.first_key:
+            conditions.append("timestamp >= %s AND (timestamp > %s OR log_id > %s)")
+            params += [self.first_key[0], self.first_key[0], self.first_key[1]]
+            order = "ASC"
+        elif direction == "current" and self.first_key:
+            conditions.append("timestamp <= %s AND (timestamp < %s OR log_id <= %s)")
+            params += [self.first_key[0], self.first_key[0], self.first_key[1]]
+
+        query = f"SELECT {LOG_COLUMNS} FROM logs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY timestamp {order}, log_id {order} LIMIT %s"
+        params.append(self.page_size + 1)
+
+        def load(cursor):
+            cursor.execute(query, tuple(params))
+            return cursor.fetchall()
+        return load
+
+    def accept(self, direction, rows):
+        """Move to the page just fetched by page_query(direction); returns its rows"""
+        more = len(rows) > self.page_size
+        rows = list(rows[:self.page_size])
+        if direction == "previous":
+            rows.reverse()
+            if not rows:
+                return rows
+            self.page_number = max(1, self.page_number - 1)
+            self.has_previous = more
+            self.has_next = True
+        elif direction == "next":
+            if not rows:
+                self.has_next = False
+                return rows
+            self.page_number += 1
+            self.has_previous = True
+            self.has_next = more
+        elif direction == "current" and self.first_key:
+            self.has_next = more
+        else:
+            self.page_number = 1
+            self.has_previous = False
+            self.has_next = more
+        if rows:
+            self.first_key = (rows[0][5], rows[0][0])
+            self.last_key = (rows[-1][5], rows[-1][0])
+        return rows
+
+    def count_query(self):
+        """work(cursor) estimating the number of matching rows without counting them
+        (SQLite keeps no row statistics, so there they are counted)"""
+        conditions, params = self.filters()
+
+        def load(cursor):
+            if not get_backend().row_estimates:
+                where = " WHERE " + " AND ".join(conditions) if conditions else ""
+                cursor.execute("SELECT COUNT(*) FROM logs" + where, tuple(params))
+                return cursor.fetchone()[0]
+            if not conditions:
+                # InnoDB's table statistics: approximate, but free
+                cursor.execute(
+                    "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'logs'"
+                )
+                row = cursor.fetchone()
+                return int(row[0] or 0) if row else 0
+            # The optimizer's row estimate for the filtered range
+            cursor.execute("EXPLAIN SELECT log_id FROM logs WHERE " + " AND ".join(conditions), tuple(params))
+            columns = [column[0] for column in cursor.description]
+            row = cursor.fetchone()
+            if not row or row[columns.index("rows")] is None:
+                return 0
+            estimate = float(row[columns.index("rows")])
+            if "filtered" in columns and row[columns.index("filtered")] is not None:
+                estimate *= float(row[columns.index("filtered")]) / 100
+            return int(estimate)
+        return load
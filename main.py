@@ -1,12 +1,43 @@
+import collections
 import datetime
+import gc
+import json
+import logging
+import logging.handlers
+import os
+
+DATA_DIR = os.environ.get(
+    "HOSPITAL_CONSOLE_DATA", os.path.join(os.path.expanduser("~"), ".hospital-management", "console")
+)
+COMPACT_AFTER = 10000           # journal entries kept before they are folded into the snapshot
+AUDIT_IN_MEMORY = 500           # latest entries View Audit Logs shows
+AUDIT_MAX_BYTES = 1 << 20       # audit.log is rotated at this size...
+AUDIT_BACKUPS = 5               # ...keeping audit.log.1 to audit.log.5
+
 
 class AuditLog:
-    def __init__(self):
-        self.logs = []
+    """Audit trail of the console. The latest keep entries stay in memory for
+    View Audit Logs; with a path, every entry is also written to that file,
+    which is rotated at max_bytes with backups older files kept."""
+
+    def __init__(self, path=None, keep=AUDIT_IN_MEMORY, max_bytes=AUDIT_MAX_BYTES, backups=AUDIT_BACKUPS):
+        self.logs = collections.deque(maxlen=keep)
+        self._file = None
+        if path is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    self.logs.extend(line.rstrip("\n") for line in f)
+            self._file = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+            )
 
     def log(self, username, action):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.logs.append(f"[{timestamp}] {username} - {action}")
+        entry = f"[{timestamp}] {username} - {action}"
+        self.logs.append(entry)
+        if self._file is not None:
+            self._file.emit(logging.makeLogRecord({"msg": entry}))
 
     def view_logs(self):
         if not self.logs:
@@ -16,29 +47,187 @@ class AuditLog:
             for log in self.logs:
                 print(log)
 
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
 
 class Patient:
-    def __init__(self, patient_id, name, age, gender):
+    __slots__ = ("patient_id", "name", "age", "gender", "treatments")
+
+    def __init__(self, patient_id, name, age, gender, treatments=None):
         self.patient_id = patient_id
         self.name = name
         self.age = age
         self.gender = gender
-        self.treatments = []
+        self.treatments = treatments if treatments is not None else []
 
     def add_treatment(self, treatment):
         self.treatments.append(treatment)
 
+    def to_record(self):
+        return [self.patient_id, self.name, self.age, self.gender, self.treatments]
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(*record)
+
     def __str__(self):
         return f"ID: {self.patient_id}, Name: {self.name}, Age: {self.age}, Gender: {self.gender}"
 
 
+class PatientStore:
+    """Patients on disk. snapshot.json holds every patient as of a journal
+    sequence number and journal.jsonl every change since, one JSON line each,
+    appended and synced as it happens. load() reads the snapshot and replays
+    the journal after it; compact() writes a new snapshot and empties the
+    journal, which the console does once it holds compact_after entries."""
+
+    def __init__(self, directory, compact_after=COMPACT_AFTER):
+        self.directory = directory
+        self.compact_after = compact_after
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.journal_path = os.path.join(directory, "journal.jsonl")
+        self.seq = 0                # sequence number of the latest change
+        self.journal_entries = 0    # changes not in the snapshot yet
+        self._journal = None
+
+    def load(self):
+        """{patient_id: Patient} as last saved"""
+        # Loading allocates hundreds of thousands of lists and records that all
+        # stay alive; the collector scanning them as they pile up doubles the time
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            return self._load()
+        finally:
+            if collecting:
+                gc.enable()
+
+    def _load(self):
+        patients = {}
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            snapshot_seq = snapshot["seq"]
+            patients = {record[0]: Patient(*record) for record in snapshot["patients"]}
+        self.seq = snapshot_seq
+        self.journal_entries = 0
+        if os.path.exists(self.journal_path):
+            good = 0
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    good += len(line)
+                    # Entries already in the snapshot are left from a compaction cut short
+                    if entry["seq"] > snapshot_seq:
+                        _apply(patients, entry)
+                        self.seq = entry["seq"]
+                        self.journal_entries += 1
+            if good < os.path.getsize(self.journal_path):
+                # Drop the half-written last line of a crash, so new entries start on a line of their own
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(good)
+        return patients
+
+    def append(self, entry):
+        """Write one change to the journal before it is acknowledged"""
+        self.seq += 1
+        entry["seq"] = self.seq
+        if self._journal is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._journal = open(self.journal_path, "ab")
+        self._journal.write(json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self.journal_entries += 1
+
+    def compact(self, patients):
+        """Replace the snapshot by patients as they are now and empty the journal"""
+        os.makedirs(self.directory, exist_ok=True)
+        partial = f"{self.snapshot_path}.partial"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump({"seq": self.seq, "patients": [patient.to_record() for patient in patients.values()]},
+                      f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial, self.snapshot_path)
+        # A crash before the journal is emptied only leaves entries load() skips
+        self.close()
+        open(self.journal_path, "wb").close()
+        self.journal_entries = 0
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+def _apply(patients, entry):
+    op = entry["op"]
+    if op == "add":
+        patient = Patient.from_record(entry["patient"])
+        patients[patient.patient_id] = patient
+        return
+    patient = patients.get(entry["id"])
+    if patient is None:
+        return
+    if op == "update":
+        for field, value in entry["changes"].items():
+            setattr(patient, field, value)
+    elif op == "treatment":
+        patient.add_treatment(entry["treatment"])
+
+
 class HospitalSystem:
-    def __init__(self):
-        self.patients = []
-        self.audit = AuditLog()
+    def __init__(self, data_dir=DATA_DIR):
+        self.store = PatientStore(data_dir)
+        self.patients = self.store.load()   # patient_id -> Patient
+        self._names = None
+        self.audit = AuditLog(os.path.join(data_dir, "audit.log"))
+
+    @property
+    def names(self):
+        """lower-case name -> {patient_id, ...}; built on the first search by
+        name rather than at start-up, then kept up to date"""
+        if self._names is None:
+            names = {}
+            for patient in self.patients.values():
+                names.setdefault(patient.name.lower(), set()).add(patient.patient_id)
+            self._names = names
+        return self._names
+
+    def _index_name(self, patient):
+        if self._names is not None:
+            self._names.setdefault(patient.name.lower(), set()).add(patient.patient_id)
+
+    def _unindex_name(self, patient):
+        ids = self._names.get(patient.name.lower()) if self._names is not None else None
+        if ids is not None:
+            ids.discard(patient.patient_id)
+            if not ids:
+                del self._names[patient.name.lower()]
+
+    def _save(self, entry):
+        self.store.append(entry)
+        if self.store.journal_entries >= self.store.compact_after:
+            self.store.compact(self.patients)
+
+    def close(self):
+        self.store.close()
+        self.audit.close()
 
     def add_patient(self, username):
         patient_id = input("Enter Patient ID: ")
+        if patient_id in self.patients:
+            print("A patient with that ID already exists.")
+            return
         name = input("Enter Name: ")
         if name.isalpha():
             print("welcome, ", name)
@@ -46,7 +235,9 @@ class HospitalSystem:
         gender = input("Enter Gender (M/F): ")
 
         patient = Patient(patient_id, name, int(age), gender)
-        self.patients.append(patient)
+        self.patients[patient_id] = patient
+        self._index_name(patient)
+        self._save({"op": "add", "patient": patient.to_record()})
         self.audit.log(username, f"Added new patient {patient_id}")
 
 
@@ -55,9 +246,19 @@ class HospitalSystem:
             print("No patient records found.")
         else:
             print("\n--- Patients ---")
-            for p in self.patients:
+            for p in self.patients.values():
                 print(p)
 
+    def find_patients(self):
+        name = input("Enter Patient Name: ")
+        ids = self.names.get(name.strip().lower())
+        if not ids:
+            print("No patient with that name.")
+        else:
+            print(f"\n--- Patients named {name.strip()} ---")
+            for pid in sorted(ids):
+                print(self.patients[pid])
+
     def update_patient(self, username):
         pid = input("Enter Patient ID to update: ")
         patient = self.get_patient_by_id(pid)
@@ -66,13 +267,22 @@ class HospitalSystem:
             age = input("Enter new age (leave blank to keep current): ")
             gender = input("Enter new gender (leave blank to keep current): ")
 
+            changes = {}
             if name:
-                patient.name = name
+                changes["name"] = name
             if age:
-                patient.age = int(age)
+                changes["age"] = int(age)
             if gender:
-                patient.gender = gender
+                changes["gender"] = gender
 
+            if "name" in changes:
+                self._unindex_name(patient)
+            for field, value in changes.items():
+                setattr(patient, field, value)
+            if "name" in changes:
+                self._index_name(patient)
+            if changes:
+                self._save({"op": "update", "id": pid, "changes": changes})
             self.audit.log(username, f"Updated patient {pid}")
             print("Patient updated.")
         else:
@@ -84,6 +294,7 @@ class HospitalSystem:
         if patient:
             treatment = input("Enter treatment details: ")
             patient.add_treatment(treatment)
+            self._save({"op": "treatment", "id": pid, "treatment": treatment})
             self.audit.log(username, f"Added treatment for patient {pid}")
             print("Treatment added.")
         else:
@@ -103,10 +314,7 @@ class HospitalSystem:
             print("Patient not found.")
 
     def get_patient_by_id(self, pid):
-        for patient in self.patients:
-            if patient.patient_id == pid:
-                return patient
-        return None
+        return self.patients.get(pid)
 
     def run(self):
         print("=== Welcome to Hospital Management System ===")
@@ -119,8 +327,9 @@ class HospitalSystem:
             print("3. Update Patient Info")
             print("4. Add Treatment Record")
             print("5. View Patient Treatments")
-            print("6. View Audit Logs")
-            print("7. Exit")
+            print("6. Find Patients by Name")
+            print("7. View Audit Logs")
+            print("8. Exit")
 
             choice = input("Enter your choice: ")
 
@@ -135,8 +344,10 @@ class HospitalSystem:
             elif choice == '5':
                 self.view_treatments()
             elif choice == '6':
-                self.audit.view_logs()
+                self.find_patients()
             elif choice == '7':
+                self.audit.view_logs()
+            elif choice == '8':
                 print("Exiting system. Goodbye.")
                 break
             else:
@@ -145,4 +356,7 @@ class HospitalSystem:
 
 if __name__ == "__main__":
     system = HospitalSystem()
-    system.run()
+    try:
+        system.run()
+    finally:
+        system.close()
@@ -0,0 +1,306 @@
+import sys
+from db_connection import get_connection, get_backend
+
+LOCK_NAME = "hospital_management_migrations"
+LOCK_TIMEOUT = 30       # seconds to wait for another client that is migrating
+
+
+class CreateIndex:
+    """Migration step that adds an index unless one with that name already exists"""
+
+    def __init__(self, table, name, columns, unique=False):
+        self.table = table
+        self.name = name
+        self.columns = columns
+        self.unique = unique
+
+    @property
+    def sql(self):
+        columns = ", ".join(f"`{column}`" for column in self.columns)
+        kind = "UNIQUE INDEX" if self.unique else "INDEX"
+        return f"CREATE {kind} `{self.name}` ON `{self.table}` ({columns})"
+
+    def needed(self, cursor):
+        return not get_backend().index_exists(cursor, self.table, self.name)
+
+    def apply(self, cursor):
+        if self.needed(cursor):
+            cursor.execute(self.sql)
+
+
+class Statement:
+    """Migration step that runs one idempotent SQL statement; sqlite= gives the
+    statement for SQLite where the translated MySQL one would not work"""
+
+    def __init__(self, sql, sqlite=None):
+        self.mysql_sql = sql
+        self.sqlite_sql = sqlite
+
+    @property
+    def sql(self):
+        if self.sqlite_sql and get_backend().name == "sqlite":
+            return self.sqlite_sql
+        return self.mysql_sql
+
+    def needed(self, cursor):
+        return True
+
+    def apply(self, cursor):
+        cursor.execute(self.sql)
+
+
+class RunPython:
+    """Migration step that calls func(cursor), e.g. to backfill data"""
+
+    def __init__(self, description, func):
+        self.description = description
+        self.func = func
+
+    @property
+    def sql(self):
+        return f"-- {self.description}"
+
+    def needed(self, cursor):
+        return True
+
+    def apply(self, cursor):
+        self.func(cursor)
+
+
+def _backfill_trigrams(cursor):
+    from patient_search import backfill_trigrams
+    backfill_trigrams(cursor)
+
+
+def _build_rollups(cursor):
+    from rollups import catch_up
+    catch_up(cursor, full=True)
+
+
+def _check_unique_usernames(cursor):
+    cursor.execute("SELECT username FROM users GROUP BY username HAVING COUNT(*) > 1")
+    duplicates = [row[0] for row in cursor.fetchall()]
+    if duplicates:
+        raise RuntimeError(
+            f"Several accounts share the usernames {', '.join(duplicates)}; "
+            "delete the extra ones in User Management, then restart"
+        )
+
+
+def _hash_passwords(cursor):
+    from credentials import hash_plaintext_passwords
+    hash_plaintext_passwords(cursor)
+
+
+# (version, description, steps) - append only; never edit a migration that has shipped
+MIGRATIONS = [
+    (1, "Create logs table", [
+        Statement("""
+            CREATE TABLE IF NOT EXISTS logs (
+                log_id INT AUTO_INCREMENT PRIMARY KEY,
+                user VARCHAR(50) NOT NULL,
+                department VARCHAR(50) NOT NULL,
+                action TEXT NOT NULL,
+                log_date DATE NOT NULL,
+                timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """),
+    ]),
+    (2, "Create patient_notes table", [
+        Statement("""
+            CREATE TABLE IF NOT EXISTS patient_notes (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                patient_id INT,
+                notes TEXT,
+                author VARCHAR(100),
+                date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                emergency BOOLEAN DEFAULT FALSE,
+                FOREIGN KEY (patient_id) REFERENCES patients(patient_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """),
+    ]),
+    (3, "Index logs for the filtered, newest-first log browser", [
+        CreateIndex("logs", "idx_logs_timestamp", ["timestamp", "log_id"]),
+        CreateIndex("logs", "idx_logs_department_timestamp", ["department", "timestamp", "log_id"]),
+        CreateIndex("logs", "idx_logs_date_timestamp", ["log_date", "timestamp", "log_id"]),
+    ]),
+    (4, "Index patients by name and registration date", [
+        CreateIndex("patients", "idx_patients_name", ["name"]),
+        CreateIndex("patients", "idx_patients_date_registered", ["date_registered"]),
+    ]),
+    (5, "Index treatments by date", [
+        CreateIndex("treatments", "idx_treatments_date", ["date"]),
+        CreateIndex("treatments", "idx_treatments_patient_date", ["patient_id", "date"]),
+    ]),
+    (6, "Index patient_notes for the emergency lists", [
+        CreateIndex("patient_notes", "idx_patient_notes_emergency_date", ["emergency", "date"]),
+    ]),
+    (7, "Trigram index for patient name search", [
+        Statement("""
+            CREATE TABLE IF NOT EXISTS patient_name_trigrams (
+                trigram VARCHAR(3) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+                patient_id INT NOT NULL,
+                PRIMARY KEY (trigram, patient_id),
+                KEY idx_trigrams_patient (patient_id)
+            ) ENGINE=InnoDB
+        """, sqlite="""
+            CREATE TABLE IF NOT EXISTS patient_name_trigrams (
+                trigram VARCHAR(3) NOT NULL,
+                patient_id INT NOT NULL,
+                PRIMARY KEY (trigram, patient_id)
+            ) WITHOUT ROWID
+        """),
+        CreateIndex("patient_name_trigrams", "idx_trigrams_patient", ["patient_id"]),
+        RunPython("Index the names of existing patients", _backfill_trigrams),
+    ]),
+    (8, "Create backup_watermarks table for incremental backups", [
+        Statement("""
+            CREATE TABLE IF NOT EXISTS backup_watermarks (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                kind VARCHAR(16) NOT NULL,
+                path VARCHAR(512) NOT NULL,
+                taken_at DATETIME NOT NULL,
+                rows_written INT NOT NULL,
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """),
+    ]),
+    (9, "Daily rollup tables for the reports", [
+        Statement("""
+            CREATE TABLE IF NOT EXISTS daily_stats (
+                day DATE NOT NULL,
+                metric VARCHAR(32) NOT NULL,
+                dimension VARCHAR(64) NOT NULL DEFAULT '',
+                value INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (metric, day, dimension)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """),
+        Statement("""
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                name VARCHAR(32) PRIMARY KEY,
+                built_through DATE NOT NULL
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """),
+        RunPython("Roll up the existing records", _build_rollups),
+    ]),
+    (10, "Unique usernames and hashed passwords", [
+        RunPython("Check that no two accounts share a username", _check_unique_usernames),
+        CreateIndex("users", "idx_users_username", ["username"], unique=True),
+        RunPython("Hash the passwords stored in plaintext", _hash_passwords),
+    ]),
+]
+
+
+def ensure_version_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_version")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations(cursor):
+    done = applied_versions(cursor)
+    return [migration for migration in sorted(MIGRATIONS, key=lambda m: m[0]) if migration[0] not in done]
+
+
+def dry_run_migrations():
+    """Print the migrations migrate() would apply and their SQL; returns their
+    versions. Read-only: nothing is created, changed or committed, and a
+    database without schema_version (or, on SQLite, without a file) has every
+    migration due."""
+    migrations = sorted(MIGRATIONS, key=lambda m: m[0])
+    backend = get_backend()
+    conn = cursor = None
+    if backend.exists():
+        conn = get_connection()
+        cursor = conn.cursor(buffered=True)
+    try:
+        fresh = cursor is None or not backend.table_exists(cursor, "schema_version")
+        if not fresh:
+            migrations = pending_migrations(cursor)
+        for version, description, steps in migrations:
+            print(f"Would apply migration {version}: {description}")
+            for step in steps:
+                # On a fresh database the tables the checks read may not exist yet
+                if fresh or step.needed(cursor):
+                    print("    " + " ".join(step.sql.split()))
+        return [migration[0] for migration in migrations]
+    finally:
+        if cursor is not None:
+            cursor.close()
+            conn.rollback()
+            conn.close()
+
+
+def migrate(dry_run=False, verbose=False):
+    """Apply every pending migration in version order; returns the versions applied (or due, for dry_run)"""
+    if dry_run:
+        return dry_run_migrations()
+    conn = get_connection()
+    cursor = conn.cursor(buffered=True)
+    locked = False
+    try:
+        get_backend().create_schema(conn)
+        ensure_version_table(cursor)
+        conn.commit()
+        # Several workstations start at once: only one of them migrates
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        locked = cursor.fetchone()[0] == 1
+        if not locked:
+            raise RuntimeError("Timed out waiting for another client to finish migrating")
+
+        versions = []
+        for version, description, steps in pending_migrations(cursor):
+            if verbose:
+                print(f"Applying migration {version}: {description}")
+            for step in steps:
+                step.apply(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                (version, description)
+            )
+            conn.commit()
+            versions.append(version)
+        return versions
+    finally:
+        if locked:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            cursor.fetchall()
+        cursor.close()
+        conn.close()
+
+
+def migrate_on_startup():
+    """Bring the schema up to date at start-up, printing (not raising) any
+    failure; Login.py runs it off the Tk thread while logins wait"""
+    try:
+        applied = migrate()
+        if applied:
+            print(f"Applied schema migrations: {', '.join(map(str, applied))}")
+    except Exception as err:
+        print(f"Schema migration failed: {err}")
+
+
+if __name__ == "__main__":
+    if "--status" in sys.argv:
+        conn = get_connection()
+        cursor = conn.cursor(buffered=True)
+        ensure_version_table(cursor)
+        done = applied_versions(cursor)
+        for version, description, _ in MIGRATIONS:
+            print(f"{version:>4}  {'applied' if version in done else 'pending':8} {description}")
+        cursor.close()
+        conn.close()
+    else:
+        dry_run = "--dry-run" in sys.argv
+        applied = migrate(dry_run=dry_run, verbose=True)
+        if not applied:
+            print("Schema is up to date.")
@@ -1,14 +1,21 @@
 import customtkinter
 from tkinter import messagebox
-from db_connection import get_connection, log_action
+from db_connection import log_action, flush_audit_log
+from query_executor import FrameTasks, show_loading, take_placeholder
+from view_cache import ViewCache
+from virtual_table import VirtualTable, query_pages, PAGE_SIZE
+import date_ranges
+from dashboard_stats import get_dashboard_stats, invalidate_stats
+from pending_queue import get_pending_queue
+from patient_picker import PatientPicker
+from rollups import record_treatment, record_treatment_moved, record_emergency
 import datetime
 
 class NurseFrame(customtkinter.CTkFrame):
     def __init__(self, master, username):
         super().__init__(master)
         self.username = username
-        self.conn = get_connection()
-        self.cursor = self.conn.cursor(buffered=True)  # Fixed: Added buffered=True
+        self.tasks = FrameTasks(self)
         self.on_logout = None
 
         # Enhanced color scheme
@@ -35,6 +42,7 @@ class NurseFrame(customtkinter.CTkFrame):
         # Create main content area
         self.content = customtkinter.CTkFrame(self, fg_color=self.colors['light_gray'])
         self.content.grid(row=0, column=1, sticky="nsew", padx=10, pady=10)
+        self.views = ViewCache(self.content)
         
         # Show welcome screen
         self.show_welcome()
@@ -116,15 +124,19 @@ class NurseFrame(customtkinter.CTkFrame):
 
     def clear_content(self):
         """Clear main content area"""
-        for widget in self.content.winfo_children():
-            widget.destroy()
+        self.tasks.cancel_all()
+        self.views.clear()
 
     def show_welcome(self):
         """Enhanced welcome screen with statistics"""
-        self.clear_content()
+        self.tasks.cancel_all()
+        self.views.show("dashboard", self._build_welcome)
+
+    def _build_welcome(self, parent):
+        """Lay out the dashboard; returns the refresh that reloads its counts"""
         
         # Welcome header
-        welcome_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        welcome_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
         welcome_frame.pack(fill="x", padx=20, pady=20)
         
         customtkinter.CTkLabel(
@@ -142,58 +154,30 @@ class NurseFrame(customtkinter.CTkFrame):
         ).pack(anchor="w", pady=(5, 0))
         
         # Enhanced statistics cards
-        stats_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        stats_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
         stats_frame.pack(fill="x", padx=20, pady=20)
         
-        try:
-            # Fixed SQL queries
-            self.cursor.execute("SELECT COUNT(*) FROM patients")
-            total_patients = self.cursor.fetchone()[0]
-            
-            # Get pending patients (those without vitals today) - FIXED QUERY
-            self.cursor.execute("""
-                SELECT COUNT(DISTINCT p.patient_id) 
-                FROM patients p 
-                WHERE p.patient_id NOT IN (
-                    SELECT DISTINCT patient_id FROM treatments 
-                    WHERE DATE(date) = CURDATE() 
-                    AND (blood_pressure IS NOT NULL OR temperature IS NOT NULL OR weight IS NOT NULL)
-                )
-            """)
-            pending_patients = self.cursor.fetchone()[0]
-            
-            self.cursor.execute("SELECT COUNT(*) FROM treatments WHERE DATE(date) = CURDATE()")
-            today_vitals = self.cursor.fetchone()[0]
-            
-            # Fixed emergency query - check if table exists
-            try:
-                self.cursor.execute("SELECT COUNT(*) FROM patient_notes WHERE emergency = TRUE AND DATE(date) = CURDATE()")
-                today_emergencies = self.cursor.fetchone()[0]
-            except:
-                today_emergencies = 0
-                
-        except Exception as e:
-            print(f"Database error in dashboard: {e}")
-            total_patients = pending_patients = today_vitals = today_emergencies = 0
-        
-        # Statistics cards
+        # Statistics cards - counts arrive from a background query
         stats_data = [
-            ("Total Patients", total_patients, self.colors['info']),
-            ("Pending Patients", pending_patients, self.colors['warning']),
-            ("Vitals Recorded Today", today_vitals, self.colors['accent']),
-            ("Emergency Cases", today_emergencies, self.colors['danger'])
+            ("Total Patients", self.colors['info']),
+            ("Pending Patients", self.colors['warning']),
+            ("Vitals Recorded Today", self.colors['accent']),
+            ("Emergency Cases", self.colors['danger'])
         ]
         
-        for i, (title, value, color) in enumerate(stats_data):
+        value_labels = []
+        for i, (title, color) in enumerate(stats_data):
             card = customtkinter.CTkFrame(stats_frame, fg_color=color, width=150, height=100)
             card.grid(row=0, column=i, padx=10, pady=10, sticky="ew")
             
-            customtkinter.CTkLabel(
+            value_label = customtkinter.CTkLabel(
                 card,
-                text=str(value),
+                text="...",
                 font=("Arial", 24, "bold"),
                 text_color="white"
-            ).pack(pady=(20, 5))
+            )
+            value_label.pack(pady=(20, 5))
+            value_labels.append(value_label)
             
             customtkinter.CTkLabel(
                 card,
@@ -202,8 +186,23 @@ class NurseFrame(customtkinter.CTkFrame):
                 text_color="white"
             ).pack()
 
+        def show_stats(values):
+            for label, value in zip(value_labels, values):
+                label.configure(text=str(value))
+
+        def stats_loaded(stats):
+            show_stats([stats["total_patients"], stats["pending_vitals"],
+                        stats["treatments_today"], stats["emergencies_today"]])
+
+        def stats_error(e):
+            print(f"Database error in dashboard: {e}")
+            show_stats([0, 0, 0, 0])
+
+        def refresh():
+            get_dashboard_stats().load(self.tasks, stats_loaded, stats_error)
+
         # Quick actions
-        actions_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
+        actions_frame = customtkinter.CTkFrame(parent, fg_color=self.colors['white'])
         actions_frame.pack(fill="both", expand=True, padx=20, pady=20)
         
         customtkinter.CTkLabel(
@@ -235,12 +234,19 @@ class NurseFrame(customtkinter.CTkFrame):
             )
             btn.grid(row=i//2, column=i%2, padx=15, pady=10, sticky="ew")
 
+        refresh()
+        return refresh
+
     # FIXED: Show Pending Patients for Nurse
     def show_pending_patients(self):
         """Show patients who need nursing attention (vitals recording)"""
-        self.clear_content()
+        self.tasks.cancel_all()
+        self.views.show("pending", self._build_pending_patients)
+
+    def _build_pending_patients(self, parent):
+        """Lay out the pending patients page; returns the refresh that reloads the list"""
         
-        title_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        title_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
         title_frame.pack(fill="x", padx=20, pady=20)
         
         customtkinter.CTkLabel(
@@ -250,100 +256,108 @@ class NurseFrame(customtkinter.CTkFrame):
             text_color=self.colors['warning']
         ).pack(anchor="w")
         
-        try:
-            # FIXED: Simplified query that should work
-            self.cursor.execute("""
-                SELECT p.patient_id, p.name, p.gender, p.blood_type, p.date_registered
-                FROM patients p
-                WHERE p.patient_id NOT IN (
-                    SELECT DISTINCT patient_id FROM treatments 
-                    WHERE DATE(date) = CURDATE() 
-                    AND (blood_pressure IS NOT NULL OR temperature IS NOT NULL OR weight IS NOT NULL)
-                )
-                ORDER BY p.date_registered ASC
-            """)
-            pending = self.cursor.fetchall()
+        body = customtkinter.CTkFrame(parent, fg_color="transparent")
+        body.pack(fill="both", expand=True)
 
-            if not pending:
-                customtkinter.CTkLabel(
-                    self.content,
-                    text="Excellent! All patients have current vitals recorded today.",
-                    font=("Arial", 16),
-                    text_color=self.colors['accent']
-                ).pack(pady=50)
-                return
+        def refresh():
+            for widget in body.winfo_children():
+                widget.destroy()
+            loading = show_loading(body, "Loading pending patients...")
+
+            def load(cursor):
+                # Patients without vitals recorded today
+                return get_pending_queue().awaiting_vitals(cursor)
+
+            def render(pending):
+                if not take_placeholder(loading):
+                    return
+                if not pending:
+                    customtkinter.CTkLabel(
+                        body,
+                        text="Excellent! All patients have current vitals recorded today.",
+                        font=("Arial", 16),
+                        text_color=self.colors['accent']
+                    ).pack(pady=50)
+                    return
 
-            # Statistics
-            stats_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['warning'])
-            stats_frame.pack(fill="x", padx=20, pady=10)
+                # Statistics
+                stats_frame = customtkinter.CTkFrame(body, fg_color=self.colors['warning'])
+                stats_frame.pack(fill="x", padx=20, pady=10)
             
-            customtkinter.CTkLabel(
-                stats_frame,
-                text=f"NURSING PRIORITY: {len(pending)} patients need vitals recording",
-                font=("Arial", 16, "bold"),
-                text_color="white"
-            ).pack(pady=10)
+                customtkinter.CTkLabel(
+                    stats_frame,
+                    text=f"NURSING PRIORITY: {len(pending)} patients need vitals recording",
+                    font=("Arial", 16, "bold"),
+                    text_color="white"
+                ).pack(pady=10)
 
-            # Scrollable patient list
-            list_frame = customtkinter.CTkFrame(self.content)
-            list_frame.pack(fill="both", expand=True, padx=20, pady=10)
+                # Scrollable patient list
+                list_frame = customtkinter.CTkFrame(body)
+                list_frame.pack(fill="both", expand=True, padx=20, pady=10)
             
-            scroll_frame = customtkinter.CTkScrollableFrame(list_frame, height=400)
-            scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
+                scroll_frame = customtkinter.CTkScrollableFrame(list_frame, height=400)
+                scroll_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
-            # Header
-            header_frame = customtkinter.CTkFrame(scroll_frame, fg_color=self.colors['text_dark'])
-            header_frame.pack(fill="x", pady=(0, 5))
+                # Header
+                header_frame = customtkinter.CTkFrame(scroll_frame, fg_color=self.colors['text_dark'])
+                header_frame.pack(fill="x", pady=(0, 5))
             
-            headers = ["Patient ID", "Name", "Gender", "Blood Type", "Registered", "Action"]
-            widths = [80, 150, 80, 100, 120, 120]
+                headers = ["Patient ID", "Name", "Gender", "Blood Type", "Registered", "Action"]
+                widths = [80, 150, 80, 100, 120, 120]
             
-            for i, (header, width) in enumerate(zip(headers, widths)):
-                customtkinter.CTkLabel(
-                    header_frame, 
-                    text=header, 
-                    font=("Arial", 12, "bold"), 
-                    text_color="white",
-                    width=width
-                ).grid(row=0, column=i, padx=5, pady=10)
-
-            # Patient rows
-            for patient in pending:
-                patient_frame = customtkinter.CTkFrame(scroll_frame, fg_color="#ecf0f1")
-                patient_frame.pack(fill="x", pady=2)
+                for i, (header, width) in enumerate(zip(headers, widths)):
+                    customtkinter.CTkLabel(
+                        header_frame, 
+                        text=header, 
+                        font=("Arial", 12, "bold"), 
+                        text_color="white",
+                        width=width
+                    ).grid(row=0, column=i, padx=5, pady=10)
+
+                # Patient rows
+                for patient in pending:
+                    patient_frame = customtkinter.CTkFrame(scroll_frame, fg_color="#ecf0f1")
+                    patient_frame.pack(fill="x", pady=2)
                 
-                data = [
-                    patient[0], 
-                    patient[1][:15] + "..." if len(patient[1]) > 15 else patient[1], 
-                    patient[2], 
-                    patient[3], 
-                    str(patient[4]).split()[0] if patient[4] else 'N/A'
-                ]
+                    data = [
+                        patient[0], 
+                        patient[1][:15] + "..." if len(patient[1]) > 15 else patient[1], 
+                        patient[2], 
+                        patient[3], 
+                        str(patient[4]).split()[0] if patient[4] else 'N/A'
+                    ]
                 
-                for i, (value, width) in enumerate(zip(data, widths[:-1])):
-                    label = customtkinter.CTkLabel(
-                        patient_frame, 
-                        text=str(value), 
-                        width=width,
-                        font=("Arial", 11)
-                    )
-                    label.grid(row=0, column=i, padx=5, pady=8)
+                    for i, (value, width) in enumerate(zip(data, widths[:-1])):
+                        label = customtkinter.CTkLabel(
+                            patient_frame, 
+                            text=str(value), 
+                            width=width,
+                            font=("Arial", 11)
+                        )
+                        label.grid(row=0, column=i, padx=5, pady=8)
                 
-                # Action button
-                record_btn = customtkinter.CTkButton(
-                    patient_frame,
-                    text="Record Vitals",
-                    width=100,
-                    height=30,
-                    font=("Arial", 10, "bold"),
-                    fg_color=self.colors['accent'],
-                    command=lambda pid=patient[0], pname=patient[1]: self.quick_record_vitals(pid, pname)
-                )
-                record_btn.grid(row=0, column=5, padx=5, pady=5)
+                    # Action button
+                    record_btn = customtkinter.CTkButton(
+                        patient_frame,
+                        text="Record Vitals",
+                        width=100,
+                        height=30,
+                        font=("Arial", 10, "bold"),
+                        fg_color=self.colors['accent'],
+                        command=lambda pid=patient[0], pname=patient[1]: self.quick_record_vitals(pid, pname)
+                    )
+                    record_btn.grid(row=0, column=5, padx=5, pady=5)
 
-        except Exception as e:
-            print(f"Database error in show_pending_patients: {e}")
-            messagebox.showerror("Database Error", f"Error loading pending patients: {e}")
+            def on_error(e):
+                if not take_placeholder(loading):
+                    return
+                print(f"Database error in show_pending_patients: {e}")
+                messagebox.showerror("Database Error", f"Error loading pending patients: {e}")
+
+            self.tasks.run(load, render, on_error)
+
+        refresh()
+        return refresh
 
     def quick_record_vitals(self, patient_id, patient_name):
         """FIXED: Quick vitals recording interface for pending patients"""
@@ -456,14 +470,20 @@ class NurseFrame(customtkinter.CTkFrame):
                             messagebox.showerror("Error", "Weight must be between 1-500 kg")
                             return
                     
+                except ValueError:
+                    messagebox.showerror("Error", "Please enter valid numbers for temperature and weight.")
+                    return
+
+                def save(cursor):
                     # FIXED: Insert new treatment record with vitals
-                    self.cursor.execute("""
+                    cursor.execute("""
                         INSERT INTO treatments (patient_id, blood_pressure, temperature, weight, notes, date)
                         VALUES (%s, %s, %s, %s, %s, NOW())
                     """, (patient_id, bp if bp else None, temp_val, weight_val, notes if notes else None))
-                    
-                    self.conn.commit()
-                    
+                    record_treatment(cursor, None)
+
+                def saved(_):
+                    invalidate_stats("treatments")
                     messagebox.showinfo("Success", f"Vitals recorded successfully for {patient_name}!")
                     
                     # Log the action
@@ -474,12 +494,12 @@ class NurseFrame(customtkinter.CTkFrame):
                     
                     vitals_window.destroy()
                     self.show_pending_patients()  # Refresh the list
-                    
-                except ValueError:
-                    messagebox.showerror("Error", "Please enter valid numbers for temperature and weight.")
-                except Exception as err:
+
+                def on_error(err):
                     print(f"Database error saving vitals: {err}")
                     messagebox.showerror("Database Error", f"Error saving vitals: {str(err)}")
+
+                self.tasks.run(save, saved, on_error, cancellable=False)
             
             # Save button
             save_btn = customtkinter.CTkButton(
@@ -499,24 +519,18 @@ class NurseFrame(customtkinter.CTkFrame):
 
     def check_emergencies(self):
         """FIXED: Check for emergency cases"""
-        try:
-            # Check if patient_notes table exists
-            self.cursor.execute("SHOW TABLES LIKE 'patient_notes'")
-            table_exists = self.cursor.fetchone()
-            
-            if not table_exists:
-                messagebox.showinfo("No Emergency System", "Emergency notes system is not set up yet.")
-                return
-                
-            self.cursor.execute("""
+        def load(cursor):
+            noted_today, _ = date_ranges.today("n.date")
+            cursor.execute(f"""
                 SELECT n.patient_id, p.name, n.notes, n.date, n.author
                 FROM patient_notes n
                 JOIN patients p ON n.patient_id = p.patient_id
-                WHERE n.emergency=1 AND DATE(n.date) = CURDATE()
+                WHERE n.emergency=1 AND {noted_today}
                 ORDER BY n.date DESC
             """)
-            today_emergencies = self.cursor.fetchall()
-            
+            return cursor.fetchall()
+
+        def render(today_emergencies):
             if today_emergencies:
                 msg = "EMERGENCY ALERT - TODAY'S CASES!\n\n"
                 for patient_id, name, notes, date, author in today_emergencies:
@@ -530,11 +544,13 @@ class NurseFrame(customtkinter.CTkFrame):
                 self.show_emergency_cases()
             else:
                 messagebox.showinfo("No Emergencies", "No emergency cases reported today.")
-                
-        except Exception as e:
+
+        def on_error(e):
             print(f"Error checking emergencies: {e}")
             messagebox.showerror("Error", f"Error checking emergencies: {str(e)}")
 
+        self.tasks.run(load, render, on_error)
+
     # FIXED: Record vitals with better error handling
     def show_record_vitals(self):
         """FIXED: Record patient vitals with enhanced interface"""
@@ -562,146 +578,142 @@ class NurseFrame(customtkinter.CTkFrame):
         form_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
         form_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
-        # Get patients from database
-        try:
-            self.cursor.execute("SELECT patient_id, name FROM patients ORDER BY name")
-            patients = self.cursor.fetchall()
-        except Exception as e:
-            print(f"Error getting patients: {e}")
-            patients = []
+        loading = show_loading(form_frame, "Loading patients...")
 
-        if not patients:
+        def load(cursor):
+            # Get patients from database
+            cursor.execute("SELECT patient_id, name FROM patients ORDER BY name LIMIT 1")
+            return cursor.fetchall()
+
+        def render(patients):
+            if not take_placeholder(loading):
+                return
+
+            if not patients:
+                customtkinter.CTkLabel(
+                    form_frame,
+                    text="No patients found in database",
+                    font=("Arial", 16),
+                    text_color=self.colors['danger']
+                ).pack(pady=50)
+                return
+
+            # Patient selection
             customtkinter.CTkLabel(
                 form_frame,
-                text="No patients found in database",
-                font=("Arial", 16),
-                text_color=self.colors['danger']
-            ).pack(pady=50)
-            return
+                text="Select Patient:",
+                font=("Arial", 14, "bold"),
+                text_color=self.colors['text_dark']
+            ).pack(anchor="w", padx=20, pady=(20, 5))
 
-        # Patient selection
-        customtkinter.CTkLabel(
-            form_frame,
-            text="Select Patient:",
-            font=("Arial", 14, "bold"),
-            text_color=self.colors['text_dark']
-        ).pack(anchor="w", padx=20, pady=(20, 5))
-
-        patient_combo = customtkinter.CTkComboBox(
-            form_frame,
-            values=[f"{p[0]} - {p[1]}" for p in patients],
-            width=400,
-            height=35,
-            font=("Arial", 12)
-        )
-        patient_combo.pack(anchor="w", padx=20, pady=(0, 20))
-        if patients:
-            patient_combo.set(f"{patients[0][0]} - {patients[0][1]}")
+            patient_picker = PatientPicker(form_frame, self.tasks)
+            patient_picker.pack(anchor="w", padx=20, pady=(0, 20))
+            if patients:
+                patient_picker.set(patients[0][0], patients[0][1])
 
-        # SCROLLABLE VITALS FORM
-        vitals_scroll = customtkinter.CTkScrollableFrame(form_frame, height=400)
-        vitals_scroll.pack(fill="both", expand=True, padx=10, pady=10)
+            # SCROLLABLE VITALS FORM
+            vitals_scroll = customtkinter.CTkScrollableFrame(form_frame, height=400)
+            vitals_scroll.pack(fill="both", expand=True, padx=10, pady=10)
 
-        # Blood Pressure
-        customtkinter.CTkLabel(
-            vitals_scroll,
-            text="Blood Pressure (e.g., 120/80):",
-            font=("Arial", 12, "bold"),
-            text_color=self.colors['text_dark']
-        ).pack(anchor="w", padx=10, pady=(10, 0))
-        bp_entry = customtkinter.CTkEntry(
-            vitals_scroll,
-            placeholder_text="Enter blood pressure",
-            width=300,
-            height=35
-        )
-        bp_entry.pack(anchor="w", padx=10, pady=(5, 10))
+            # Blood Pressure
+            customtkinter.CTkLabel(
+                vitals_scroll,
+                text="Blood Pressure (e.g., 120/80):",
+                font=("Arial", 12, "bold"),
+                text_color=self.colors['text_dark']
+            ).pack(anchor="w", padx=10, pady=(10, 0))
+            bp_entry = customtkinter.CTkEntry(
+                vitals_scroll,
+                placeholder_text="Enter blood pressure",
+                width=300,
+                height=35
+            )
+            bp_entry.pack(anchor="w", padx=10, pady=(5, 10))
 
-        # Temperature
-        customtkinter.CTkLabel(
-            vitals_scroll,
-            text="Temperature (°C):",
-            font=("Arial", 12, "bold"),
-            text_color=self.colors['text_dark']
-        ).pack(anchor="w", padx=10, pady=(0, 0))
-        temp_entry = customtkinter.CTkEntry(
-            vitals_scroll,
-            placeholder_text="Enter temperature",
-            width=300,
-            height=35
-        )
-        temp_entry.pack(anchor="w", padx=10, pady=(5, 10))
+            # Temperature
+            customtkinter.CTkLabel(
+                vitals_scroll,
+                text="Temperature (°C):",
+                font=("Arial", 12, "bold"),
+                text_color=self.colors['text_dark']
+            ).pack(anchor="w", padx=10, pady=(0, 0))
+            temp_entry = customtkinter.CTkEntry(
+                vitals_scroll,
+                placeholder_text="Enter temperature",
+                width=300,
+                height=35
+            )
+            temp_entry.pack(anchor="w", padx=10, pady=(5, 10))
 
-        # Weight
-        customtkinter.CTkLabel(
-            vitals_scroll,
-            text="Weight (kg):",
-            font=("Arial", 12, "bold"),
-            text_color=self.colors['text_dark']
-        ).pack(anchor="w", padx=10, pady=(0, 0))
-        weight_entry = customtkinter.CTkEntry(
-            vitals_scroll,
-            placeholder_text="Enter weight",
-            width=300,
-            height=35
-        )
-        weight_entry.pack(anchor="w", padx=10, pady=(5, 10))
+            # Weight
+            customtkinter.CTkLabel(
+                vitals_scroll,
+                text="Weight (kg):",
+                font=("Arial", 12, "bold"),
+                text_color=self.colors['text_dark']
+            ).pack(anchor="w", padx=10, pady=(0, 0))
+            weight_entry = customtkinter.CTkEntry(
+                vitals_scroll,
+                placeholder_text="Enter weight",
+                width=300,
+                height=35
+            )
+            weight_entry.pack(anchor="w", padx=10, pady=(5, 10))
 
-        # Additional Notes
-        customtkinter.CTkLabel(
-            vitals_scroll,
-            text="Additional Notes:",
-            font=("Arial", 12, "bold"),
-            text_color=self.colors['text_dark']
-        ).pack(anchor="w", padx=10, pady=(10, 0))
-        notes_text = customtkinter.CTkTextbox(
-            vitals_scroll,
-            height=80,
-            font=("Arial", 11)
-        )
-        notes_text.pack(anchor="w", padx=10, pady=(5, 20))
-
-        # Mode selection
-        mode_var = customtkinter.StringVar(value="add")
-        mode_frame = customtkinter.CTkFrame(vitals_scroll, fg_color="transparent")
-        mode_frame.pack(anchor="w", padx=10, pady=10)
-        add_radio = customtkinter.CTkRadioButton(
-            mode_frame,
-            text="Add New Record",
-            variable=mode_var,
-            value="add"
-        )
-        add_radio.pack(side="left", padx=(0, 20))
-        update_radio = customtkinter.CTkRadioButton(
-            mode_frame,
-            text="Update Latest Record",
-            variable=mode_var,
-            value="update"
-        )
-        update_radio.pack(side="left")
+            # Additional Notes
+            customtkinter.CTkLabel(
+                vitals_scroll,
+                text="Additional Notes:",
+                font=("Arial", 12, "bold"),
+                text_color=self.colors['text_dark']
+            ).pack(anchor="w", padx=10, pady=(10, 0))
+            notes_text = customtkinter.CTkTextbox(
+                vitals_scroll,
+                height=80,
+                font=("Arial", 11)
+            )
+            notes_text.pack(anchor="w", padx=10, pady=(5, 20))
+
+            # Mode selection
+            mode_var = customtkinter.StringVar(value="add")
+            mode_frame = customtkinter.CTkFrame(vitals_scroll, fg_color="transparent")
+            mode_frame.pack(anchor="w", padx=10, pady=10)
+            add_radio = customtkinter.CTkRadioButton(
+                mode_frame,
+                text="Add New Record",
+                variable=mode_var,
+                value="add"
+            )
+            add_radio.pack(side="left", padx=(0, 20))
+            update_radio = customtkinter.CTkRadioButton(
+                mode_frame,
+                text="Update Latest Record",
+                variable=mode_var,
+                value="update"
+            )
+            update_radio.pack(side="left")
 
-        # FIXED: Save button with proper error handling
-        def save_vitals():
-            selection = patient_combo.get()
-            if not selection:
-                messagebox.showerror("Error", "Please select a patient")
-                return
+            # FIXED: Save button with proper error handling
+            def save_vitals():
+                selection = patient_picker.selected()
+                if not selection:
+                    messagebox.showerror("Error", "Please select a patient")
+                    return
             
-            try:
-                patient_id = selection.split(" - ")[0].strip()
+                patient_id = selection[0]
                 bp = bp_entry.get().strip()
                 temp = temp_entry.get().strip()
                 weight = weight_entry.get().strip()
                 notes = notes_text.get("1.0", "end-1c").strip()
-                
+            
                 if not any([bp, temp, weight]):
                     messagebox.showerror("Error", "Please enter at least one vital sign")
                     return
-                
+            
                 # Validate numeric inputs
                 temp_val = None
                 weight_val = None
-                
+            
                 if temp:
                     try:
                         temp_val = float(temp)
@@ -711,7 +723,7 @@ class NurseFrame(customtkinter.CTkFrame):
                     except ValueError:
                         messagebox.showerror("Error", "Please enter a valid temperature")
                         return
-                
+            
                 if weight:
                     try:
                         weight_val = float(weight)
@@ -721,63 +733,77 @@ class NurseFrame(customtkinter.CTkFrame):
                     except ValueError:
                         messagebox.showerror("Error", "Please enter a valid weight")
                         return
-                
-                if mode_var.get() == "add":
-                    self.cursor.execute("""
-                        INSERT INTO treatments (patient_id, blood_pressure, temperature, weight, notes, date)
-                        VALUES (%s, %s, %s, %s, %s, NOW())
-                    """, (patient_id, bp if bp else None, temp_val, weight_val, notes if notes else None))
-                    message = "Vitals recorded successfully!"
-                    log_message = f"Added vitals for patient ID: {patient_id}"
-                else:
+            
+                update_mode = mode_var.get() != "add"
+
+                def save(cursor):
+                    if not update_mode:
+                        cursor.execute("""
+                            INSERT INTO treatments (patient_id, blood_pressure, temperature, weight, notes, date)
+                            VALUES (%s, %s, %s, %s, %s, NOW())
+                        """, (patient_id, bp if bp else None, temp_val, weight_val, notes if notes else None))
+                        record_treatment(cursor, None)
+                        return "Vitals recorded successfully!", f"Added vitals for patient ID: {patient_id}"
                     # Update mode
-                    self.cursor.execute("""
+                    cursor.execute("""
                         SELECT treatment_id FROM treatments 
                         WHERE patient_id = %s 
                         ORDER BY date DESC LIMIT 1
                     """, (patient_id,))
-                    result = self.cursor.fetchone()
+                    result = cursor.fetchone()
                     if not result:
-                        messagebox.showerror("Error", "No previous record found to update")
-                        return
-                    self.cursor.execute("""
+                        return None
+                    record_treatment_moved(cursor, result[0])
+                    cursor.execute("""
                         UPDATE treatments 
                         SET blood_pressure = %s, temperature = %s, weight = %s, notes = %s, date = NOW()
                         WHERE treatment_id = %s
                     """, (bp if bp else None, temp_val, weight_val, notes if notes else None, result[0]))
-                    message = "Latest vitals updated successfully!"
-                    log_message = f"Updated vitals for patient ID: {patient_id}"
-                
-                self.conn.commit()
-                messagebox.showinfo("Success", message)
-                
-                # Log the action
-                try:
-                    log_action(self.username, "Nurse", log_message)
-                except Exception as log_err:
-                    print(f"Logging error: {log_err}")
+                    return "Latest vitals updated successfully!", f"Updated vitals for patient ID: {patient_id}"
+
+                def saved(outcome):
+                    if outcome is None:
+                        messagebox.showerror("Error", "No previous record found to update")
+                        return
+                    message, log_message = outcome
+                    invalidate_stats("treatments")
+                    messagebox.showinfo("Success", message)
                 
-                # Clear form
-                bp_entry.delete(0, 'end')
-                temp_entry.delete(0, 'end')
-                weight_entry.delete(0, 'end')
-                notes_text.delete("1.0", "end")
+                    # Log the action
+                    try:
+                        log_action(self.username, "Nurse", log_message)
+                    except Exception as log_err:
+                        print(f"Logging error: {log_err}")
                 
-            except Exception as e:
-                print(f"Database error saving vitals: {e}")
-                messagebox.showerror("Database Error", f"Error saving vitals: {str(e)}")
-
-        save_button = customtkinter.CTkButton(
-            vitals_scroll,
-            text="Save Vitals",
-            command=save_vitals,
-            height=50,
-            width=250,
-            font=("Arial", 14, "bold"),
-            fg_color=self.colors['accent'],
-            hover_color="#219a52"
-        )
-        save_button.pack(pady=30)
+                    # Clear form
+                    bp_entry.delete(0, 'end')
+                    temp_entry.delete(0, 'end')
+                    weight_entry.delete(0, 'end')
+                    notes_text.delete("1.0", "end")
+
+                def on_error(e):
+                    print(f"Database error saving vitals: {e}")
+                    messagebox.showerror("Database Error", f"Error saving vitals: {str(e)}")
+
+                self.tasks.run(save, saved, on_error, cancellable=False)
+
+            save_button = customtkinter.CTkButton(
+                vitals_scroll,
+                text="Save Vitals",
+                command=save_vitals,
+                height=50,
+                width=250,
+                font=("Arial", 14, "bold"),
+                fg_color=self.colors['accent'],
+                hover_color="#219a52"
+            )
+            save_button.pack(pady=30)
+
+        def on_error(e):
+            print(f"Error getting patients: {e}")
+            render([])
+
+        self.tasks.run(load, render, on_error)
 
     def show_view_vitals(self):
         """View patient vitals with enhanced interface"""
@@ -793,188 +819,201 @@ class NurseFrame(customtkinter.CTkFrame):
             text_color=self.colors['text_dark']
         ).pack(anchor="w")
 
-        # Get patients
-        try:
-            self.cursor.execute("SELECT patient_id, name FROM patients ORDER BY name")
-            patients = self.cursor.fetchall()
-        except Exception as e:
-            print(f"Error getting patients for view: {e}")
-            patients = []
+        loading = show_loading(self.content, "Loading patients...")
 
-        if not patients:
-            customtkinter.CTkLabel(
-                self.content,
-                text="No patients found",
-                font=("Arial", 16),
-                text_color=self.colors['danger']
-            ).pack(pady=50)
-            return
+        def load(cursor):
+            # Get patients
+            cursor.execute("SELECT patient_id, name FROM patients ORDER BY name LIMIT 1")
+            return cursor.fetchall()
 
-        # Patient selection
-        selection_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
-        selection_frame.pack(fill="x", padx=20, pady=20)
+        def render(patients):
+            if not take_placeholder(loading):
+                return
 
-        customtkinter.CTkLabel(
-            selection_frame,
-            text="Select Patient:",
-            font=("Arial", 14, "bold"),
-            text_color=self.colors['text_dark']
-        ).pack(anchor="w", padx=20, pady=(20, 5))
-
-        patient_combo = customtkinter.CTkComboBox(
-            selection_frame,
-            values=[f"{p[0]} - {p[1]}" for p in patients],
-            width=400,
-            height=35,
-            command=lambda _: show_patient_vitals()
-        )
-        patient_combo.pack(anchor="w", padx=20, pady=(0, 20))
+            if not patients:
+                customtkinter.CTkLabel(
+                    self.content,
+                    text="No patients found",
+                    font=("Arial", 16),
+                    text_color=self.colors['danger']
+                ).pack(pady=50)
+                return
 
-        # Display area for vitals
-        display_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['light_gray'])
-        display_frame.pack(fill="both", expand=True, padx=20, pady=20)
+            # Patient selection
+            selection_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
+            selection_frame.pack(fill="x", padx=20, pady=20)
 
-        def show_patient_vitals():
-            """Display selected patient's vitals"""
-            # Clear display area
-            for widget in display_frame.winfo_children():
-                widget.destroy()
+            customtkinter.CTkLabel(
+                selection_frame,
+                text="Select Patient:",
+                font=("Arial", 14, "bold"),
+                text_color=self.colors['text_dark']
+            ).pack(anchor="w", padx=20, pady=(20, 5))
 
-            selection = patient_combo.get()
-            if not selection:
-                return
+            patient_picker = PatientPicker(
+                selection_frame,
+                self.tasks,
+                on_select=lambda pid, name: show_patient_vitals()
+            )
+            patient_picker.pack(anchor="w", padx=20, pady=(0, 20))
+
+            # Display area for vitals
+            display_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['light_gray'])
+            display_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
-            patient_id = selection.split(" - ")[0]
-            patient_name = selection.split(" - ")[1]
+            def show_patient_vitals():
+                """Display selected patient's vitals"""
+                # Clear display area
+                for widget in display_frame.winfo_children():
+                    widget.destroy()
 
-            # Patient header
-            header_frame = customtkinter.CTkFrame(display_frame, fg_color=self.colors['primary'])
-            header_frame.pack(fill="x", padx=20, pady=20)
+                selection = patient_picker.selected()
+                if not selection:
+                    return
+
+                patient_id, patient_name = selection
+
+                # Patient header
+                header_frame = customtkinter.CTkFrame(display_frame, fg_color=self.colors['primary'])
+                header_frame.pack(fill="x", padx=20, pady=20)
             
-            customtkinter.CTkLabel(
-                header_frame,
-                text=f"Patient: {patient_name} (ID: {patient_id})",
-                font=("Arial", 16, "bold"),
-                text_color="white"
-            ).pack(pady=15)
+                customtkinter.CTkLabel(
+                    header_frame,
+                    text=f"Patient: {patient_name} (ID: {patient_id})",
+                    font=("Arial", 16, "bold"),
+                    text_color="white"
+                ).pack(pady=15)
 
-            try:
-                # Get all vitals for this patient
-                self.cursor.execute("""
+                loading = show_loading(display_frame, "Loading vitals...")
+
+                query = """
                     SELECT blood_pressure, temperature, weight, notes, date
                     FROM treatments 
                     WHERE patient_id = %s AND (blood_pressure IS NOT NULL OR temperature IS NOT NULL OR weight IS NOT NULL)
                     ORDER BY date DESC
-                """, (patient_id,))
-                
-                vitals = self.cursor.fetchall()
+                """
 
-                if not vitals:
-                    customtkinter.CTkLabel(
-                        display_frame,
-                        text="No vitals recorded for this patient",
-                        font=("Arial", 14),
-                        text_color=self.colors['text_dark']
-                    ).pack(pady=20)
-                    return
+                def load_vitals(cursor):
+                    # Latest record plus the first page of history; older pages load on scroll
+                    cursor.execute(query + " LIMIT %s", (patient_id, PAGE_SIZE + 1))
+                    return cursor.fetchall()
 
-                # Show latest vitals first
-                latest = vitals[0]
-                latest_frame = customtkinter.CTkFrame(display_frame, fg_color=self.colors['white'])
-                latest_frame.pack(fill="x", padx=20, pady=10)
+                def render_vitals(vitals):
+                    if not take_placeholder(loading):
+                        return
+                    if not vitals:
+                        customtkinter.CTkLabel(
+                            display_frame,
+                            text="No vitals recorded for this patient",
+                            font=("Arial", 14),
+                            text_color=self.colors['text_dark']
+                        ).pack(pady=20)
+                        return
+
+                    # Show latest vitals first
+                    latest = vitals[0]
+                    latest_frame = customtkinter.CTkFrame(display_frame, fg_color=self.colors['white'])
+                    latest_frame.pack(fill="x", padx=20, pady=10)
 
-                customtkinter.CTkLabel(
-                    latest_frame,
-                    text="Latest Vitals:",
-                    font=("Arial", 14, "bold"),
-                    text_color=self.colors['text_dark']
-                ).pack(anchor="w", padx=20, pady=(15, 10))
-
-                # Display each vital sign
-                vital_info = []
-                if latest[0]:  # Blood pressure
-                    vital_info.append(f"Blood Pressure: {latest[0]}")
-                if latest[1]:  # Temperature
-                    vital_info.append(f"Temperature: {latest[1]}°C")
-                if latest[2]:  # Weight
-                    vital_info.append(f"Weight: {latest[2]} kg")
-
-                for info in vital_info:
                     customtkinter.CTkLabel(
                         latest_frame,
-                        text=info,
-                        font=("Arial", 12),
+                        text="Latest Vitals:",
+                        font=("Arial", 14, "bold"),
                         text_color=self.colors['text_dark']
-                    ).pack(anchor="w", padx=20, pady=2)
+                    ).pack(anchor="w", padx=20, pady=(15, 10))
 
-                if latest[3]:  # Notes
-                    customtkinter.CTkLabel(
-                        latest_frame,
-                        text=f"Notes: {latest[3]}",
-                        font=("Arial", 12),
-                        text_color=self.colors['text_dark'],
-                        wraplength=400
-                    ).pack(anchor="w", padx=20, pady=(5, 10))
+                    # Display each vital sign
+                    vital_info = []
+                    if latest[0]:  # Blood pressure
+                        vital_info.append(f"Blood Pressure: {latest[0]}")
+                    if latest[1]:  # Temperature
+                        vital_info.append(f"Temperature: {latest[1]}°C")
+                    if latest[2]:  # Weight
+                        vital_info.append(f"Weight: {latest[2]} kg")
 
-                customtkinter.CTkLabel(
-                    latest_frame,
-                    text=f"Date: {latest[4]}",
-                    font=("Arial", 11, "italic"),
-                    text_color="#7f8c8d"
-                ).pack(anchor="w", padx=20, pady=(0, 15))
+                    for info in vital_info:
+                        customtkinter.CTkLabel(
+                            latest_frame,
+                            text=info,
+                            font=("Arial", 12),
+                            text_color=self.colors['text_dark']
+                        ).pack(anchor="w", padx=20, pady=2)
 
-                # Show history if more than one record
-                if len(vitals) > 1:
-                    history_frame = customtkinter.CTkFrame(display_frame, fg_color=self.colors['white'])
-                    history_frame.pack(fill="both", expand=True, padx=20, pady=10)
+                    if latest[3]:  # Notes
+                        customtkinter.CTkLabel(
+                            latest_frame,
+                            text=f"Notes: {latest[3]}",
+                            font=("Arial", 12),
+                            text_color=self.colors['text_dark'],
+                            wraplength=400
+                        ).pack(anchor="w", padx=20, pady=(5, 10))
 
                     customtkinter.CTkLabel(
-                        history_frame,
-                        text="Vitals History:",
-                        font=("Arial", 14, "bold"),
-                        text_color=self.colors['text_dark']
-                    ).pack(anchor="w", padx=20, pady=(15, 10))
+                        latest_frame,
+                        text=f"Date: {latest[4]}",
+                        font=("Arial", 11, "italic"),
+                        text_color="#7f8c8d"
+                    ).pack(anchor="w", padx=20, pady=(0, 15))
 
-                    # Create scrollable area for history
-                    history_scroll = customtkinter.CTkScrollableFrame(history_frame, height=200)
-                    history_scroll.pack(fill="both", expand=True, padx=20, pady=(0, 20))
-
-                    for vital in vitals[1:]:  # Skip the first one (already shown as latest)
-                        record_frame = customtkinter.CTkFrame(history_scroll, fg_color=self.colors['light_green'])
-                        record_frame.pack(fill="x", pady=5)
-
-                        # Build record text
-                        record_text = f"Date: {vital[4]}\n"
-                        if vital[0]: record_text += f"BP: {vital[0]} | "
-                        if vital[1]: record_text += f"Temp: {vital[1]}°C | "
-                        if vital[2]: record_text += f"Weight: {vital[2]}kg"
-                        
-                        record_text = record_text.rstrip(" | ")
-                        
-                        if vital[3]:  # Notes
-                            record_text += f"\nNotes: {vital[3]}"
+                    # Show history if more than one record
+                    if len(vitals) > 1:
+                        history_frame = customtkinter.CTkFrame(display_frame, fg_color=self.colors['white'])
+                        history_frame.pack(fill="both", expand=True, padx=20, pady=10)
 
                         customtkinter.CTkLabel(
-                            record_frame,
-                            text=record_text,
-                            font=("Arial", 11),
-                            justify="left",
+                            history_frame,
+                            text="Vitals History:",
+                            font=("Arial", 14, "bold"),
                             text_color=self.colors['text_dark']
-                        ).pack(anchor="w", padx=15, pady=10)
+                        ).pack(anchor="w", padx=20, pady=(15, 10))
+
+                        def format_vital(vital):
+                            notes = str(vital[3]) if vital[3] else "-"
+                            return [
+                                vital[4],
+                                vital[0] or "-",
+                                f"{vital[1]}°C" if vital[1] else "-",
+                                f"{vital[2]}kg" if vital[2] else "-",
+                                notes[:50] + "..." if len(notes) > 50 else notes
+                            ]
+
+                        # History starts after the latest record, so shift every page by one
+                        fetch_history = query_pages(self.tasks, query, (patient_id,))
+                        VirtualTable(
+                            history_frame,
+                            columns=[("Date", 150), ("BP", 80), ("Temp", 70), ("Weight", 70), ("Notes", 300)],
+                            rows=vitals[1:],
+                            fetch_page=lambda offset, limit, done, failed: fetch_history(offset + 1, limit, done, failed),
+                            format_row=format_vital,
+                            height=200,
+                            header_color=self.colors['primary'],
+                            row_colors=(self.colors['light_green'], self.colors['white']),
+                            font=("Arial", 11)
+                        ).pack(fill="both", expand=True, padx=20, pady=(0, 20))
+
+                def vitals_error(e):
+                    if not take_placeholder(loading):
+                        return
+                    print(f"Error loading patient vitals: {e}")
+                    customtkinter.CTkLabel(
+                        display_frame,
+                        text=f"Error loading vitals: {str(e)}",
+                        font=("Arial", 12),
+                        text_color=self.colors['danger']
+                    ).pack(pady=20)
 
-            except Exception as e:
-                print(f"Error loading patient vitals: {e}")
-                customtkinter.CTkLabel(
-                    display_frame,
-                    text=f"Error loading vitals: {str(e)}",
-                    font=("Arial", 12),
-                    text_color=self.colors['danger']
-                ).pack(pady=20)
+                self.tasks.run(load_vitals, render_vitals, vitals_error)
+
+            # Show first patient by default
+            if patients:
+                patient_picker.set(patients[0][0], patients[0][1])
+                show_patient_vitals()
+
+        def on_error(e):
+            print(f"Error getting patients for view: {e}")
+            render([])
 
-        # Show first patient by default
-        if patients:
-            patient_combo.set(f"{patients[0][0]} - {patients[0][1]}")
-            show_patient_vitals()
+        self.tasks.run(load, render, on_error)
 
     def show_patient_notes(self):
         """Enhanced patient notes interface"""
@@ -990,135 +1029,127 @@ class NurseFrame(customtkinter.CTkFrame):
             text_color=self.colors['text_dark']
         ).pack(anchor="w")
 
-        # Get patients
-        try:
-            self.cursor.execute("SELECT patient_id, name FROM patients ORDER BY name")
-            patients = self.cursor.fetchall()
-        except Exception as e:
-            print(f"Error getting patients for notes: {e}")
-            patients = []
+        loading = show_loading(self.content, "Loading patients...")
 
-        if not patients:
-            customtkinter.CTkLabel(
-                self.content,
-                text="No patients found",
-                font=("Arial", 16),
-                text_color=self.colors['danger']
-            ).pack(pady=50)
-            return
+        def load(cursor):
+            # Get patients
+            cursor.execute("SELECT patient_id, name FROM patients ORDER BY name LIMIT 1")
+            return cursor.fetchall()
 
-        # Check if patient_notes table exists, if not create it
-        try:
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS patient_notes (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    patient_id INT,
-                    notes TEXT,
-                    author VARCHAR(100),
-                    date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    emergency BOOLEAN DEFAULT FALSE,
-                    FOREIGN KEY (patient_id) REFERENCES patients(patient_id)
-                )
-            """)
-            self.conn.commit()
-        except Exception as e:
-            print(f"Error creating patient_notes table: {e}")
+        def render(patients):
+            if not take_placeholder(loading):
+                return
 
-        # Form frame
-        form_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
-        form_frame.pack(fill="both", expand=True, padx=20, pady=20)
+            if not patients:
+                customtkinter.CTkLabel(
+                    self.content,
+                    text="No patients found",
+                    font=("Arial", 16),
+                    text_color=self.colors['danger']
+                ).pack(pady=50)
+                return
 
-        # Patient selection
-        customtkinter.CTkLabel(
-            form_frame,
-            text="Select Patient:",
-            font=("Arial", 14, "bold"),
-            text_color=self.colors['text_dark']
-        ).pack(anchor="w", padx=20, pady=(20, 5))
+            # Form frame
+            form_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
+            form_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
-        patient_combo = customtkinter.CTkComboBox(
-            form_frame,
-            values=[f"{p[0]} - {p[1]}" for p in patients],
-            width=400,
-            height=35
-        )
-        patient_combo.pack(anchor="w", padx=20, pady=(0, 20))
+            # Patient selection
+            customtkinter.CTkLabel(
+                form_frame,
+                text="Select Patient:",
+                font=("Arial", 14, "bold"),
+                text_color=self.colors['text_dark']
+            ).pack(anchor="w", padx=20, pady=(20, 5))
 
-        # Notes input
-        customtkinter.CTkLabel(
-            form_frame,
-            text="Write Notes:",
-            font=("Arial", 14, "bold"),
-            text_color=self.colors['text_dark']
-        ).pack(anchor="w", padx=20, pady=(10, 5))
+            patient_picker = PatientPicker(form_frame, self.tasks)
+            patient_picker.pack(anchor="w", padx=20, pady=(0, 20))
 
-        notes_text = customtkinter.CTkTextbox(
-            form_frame,
-            height=120,
-            width=500,
-            font=("Arial", 11)
-        )
-        notes_text.pack(anchor="w", padx=20, pady=(0, 20))
-
-        # Emergency checkbox
-        emergency_var = customtkinter.BooleanVar()
-        emergency_check = customtkinter.CTkCheckBox(
-            form_frame,
-            text="Mark as Emergency",
-            variable=emergency_var,
-            font=("Arial", 12, "bold"),
-            text_color=self.colors['danger']
-        )
-        emergency_check.pack(anchor="w", padx=20, pady=10)
+            # Notes input
+            customtkinter.CTkLabel(
+                form_frame,
+                text="Write Notes:",
+                font=("Arial", 14, "bold"),
+                text_color=self.colors['text_dark']
+            ).pack(anchor="w", padx=20, pady=(10, 5))
+
+            notes_text = customtkinter.CTkTextbox(
+                form_frame,
+                height=120,
+                width=500,
+                font=("Arial", 11)
+            )
+            notes_text.pack(anchor="w", padx=20, pady=(0, 20))
+
+            # Emergency checkbox
+            emergency_var = customtkinter.BooleanVar()
+            emergency_check = customtkinter.CTkCheckBox(
+                form_frame,
+                text="Mark as Emergency",
+                variable=emergency_var,
+                font=("Arial", 12, "bold"),
+                text_color=self.colors['danger']
+            )
+            emergency_check.pack(anchor="w", padx=20, pady=10)
 
-        # Save button
-        def save_notes():
-            selection = patient_combo.get()
-            notes = notes_text.get("1.0", "end-1c").strip()
+            # Save button
+            def save_notes():
+                selection = patient_picker.selected()
+                notes = notes_text.get("1.0", "end-1c").strip()
             
-            if not selection or not notes:
-                messagebox.showerror("Error", "Please select a patient and write a note")
-                return
+                if not selection or not notes:
+                    messagebox.showerror("Error", "Please select a patient and write a note")
+                    return
             
-            patient_id = selection.split(" - ")[0]
+                patient_id = selection[0]
+                emergency = emergency_var.get()
             
-            try:
-                self.cursor.execute("""
-                    INSERT INTO patient_notes (patient_id, notes, author, date, emergency)
-                    VALUES (%s, %s, %s, NOW(), %s)
-                """, (patient_id, notes, self.username, emergency_var.get()))
-                
-                self.conn.commit()
+                def save(cursor):
+                    cursor.execute("""
+                        INSERT INTO patient_notes (patient_id, notes, author, date, emergency)
+                        VALUES (%s, %s, %s, NOW(), %s)
+                    """, (patient_id, notes, self.username, emergency))
+                    if emergency:
+                        record_emergency(cursor)
+
+                def saved(_):
+                    invalidate_stats("patient_notes")
+                    if emergency:
+                        messagebox.showwarning("Emergency Notes Saved", 
+                            "EMERGENCY notes saved successfully!\nAll medical staff will be notified.")
+                    else:
+                        messagebox.showinfo("Success", "Notes saved successfully!")
                 
-                if emergency_var.get():
-                    messagebox.showwarning("Emergency Notes Saved", 
-                        "EMERGENCY notes saved successfully!\nAll medical staff will be notified.")
-                else:
-                    messagebox.showinfo("Success", "Notes saved successfully!")
+                    # Clear form
+                    notes_text.delete("1.0", "end")
+                    emergency_var.set(False)
                 
-                # Clear form
-                notes_text.delete("1.0", "end")
-                emergency_var.set(False)
-                
-                try:
-                    log_action(self.username, "Nurse", f"Added {'EMERGENCY' if emergency_var.get() else ''} notes for patient ID: {patient_id}")
-                except Exception as log_err:
-                    print(f"Logging error: {log_err}")
-                    
-            except Exception as e:
-                print(f"Error saving notes: {e}")
-                messagebox.showerror("Error", f"Error saving notes: {str(e)}")
+                    try:
+                        log_action(self.username, "Nurse", f"Added {'EMERGENCY' if emergency else ''} notes for patient ID: {patient_id}")
+                    except Exception as log_err:
+                        print(f"Logging error: {log_err}")
 
-        save_btn = customtkinter.CTkButton(
-            form_frame,
-            text="Save Notes",
-            command=save_notes,
-            height=45,
-            width=200,
-            font=("Arial", 14, "bold"),
-            fg_color=self.colors['accent']
-        )
-        save_btn.pack(pady=20)
+                def on_error(e):
+                    print(f"Error saving notes: {e}")
+                    messagebox.showerror("Error", f"Error saving notes: {str(e)}")
+
+                self.tasks.run(save, saved, on_error, cancellable=False)
+
+            save_btn = customtkinter.CTkButton(
+                form_frame,
+                text="Save Notes",
+                command=save_notes,
+                height=45,
+                width=200,
+                font=("Arial", 14, "bold"),
+                fg_color=self.colors['accent']
+            )
+            save_btn.pack(pady=20)
+
+        def on_error(e):
+            print(f"Error getting patients for notes: {e}")
+            render([])
+
+        self.tasks.run(load, render, on_error)
 
     def show_emergency_cases(self):
         """Enhanced emergency cases display"""
@@ -1138,21 +1169,10 @@ class NurseFrame(customtkinter.CTkFrame):
         emergency_frame = customtkinter.CTkFrame(self.content, fg_color=self.colors['white'])
         emergency_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
-        try:
-            # Check if table exists first
-            self.cursor.execute("SHOW TABLES LIKE 'patient_notes'")
-            table_exists = self.cursor.fetchone()
-            
-            if not table_exists:
-                customtkinter.CTkLabel(
-                    emergency_frame,
-                    text="Emergency notes system is not set up yet.\nUse 'Patient Notes' to create emergency notes first.",
-                    font=("Arial", 16),
-                    text_color=self.colors['info']
-                ).pack(pady=50)
-                return
-            
-            self.cursor.execute("""
+        loading = show_loading(emergency_frame, "Loading emergency cases...")
+
+        def load(cursor):
+            cursor.execute("""
                 SELECT pn.notes, pn.date, p.name, p.patient_id, pn.author
                 FROM patient_notes pn
                 JOIN patients p ON pn.patient_id = p.patient_id
@@ -1161,8 +1181,11 @@ class NurseFrame(customtkinter.CTkFrame):
                 LIMIT 20
             """)
             
-            emergencies = self.cursor.fetchall()
+            return cursor.fetchall()
 
+        def render(emergencies):
+            if not take_placeholder(loading):
+                return
             if emergencies:
                 # Statistics
                 import datetime
@@ -1229,7 +1252,9 @@ class NurseFrame(customtkinter.CTkFrame):
                     text_color=self.colors['accent']
                 ).pack(pady=50)
 
-        except Exception as e:
+        def on_error(e):
+            if not take_placeholder(loading):
+                return
             print(f"Error loading emergency cases: {e}")
             customtkinter.CTkLabel(
                 emergency_frame,
@@ -1238,6 +1263,8 @@ class NurseFrame(customtkinter.CTkFrame):
                 text_color=self.colors['danger']
             ).pack(pady=50)
 
+        self.tasks.run(load, render, on_error)
+
     def logout(self):
         """Enhanced logout with confirmation"""
         result = messagebox.askyesno(
@@ -1247,10 +1274,13 @@ class NurseFrame(customtkinter.CTkFrame):
         if result:
             try:
                 log_action(self.username, "Nurse", "Logged out from nursing system")
-                self.conn.close()
+                self.tasks.cancel_all()
+                flush_audit_log()
             except Exception as e:
                 print(f"Logout error: {e}")
             messagebox.showinfo("Goodbye", f"Thank you for your dedication, Nurse {self.username}!")
-            self.master.destroy()
+            # The application window tears this frame down and shows the login page
             if self.on_logout:
-                self.on_logout()
\ No newline at end of file
+                self.on_logout()
+            else:
+                self.master.destroy()
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""Parallel per-table dump and restore for disaster recovery drills.
+
+    python parallel_backup.py dump [--jobs 4] [--dir ~/hospital_backups] [--compression gzip|zstd]
+    python parallel_backup.py restore BACKUP [--jobs 4] [--yes]
+
+Both work on the configured database (HOSPITAL_DB_BACKEND / HOSPITAL_DB_PATH)
+and use the backup format of backup.py, so backups taken from the admin page
+restore here and the other way round.
+
+dump: every worker process opens its own snapshot while the coordinator
+briefly holds off writers (FLUSH TABLES WITH READ LOCK on MySQL, the write
+lock on SQLite), so all tables are dumped as of the same moment. Tables are
+handed out largest first.
+
+restore: each worker recreates its table without the secondary indexes,
+bulk loads it with multi-row INSERTs (FK and unique checks off, a commit
+every COMMIT_ROWS rows), then builds the indexes in one pass. The
+increments of an incremental chain are replayed after the base, in order.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from backup import (
+    BACKUP_DIR, LOCAL_TABLES, BackupError, default_compression, dump_table, finish_backup,
+    open_table_file, record_watermark
+)
+from db_connection import get_backend
+from patient_search import index_patient
+from restore import backup_chain, check_chain, replay_backup
+
+DEFAULT_JOBS = min(4, os.cpu_count() or 1)
+ROWS_PER_INSERT = 500           # rows per multi-row INSERT statement
+MAX_PARAMS = 30000              # placeholders per statement (SQLite allows 32766)
+COMMIT_ROWS = 50000             # rows per transaction while loading
+SNAPSHOT_TIMEOUT = 60           # seconds for the workers to open their snapshots
+
+# Per-process state of a dump worker: its connection, held open in the snapshot
+_worker = {}
+
+
+def _open_snapshot(ready):
+    backend = get_backend()
+    conn = backend.connect()
+    cursor = conn.cursor()
+    backend.begin_snapshot(cursor)
+    _worker.update(conn=conn, cursor=cursor)
+    ready.wait()
+
+
+def _dump_one(job):
+    table, ddl, directory, compression = job
+    started = time.perf_counter()
+    cursor = _worker["cursor"]
+    cursor.execute(f"SELECT * FROM {table}")
+    entry = dump_table(cursor, directory, table, ddl, "full", compression, lambda rows: None)
+    return entry, time.perf_counter() - started
+
+
+def dump_parallel(destination, jobs=DEFAULT_JOBS, compression=None, report=print):
+    """Full backup of every table, dumped by jobs worker processes from one point in time"""
+    backend = get_backend()
+    compression = compression or default_compression()
+    if os.path.exists(destination):
+        raise BackupError(f"{destination} already exists")
+    partial = destination + ".partial"
+    os.makedirs(partial)
+    started = time.perf_counter()
+    context = multiprocessing.get_context()
+    pool = None
+    try:
+        conn = backend.connect()
+        try:
+            cursor = conn.cursor()
+            tables = [table for table in backend.list_tables(cursor) if table not in LOCAL_TABLES]
+            plan = sorted(
+                ((table, backend.table_ddl(cursor, table), backend.estimate_rows(cursor, table))
+                 for table in tables),
+                key=lambda entry: entry[2], reverse=True
+            )
+            conn.commit()
+            ready = context.Barrier(jobs + 1, timeout=SNAPSHOT_TIMEOUT)
+            backend.lock_writes(cursor)
+            try:
+                cursor.execute("SELECT NOW()")
+                taken_at = cursor.fetchone()[0]
+                pool = context.Pool(jobs, _open_snapshot, (ready,))
+                ready.wait()
+            finally:
+                backend.unlock_writes(cursor)
+            cursor.close()
+        finally:
+            conn.close()
+
+        entries = []
+        work = [(table, ddl, partial, compression) for table, ddl, _ in plan]
+        for entry, seconds in pool.imap_unordered(_dump_one, work):
+            entries.append(entry)
+            report(_throughput(entry["table"], entry["rows"], entry["bytes"], seconds))
+        pool.close()
+        pool.join()
+        pool = None
+
+        entries.sort(key=lambda entry: entry["table"])
+        manifest = {
+            "format": 1,
+            "kind": "full",
+            "created": datetime.now().isoformat(sep=" ", timespec="seconds"),
+            "taken_at": taken_at.isoformat(sep=" "),
+            "since": None,
+            "previous": None,
+            "backend": backend.name,
+            "source": backend.describe(),
+            "compression": compression,
+            "tables": entries,
+        }
+        finish_backup(partial, destination, manifest)
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    rows = sum(entry["rows"] for entry in entries)
+    record_watermark(backend, "full", destination, taken_at, rows)
+    seconds = time.perf_counter() - started
+    report(_throughput("total", rows, sum(entry["bytes"] for entry in entries), seconds))
+    return manifest
+
+
+def insert_rows(cursor, table, columns, rows):
+    """INSERT rows with as few statements as possible: ROWS_PER_INSERT rows each,
+    fewer for wide tables so a statement stays under MAX_PARAMS placeholders"""
+    per_statement = max(1, min(ROWS_PER_INSERT, MAX_PARAMS // len(columns)))
+    head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    group = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    full_sql = head + ", ".join([group] * per_statement)
+    for start in range(0, len(rows), per_statement):
+        chunk = rows[start:start + per_statement]
+        sql = full_sql if len(chunk) == per_statement else head + ", ".join([group] * len(chunk))
+        cursor.execute(sql, [value for row in chunk for value in row])
+
+
+def _load_one(job):
+    path, compression = job
+    backend = get_backend()
+    conn = backend.connect()
+    try:
+        cursor = conn.cursor()
+        backend.bulk_load_session(cursor)
+        started = time.perf_counter()
+        with open_table_file(path, compression) as f:
+            header = json.loads(f.readline())
+            table, columns = header["table"], header["columns"]
+            create, indexes = backend.split_indexes(table, header["ddl"])
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            for ddl in create:
+                cursor.execute(ddl)
+            conn.commit()
+            rows = 0
+            batch = []
+            for line in f:
+                batch.append(json.loads(line))
+                if len(batch) >= COMMIT_ROWS:
+                    insert_rows(cursor, table, columns, batch)
+                    conn.commit()
+                    rows += len(batch)
+                    batch = []
+            if batch:
+                insert_rows(cursor, table, columns, batch)
+                conn.commit()
+                rows += len(batch)
+        loaded = time.perf_counter()
+        for ddl in indexes:
+            cursor.execute(ddl)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    return table, rows, os.path.getsize(path), loaded - started, time.perf_counter() - loaded
+
+
+def restore_parallel(path, jobs=DEFAULT_JOBS, report=print):
+    """Restore path (with the chain it builds on): the full base by jobs worker
+    processes, table by table, then the increments in order"""
+    backend = get_backend()
+    chain, manifests = check_chain(path, backend)
+    started = time.perf_counter()
+    base_path, base = chain[0], manifests[0]
+    report(f"Full backup {os.path.basename(base_path)} (taken {base['taken_at']}) with {jobs} workers")
+    # Largest files first, so the long loads are not left for the end
+    work = sorted(
+        ((os.path.join(base_path, entry["file"]), base["compression"]) for entry in base["tables"]),
+        key=lambda job: os.path.getsize(job[0]), reverse=True
+    )
+    total_rows = 0
+    with multiprocessing.get_context().Pool(jobs) as pool:
+        for table, rows, size, load_seconds, index_seconds in pool.imap_unordered(_load_one, work):
+            total_rows += rows
+            report(_throughput(table, rows, size, load_seconds) + f"   indexes {index_seconds:6.2f} s")
+
+    if len(chain) > 1:
+        touched_patients = {}
+        conn = backend.connect()
+        try:
+            cursor = conn.cursor()
+            backend.foreign_keys(cursor, False)
+            for backup_path, manifest in zip(chain[1:], manifests[1:]):
+                total_rows += replay_backup(conn, cursor, backup_path, manifest, touched_patients, report)
+            for patient_id, name in touched_patients.items():
+                index_patient(cursor, patient_id, name)
+            conn.commit()
+            backend.foreign_keys(cursor, True)
+            cursor.close()
+        finally:
+            conn.close()
+    seconds = time.perf_counter() - started
+    report(f"Restored {total_rows:,} rows in {seconds:.1f} s "
+           f"({total_rows / seconds if seconds else 0:,.0f} rows/s) into {backend.describe()}")
+    return total_rows, seconds
+
+
+def _throughput(table, rows, size, seconds):
+    rate = rows / seconds if seconds else 0
+    mib = size / 1024 / 1024
+    return (f"  {table:24} {rows:>10,} rows {mib:8.1f} MiB {seconds:8.2f} s "
+            f"{rate:>10,.0f} rows/s {mib / seconds if seconds else 0:6.1f} MiB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    dump = commands.add_parser("dump", help="full backup of the configured database")
+    dump.add_argument("--dir", default=BACKUP_DIR, help="directory the backup is created in")
+    dump.add_argument("--compression", choices=["gzip", "zstd"], default=None)
+    dump.add_argument("--jobs", type=int, default=DEFAULT_JOBS)
+    load = commands.add_parser("restore", help="replace the configured database with a backup")
+    load.add_argument("backup", help="backup directory; an increment brings its whole chain")
+    load.add_argument("--jobs", type=int, default=DEFAULT_JOBS)
+    load.add_argument("--yes", action="store_true", help="do not ask before replacing the database")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "dump":
+            os.makedirs(args.dir, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            destination = os.path.join(args.dir, f"hospital_db_backup_{timestamp}")
+            print(f"Dumping {get_backend().describe()} with {args.jobs} workers")
+            dump_parallel(destination, args.jobs, args.compression)
+            print(f"Backup written to {destination}")
+        else:
+            print("Restore order:")
+            for backup_path in backup_chain(args.backup):
+                print(f"  {backup_path}")
+            if not args.yes:
+                answer = input(f"This replaces the data in {get_backend().describe()}. Type RESTORE to continue: ")
+                if answer.strip() != "RESTORE":
+                    print("Restore cancelled.")
+                    return
+            restore_parallel(args.backup, args.jobs)
+    except (OSError, BackupError) as err:
+        print(f"{args.command.capitalize()} failed: {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import time
+from collections import OrderedDict
+import customtkinter
+from patient_search import SUGGESTION_LIMIT, search_query
+
+DEBOUNCE_MS = 250           # wait this long after the last keystroke before querying
+CACHE_SIZE = 128            # prefixes remembered across every picker in the process
+CACHE_TTL = 60              # seconds; new registrations also clear it
+
+_cache = OrderedDict()      # prefix -> (rows, fetched_at); touched on the Tk thread only
+
+
+def clear_patient_cache():
+    """Forget cached suggestions, e.g. after a patient is registered or renamed"""
+    _cache.clear()
+
+
+def _cached(prefix):
+    now = time.monotonic()
+    entry = _cache.get(prefix)
+    if entry is not None and now - entry[1] <= CACHE_TTL:
+        _cache.move_to_end(prefix)
+        return entry[0]
+    if prefix.isdigit():
+        return None
+    # A shorter prefix that returned fewer rows than the limit holds every match
+    for length in range(len(prefix) - 1, -1, -1):
+        entry = _cache.get(prefix[:length])
+        if entry is None or now - entry[1] > CACHE_TTL:
+            continue
+        if len(entry[0]) < SUGGESTION_LIMIT:
+            return [row for row in entry[0] if _matches(row, prefix)]
+        break
+    return None
+
+
+def _remember(prefix, rows):
+    _cache[prefix] = (rows, time.monotonic())
+    _cache.move_to_end(prefix)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def _matches(row, prefix):
+    return str(row[1]).lower().startswith(prefix) or (prefix.isdigit() and str(row[0]) == prefix)
+
+
+class PatientPicker(customtkinter.CTkFrame):
+    """Type-ahead patient selector: an entry plus a short list of matching patients.
+
+    Keystrokes are debounced, then answered from the shared LRU cache or a
+    prefix LIMIT query run on the owning frame's FrameTasks. Picking a
+    suggestion calls on_select(patient_id, name); selected() returns the
+    current (patient_id, name) or None.
+    """
+
+    def __init__(self, master, tasks, on_select=None, width=400, height=35,
+                 font=("Arial", 12), **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+        self.tasks = tasks
+        self.on_select = on_select
+        self._selected = None
+        self._pending = None        # after() id of the debounced search
+        self._shown_text = None
+        self._rows = []
+
+        self.entry = customtkinter.CTkEntry(
+            self, width=width, height=height, font=font,
+            placeholder_text="Type a patient name or ID..."
+        )
+        self.entry.pack(anchor="w")
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.entry.bind("<Return>", lambda e: self._choose_first())
+
+        self.results = customtkinter.CTkFrame(self, fg_color="white", border_width=1, border_color="#d0d0d0")
+        self._buttons = []
+        for _ in range(SUGGESTION_LIMIT):
+            button = customtkinter.CTkButton(
+                self.results, text="", width=width - 10, height=28, anchor="w",
+                font=font, fg_color="transparent", text_color="#2c3e50", hover_color="#e8f4f8"
+            )
+            self._buttons.append(button)
+
+    def selected(self):
+        return self._selected
+
+    def set(self, patient_id, name):
+        """Select a patient without notifying on_select"""
+        self._selected = (patient_id, name)
+        self._set_text(f"{patient_id} - {name}")
+        self._hide_results()
+
+    def _set_text(self, text):
+        self.entry.delete(0, "end")
+        self.entry.insert(0, text)
+        self._shown_text = text
+
+    def _on_key(self, event):
+        if event.keysym in ("Return", "Up", "Down", "Left", "Right", "Tab"):
+            return
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(DEBOUNCE_MS, self._search)
+
+    def _search(self):
+        self._pending = None
+        text = self.entry.get().strip()
+        if text == self._shown_text:
+            return
+        self._selected = None
+        prefix = text.lower()
+        if not prefix:
+            self._hide_results()
+            return
+        rows = _cached(prefix)
+        if rows is not None:
+            self._show_results(rows)
+            return
+
+        def done(found):
+            _remember(prefix, found)
+            # Ignore answers to text the user has already typed past
+            if self.winfo_exists() and self.entry.get().strip().lower() == prefix:
+                self._show_results(found)
+
+        self.tasks.run(search_query(text), done, lambda err: print(f"Patient search failed: {err}"))
+
+    def _show_results(self, rows):
+        self._rows = rows
+        for button in self._buttons:
+            button.pack_forget()
+        if not rows:
+            self._buttons[0].configure(text="No matching patients", command=lambda: None)
+            self._buttons[0].pack(fill="x", padx=4, pady=1)
+        for button, (patient_id, name) in zip(self._buttons, rows):
+            button.configure(text=f"{patient_id} - {name}",
+                             command=lambda pid=patient_id, n=name: self._choose(pid, n))
+            button.pack(fill="x", padx=4, pady=1)
+        self.results.pack(anchor="w", fill="x", pady=(2, 0))
+
+    def _hide_results(self):
+        self.results.pack_forget()
+
+    def _choose_first(self):
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+            self._search()
+        if self._rows and self.results.winfo_ismapped():
+            self._choose(*self._rows[0])
+
+    def _choose(self, patient_id, name):
+        self.set(patient_id, name)
+        if self.on_select:
+            self.on_select(patient_id, name)
@@ -0,0 +1,348 @@
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import timedelta
+
+SEARCH_LIMIT = 50
+SUGGESTION_LIMIT = 8        # rows in a PatientPicker's type-ahead list
+MIN_SIMILARITY = 0.4        # share of the query's trigrams a name must contain (typo tolerance)
+SEARCH_BACKEND = "database" # "memory" serves searches from an in-process TrigramIndex
+BACKFILL_BATCH = 1000
+SHORT_TERM = 3              # terms shorter than a trigram are matched with LIKE instead
+
+_EMPTY = array("I")
+
+
+def normalize(text):
+    return " ".join(str(text).lower().split())
+
+
+def name_trigrams(name):
+    """Trigrams of "  name ", so word starts (" ka") are trigrams of their own"""
+    padded = "  " + normalize(name) + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def term_trigrams(term):
+    """Trigrams every name containing term must have"""
+    term = normalize(term)
+    if len(term) == 2:
+        return {" " + term}           # two letters: names with a word starting with them
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def query_trigrams(term):
+    """Trigrams a name is scored against; padded so a typo still leaves the
+    word's first and last trigrams (" ba", "da ") to match"""
+    term = normalize(term)
+    if len(term) <= 2:
+        return term_trigrams(term)
+    padded = " " + term + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def required_hits(count):
+    return max(1, math.ceil(count * MIN_SIMILARITY))
+
+
+def score(term, name):
+    """Share of the term's trigrams found in name, plus a bonus for an exact substring
+    and another for a word starting with the term; 0 when below MIN_SIMILARITY"""
+    term = normalize(term)
+    grams = query_trigrams(term)
+    if not grams:
+        return 0.0
+    normalized = normalize(name)
+    padded = "  " + normalized + " "
+    hits = sum(1 for gram in grams if gram in padded)
+    if hits < required_hits(len(grams)):
+        return 0.0
+    result = hits / len(grams)
+    if term in normalized:
+        result += 1.0
+        if (" " + normalized).find(" " + term) >= 0:
+            result += 0.5
+    return result
+
+
+class TrigramIndex:
+    """In-process trigram index over patient names.
+
+    Kept compact for millions of patients: each distinct name is stored once,
+    UTF-8 encoded in a single bytearray, and the postings (trigram -> name
+    numbers), patient ids and per-name member lists are all typed arrays, not
+    Python lists of objects; only the patient id -> position map, which
+    re-indexing a renamed patient needs, is a dict. A search intersects the
+    query's postings (rarest first) for exact and substring matches and, only
+    when there are none, counts the rarest postings for names with enough
+    matching trigrams.
+    """
+
+    def __init__(self):
+        self._text = bytearray()
+        self._offsets = array("Q", [0])     # name n is _text[_offsets[n]:_offsets[n + 1]]
+        self._name_numbers = {}             # name -> name number
+        self._members = []                  # name number -> array of patient positions
+        self._postings = {}                 # trigram -> array of name numbers
+        self._patient_ids = array("i")
+        self._patient_names = array("I")    # patient position -> name number
+        self._positions = {}                # patient id -> patient position
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._patient_ids)
+
+    def add(self, patient_id, name):
+        """Index a patient, or re-index one whose name changed"""
+        with self._lock:
+            number = self._name_number(name)
+            position = self._positions.get(patient_id)
+            if position is not None:
+                old = self._patient_names[position]
+                if old == number:
+                    return
+                self._members[old].remove(position)
+                self._patient_names[position] = number
+            else:
+                position = len(self._patient_ids)
+                self._patient_ids.append(patient_id)
+                self._patient_names.append(number)
+                self._positions[patient_id] = position
+            self._members[number].append(position)
+
+    def _name_number(self, name):
+        number = self._name_numbers.get(name)
+        if number is not None:
+            return number
+        number = len(self._members)
+        self._name_numbers[name] = number
+        self._text += name.encode("utf-8")
+        self._offsets.append(len(self._text))
+        self._members.append(array("I"))
+        for gram in name_trigrams(name):
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array("I")
+            postings.append(number)
+        return number
+
+    def name(self, number):
+        return self._text[self._offsets[number]:self._offsets[number + 1]].decode("utf-8")
+
+    def search(self, term, limit=SEARCH_LIMIT):
+        """[(patient_id, name, score)] best first"""
+        grams = query_trigrams(term)
+        if not grams:
+            return []
+        need = required_hits(len(grams))
+        with self._lock:
+            lists = sorted((self._postings.get(gram, _EMPTY) for gram in term_trigrams(term)), key=len)
+            # Names holding every trigram (exact and substring matches) come from
+            # walking the rarest list; fuzzy matching only runs when there are none
+            numbers = _intersect(lists, limit * 4) if lists and lists[0] else []
+            if not numbers:
+                lists = sorted((self._postings.get(gram, _EMPTY) for gram in grams), key=len)
+                # A name sharing `need` of the n trigrams is in one of the n - need + 1
+                # rarest lists, so only those are counted (in C)
+                counts = Counter()
+                for postings in lists[:len(lists) - need + 1]:
+                    counts.update(postings)
+                numbers = [number for number, _ in counts.most_common(limit * 4)]
+            ranked = []
+            for number in numbers:
+                if not self._members[number]:
+                    continue
+                name = self.name(number)
+                value = score(term, name)
+                if value:
+                    ranked.append((value, name, number))
+            ranked.sort(key=lambda item: (-item[0], item[1]))
+
+            results = []
+            for value, name, number in ranked:
+                for position in self._members[number]:
+                    results.append((self._patient_ids[position], name, value))
+                    if len(results) >= limit:
+                        return results
+            return results
+
+
+def _intersect(lists, cap):
+    """Up to cap numbers present in every sorted list, shortest list first"""
+    found = []
+    others = lists[1:]
+    for number in lists[0]:
+        for postings in others:
+            position = bisect_left(postings, number)
+            if position == len(postings) or postings[position] != number:
+                break
+        else:
+            found.append(number)
+            if len(found) >= cap:
+                break
+    return found
+
+
+class MemorySearch:
+    """TrigramIndex loaded from the patients table and topped up before each search
+    with patients registered or edited since the last load (date_registered is
+    ON UPDATE CURRENT_TIMESTAMP)"""
+
+    def __init__(self):
+        self.index = TrigramIndex()
+        self._watermark = None
+        self._lock = threading.Lock()
+
+    def refresh(self, cursor):
+        with self._lock:
+            cursor.execute("SELECT NOW()")
+            started = cursor.fetchone()[0]
+            if self._watermark is None:
+                cursor.execute("SELECT patient_id, name FROM patients ORDER BY patient_id")
+            else:
+                cursor.execute(
+                    "SELECT patient_id, name FROM patients WHERE date_registered >= %s",
+                    (self._watermark,)
+                )
+            for patient_id, name in cursor.fetchall():
+                self.index.add(patient_id, name)
+            self._watermark = started - timedelta(seconds=5)
+
+    def search(self, cursor, term, limit=SEARCH_LIMIT):
+        self.refresh(cursor)
+        return self.index.search(term, limit)
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_memory_search():
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = MemorySearch()
+    return _memory
+
+
+# Database trigram index (patient_name_trigrams, created by migration 7) ---
+
+def index_patient(cursor, patient_id, name):
+    """(Re)write a patient's trigrams; call in the same transaction as the insert or rename"""
+    cursor.execute("DELETE FROM patient_name_trigrams WHERE patient_id = %s", (patient_id,))
+    cursor.executemany(
+        "INSERT INTO patient_name_trigrams (trigram, patient_id) VALUES (%s, %s)",
+        [(gram, patient_id) for gram in sorted(name_trigrams(name))]
+    )
+
+
+def backfill_trigrams(cursor):
+    """Index every existing patient, a batch at a time"""
+    last_id = 0
+    while True:
+        cursor.execute(
+            "SELECT patient_id, name FROM patients WHERE patient_id > %s ORDER BY patient_id LIMIT %s",
+            (last_id, BACKFILL_BATCH)
+        )
+        batch = cursor.fetchall()
+        if not batch:
+            return
+        rows = [(gram, patient_id) for patient_id, name in batch for gram in name_trigrams(name)]
+        cursor.executemany(
+            "INSERT IGNORE INTO patient_name_trigrams (trigram, patient_id) VALUES (%s, %s)", rows
+        )
+        last_id = batch[-1][0]
+
+
+def search_database(cursor, term, limit=SEARCH_LIMIT):
+    """[(patient_id, name, score)] best first, from patient_name_trigrams"""
+    grams = sorted(query_trigrams(term))
+    if not grams:
+        return []
+    placeholders = ", ".join(["%s"] * len(grams))
+    cursor.execute(f"""
+        SELECT g.patient_id, p.name
+        FROM patient_name_trigrams g
+        JOIN patients p ON p.patient_id = g.patient_id
+        WHERE g.trigram IN ({placeholders})
+        GROUP BY g.patient_id, p.name
+        HAVING COUNT(*) >= %s
+        ORDER BY COUNT(*) DESC, p.name
+        LIMIT %s
+    """, tuple(grams) + (required_hits(len(grams)), limit * 4))
+    ranked = [(patient_id, name, score(term, name)) for patient_id, name in cursor.fetchall()]
+    ranked = [row for row in ranked if row[2]]
+    ranked.sort(key=lambda row: (-row[2], row[1]))
+    return ranked[:limit]
+
+
+def like_escape(text):
+    """text with LIKE's wildcards escaped, for a pattern used with ESCAPE '!'"""
+    # '!' rather than a backslash, which MySQL reads from '\\' but SQLite from '\'
+    return text.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+
+def search_short(cursor, term, limit=SEARCH_LIMIT):
+    """[(patient_id, name, score)] for a term too short to have trigrams: names
+    containing it, those with a word starting with it first"""
+    term = normalize(term)
+    cursor.execute(
+        "SELECT patient_id, name FROM patients WHERE name LIKE %s ESCAPE '!' ORDER BY name LIMIT %s",
+        ("%" + like_escape(term) + "%", limit * 4)
+    )
+    ranked = [(patient_id, name, 1.5 if (" " + normalize(name)).find(" " + term) >= 0 else 1.0)
+              for patient_id, name in cursor.fetchall()]
+    ranked.sort(key=lambda row: (-row[2], row[1]))
+    return ranked[:limit]
+
+
+def search_query(prefix, limit=SUGGESTION_LIMIT):
+    """work(cursor) returning up to limit (patient_id, name) rows whose name starts with prefix
+    (or whose id equals it); a LIKE 'prefix%' range read on idx_patients_name"""
+    pattern = like_escape(prefix) + "%"
+
+    def load(cursor):
+        rows = []
+        if prefix.isdigit():
+            # Two plain queries: SQLite has no parenthesised SELECTs in a UNION
+            cursor.execute("SELECT patient_id, name FROM patients WHERE patient_id = %s", (int(prefix),))
+            rows = list(cursor.fetchall())
+        cursor.execute(
+            "SELECT patient_id, name FROM patients WHERE name LIKE %s ESCAPE '!' ORDER BY name LIMIT %s",
+            (pattern, limit)
+        )
+        rows += [row for row in cursor.fetchall() if row not in rows]
+        return rows[:limit]
+    return load
+
+
+def search_patients(cursor, term, limit=SEARCH_LIMIT):
+    """Ranked, typo-tolerant name search; [(patient_id, name, score)] best first"""
+    if len(normalize(term)) < SHORT_TERM:
+        return search_short(cursor, term, limit)
+    if SEARCH_BACKEND == "memory":
+        return get_memory_search().search(cursor, term, limit)
+    return search_database(cursor, term, limit)
+
+
+def find_patients(cursor, term, columns, limit=SEARCH_LIMIT):
+    """SELECT columns for the patient whose id is term (when it is a number),
+    then for the ranked name matches of term"""
+    patient_ids = [int(term)] if term.isdigit() else []
+    patient_ids += [match[0] for match in search_patients(cursor, term, limit) if match[0] not in patient_ids]
+    return fetch_ranked(cursor, columns, patient_ids)
+
+
+def fetch_ranked(cursor, columns, patient_ids):
+    """SELECT columns for patient_ids, returned in the order of patient_ids"""
+    if not patient_ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(patient_ids))
+    cursor.execute(
+        f"SELECT {columns} FROM patients WHERE patient_id IN ({placeholders})", tuple(patient_ids)
+    )
+    by_id = {row[0]: row for row in cursor.fetchall()}
+    return [by_id[patient_id] for patient_id in patient_ids if patient_id in by_id]
@@ -0,0 +1,134 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import date_ranges
+
+DELETION_CHECK_INTERVAL = 300   # seconds between checks for deleted patients
+WATERMARK_SLACK = timedelta(seconds=5)  # re-read writes that committed just after the last refresh read
+
+_VITALS = "(t.blood_pressure IS NOT NULL OR t.temperature IS NOT NULL OR t.weight IS NOT NULL)"
+
+
+def _status_query():
+    treated_today, _ = date_ranges.today("t.date")
+    # Correlated lookups per patient, each answered from the (patient_id, date)
+    # index on treatments, instead of joining and grouping every treatment row
+    return f"""
+        SELECT p.patient_id, p.name, p.gender, p.blood_type, p.date_registered,
+               (SELECT MAX(t.date) FROM treatments t WHERE t.patient_id = p.patient_id) AS last_treatment,
+               EXISTS (SELECT 1 FROM treatments t
+                       WHERE t.patient_id = p.patient_id AND {treated_today}) AS treated_today,
+               EXISTS (SELECT 1 FROM treatments t
+                       WHERE t.patient_id = p.patient_id AND {treated_today} AND {_VITALS}) AS vitals_today
+        FROM patients p
+    """
+
+
+class PendingQueue:
+    """Which patients still need a doctor or a nurse today, shared by every role frame.
+
+    The first refresh computes every patient's status (last treatment, treated
+    today, vitals today). Later refreshes only read what changed since the
+    previous one, each through an indexed range scan: patients with an id above
+    the highest one seen, edited patients (date_registered is ON UPDATE
+    CURRENT_TIMESTAMP) and patients with treatments written since then. When
+    the day changes nobody has been treated yet, so the flags are cleared
+    without a query. Every DELETION_CHECK_INTERVAL seconds the patient count
+    is compared with the snapshot, and only when they differ are the ids
+    read to drop deleted patients.
+    """
+
+    def __init__(self, deletion_check_interval=DELETION_CHECK_INTERVAL):
+        self.deletion_check_interval = deletion_check_interval
+        self._lock = threading.Lock()
+        self._status = {}           # patient_id -> status row
+        self._last_id = 0           # highest patient_id in the snapshot
+        self._day = None            # server CURDATE() the snapshot belongs to
+        self._watermark = None      # server NOW() when the last refresh started
+        self._checked_at = 0.0
+
+    def refresh(self, cursor):
+        with self._lock:
+            cursor.execute("SELECT NOW(), CURDATE()")
+            started, day = cursor.fetchone()
+            if self._watermark is None:
+                cursor.execute(_status_query())
+                self._status = {}
+                self._store(cursor.fetchall())
+                self._checked_at = time.monotonic()
+            else:
+                if day != self._day:
+                    # Treatments since midnight are after the watermark and re-read below
+                    self._status = {pid: tuple(row[:6]) + (0, 0) for pid, row in self._status.items()}
+                cursor.execute(_status_query() + " WHERE p.patient_id > %s", (self._last_id,))
+                new = cursor.fetchall()
+                self._store(new)
+                self._refresh_touched(cursor, {row[0] for row in new})
+                if time.monotonic() - self._checked_at > self.deletion_check_interval:
+                    self._drop_deleted(cursor)
+            self._day = day
+            self._watermark = started - WATERMARK_SLACK
+
+    def _store(self, rows):
+        for row in rows:
+            self._status[row[0]] = row
+            self._last_id = max(self._last_id, row[0])
+
+    def _drop_deleted(self, cursor):
+        cursor.execute("SELECT COUNT(*) FROM patients")
+        if cursor.fetchone()[0] != len(self._status):
+            cursor.execute("SELECT patient_id FROM patients")
+            present = {row[0] for row in cursor.fetchall()}
+            self._status = {pid: row for pid, row in self._status.items() if pid in present}
+        self._checked_at = time.monotonic()
+
+    def _refresh_touched(self, cursor, fresh):
+        cursor.execute("SELECT DISTINCT patient_id FROM treatments WHERE date >= %s", (self._watermark,))
+        touched = {row[0] for row in cursor.fetchall()}
+        cursor.execute("SELECT patient_id FROM patients WHERE date_registered >= %s", (self._watermark,))
+        touched.update(row[0] for row in cursor.fetchall())
+        touched -= fresh
+        if not touched:
+            return
+        ids = sorted(touched)
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(_status_query() + f" WHERE p.patient_id IN ({placeholders})", tuple(ids))
+        self._store(cursor.fetchall())
+
+    def awaiting_treatment(self, cursor):
+        """(patient_id, name, gender, blood_type, date_registered, last_treatment) for patients
+        not treated today; never-treated first, then by last treatment, newest first"""
+        self.refresh(cursor)
+        with self._lock:
+            rows = [row[:6] for row in self._status.values() if not row[6]]
+        rows.sort(key=lambda row: row[4])
+        rows.sort(key=lambda row: (row[5] is None, row[5] or datetime.min), reverse=True)
+        return rows
+
+    def awaiting_vitals(self, cursor):
+        """(patient_id, name, gender, blood_type, date_registered) for patients without
+        vitals recorded today, oldest registration first"""
+        self.refresh(cursor)
+        with self._lock:
+            rows = [row[:5] for row in self._status.values() if not row[7]]
+        rows.sort(key=lambda row: row[4])
+        return rows
+
+    def invalidate(self):
+        """Force the next refresh to recompute every patient"""
+        with self._lock:
+            self._watermark = None
+            self._last_id = 0
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_pending_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = PendingQueue()
+    return _queue
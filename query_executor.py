@@ -0,0 +1,168 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import customtkinter
+from db_connection import get_connection
+
+MAX_WORKERS = 4                 # shared by every frame in the process
+MAX_IN_FLIGHT_PER_FRAME = 2     # further requests from a frame wait their turn
+POLL_INTERVAL_MS = 30
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="db-query")
+    return _executor
+
+
+def run_query(work):
+    """Run work(cursor) on a pooled connection and commit; used by the worker threads"""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor(buffered=True)
+        try:
+            result = work(cursor)
+            conn.commit()
+            return result
+        finally:
+            cursor.close()
+    finally:
+        conn.close()
+
+
+class _Task:
+    __slots__ = ("generation", "work", "on_done", "on_error", "cancellable", "on_cancel")
+
+    def __init__(self, generation, work, on_done, on_error, cancellable, on_cancel):
+        self.generation = generation
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancellable = cancellable
+        self.on_cancel = on_cancel
+
+    def stale(self, generation):
+        return self.cancellable and self.generation != generation
+
+
+class FrameTasks:
+    """Background database work for one role frame.
+
+    work(cursor) runs on the shared thread pool; on_done(result) / on_error(exc)
+    run back on the Tk thread, picked up by a widget.after() poll. cancel_all()
+    (called from clear_content) drops queued work and discards the results of
+    anything still running, so a screen the user left never gets redrawn.
+    Work that must outlive the current screen (writes, sidebar widgets) passes
+    cancellable=False, so a save is never dropped by navigating away.
+    on_cancel() runs, on the Tk thread, for work that was dropped or whose
+    result was discarded, for callers that must know it never completed.
+    """
+
+    def __init__(self, widget, max_in_flight=MAX_IN_FLIGHT_PER_FRAME):
+        self.widget = widget
+        self.max_in_flight = max_in_flight
+        self._generation = 0
+        self._in_flight = 0
+        self._waiting = deque()
+        self._results = queue.SimpleQueue()
+        self._polling = False
+
+    def run(self, work, on_done=None, on_error=None, cancellable=True, on_cancel=None):
+        task = _Task(self._generation, work, on_done, on_error, cancellable, on_cancel)
+        if self._in_flight < self.max_in_flight:
+            self._submit(task)
+        else:
+            self._waiting.append(task)
+
+    def cancel_all(self):
+        self._generation += 1
+        dropped = [task for task in self._waiting if task.cancellable]
+        self._waiting = deque(task for task in self._waiting if not task.cancellable)
+        for task in dropped:
+            self._cancelled(task)
+
+    def busy(self):
+        return self._in_flight > 0 or bool(self._waiting)
+
+    def _submit(self, task):
+        self._in_flight += 1
+        get_executor().submit(self._execute, task)
+        if not self._polling:
+            self._polling = True
+            self._schedule_poll()
+
+    def _execute(self, task):
+        if task.stale(self._generation):
+            self._results.put((task, False, None))
+            return
+        try:
+            self._results.put((task, True, run_query(task.work)))
+        except Exception as err:
+            self._results.put((task, False, err))
+
+    def _cancelled(self, task):
+        if task.on_cancel is None:
+            return
+        try:
+            task.on_cancel()
+        except Exception as err:
+            print(f"Error handling a cancelled query: {err}")
+
+    def _schedule_poll(self):
+        try:
+            self.widget.after(POLL_INTERVAL_MS, self._poll)
+        except Exception:
+            # Widget already destroyed - nobody is left to receive results
+            self._polling = False
+
+    def _poll(self):
+        while True:
+            try:
+                task, ok, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight -= 1
+            while self._waiting and self._in_flight < self.max_in_flight:
+                self._submit(self._waiting.popleft())
+            if task.stale(self._generation):
+                self._cancelled(task)
+                continue
+            callback = task.on_done if ok else task.on_error
+            if callback is None:
+                if not ok and value is not None:
+                    print(f"Background query failed: {value}")
+                continue
+            try:
+                callback(value)
+            except Exception as err:
+                print(f"Error handling query result: {err}")
+
+        if self._in_flight > 0:
+            self._schedule_poll()
+        else:
+            self._polling = False
+
+
+def show_loading(parent, text="Loading...", **pack_options):
+    """Placeholder shown while a background query runs; the render callback destroys it"""
+    label = customtkinter.CTkLabel(parent, text=text, font=("Arial", 14), text_color="#7f8c8d")
+    label.pack(**(pack_options or {"pady": 30}))
+    return label
+
+
+def take_placeholder(loading):
+    """Remove the loading placeholder; False if its area was cleared while the query ran"""
+    try:
+        if not loading.winfo_exists():
+            return False
+        loading.destroy()
+        return True
+    except Exception:
+        return False
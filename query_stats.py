@@ -0,0 +1,224 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from hashlib import sha1
+
+SLOW_QUERY_MS = 200             # statements slower than this go to the slow-query log
+SLOW_LOG_PATH = os.path.join(os.path.expanduser("~"), ".hospital-management", "slow_queries.log")
+SAMPLES_PER_QUERY = 1000        # latencies kept per fingerprint for the percentiles
+
+# Files whose frames are skipped when looking for the code that ran a statement
+_INTERNAL_FILES = {os.path.abspath(__file__)}
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Statement with literals and placeholders replaced by ?, so a query's runs group together"""
+    text = _STRING.sub("?", str(sql).replace("%s", "?"))
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("(...)", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def redact(params):
+    """Parameter types only - the values are patient data"""
+    if params is None:
+        return "[]"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+    return "[" + ", ".join(type(value).__name__ for value in params) + "]"
+
+
+def caller():
+    """Class.method (or function) of the application code that ran the statement;
+    closures report the method they were defined in, e.g. NurseFrame.show_view_vitals"""
+    frame = sys._getframe(1)
+    while frame is not None and os.path.abspath(frame.f_code.co_filename) in _INTERNAL_FILES:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return name.split(".<locals>", 1)[0]
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class _QueryTimings:
+    __slots__ = ("count", "total", "max", "rows", "samples", "callers")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLES_PER_QUERY)
+        self.callers = {}
+
+
+class QueryStats:
+    """Latency, row counts and callers of every statement, grouped by fingerprint.
+
+    record() is called by InstrumentedCursor on the thread that ran the
+    statement. Percentiles come from the most recent SAMPLES_PER_QUERY
+    timings of each fingerprint; statements slower than slow_ms are also
+    appended to the slow-query log with their parameters redacted.
+    """
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, slow_log_path=SLOW_LOG_PATH):
+        self.slow_ms = slow_ms
+        self.slow_log_path = slow_log_path
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._queries = {}
+        self._started = time.time()
+
+    def record(self, sql, params, seconds, rows, where):
+        key = fingerprint(sql)
+        with self._lock:
+            timings = self._queries.get(key)
+            if timings is None:
+                timings = self._queries[key] = _QueryTimings()
+            timings.count += 1
+            timings.total += seconds
+            timings.max = max(timings.max, seconds)
+            if rows:
+                timings.rows += rows
+            timings.samples.append(seconds)
+            timings.callers[where] = timings.callers.get(where, 0) + 1
+        if seconds * 1000 >= self.slow_ms:
+            self._log_slow(key, params, seconds, rows, where)
+
+    def _log_slow(self, key, params, seconds, rows, where):
+        line = (f"{datetime.now():%Y-%m-%d %H:%M:%S} {seconds * 1000:.1f} ms {where} "
+                f"rows={rows if rows is not None else '?'} params={redact(params)} {key}\n")
+        try:
+            os.makedirs(os.path.dirname(self.slow_log_path), exist_ok=True)
+            with self._log_lock, open(self.slow_log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as err:
+            print(f"Could not write slow-query log: {err}")
+
+    def snapshot(self):
+        """One dict per fingerprint, most total time first; times in milliseconds"""
+        with self._lock:
+            entries = [(key, t.count, t.total, t.max, t.rows, sorted(t.samples), dict(t.callers))
+                       for key, t in self._queries.items()]
+        result = []
+        for key, count, total, longest, rows, ordered, callers in entries:
+            result.append({
+                "id": sha1(key.encode("utf-8")).hexdigest()[:12],
+                "fingerprint": key,
+                "count": count,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total * 1000 / count, 3),
+                "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+                "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+                "p99_ms": round(_percentile(ordered, 0.99) * 1000, 3),
+                "max_ms": round(longest * 1000, 3),
+                "rows_per_call": round(rows / count, 1),
+                "callers": sorted(callers, key=callers.get, reverse=True),
+            })
+        result.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._started = time.time()
+
+    def to_json(self):
+        return json.dumps({
+            "since": datetime.fromtimestamp(self._started).isoformat(timespec="seconds"),
+            "slow_query_ms": self.slow_ms,
+            "queries": self.snapshot(),
+        }, indent=2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format: one summary per fingerprint"""
+        lines = [
+            "# HELP hospital_query_duration_seconds Database statement latency by query fingerprint.",
+            "# TYPE hospital_query_duration_seconds summary",
+        ]
+        for entry in self.snapshot():
+            labels = f'query="{entry["id"]}",fingerprint="{_label(entry["fingerprint"][:200])}"'
+            for quantile, field in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                lines.append(f'hospital_query_duration_seconds{{{labels},quantile="{quantile}"}} '
+                             f'{entry[field] / 1000:.6f}')
+            lines.append(f"hospital_query_duration_seconds_sum{{{labels}}} {entry['total_ms'] / 1000:.6f}")
+            lines.append(f"hospital_query_duration_seconds_count{{{labels}}} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class InstrumentedCursor:
+    """Database cursor that times execute()/executemany() and reports them to QueryStats;
+    everything else is passed straight through to the real cursor"""
+
+    def __init__(self, raw, stats):
+        self._raw = raw
+        self._stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._raw.execute(operation, params, *args, **kwargs)
+        finally:
+            self._stats.record(operation, params, time.perf_counter() - started, self._rowcount(), caller())
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._raw.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            self._stats.record(operation, None, time.perf_counter() - started, self._rowcount(), caller())
+
+    def _rowcount(self):
+        # Rows read by a buffered SELECT or written by DML; -1 (unknown) until an
+        # unbuffered cursor has been fetched from
+        try:
+            rowcount = self._raw.rowcount
+        except Exception:
+            return None
+        return rowcount if rowcount is not None and rowcount >= 0 else None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._raw.close()
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+
+def get_query_stats():
+    global _stats
+    if _stats is None:
+        with _stats_lock:
+            if _stats is None:
+                _stats = QueryStats()
+    return _stats
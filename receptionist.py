@@ -1,17 +1,24 @@
 import customtkinter
 from tkinter import messagebox, ttk
 from tkinter import *
-from db_connection import get_connection, log_action
+from db_connection import get_pool, log_action, flush_audit_log
+from query_executor import FrameTasks, show_loading, take_placeholder
+from view_cache import ViewCache
+from virtual_table import VirtualTable, query_pages, PAGE_SIZE
+import date_ranges
+from dashboard_stats import get_dashboard_stats, invalidate_stats, recent_patients
+from patient_picker import clear_patient_cache
+from patient_search import search_patients, fetch_ranked, index_patient
+from rollups import record_new_patient
 import datetime
-from PIL import Image
 import os
 
+
 class ReceptionistFrame(customtkinter.CTkFrame):
     def __init__(self, master, username):
         super().__init__(master)
         self.username = username
-        self.conn = get_connection()
-        self.cursor = self.conn.cursor()
+        self.tasks = FrameTasks(self)
         self.on_logout = None  # Add this line
         self.current_view = "dashboard"
         
@@ -107,37 +114,32 @@ class ReceptionistFrame(customtkinter.CTkFrame):
             text_color="white"
         ).pack(pady=(10, 5))
         
-        try:
-            # Get today's registrations
-            today = datetime.date.today()
-            self.cursor.execute("SELECT COUNT(*) FROM patients WHERE DATE(date_registered) = %s", (today,))
-            today_count = self.cursor.fetchone()[0]
-            
-            # Get total patients
-            self.cursor.execute("SELECT COUNT(*) FROM patients")
-            total_count = self.cursor.fetchone()[0]
-            
-            customtkinter.CTkLabel(
-                stats_frame, 
-                text=f"New Patients: {today_count}", 
-                font=("Arial", 11), 
-                text_color="#a8c8ec"
-            ).pack()
-            
-            customtkinter.CTkLabel(
-                stats_frame, 
-                text=f"Total Patients: {total_count}", 
-                font=("Arial", 11), 
-                text_color="#a8c8ec"
-            ).pack()
-            
-        except Exception as e:
-            customtkinter.CTkLabel(
-                stats_frame, 
-                text="Stats unavailable", 
-                font=("Arial", 11), 
-                text_color="#a8c8ec"
-            ).pack()
+        today_label = customtkinter.CTkLabel(
+            stats_frame, 
+            text="New Patients: ...", 
+            font=("Arial", 11), 
+            text_color="#a8c8ec"
+        )
+        today_label.pack()
+        
+        total_label = customtkinter.CTkLabel(
+            stats_frame, 
+            text="Total Patients: ...", 
+            font=("Arial", 11), 
+            text_color="#a8c8ec"
+        )
+        total_label.pack()
+
+        def show_stats(stats):
+            today_label.configure(text=f"New Patients: {stats['registered_today']}")
+            total_label.configure(text=f"Total Patients: {stats['total_patients']}")
+
+        def stats_error(e):
+            today_label.configure(text="Stats unavailable")
+            total_label.pack_forget()
+
+        # The sidebar outlives clear_content(), so this query must not be cancelled with the page
+        get_dashboard_stats().load(self.tasks, show_stats, stats_error, cancellable=False)
 
         # Logout button
         logout_btn = customtkinter.CTkButton(
@@ -155,6 +157,7 @@ class ReceptionistFrame(customtkinter.CTkFrame):
         # Main content area
         self.content = customtkinter.CTkFrame(self, fg_color=self.light_bg, corner_radius=0)
         self.content.grid(row=0, column=1, sticky="nsew")
+        self.views = ViewCache(self.content)
 
     def update_nav_buttons(self, active_button):
         """Update navigation button styles"""
@@ -165,12 +168,12 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                 btn.configure(fg_color="transparent")
 
     def clear_content(self):
-        for widget in self.content.winfo_children():
-            widget.destroy()
+        self.tasks.cancel_all()
+        self.views.clear()
 
-    def create_header(self, title, subtitle=""):
+    def create_header(self, title, subtitle="", parent=None):
         """Create a consistent header for all pages"""
-        header_frame = customtkinter.CTkFrame(self.content, fg_color=self.primary_color, height=80)
+        header_frame = customtkinter.CTkFrame(parent or self.content, fg_color=self.primary_color, height=80)
         header_frame.pack(fill="x", padx=20, pady=(20, 15))
         header_frame.pack_propagate(False)
         
@@ -193,14 +196,17 @@ class ReceptionistFrame(customtkinter.CTkFrame):
             ).pack(anchor="w")
 
     def show_dashboard(self):
-        self.clear_content()
+        self.tasks.cancel_all()
         self.current_view = "dashboard"
         self.update_nav_buttons("🏠 Dashboard")
-        
-        self.create_header("Reception Dashboard", "Queen Elizabeth Hospital - Patient Management")
+        self.views.show("dashboard", self._build_dashboard)
+
+    def _build_dashboard(self, parent):
+        """Lay out the dashboard; returns the refresh that reloads the recent registrations"""
+        self.create_header("Reception Dashboard", "Queen Elizabeth Hospital - Patient Management", parent)
         
         # Dashboard content
-        main_frame = customtkinter.CTkFrame(self.content, fg_color="transparent")
+        main_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
         main_frame.pack(fill="both", expand=True, padx=20, pady=10)
         
         # Quick action cards
@@ -270,20 +276,26 @@ class ReceptionistFrame(customtkinter.CTkFrame):
             text_color=self.primary_color
         ).pack(pady=15)
         
-        # Recent patients table
-        self.show_recent_patients(activity_frame)
+        # Recent patients table, reloaded each time the dashboard is shown
+        recent_frame = customtkinter.CTkFrame(activity_frame, fg_color="transparent")
+        recent_frame.pack(fill="both", expand=True)
+
+        def refresh():
+            for widget in recent_frame.winfo_children():
+                widget.destroy()
+            self.show_recent_patients(recent_frame)
+
+        refresh()
+        return refresh
 
     def show_recent_patients(self, parent):
         """Show recent patient registrations with all fields in correct order"""
-        try:
-            self.cursor.execute("""
-                SELECT patient_id, name, date_of_birth, gender, phone, address, date_registered 
-                FROM patients 
-                ORDER BY date_registered DESC
-            """)
-            recent_patients = self.cursor.fetchall()
-            
-            if recent_patients:
+        loading = show_loading(parent, "Loading recent patients...")
+
+        def render(recent):
+            if not take_placeholder(loading):
+                return
+            if recent:
                 # Create table header
                 table_frame = customtkinter.CTkFrame(parent, fg_color="transparent")
                 table_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
@@ -302,7 +314,7 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                     ).grid(row=0, column=i, padx=10, pady=8, sticky="w")
                 
                 # Table rows
-                for i, patient in enumerate(recent_patients):
+                for i, patient in enumerate(recent):
                     row_frame = customtkinter.CTkFrame(table_frame, fg_color="white" if i % 2 == 0 else "#f8f9fa")
                     row_frame.pack(fill="x", pady=1)
                     
@@ -327,8 +339,10 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                     font=("Arial", 12), 
                     text_color="#666"
                 ).pack(pady=20)
-                
-        except Exception as e:
+
+        def on_error(e):
+            if not take_placeholder(loading):
+                return
             customtkinter.CTkLabel(
                 parent, 
                 text="Unable to load recent patients.", 
@@ -336,6 +350,8 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                 text_color=self.danger_color
             ).pack(pady=20)
 
+        self.tasks.run(recent_patients, render, on_error)
+
     def show_register_patient(self):
         self.clear_content()
         self.current_view = "register"
@@ -507,33 +523,50 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                 )
                 return
 
-        try:
+        def save(cursor):
             # Insert patient
             query = """
                 INSERT INTO patients (name, date_of_birth, gender, phone, address) 
                 VALUES (%s, %s, %s, %s, %s)
             """
-            self.cursor.execute(query, (name, dob, gender, phone or None, address or None))
-            self.conn.commit()
+            cursor.execute(query, (name, dob, gender, phone or None, address or None))
 
-            # Get the new patient ID
-            self.cursor.execute("SELECT LAST_INSERT_ID()")
-            new_id = self.cursor.fetchone()[0]
+            # The new patient ID, as reported by the driver for this insert
+            new_id = cursor.lastrowid
+
+            # Keep the name search index and the report rollups in step, in the same transaction
+            index_patient(cursor, new_id, name)
+            record_new_patient(cursor, gender)
+            return new_id
+
+        def saved(new_id):
+            # Log action first: the form may have been left while the insert ran
+            log_action(self.username, "Receptionist", f"Registered patient: {name} (ID: {new_id})")
+            invalidate_stats("patients")
+            clear_patient_cache()
+
+            if not status.winfo_exists():
+                return
 
             # Success message
-            self.register_status.configure(
+            status.configure(
                 text=f"✅ Patient '{name}' registered successfully! ID: {new_id}", 
                 text_color=self.success_color
             )
 
-            # Log action
-            log_action(self.username, "Receptionist", f"Registered patient: {name} (ID: {new_id})")
+            # Clear form after successful registration, unless it was left (and perhaps reopened) meanwhile
+            self.master.after(2000, lambda: status.winfo_exists() and self.clear_registration_form())
 
-            # Clear form after successful registration
-            self.master.after(2000, self.clear_registration_form)
+        def on_error(err):
+            if status.winfo_exists():
+                status.configure(text=f"❌ Database Error: {str(err)}", text_color=self.danger_color)
+            else:
+                messagebox.showerror("Database Error", f"Patient '{name}' was not registered: {err}")
 
-        except Exception as err:
-            self.register_status.configure(text=f"❌ Database Error: {str(err)}", text_color=self.danger_color)
+        # The form these callbacks update; it is destroyed if the user leaves the page
+        status = self.register_status
+        status.configure(text="Saving...", text_color="#666")
+        self.tasks.run(save, saved, on_error, cancellable=False)
 
     def clear_registration_form(self):
         self.name_entry.delete(0, 'end')
@@ -577,69 +610,46 @@ class ReceptionistFrame(customtkinter.CTkFrame):
         refresh_btn.pack(side="right")
         
         # Table container
-        table_container = customtkinter.CTkScrollableFrame(main_container, fg_color="transparent")
+        table_container = customtkinter.CTkFrame(main_container, fg_color="transparent")
         table_container.pack(fill="both", expand=True, padx=20, pady=(0, 20))
         
-        try:
-            self.cursor.execute("""
-                SELECT patient_id, name, date_of_birth, gender, phone, date_registered 
-                FROM patients 
-                ORDER BY date_registered DESC
-            """)
-            patients = self.cursor.fetchall()
-            
+        loading = show_loading(table_container, "Loading patients...")
+        query = """
+            SELECT patient_id, name, date_of_birth, gender, phone, date_registered 
+            FROM patients 
+            ORDER BY date_registered DESC
+        """
+
+        def load(cursor):
+            cursor.execute(query + " LIMIT %s", (PAGE_SIZE,))
+            return cursor.fetchall()
+
+        def render(patients):
+            if not take_placeholder(loading):
+                return
             if patients:
-                # Table header
-                headers = ["ID", "Name", "Date of Birth", "Gender", "Phone", "Registered", "Actions"]
-                header_frame = customtkinter.CTkFrame(table_container, fg_color=self.primary_color, height=40)
-                header_frame.pack(fill="x", pady=(0, 5))
-                
-                for i, header in enumerate(headers):
-                    customtkinter.CTkLabel(
-                        header_frame, 
-                        text=header, 
-                        font=("Arial", 12, "bold"),
-                        text_color="white"
-                    ).grid(row=0, column=i, padx=10, pady=10, sticky="w")
-                
-                # Table rows
-                for i, patient in enumerate(patients):
-                    row_color = "white" if i % 2 == 0 else "#f8f9fa"
-                    row_frame = customtkinter.CTkFrame(table_container, fg_color=row_color, height=50)
-                    row_frame.pack(fill="x", pady=1)
-                    row_frame.pack_propagate(False)
-                    
-                    # Patient data
+                def format_patient(patient):
+                    values = []
                     for j, value in enumerate(patient):
                         display_value = str(value) if value else "N/A"
                         if j == 2 and value:  # Format date
                             display_value = value.strftime("%Y-%m-%d") if hasattr(value, 'strftime') else str(value)
-                        
-                        customtkinter.CTkLabel(
-                            row_frame, 
-                            text=display_value, 
-                            font=("Arial", 11),
-                            text_color="#333"
-                        ).grid(row=0, column=j, padx=10, pady=10, sticky="w")
-                    
-                    # Action buttons
-                    action_frame = customtkinter.CTkFrame(row_frame, fg_color="transparent")
-                    action_frame.grid(row=0, column=len(headers)-1, padx=10, pady=5, sticky="w")
-                    
-                    def make_view_callback(patient_id=patient[0]):
-                        return lambda: self.view_patient_details(patient_id)
-                    
-                    view_btn = customtkinter.CTkButton(
-                        action_frame, 
-                        text="👁️", 
-                        width=30,
-                        height=30,
-                        font=("Arial", 12),
-                        fg_color=self.accent_color,
-                        hover_color="#0056b3",
-                        command=make_view_callback()
-                    )
-                    view_btn.pack(side="left", padx=2)
+                        values.append(display_value)
+                    return values
+
+                # Rows beyond the first page are fetched as the table scrolls
+                VirtualTable(
+                    table_container,
+                    columns=[("ID", 60), ("Name", 180), ("Date of Birth", 110), ("Gender", 80), ("Phone", 120), ("Registered", 160)],
+                    rows=patients,
+                    fetch_page=query_pages(self.tasks, query),
+                    format_row=format_patient,
+                    action=("👁️ View", lambda patient: self.view_patient_details(patient[0]), self.accent_color),
+                    header_color=self.primary_color,
+                    row_colors=("white", "#f8f9fa"),
+                    font=("Arial", 11),
+                    fg_color="transparent"
+                ).pack(fill="both", expand=True)
             else:
                 no_data_frame = customtkinter.CTkFrame(table_container, fg_color="transparent")
                 no_data_frame.pack(fill="both", expand=True)
@@ -650,8 +660,10 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                     font=("Arial", 16), 
                     text_color="#666"
                 ).pack(expand=True)
-                
-        except Exception as err:
+
+        def on_error(err):
+            if not take_placeholder(loading):
+                return
             error_frame = customtkinter.CTkFrame(table_container, fg_color="transparent")
             error_frame.pack(fill="both", expand=True)
             
@@ -662,12 +674,15 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                 text_color=self.danger_color
             ).pack(expand=True)
 
+        self.tasks.run(load, render, on_error)
+
     def view_patient_details(self, patient_id):
         """Show detailed patient information in a popup"""
-        try:
-            self.cursor.execute("SELECT * FROM patients WHERE patient_id = %s", (patient_id,))
-            patient_data = self.cursor.fetchone()
-            
+        def load(cursor):
+            cursor.execute("SELECT * FROM patients WHERE patient_id = %s", (patient_id,))
+            return cursor.fetchone()
+
+        def render(patient_data):
             if patient_data:
                 # Create popup window
                 detail_window = customtkinter.CTkToplevel(self)
@@ -725,9 +740,8 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                     fg_color=self.secondary_color,
                     hover_color=self.primary_color
                 ).pack(pady=20)
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load patient details: {str(e)}")
+
+        self.tasks.run(load, render, lambda e: messagebox.showerror("Error", f"Failed to load patient details: {str(e)}"))
 
     def show_search_patients(self):
         self.clear_content()
@@ -838,29 +852,25 @@ class ReceptionistFrame(customtkinter.CTkFrame):
             ).pack(expand=True)
             return
         
-        try:
-            # Build query
-            query_parts = []
-            params = []
-            
+        loading = show_loading(self.search_results_frame, "Searching...")
+
+        def load(cursor):
+            # Exact ID match first, then name matches ranked by the trigram search
+            patient_ids = []
+            if search_id.isdigit():
+                patient_ids.append(int(search_id))
             if search_name:
-                query_parts.append("name LIKE %s")
-                params.append(f"%{search_name}%")
-            
-            if search_id:
-                query_parts.append("patient_id = %s")
-                params.append(search_id)
-            
-            query = f"""
-                SELECT patient_id, name, date_of_birth, gender, phone, date_registered 
-                FROM patients 
-                WHERE {' OR '.join(query_parts)}
-                ORDER BY name
-            """
-            
-            self.cursor.execute(query, params)
-            results = self.cursor.fetchall()
-            
+                patient_ids += [match[0] for match in search_patients(cursor, search_name)
+                                if match[0] not in patient_ids]
+            return fetch_ranked(
+                cursor,
+                "patient_id, name, date_of_birth, gender, phone, date_registered",
+                patient_ids
+            )
+
+        def render(results):
+            if not take_placeholder(loading):
+                return
             if results:
                 # Results header
                 results_header = customtkinter.CTkLabel(
@@ -929,8 +939,10 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                     font=("Arial", 14), 
                     text_color=self.warning_color
                 ).pack(expand=True)
-                
-        except Exception as e:
+
+        def on_error(e):
+            if not take_placeholder(loading):
+                return
             customtkinter.CTkLabel(
                 self.search_results_frame, 
                 text=f"❌ Search error: {str(e)}", 
@@ -938,6 +950,8 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                 text_color=self.danger_color
             ).pack(expand=True)
 
+        self.tasks.run(load, render, on_error)
+
     def clear_search(self):
         self.search_name_entry.delete(0, 'end')
         self.search_id_entry.delete(0, 'end')
@@ -964,26 +978,35 @@ class ReceptionistFrame(customtkinter.CTkFrame):
         reports_container = customtkinter.CTkFrame(self.content, fg_color="white", corner_radius=12)
         reports_container.pack(fill="both", expand=True, padx=20, pady=10)
         
-        try:
+        loading = show_loading(reports_container, "Loading reports...")
+
+        def load(cursor):
             today = datetime.date.today()
-            week_ago = today - datetime.timedelta(days=7)
             
             # Today's stats
-            self.cursor.execute("SELECT COUNT(*) FROM patients WHERE DATE(date_registered) = %s", (today,))
-            today_count = self.cursor.fetchone()[0]
+            registered_today, params = date_ranges.on_day("date_registered", today)
+            cursor.execute(f"SELECT COUNT(*) FROM patients WHERE {registered_today}", params)
+            today_count = cursor.fetchone()[0]
             
             # This week's stats
-            self.cursor.execute("SELECT COUNT(*) FROM patients WHERE DATE(date_registered) >= %s", (week_ago,))
-            week_count = self.cursor.fetchone()[0]
+            registered_since, params = date_ranges.since_days("date_registered", 7, today)
+            cursor.execute(f"SELECT COUNT(*) FROM patients WHERE {registered_since}", params)
+            week_count = cursor.fetchone()[0]
             
             # Total patients
-            self.cursor.execute("SELECT COUNT(*) FROM patients")
-            total_count = self.cursor.fetchone()[0]
+            cursor.execute("SELECT COUNT(*) FROM patients")
+            total_count = cursor.fetchone()[0]
             
             # Gender breakdown
-            self.cursor.execute("SELECT gender, COUNT(*) FROM patients GROUP BY gender")
-            gender_stats = self.cursor.fetchall()
-            
+            cursor.execute("SELECT gender, COUNT(*) FROM patients GROUP BY gender")
+            gender_stats = cursor.fetchall()
+            return today_count, week_count, total_count, gender_stats
+
+        def render(data):
+            if not take_placeholder(loading):
+                return
+            today_count, week_count, total_count, gender_stats = data
+
             # Stats grid
             stats_frame = customtkinter.CTkFrame(reports_container, fg_color="transparent")
             stats_frame.pack(fill="x", padx=20, pady=20)
@@ -1038,8 +1061,10 @@ class ReceptionistFrame(customtkinter.CTkFrame):
                     font=("Arial", 12), 
                     text_color="#333"
                 ).pack(pady=8)
-                
-        except Exception as e:
+
+        def on_error(e):
+            if not take_placeholder(loading):
+                return
             error_label = customtkinter.CTkLabel(
                 reports_container, 
                 text=f"❌ Error loading reports: {str(e)}", 
@@ -1048,6 +1073,8 @@ class ReceptionistFrame(customtkinter.CTkFrame):
             )
             error_label.pack(expand=True)
 
+        self.tasks.run(load, render, on_error)
+
     def show_quick_actions(self):
         self.clear_content()
         self.current_view = "quick_actions"
@@ -1144,15 +1171,14 @@ call 911 or go directly to Emergency Department"""
         messagebox.showinfo("Print Function", "📄 Print function would generate a patient list report.\n\nThis feature requires printer setup and configuration.")
 
     def refresh_database(self):
-        try:
-            # Reconnect to database
-            if self.conn:
-                self.conn.close()
-            self.conn = get_connection()
-            self.cursor = self.conn.cursor()
-            messagebox.showinfo("Success", "✅ Database connection refreshed successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"❌ Failed to refresh database: {str(e)}")
+        # Drop idle pooled connections, then check a fresh one can be opened
+        get_pool().close_all()
+        self.tasks.run(
+            lambda cursor: cursor.execute("SELECT 1"),
+            lambda _: messagebox.showinfo("Success", "✅ Database connection refreshed successfully!"),
+            lambda e: messagebox.showerror("Error", f"❌ Failed to refresh database: {str(e)}"),
+            cancellable=False
+        )
 
     def export_reports(self):
         messagebox.showinfo("Export Function", "📊 Export function would save patient data to CSV/Excel file.\n\nThis feature requires file system permissions.")
@@ -1183,11 +1209,13 @@ contact IT Support immediately."""
 
     def logout(self):
         try:
-            if self.conn:
-                self.conn.close()
+            self.tasks.cancel_all()
             log_action(self.username, "Receptionist", "Logged out")
+            flush_audit_log()
         except:
             pass
-        self.master.destroy()
+        # The application window tears this frame down and shows the login page
         if self.on_logout:
-            self.on_logout()
\ No newline at end of file
+            self.on_logout()
+        else:
+            self.master.destroy()
\ No newline at end of file
@@ -0,0 +1,150 @@
+import os
+from datetime import datetime
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.units import inch
+from reports import FULL_YEAR
+
+
+def _table(data, header_size=12):
+    """Two-column table in the report style: grey header row, beige body"""
+    table = Table(data, colWidths=[3*inch, 2*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    return table
+
+
+def _title(styles, heading, month_name, year):
+    """Hospital name and the report heading for the period"""
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=1  # Center alignment
+    )
+    period = f"Annual Report - {year}" if month_name == FULL_YEAR else f"Monthly Report - {month_name} {year}"
+    return [
+        Paragraph(f"Queen Elizabeth Central Hospital", title_style),
+        Paragraph(f"{heading} {period}" if heading else period, styles['Heading2']),
+        Spacer(1, 20),
+    ]
+
+
+def _footer(styles):
+    return [
+        Spacer(1, 30),
+        Paragraph(f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']),
+        Paragraph("Queen Elizabeth Central Hospital - Blantyre, Malawi", styles['Normal']),
+    ]
+
+
+def _build(filename, story, on_progress=None):
+    """Write story to filename through "<filename>.partial", so a failed or
+    killed build leaves nothing behind; on_progress receives the fraction done"""
+    partial = filename + ".partial"
+    doc = SimpleDocTemplate(partial, pagesize=A4)
+    if on_progress is not None:
+        size = [1]
+
+        def progress(kind, value):
+            if kind == "SIZE_EST":
+                size[0] = max(1, value)
+            elif kind == "PROGRESS":
+                on_progress(min(1.0, value / size[0]))
+
+        doc.setProgressCallBack(progress)
+    try:
+        doc.build(story)
+        os.replace(partial, filename)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def build_period_report(filename, month_name, year, new_patients, total_treatments,
+                        dept_treatments, usage_stats, days=30, on_progress=None):
+    """Lay out the monthly (or annual) report PDF from data already fetched;
+    on_progress receives the fraction of the layout done"""
+    styles = getSampleStyleSheet()
+    story = _title(styles, None, month_name, year)
+
+    # Patient statistics
+    story.append(Paragraph("Patient Statistics", styles['Heading3']))
+
+    # Patient statistics table
+    patient_data = [
+        ['Metric', 'Value'],
+        ['New Patients Registered', str(new_patients)],
+        ['Total Treatments Given', str(total_treatments)],
+        ['Average Treatments per Day', str(round(total_treatments/days, 1))]
+    ]
+
+    story.append(_table(patient_data, header_size=14))
+    story.append(Spacer(1, 20))
+
+    # Department performance
+    if dept_treatments:
+        story.append(Paragraph("Department Performance", styles['Heading3']))
+
+        dept_data = [['Department', 'Treatments']]
+        for dept, count in dept_treatments:
+            dept_data.append([dept or 'General', str(count)])
+
+        story.append(_table(dept_data))
+        story.append(Spacer(1, 20))
+
+    # System usage statistics
+    story.append(Paragraph("System Usage", styles['Heading3']))
+
+    if usage_stats:
+        usage_data = [['Department', 'System Activities']]
+        for dept, count in usage_stats:
+            usage_data.append([dept, str(count)])
+
+        story.append(_table(usage_data))
+
+    story.extend(_footer(styles))
+    _build(filename, story, on_progress)
+
+
+def build_specialization_report(filename, specialization, month_name, year, total_treatments,
+                                dept_treatments, doctors, days=30):
+    """Lay out the report of one specialization for the period: its share of
+    the treatments and the treatments given by each of its doctors.
+    doctors is the period's doctor_treatments(); other specializations are skipped."""
+    styles = getSampleStyleSheet()
+    story = _title(styles, specialization, month_name, year)
+    treatments = dict(dept_treatments).get(specialization, 0)
+    staff = [(firstname, lastname, count) for firstname, lastname, doctor_specialization, count in doctors
+             if doctor_specialization == specialization]
+    share = 100.0 * treatments / total_treatments if total_treatments else 0.0
+
+    story.append(Paragraph("Treatment Statistics", styles['Heading3']))
+    story.append(_table([
+        ['Metric', 'Value'],
+        ['Treatments Given', str(treatments)],
+        ['Share of All Treatments', f"{share:.1f}%"],
+        ['Average Treatments per Day', str(round(treatments/days, 1))],
+        ['Doctors', str(len(staff))]
+    ], header_size=14))
+    story.append(Spacer(1, 20))
+
+    story.append(Paragraph("Doctors", styles['Heading3']))
+    if staff:
+        story.append(_table([['Doctor', 'Treatments']] +
+                            [[f"Dr. {firstname} {lastname}", str(count)] for firstname, lastname, count in staff]))
+
+    story.extend(_footer(styles))
+    _build(filename, story)
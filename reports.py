@@ -0,0 +1,234 @@
+import calendar
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from datetime import date
+import date_ranges
+from db_connection import get_backend
+from rollups import period_report
+
+FULL_YEAR = "Full Year"
+MONTHS = list(calendar.month_name)[1:]
+LOAD_SHARE = 0.2                # part of the progress bar spent fetching the figures
+# A fresh interpreter per report: nothing of the Tk process (its threads, its
+# open connections) is inherited, and killing it on cancel is always safe
+START_METHOD = "spawn"
+POLL_SECONDS = 0.1
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+def report_period(month_name, year):
+    """[start, end) dates covered by the report for month_name (or FULL_YEAR) of year"""
+    year = int(year)
+    if month_name == FULL_YEAR:
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    _, (start, end) = date_ranges.in_month("date", year, MONTHS.index(month_name) + 1)
+    return start, end
+
+
+def report_filename(month_name, year, specialization=None):
+    if specialization:
+        safe = "".join(ch if ch.isalnum() else "_" for ch in specialization)
+        return f"Hospital_Report_{safe}_{month_name.replace(' ', '_')}_{year}.pdf"
+    return f"Hospital_Report_{month_name.replace(' ', '_')}_{year}.pdf"
+
+
+def render_report(month_name, year, filename, on_progress=None):
+    """Fetch the figures for one report and write its PDF to filename.
+    on_progress(stage, fraction) is called as the work advances. The PDF is
+    written beside filename first, so a failed or killed render leaves
+    nothing behind."""
+    # reportlab is only loaded where reports are laid out: in the worker
+    # process and batch_reports.py, never in the Tk process
+    from report_layout import build_period_report
+    report = on_progress or (lambda stage, fraction: None)
+    start, end = report_period(month_name, year)
+    report("Loading figures", 0.0)
+    conn = get_backend().connect()
+    try:
+        cursor = conn.cursor(buffered=True)
+        data = period_report(cursor, start, end)
+        conn.commit()   # keep any rollups the catch-up refreshed
+        cursor.close()
+    finally:
+        conn.close()
+
+    report("Laying out", LOAD_SHARE)
+    build_period_report(
+        filename, month_name, year, *data, days=(end - start).days,
+        on_progress=lambda fraction: report("Laying out", LOAD_SHARE + (1 - LOAD_SHARE) * fraction)
+    )
+
+
+def _render_in_worker(month_name, year, filename, updates):
+    try:
+        render_report(month_name, year, filename, lambda stage, fraction: updates.put((stage, fraction)))
+    except Exception as err:
+        updates.put(("error", f"{type(err).__name__}: {err}"))
+    else:
+        updates.put(("done", 1.0))
+
+
+class ReportRequest:
+    """One report waiting in, or taken from, the ReportQueue"""
+
+    __slots__ = ("month_name", "year", "filename")
+
+    def __init__(self, month_name, year, filename):
+        self.month_name = month_name
+        self.year = str(year)
+        self.filename = filename
+
+    @property
+    def title(self):
+        if self.month_name == FULL_YEAR:
+            return f"Annual report {self.year}"
+        return f"{self.month_name} {self.year} report"
+
+
+class ReportProgress:
+    """State of the report being rendered, posted to ReportQueue.updates"""
+
+    __slots__ = ("request", "stage", "fraction", "pending", "done", "error")
+
+    def __init__(self, request, stage="Queued", fraction=0.0, pending=0, done=False, error=None):
+        self.request = request
+        self.stage = stage
+        self.fraction = fraction
+        self.pending = pending
+        self.done = done
+        self.error = error
+
+
+class ReportQueue:
+    """Renders queued reports one at a time, each in its own worker process,
+    so neither the figures query nor the PDF layout runs on the Tk thread.
+
+    A dispatcher thread takes requests in order and relays the worker's
+    progress to the updates queue, which the Tk side polls with after().
+    cancel() drops a waiting request or kills the worker rendering it.
+    """
+
+    def __init__(self):
+        self.updates = queue.SimpleQueue()
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._current = None
+        self._cancel_current = threading.Event()
+        self._thread = None
+
+    def submit(self, request):
+        with self._lock:
+            self._pending.append(request)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="report-queue", daemon=True)
+                self._thread.start()
+        return request
+
+    def pending(self):
+        with self._lock:
+            return list(self._pending)
+
+    def current(self):
+        return self._current
+
+    def busy(self):
+        with self._lock:
+            return self._current is not None or bool(self._pending)
+
+    def cancel(self, request=None):
+        """Cancel request (the report being rendered when not given)"""
+        with self._lock:
+            if request is not None and request is not self._current:
+                if request in self._pending:
+                    self._pending.remove(request)
+                    self.updates.put(ReportProgress(request, "Cancelled", pending=len(self._pending),
+                                                    done=True, error=ReportCancelled()))
+                return
+            if self._current is not None:
+                self._cancel_current.set()
+
+    def cancel_all(self):
+        with self._lock:
+            dropped = list(self._pending)
+            self._pending.clear()
+            if self._current is not None:
+                self._cancel_current.set()
+        for request in dropped:
+            self.updates.put(ReportProgress(request, "Cancelled", done=True, error=ReportCancelled()))
+
+    def _next(self):
+        with self._lock:
+            self._current = self._pending.popleft() if self._pending else None
+            self._cancel_current.clear()
+            return self._current, len(self._pending)
+
+    def _run(self):
+        context = multiprocessing.get_context(START_METHOD)
+        while True:
+            request, pending = self._next()
+            if request is None:
+                return
+            self.updates.put(ReportProgress(request, "Starting", pending=pending))
+            try:
+                outcome = self._render(context, request)
+            except Exception as err:
+                outcome = ReportProgress(request, "Failed", done=True, error=err)
+            outcome.pending = len(self._pending)
+            self.updates.put(outcome)
+
+    def _render(self, context, request):
+        updates = context.SimpleQueue()
+        worker = context.Process(
+            target=_render_in_worker, args=(request.month_name, request.year, request.filename, updates),
+            name="report-worker", daemon=True
+        )
+        worker.start()
+        try:
+            while True:
+                if self._cancel_current.is_set():
+                    worker.terminate()
+                    worker.join()
+                    partial = request.filename + ".partial"
+                    if os.path.exists(partial):
+                        os.remove(partial)
+                    return ReportProgress(request, "Cancelled", done=True, error=ReportCancelled())
+                # Drain everything the worker posted, keeping the latest state;
+                # liveness is read first so a result posted just before exiting is seen
+                alive = worker.is_alive()
+                latest = None
+                while not updates.empty():
+                    latest = updates.get()
+                if latest is not None:
+                    stage, value = latest
+                    if stage == "done":
+                        return ReportProgress(request, "Saved", 1.0, done=True)
+                    if stage == "error":
+                        return ReportProgress(request, "Failed", done=True, error=RuntimeError(value))
+                    self.updates.put(ReportProgress(request, stage, value, pending=len(self._pending)))
+                elif not alive:
+                    return ReportProgress(request, "Failed", done=True, error=RuntimeError(
+                        f"the report worker exited unexpectedly (code {worker.exitcode})"))
+                else:
+                    worker.join(POLL_SECONDS)
+        finally:
+            worker.join(5)
+            updates.close()
+
+
+_report_queue = None
+_report_queue_lock = threading.Lock()
+
+
+def get_report_queue():
+    global _report_queue
+    if _report_queue is None:
+        with _report_queue_lock:
+            if _report_queue is None:
+                _report_queue = ReportQueue()
+    return _report_queue
@@ -0,0 +1,159 @@
+"""Restore a backup written by backup.py into the configured database.
+
+    python restore.py ~/hospital_backups/hospital_db_backup_20250101_180000_incr [--yes]
+
+An incremental backup is restored with the chain it builds on: the full backup
+the chain starts from is loaded first (every table dropped and recreated),
+then each increment in order - changed rows are upserted, tables copied whole
+are replaced. Throughput is reported per table and for the whole restore.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from backup import BackupError, open_table_file, read_manifest, verify_backup
+from db_connection import get_backend
+from patient_search import index_patient
+
+INSERT_BATCH = 1000             # rows per executemany (a multi-row INSERT on MySQL)
+
+
+def backup_chain(path):
+    """The full backup path builds on followed by every increment up to path, oldest first"""
+    chain = [os.path.abspath(path)]
+    manifest = read_manifest(path)
+    while manifest["kind"] == "incremental":
+        previous = os.path.join(os.path.dirname(chain[0]), manifest["previous"])
+        if not os.path.isdir(previous):
+            raise BackupError(f"{os.path.basename(chain[0])} builds on {manifest['previous']}, which is missing")
+        chain.insert(0, previous)
+        manifest = read_manifest(previous)
+    return chain
+
+
+def restore_table(cursor, path, compression, mode, touched_patients=None):
+    """Load one table file; returns the number of rows written. mode "full"
+    recreates the table from its DDL, "changes" upserts by primary key."""
+    with open_table_file(path, compression) as f:
+        header = json.loads(f.readline())
+        table, columns = header["table"], header["columns"]
+        if mode == "full":
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            for ddl in header["ddl"]:
+                cursor.execute(ddl)
+        verb = "INSERT" if mode == "full" else "REPLACE"
+        sql = (f"{verb} INTO {table} ({', '.join(columns)}) "
+               f"VALUES ({', '.join(['%s'] * len(columns))})")
+        # Renamed or new patients need their name trigrams rewritten afterwards
+        track = touched_patients is not None and table == "patients"
+        if track:
+            id_column, name_column = columns.index("patient_id"), columns.index("name")
+        rows = 0
+        batch = []
+        for line in f:
+            row = json.loads(line)
+            batch.append(row)
+            if track:
+                touched_patients[row[id_column]] = row[name_column]
+            if len(batch) >= INSERT_BATCH:
+                cursor.executemany(sql, batch)
+                rows += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(sql, batch)
+            rows += len(batch)
+    return rows
+
+
+def check_chain(path, backend):
+    """(chain, manifests) for path, every backup verified and taken from backend's kind of database"""
+    chain = backup_chain(path)
+    manifests = []
+    for backup_path in chain:
+        manifest = verify_backup(backup_path)
+        if manifest["backend"] != backend.name:
+            raise BackupError(f"{os.path.basename(backup_path)} is a {manifest['backend']} backup; "
+                              f"the configured database is {backend.name}")
+        manifests.append(manifest)
+    return chain, manifests
+
+
+def replay_backup(conn, cursor, backup_path, manifest, touched_patients, report=print):
+    """Load every table of one backup, committing table by table; returns the rows written"""
+    report(f"{manifest['kind'].capitalize()} backup {os.path.basename(backup_path)} "
+           f"(taken {manifest['taken_at']})")
+    incremental = manifest["kind"] == "incremental"
+    total_rows = 0
+    for entry in manifest["tables"]:
+        started = time.perf_counter()
+        rows = restore_table(
+            cursor, os.path.join(backup_path, entry["file"]), manifest["compression"],
+            entry["mode"], touched_patients if incremental else None
+        )
+        conn.commit()
+        seconds = time.perf_counter() - started
+        total_rows += rows
+        report(f"  {entry['table']:24} {rows:>10,} rows {seconds:8.2f} s "
+               f"{rows / seconds if seconds else 0:>12,.0f} rows/s")
+    return total_rows
+
+
+def restore(path, backend=None, report=print):
+    """Replay path (and, for an increment, the backups it builds on) into the
+    database; returns (rows, seconds) for the whole restore"""
+    backend = backend or get_backend()
+    chain, manifests = check_chain(path, backend)
+
+    started = time.perf_counter()
+    total_rows = 0
+    touched_patients = {}
+    conn = backend.connect()
+    try:
+        cursor = conn.cursor()
+        backend.foreign_keys(cursor, False)
+        for backup_path, manifest in zip(chain, manifests):
+            total_rows += replay_backup(conn, cursor, backup_path, manifest, touched_patients, report)
+        if touched_patients:
+            for patient_id, name in touched_patients.items():
+                index_patient(cursor, patient_id, name)
+            conn.commit()
+            report(f"  Re-indexed the names of {len(touched_patients):,} changed patients")
+        backend.foreign_keys(cursor, True)
+        cursor.close()
+    finally:
+        conn.close()
+    seconds = time.perf_counter() - started
+    report(f"Restored {total_rows:,} rows in {seconds:.1f} s "
+           f"({total_rows / seconds if seconds else 0:,.0f} rows/s) into {backend.describe()}")
+    return total_rows, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("backup", help="backup directory; an increment brings its whole chain")
+    parser.add_argument("--yes", action="store_true", help="do not ask before replacing the database")
+    args = parser.parse_args()
+
+    try:
+        chain = backup_chain(args.backup)
+    except (OSError, BackupError) as err:
+        print(f"Cannot restore: {err}")
+        sys.exit(1)
+    print("Restore order:")
+    for backup_path in chain:
+        print(f"  {backup_path}")
+    if not args.yes:
+        answer = input(f"This replaces the data in {get_backend().describe()}. Type RESTORE to continue: ")
+        if answer.strip() != "RESTORE":
+            print("Restore cancelled.")
+            return
+    try:
+        restore(args.backup)
+    except BackupError as err:
+        print(f"Restore failed: {err}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
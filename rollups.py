@@ -0,0 +1,268 @@
+import sys
+from datetime import date, timedelta
+
+LOCK_NAME = "hospital_management_rollups"
+LOCK_TIMEOUT = 10       # seconds to wait for another client's catch-up
+CATCH_UP_DAYS = 2       # days before the watermark recomputed on each catch-up
+REBUILD_CHUNK_DAYS = 31
+
+# The treatments dimension for a doctor: NULL and '' specializations both count
+# as 'General', here in SQL and in _specialization() for the incremental upkeep
+SPECIALIZATION_SQL = "COALESCE(NULLIF(d.specialization, ''), 'General')"
+
+# metric -> SELECT yielding (day, dimension, value) for rows in [start, end);
+# each is the rollup of one of the report queries that used to scan the raw tables
+METRICS = {
+    "new_patients": """
+        SELECT DATE(date_registered), '', COUNT(*) FROM patients
+        WHERE date_registered >= %s AND date_registered < %s
+        GROUP BY DATE(date_registered)""",
+    "new_patients_gender": """
+        SELECT DATE(date_registered), COALESCE(gender, ''), COUNT(*) FROM patients
+        WHERE date_registered >= %s AND date_registered < %s
+        GROUP BY DATE(date_registered), COALESCE(gender, '')""",
+    "new_patients_blood_type": """
+        SELECT DATE(date_registered), COALESCE(blood_type, ''), COUNT(*) FROM patients
+        WHERE date_registered >= %s AND date_registered < %s
+        GROUP BY DATE(date_registered), COALESCE(blood_type, '')""",
+    # dimension: the doctor's specialization ('General' when unset), '' when no doctor yet
+    "treatments": f"""
+        SELECT DATE(t.date),
+               CASE WHEN d.id IS NULL THEN '' ELSE {SPECIALIZATION_SQL} END,
+               COUNT(*)
+        FROM treatments t LEFT JOIN doctors d ON d.id = t.doctor_id
+        WHERE t.date >= %s AND t.date < %s
+        GROUP BY DATE(t.date), CASE WHEN d.id IS NULL THEN '' ELSE {SPECIALIZATION_SQL} END""",
+    "treatments_doctor": """
+        SELECT DATE(date), CAST(doctor_id AS CHAR), COUNT(*) FROM treatments
+        WHERE date >= %s AND date < %s AND doctor_id IS NOT NULL
+        GROUP BY DATE(date), doctor_id""",
+    "emergencies": """
+        SELECT DATE(date), '', COUNT(*) FROM patient_notes
+        WHERE date >= %s AND date < %s AND emergency = TRUE
+        GROUP BY DATE(date)""",
+    "log_activity": """
+        SELECT log_date, department, COUNT(*) FROM logs
+        WHERE log_date >= %s AND log_date < %s
+        GROUP BY log_date, department""",
+}
+
+
+# Incremental upkeep, called in the same transaction as the write ---
+
+def bump(cursor, metric, dimension="", amount=1, day=None):
+    """Add amount to one daily_stats counter (today's unless day is given)"""
+    dimension = "" if dimension is None else str(dimension)
+    if day is None:
+        cursor.execute(
+            "INSERT IGNORE INTO daily_stats (day, metric, dimension, value) VALUES (CURDATE(), %s, %s, 0)",
+            (metric, dimension)
+        )
+        cursor.execute(
+            "UPDATE daily_stats SET value = value + %s WHERE day = CURDATE() AND metric = %s AND dimension = %s",
+            (amount, metric, dimension)
+        )
+    else:
+        cursor.execute(
+            "INSERT IGNORE INTO daily_stats (day, metric, dimension, value) VALUES (%s, %s, %s, 0)",
+            (day, metric, dimension)
+        )
+        cursor.execute(
+            "UPDATE daily_stats SET value = value + %s WHERE day = %s AND metric = %s AND dimension = %s",
+            (amount, day, metric, dimension)
+        )
+
+
+def record_new_patient(cursor, gender, blood_type=None):
+    bump(cursor, "new_patients")
+    bump(cursor, "new_patients_gender", gender)
+    bump(cursor, "new_patients_blood_type", blood_type)
+
+
+def _specialization(value):
+    """SPECIALIZATION_SQL for a specialization read in Python"""
+    return value or "General"
+
+
+def record_treatment(cursor, doctor_id, amount=1, day=None):
+    if doctor_id is None:
+        bump(cursor, "treatments", "", amount, day)
+        return
+    cursor.execute("SELECT specialization FROM doctors WHERE id = %s", (doctor_id,))
+    row = cursor.fetchone()
+    specialization = "" if row is None else _specialization(row[0])
+    bump(cursor, "treatments", specialization, amount, day)
+    bump(cursor, "treatments_doctor", doctor_id, amount, day)
+
+
+_SAME_DOCTOR = object()
+
+
+def record_treatment_moved(cursor, treatment_id, doctor_id=_SAME_DOCTOR):
+    """Call before an UPDATE that re-dates a treatment to now (and possibly
+    assigns doctor_id): moves its count from the old day and doctor"""
+    cursor.execute("SELECT DATE(date), doctor_id FROM treatments WHERE treatment_id = %s", (treatment_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    old_day, old_doctor = row
+    if old_day is not None:
+        record_treatment(cursor, old_doctor, -1, old_day)
+    record_treatment(cursor, old_doctor if doctor_id is _SAME_DOCTOR else doctor_id)
+
+
+def record_emergency(cursor):
+    bump(cursor, "emergencies")
+
+
+def record_log_activity(cursor, entries):
+    """Count a batch of audit log rows: (user, department, action, log_date, timestamp) tuples"""
+    counts = {}
+    for _, department, _, log_date, _ in entries:
+        counts[(log_date, department)] = counts.get((log_date, department), 0) + 1
+    for (log_date, department), count in counts.items():
+        bump(cursor, "log_activity", department, count, log_date)
+
+
+def record_log_deleted(cursor, log_id):
+    """Call before deleting a log entry"""
+    cursor.execute("SELECT log_date, department FROM logs WHERE log_id = %s", (log_id,))
+    row = cursor.fetchone()
+    if row is not None:
+        bump(cursor, "log_activity", row[1], -1, row[0])
+
+
+# Rebuilding from the raw tables ---
+
+def rebuild(cursor, start, end):
+    """Recompute every metric for the days in [start, end) from the raw tables"""
+    cursor.execute("DELETE FROM daily_stats WHERE day >= %s AND day < %s", (start, end))
+    for metric, query in METRICS.items():
+        cursor.execute(query, (start, end))
+        rows = [(day, metric, dimension, value) for day, dimension, value in cursor.fetchall()]
+        if rows:
+            cursor.executemany(
+                "INSERT INTO daily_stats (day, metric, dimension, value) VALUES (%s, %s, %s, %s)", rows
+            )
+
+
+def _first_day(cursor):
+    cursor.execute("""
+        SELECT MIN(first) FROM (
+            SELECT MIN(date_registered) AS first FROM patients
+            UNION ALL SELECT MIN(date) FROM treatments
+            UNION ALL SELECT MIN(date) FROM patient_notes
+            UNION ALL SELECT MIN(log_date) FROM logs
+        ) firsts
+    """)
+    first = cursor.fetchone()[0]
+    return None if first is None else _as_date(first)
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value.date() if hasattr(value, "date") else value
+
+
+def catch_up(cursor, full=False):
+    """Bring daily_stats up to date: the whole history the first time (or with
+    full=True), afterwards the days since the last catch-up plus CATCH_UP_DAYS,
+    which absorbs rows written by clients that could not update the rollups.
+    Cheap when already current (two small SELECTs), so report loaders call it first."""
+    cursor.execute("SELECT CURDATE()")
+    today = _as_date(cursor.fetchone()[0])
+    cursor.execute("SELECT built_through FROM rollup_state WHERE name = 'daily_stats'")
+    row = cursor.fetchone()
+    built_through = None if row is None or full else _as_date(row[0])
+    if built_through is not None and built_through >= today:
+        return False
+
+    cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+    if cursor.fetchone()[0] != 1:
+        return False  # another client is catching up; its rollups will do
+    try:
+        if built_through is None:
+            start = _first_day(cursor) or today
+        else:
+            start = built_through - timedelta(days=CATCH_UP_DAYS)
+        end = today + timedelta(days=1)
+        while start < end:
+            chunk_end = min(end, start + timedelta(days=REBUILD_CHUNK_DAYS))
+            rebuild(cursor, start, chunk_end)
+            start = chunk_end
+        cursor.execute("INSERT IGNORE INTO rollup_state (name, built_through) VALUES ('daily_stats', %s)", (today,))
+        cursor.execute("UPDATE rollup_state SET built_through = %s WHERE name = 'daily_stats'", (today,))
+        return True
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchall()
+
+
+# Reading ---
+
+def totals(cursor, metric, start=None, end=None):
+    """{dimension: value} summed over the days in [start, end) (all days when not given)"""
+    if start is None:
+        cursor.execute(
+            "SELECT dimension, SUM(value) FROM daily_stats WHERE metric = %s GROUP BY dimension", (metric,)
+        )
+    else:
+        cursor.execute(
+            "SELECT dimension, SUM(value) FROM daily_stats "
+            "WHERE metric = %s AND day >= %s AND day < %s GROUP BY dimension",
+            (metric, start, end)
+        )
+    return {dimension: int(value) for dimension, value in cursor.fetchall() if value}
+
+
+def period_report(cursor, start, end):
+    """Figures for the monthly/yearly report PDF, from a few hundred rollup rows"""
+    catch_up(cursor)
+    new_patients = sum(totals(cursor, "new_patients", start, end).values())
+    by_specialization = totals(cursor, "treatments", start, end)
+    total_treatments = sum(by_specialization.values())
+    dept_treatments = sorted(
+        ((specialization, count) for specialization, count in by_specialization.items() if specialization),
+        key=lambda item: item[1], reverse=True
+    )
+    usage_stats = sorted(totals(cursor, "log_activity", start, end).items(), key=lambda item: item[1], reverse=True)
+    return new_patients, total_treatments, dept_treatments, usage_stats
+
+
+def doctor_treatments(cursor, start, end):
+    """(firstname, lastname, specialization, treatments) for every doctor over
+    [start, end), busiest first; specialization is 'General' when unset"""
+    by_doctor = totals(cursor, "treatments_doctor", start, end)
+    cursor.execute("SELECT id, firstname, lastname, specialization FROM doctors")
+    doctors = [(firstname, lastname, _specialization(specialization), by_doctor.get(str(doctor_id), 0))
+               for doctor_id, firstname, lastname, specialization in cursor.fetchall()]
+    doctors.sort(key=lambda doctor: doctor[3], reverse=True)
+    return doctors
+
+
+def department_stats(cursor):
+    """All-time patient gender and blood type counts and treatments per doctor,
+    shaped like the GROUP BY results the statistics page used to read"""
+    catch_up(cursor)
+    gender = sorted(totals(cursor, "new_patients_gender").items())
+    blood_type = sorted(totals(cursor, "new_patients_blood_type").items())
+    by_doctor = totals(cursor, "treatments_doctor")
+    cursor.execute("SELECT id, firstname, lastname FROM doctors")
+    doctors = [(firstname, lastname, by_doctor.get(str(doctor_id), 0))
+               for doctor_id, firstname, lastname in cursor.fetchall()]
+    doctors.sort(key=lambda doctor: doctor[2], reverse=True)
+    return gender, blood_type, doctors
+
+
+if __name__ == "__main__":
+    from db_connection import get_connection
+    conn = get_connection()
+    cursor = conn.cursor(buffered=True)
+    try:
+        rebuilt = catch_up(cursor, full="--rebuild" in sys.argv)
+        conn.commit()
+        print("Rollups rebuilt." if rebuilt else "Rollups are up to date.")
+    finally:
+        cursor.close()
+        conn.close()
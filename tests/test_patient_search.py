@@ -0,0 +1,85 @@
+import os
+import shutil
+import sys
+import tempfile
+import importlib.util
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_backend import SQLiteBackend
+from db_connection import get_connection, set_backend
+from migrations import migrate
+from patient_search import find_patients, index_patient
+
+PATIENTS = ["Chikondi Banda", "Mphatso Phiri", "Thoko Banda", "Kondwani Mwale"]
+
+
+def run_query(work):
+    # query_executor.run_query without the GUI import
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        result = work(cursor)
+        conn.commit()
+        cursor.close()
+        return result
+    finally:
+        conn.close()
+
+
+class PatientSearchTest(unittest.TestCase):
+    """The searches the role frames run, on a scratch SQLite database"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix="hospital_test_")
+        set_backend(SQLiteBackend(os.path.join(self.directory, "hospital.db")))
+        migrate()
+
+        def register(cursor):
+            for name in PATIENTS:
+                cursor.execute(
+                    "INSERT INTO patients (name, date_of_birth, gender, blood_type) "
+                    "VALUES (%s, '1990-01-01', 'F', 'O+')",
+                    (name,)
+                )
+                index_patient(cursor, cursor.lastrowid, name)
+        run_query(register)
+
+    def tearDown(self):
+        set_backend(None)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def search(self, term):
+        # What the doctor's "Search Patient" page runs
+        return run_query(lambda cursor: find_patients(cursor, term, "patient_id, name"))
+
+    def test_search_by_name(self):
+        self.assertEqual([name for _, name in self.search("banda")], ["Chikondi Banda", "Thoko Banda"])
+
+    def test_search_tolerates_a_typo(self):
+        self.assertEqual([name for _, name in self.search("Mphatso Phri")], ["Mphatso Phiri"])
+
+    def test_one_character_search(self):
+        # Too short for a trigram: a word starting with it ranks first
+        self.assertEqual([name for _, name in self.search("k")],
+                         ["Kondwani Mwale", "Chikondi Banda", "Thoko Banda"])
+
+    def test_short_search_treats_wildcards_literally(self):
+        self.assertEqual(self.search("_"), [])
+
+    def test_search_by_id_comes_first(self):
+        self.assertEqual(self.search("3")[0], (3, "Thoko Banda"))
+
+    @unittest.skipUnless(importlib.util.find_spec("customtkinter"), "needs customtkinter")
+    def test_doctor_page_uses_find_patients(self):
+        import doctor
+        import patient_search
+        self.assertIs(doctor.find_patients, patient_search.find_patients)
+
+    def test_no_match(self):
+        self.assertEqual(self.search("zzzz"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,13 +3,9 @@ import customtkinter
 from tkinter import messagebox, ttk, filedialog
 import tkinter as tk
 from datetime import datetime, date
-from db_connection import get_connection
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.units import inch
-import calendar
+from query_executor import run_query
+from credentials import authenticate, LoginThrottled
+from assets import load_image
 class LoginPage(customtkinter.CTk):
     def __init__(self):
         super().__init__()
@@ -41,16 +37,13 @@ class LoginPage(customtkinter.CTk):
         logo_frame = customtkinter.CTkFrame(title_frame, fg_color="transparent")
         logo_frame.pack(pady=15)
         
-        # Try to load logo, fallback to text
-        img_path = os.path.join(os.path.dirname(__file__), "hospital_logo.png")
-        if os.path.exists(img_path):
-            try:
-                pil_img = Image.open(img_path)
-                hospital_logo = customtkinter.CTkImage(light_image=pil_img, size=(60, 60))
-                logo_label = customtkinter.CTkLabel(logo_frame, image=hospital_logo, text="")
-                logo_label.pack(side="left", padx=(0, 15))
-            except:
-                pass
+        # Try to load logo (pre-resized, from the asset cache), fallback to text
+        hospital_logo = load_image(
+            "hospital_logo.png", (60, 60), customtkinter.ScalingTracker.get_widget_scaling(self)
+        )
+        if hospital_logo is not None:
+            logo_label = customtkinter.CTkLabel(logo_frame, image=hospital_logo, text="")
+            logo_label.pack(side="left", padx=(0, 15))
         
         # Hospital name and subtitle
         text_frame = customtkinter.CTkFrame(logo_frame, fg_color="transparent")
@@ -300,16 +293,10 @@ class LoginPage(customtkinter.CTk):
         self.update()
         
         try:
-            self.conn = get_connection()
-            self.cursor = self.conn.cursor()
-            
-            # More secure query (consider using hashed passwords in production)
-            self.cursor.execute("SELECT role FROM users WHERE username=%s AND password=%s", (username, password))
-            result = self.cursor.fetchone()
-            self.conn.close()
+            session = run_query(lambda cursor: authenticate(cursor, username, password))
             
-            if result:
-                role = result[0]
+            if session:
+                role = session.role
                 self.status_label.configure(text="✅ Login successful! Loading dashboard...", text_color="#28a745")
                 self.update()
                 self.withdraw()
@@ -355,6 +342,8 @@ class LoginPage(customtkinter.CTk):
             else:
                 self.status_label.configure(text="❌ Invalid username or password. Please try again.", text_color="#dc3545")
                 
+        except LoginThrottled as err:
+            self.status_label.configure(text=f"⏳ {err}", text_color="#dc3545")
         except Exception as err:
             self.status_label.configure(text=f"🚫 Database connection error. Contact IT support.", text_color="#dc3545")
             print(f"Database Error: {err}")  # Log for debugging
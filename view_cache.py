@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+import customtkinter
+
+MAX_CACHED_VIEWS = 4            # per role frame; the least recently shown is destroyed first
+
+
+class ViewCache:
+    """Keeps the views of a role frame's content area alive between visits.
+
+    show(name, build) hides whatever the content area is showing, then packs
+    the view cached under name again and calls its refresh(), which reloads
+    only the view's data. A view that is not cached yet is built: build(parent)
+    lays it out in a fresh container and returns its refresh function (or
+    None). Pages that are not cached still call clear() and draw straight into
+    the content area; clear() hides the cached views and destroys the rest.
+
+    The time every show takes on the Tk thread, layout included, is kept per
+    view and kind ("build" or "reuse"); report() summarises it.
+    """
+
+    def __init__(self, content, max_views=MAX_CACHED_VIEWS):
+        self.content = content
+        self.max_views = max_views
+        self._views = OrderedDict()     # name -> (container, refresh), least recently shown first
+        self.timings = {}               # (name, kind) -> [seconds, ...]
+
+    def clear(self):
+        """Hide the cached views and destroy everything else in the content area"""
+        cached = {container for container, _ in self._views.values()}
+        for widget in self.content.winfo_children():
+            if widget in cached:
+                widget.pack_forget()
+            else:
+                widget.destroy()
+
+    def show(self, name, build):
+        self.clear()
+        started = time.perf_counter()
+        view = self._views.get(name)
+        if view is not None:
+            self._views.move_to_end(name)
+            container, refresh = view
+            container.pack(fill="both", expand=True)
+            if refresh is not None:
+                refresh()
+            kind = "reuse"
+        else:
+            container = customtkinter.CTkFrame(self.content, fg_color="transparent")
+            container.pack(fill="both", expand=True)
+            refresh = build(container)
+            if self.max_views > 0:
+                self._views[name] = (container, refresh)
+                while len(self._views) > self.max_views:
+                    _, (oldest, _) = self._views.popitem(last=False)
+                    oldest.destroy()
+            kind = "build"
+        # Lay the view out now, so the time taken includes geometry management
+        self.content.update_idletasks()
+        self.timings.setdefault((name, kind), []).append(time.perf_counter() - started)
+        return container
+
+    def invalidate(self, name=None):
+        """Destroy the cached view name (every cached view when not given), so its next show rebuilds it"""
+        names = list(self._views) if name is None else [name]
+        for view_name in names:
+            view = self._views.pop(view_name, None)
+            if view is not None:
+                view[0].destroy()
+
+    def report(self):
+        """One line per view: median build and reuse time, in milliseconds"""
+        lines = []
+        for name in sorted({name for name, _ in self.timings}):
+            parts = []
+            for kind in ("build", "reuse"):
+                samples = sorted(self.timings.get((name, kind), []))
+                if samples:
+                    parts.append(f"{kind} {samples[len(samples) // 2] * 1000:7.1f} ms x{len(samples)}")
+            lines.append(f"{name:24} " + "   ".join(parts))
+        return lines
@@ -0,0 +1,228 @@
+import customtkinter
+
+ROW_HEIGHT = 32
+PAGE_SIZE = 100
+WHEEL_ROWS = 3
+
+
+class VirtualTable(customtkinter.CTkFrame):
+    """Scrollable table that only creates widgets for the rows on screen.
+
+    Row widgets are created once per visible slot and re-filled as the table
+    scrolls, so a list of thousands of rows costs the same number of widgets
+    as a list of twenty. Rows come either from a list (rows=...) or lazily,
+    a page at a time, from fetch_page(offset, limit, done, failed); done(rows)
+    must be called back on the Tk thread, or failed() if the page could not
+    be loaded (an error, or the query was cancelled), so that scrolling back
+    to it fetches it again (query_pages() builds one on FrameTasks).
+    Passing both treats rows as the first page.
+    """
+
+    def __init__(self, master, columns, rows=None, fetch_page=None, total=None,
+                 page_size=PAGE_SIZE, row_height=ROW_HEIGHT, format_row=None,
+                 action=None, height=400, header_color="#2c3e50",
+                 row_colors=("#ecf0f1", "#ffffff"), font=("Arial", 10), **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = columns              # [(title, width), ...]
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.row_height = row_height
+        self.format_row = format_row or _default_format
+        self.action = action                # (text, callback(row), color) or None
+        self.row_colors = row_colors
+        self.font = font
+
+        self._rows = dict(enumerate(rows or []))
+        self._loaded_until = len(self._rows)
+        self._requested = set()
+        if fetch_page is None:
+            self._total = len(self._rows)
+        elif rows is not None:
+            # rows already holds the first page (e.g. fetched to decide "no results")
+            self._requested.add(0)
+            self._total = len(rows) if len(rows) < page_size else total
+        else:
+            self._total = total             # None until the last page has been seen
+        self._first = 0
+        self._slots = []
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        header = customtkinter.CTkFrame(self, fg_color=header_color)
+        header.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 2))
+        titles = list(columns) + ([("Actions", 80)] if action else [])
+        for i, (title, width) in enumerate(titles):
+            customtkinter.CTkLabel(
+                header,
+                text=title,
+                width=width,
+                font=(font[0], 12, "bold"),
+                text_color="white",
+                anchor="w"
+            ).grid(row=0, column=i, padx=2, pady=8, sticky="w")
+
+        self.body = customtkinter.CTkFrame(self, height=height, fg_color="transparent")
+        self.body.grid(row=1, column=0, sticky="nsew")
+        self.scrollbar = customtkinter.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+
+        self.body.bind("<Configure>", lambda e: self._layout())
+        self._bind_wheel(self.body)
+
+        if fetch_page is not None:
+            self._request(0)
+
+    # Data -------------------------------------------------------------
+
+    def row_count(self):
+        """Rows the scroll range covers; one extra placeholder row while more may follow"""
+        if self._total is not None:
+            return self._total
+        return self._loaded_until + 1
+
+    def _row(self, index):
+        row = self._rows.get(index)
+        if row is None and self.fetch_page is not None:
+            self._request(index // self.page_size)
+        return row
+
+    def _request(self, page):
+        if page in self._requested:
+            return
+        self._requested.add(page)
+        offset = page * self.page_size
+        self.fetch_page(offset, self.page_size, lambda rows: self._page_loaded(offset, rows),
+                        lambda: self._requested.discard(page))
+
+    def _page_loaded(self, offset, rows):
+        try:
+            if not self.winfo_exists():
+                return
+        except Exception:
+            return
+        for i, row in enumerate(rows):
+            self._rows[offset + i] = row
+        self._loaded_until = max(self._loaded_until, offset + len(rows))
+        if self._total is None and len(rows) < self.page_size:
+            self._total = offset + len(rows)
+        self._refresh()
+
+    # Layout -----------------------------------------------------------
+
+    def _layout(self):
+        needed = max(1, self.body.winfo_height() // self.row_height + 1)
+        while len(self._slots) < needed:
+            self._slots.append(self._make_slot(len(self._slots)))
+        self._refresh()
+
+    def _make_slot(self, position):
+        slot = customtkinter.CTkFrame(self.body, height=self.row_height, corner_radius=0)
+        slot.labels = []
+        for i, (_, width) in enumerate(self.columns):
+            label = customtkinter.CTkLabel(slot, text="", width=width, font=self.font, anchor="w")
+            label.grid(row=0, column=i, padx=2, pady=2, sticky="w")
+            self._bind_wheel(label)
+            slot.labels.append(label)
+        slot.button = None
+        if self.action:
+            text, _, color = self.action
+            slot.button = customtkinter.CTkButton(
+                slot, text=text, width=70, height=self.row_height - 8,
+                font=self.font, fg_color=color
+            )
+            slot.button.grid(row=0, column=len(self.columns), padx=2, pady=2)
+        slot.color = None
+        slot.position = position
+        self._bind_wheel(slot)
+        return slot
+
+    def _refresh(self):
+        count = self.row_count()
+        visible = max(1, self.body.winfo_height() // self.row_height)
+        self._first = max(0, min(self._first, count - visible))
+
+        for slot in self._slots:
+            index = self._first + slot.position
+            if index >= count:
+                slot.place_forget()
+                continue
+            slot.place(x=0, y=slot.position * self.row_height, relwidth=1)
+            color = self.row_colors[index % len(self.row_colors)]
+            if slot.color != color:
+                slot.configure(fg_color=color)
+                slot.color = color
+
+            row = self._row(index)
+            if row is None:
+                values = ["Loading..."] + [""] * (len(self.columns) - 1)
+            else:
+                values = self.format_row(row)
+            for label, value in zip(slot.labels, values):
+                text = str(value)
+                if label.cget("text") != text:
+                    label.configure(text=text)
+            if slot.button is not None:
+                if row is None:
+                    slot.button.grid_remove()
+                else:
+                    slot.button.grid()
+                    slot.button.configure(command=lambda r=row: self.action[1](r))
+
+        if count:
+            self.scrollbar.set(self._first / count, min(1.0, (self._first + visible) / count))
+        else:
+            self.scrollbar.set(0, 1)
+
+    # Scrolling --------------------------------------------------------
+
+    def scroll_to(self, index):
+        self._first = max(0, index)
+        self._refresh()
+
+    def _on_scrollbar(self, *args):
+        count = self.row_count()
+        visible = max(1, self.body.winfo_height() // self.row_height)
+        if args[0] == "moveto":
+            self.scroll_to(int(float(args[1]) * count))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (visible if args[2] == "pages" else 1)
+            self.scroll_to(self._first + step)
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4:
+            step = -WHEEL_ROWS
+        elif getattr(event, "num", None) == 5:
+            step = WHEEL_ROWS
+        else:
+            step = -WHEEL_ROWS if event.delta > 0 else WHEEL_ROWS
+        self.scroll_to(self._first + step)
+        return "break"
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", self._on_wheel)
+        widget.bind("<Button-5>", self._on_wheel)
+
+
+def _default_format(row):
+    return ["N/A" if value is None else value for value in row]
+
+
+def query_pages(tasks, query, params=(), on_error=None):
+    """fetch_page for VirtualTable that runs query with LIMIT/OFFSET on a FrameTasks"""
+    def fetch_page(offset, limit, done, failed=None):
+        def load(cursor):
+            cursor.execute(query + " LIMIT %s OFFSET %s", tuple(params) + (limit, offset))
+            return cursor.fetchall()
+
+        def error(err):
+            if failed is not None:
+                failed()
+            if on_error is not None:
+                on_error(err)
+            else:
+                print(f"Background query failed: {err}")
+
+        tasks.run(load, done, error, on_cancel=failed)
+    return fetch_page